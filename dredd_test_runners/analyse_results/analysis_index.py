@@ -0,0 +1,338 @@
+import json
+import os
+import sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# An analysis index holds a condensed copy of the results of a campaign: for each completed test, the numbers of mutants
+# that it covered, killed, skipped and saw survive; for each killed mutant, the test that killed it, the kind of kill
+# and when it happened; and, for each kind of test, the mutants covered by some test of that kind. Aggregate queries
+# are answered from the index rather than by reading every result file.
+#
+# The index is brought up to date incrementally before each analysis: only the results that have appeared (or changed)
+# since the last analysis are read. A completed test's summary never changes, so only tests that are new to the index,
+# or that were terminated early (and may since have been resumed), are looked at. An index is tied to the result
+# store from which it was built, and is rebuilt if it is used with another store.
+
+FORMAT_VERSION: int = 1
+
+# The kinds of test, as determined from test names by test_generator.
+GENERATORS: List[str] = ["csmith", "yarpgen", "llvm-test-suite", "llvm-regression", "other"]
+
+# Kills for which reducing the killing test leads to a runnable test case with an oracle.
+ACTIONABLE_KILL_TYPES: List[str] = ['KillStatus.KILL_DIFFERENT_STDOUT',
+                                    'KillStatus.KILL_RUNTIME_TIMEOUT',
+                                    'KillStatus.KILL_DIFFERENT_EXIT_CODES']
+
+# The number of tests whose summaries are fetched from a result database with a single query.
+DATABASE_BATCH_SIZE: int = 500
+
+
+def test_generator(test_name: str) -> str:
+    # Works both for test names and for the killing tests recorded with kills, which for LLVM tests are paths relative
+    # to the test suite root rather than directory names.
+    if test_name.startswith("csmith_"):
+        return "csmith"
+    if test_name.startswith("yarpgen_"):
+        return "yarpgen"
+    if test_name.startswith("SingleSource"):
+        return "llvm-test-suite"
+    if test_name.endswith(".ll"):
+        return "llvm-regression"
+    return "other"
+
+
+def format_time(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+class IndexedTest:
+    # The condensed summary of a completed test. 'version' identifies the recorded summary from which it was made, so
+    # that a test whose summary has been replaced is indexed again.
+    def __init__(self, name: str, version: str, completed_at: float, kill_summary: Dict):
+        self.name: str = name
+        self.generator: str = test_generator(name)
+        self.version: str = version
+        self.completed_at: float = completed_at
+        self.terminated_early: bool = kill_summary.get("terminated_early", False)
+        self.covered_mutants: List[int] = kill_summary.get("covered_mutants", [])
+        self.killed: int = len(kill_summary.get("killed_mutants", []))
+        self.skipped: int = len(kill_summary.get("skipped_mutants", []))
+        self.survived: int = len(kill_summary.get("survived_mutants", []))
+
+
+class IndexedKill:
+    def __init__(self, mutant: int, killing_test: str, kill_type: str, killed_at: float):
+        self.mutant: int = mutant
+        self.killing_test: str = killing_test
+        self.generator: str = test_generator(killing_test)
+        self.kill_type: str = kill_type
+        self.killed_at: float = killed_at
+
+
+def _read_test(test_dir: Path, indexed_version: Optional[str]) -> Optional[IndexedTest]:
+    # Returns None if the test has not been completed, or if the index already holds its current summary. A summary is
+    # identified by its modification time and size.
+    kill_summary_file: Path = test_dir / "kill_summary.json"
+    try:
+        stat: os.stat_result = kill_summary_file.stat()
+    except FileNotFoundError:
+        return None
+    version: str = f"{stat.st_mtime_ns}:{stat.st_size}"
+    if version == indexed_version:
+        return None
+    try:
+        with open(kill_summary_file, 'r') as infile:
+            kill_summary: Dict = json.load(infile)
+    except ValueError:
+        # The summary is still being written; it will be indexed by a later analysis.
+        return None
+    return IndexedTest(name=test_dir.name, version=version, completed_at=stat.st_mtime, kill_summary=kill_summary)
+
+
+def _read_kill(mutant_dir: Path) -> Optional[IndexedKill]:
+    # Returns None if the worker that killed the mutant has not (yet) written the kill information.
+    kill_info_file: Path = mutant_dir / "kill_info.json"
+    try:
+        killed_at: float = kill_info_file.stat().st_mtime
+        with open(kill_info_file, 'r') as infile:
+            kill_info: Dict = json.load(infile)
+    except (FileNotFoundError, ValueError):
+        return None
+    return IndexedKill(mutant=int(mutant_dir.name),
+                       killing_test=kill_info["killing_test"],
+                       kill_type=kill_info["kill_type"],
+                       killed_at=killed_at)
+
+
+class AnalysisIndex:
+    SCHEMA: List[str] = [
+        "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS tests (name TEXT PRIMARY KEY, generator TEXT NOT NULL, version TEXT NOT NULL, "
+        "completed_at REAL NOT NULL, terminated_early INTEGER NOT NULL, covered INTEGER NOT NULL, "
+        "killed INTEGER NOT NULL, skipped INTEGER NOT NULL, survived INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS kills (mutant INTEGER PRIMARY KEY, killing_test TEXT NOT NULL, "
+        "generator TEXT NOT NULL, kill_type TEXT NOT NULL, killed_at REAL NOT NULL)",
+        # A mutant covered by several tests of the same kind is recorded once for that kind.
+        "CREATE TABLE IF NOT EXISTS coverage (generator TEXT NOT NULL, mutant INTEGER NOT NULL, "
+        "PRIMARY KEY (generator, mutant)) WITHOUT ROWID",
+    ]
+
+    def __init__(self, path: Path, source: str):
+        # 'source' identifies the result store that the index condenses.
+        self.path: Path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        for statement in AnalysisIndex.SCHEMA:
+            self.connection.execute(statement)
+        metadata: Dict[str, str] = dict(self.connection.execute("SELECT key, value FROM metadata").fetchall())
+        if metadata != {"format_version": str(FORMAT_VERSION), "source": source}:
+            self.clear(source)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def clear(self, source: str) -> None:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ["metadata", "tests", "kills", "coverage"]:
+                self.connection.execute(f"DELETE FROM {table}")
+            self.connection.executemany("INSERT INTO metadata (key, value) VALUES (?, ?)",
+                                        [("format_version", str(FORMAT_VERSION)), ("source", source)])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def _unsettled_tests(self) -> Tuple[Set[str], Dict[str, str]]:
+        # Returns the tests whose summaries can no longer change, and the indexed summary versions of the others.
+        settled: Set[str] = set(name for (name,) in self.connection.execute(
+            "SELECT name FROM tests WHERE terminated_early = 0"))
+        versions: Dict[str, str] = dict(self.connection.execute(
+            "SELECT name, version FROM tests WHERE terminated_early = 1").fetchall())
+        return settled, versions
+
+    def _indexed_kills(self) -> Set[int]:
+        return set(mutant for (mutant,) in self.connection.execute("SELECT mutant FROM kills"))
+
+    def update_from_directory(self, work_dir: Path, jobs: int) -> Tuple[int, int]:
+        # Indexes the results recorded under a work directory (see DirectoryResultStore). Result files are read by
+        # 'jobs' threads, since on a network file system the time taken is dominated by the latency of each read.
+        # Returns the number of tests and the number of kills that were indexed.
+        tests_dir: Path = work_dir / "tests"
+        killed_mutants_dir: Path = work_dir / "killed_mutants"
+        settled, versions = self._unsettled_tests()
+        candidate_tests: List[str] = [entry.name for entry in os.scandir(tests_dir)
+                                      if entry.name not in settled and entry.is_dir()]
+        indexed_kills: Set[int] = self._indexed_kills()
+        new_kills: List[str] = [entry.name for entry in os.scandir(killed_mutants_dir)
+                                if entry.name.isdigit() and int(entry.name) not in indexed_kills]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            tests: List[IndexedTest] = [test for test in executor.map(
+                lambda name: _read_test(tests_dir / name, versions.get(name)), candidate_tests) if test is not None]
+            kills: List[IndexedKill] = [kill for kill in executor.map(
+                lambda name: _read_kill(killed_mutants_dir / name), new_kills) if kill is not None]
+        self._record(tests, kills)
+        return len(tests), len(kills)
+
+    def update_from_database(self, database: Path) -> Tuple[int, int]:
+        # Indexes the results recorded in a result database (see SqliteResultStore), which is opened read-only. A
+        # summary is identified by its length and by the time of the test's last heartbeat, which changes whenever a
+        # test is resumed. Returns the number of tests and the number of kills that were indexed.
+        source: sqlite3.Connection = sqlite3.connect(database.resolve().as_uri() + "?mode=ro", uri=True,
+                                                     timeout=60.0)
+        try:
+            if source.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'test_claims'").fetchone():
+                completed_at: str = "COALESCE(test_claims.heartbeat_at, tests.claimed_at)"
+                claims_join: str = "LEFT JOIN test_claims ON test_claims.name = tests.name"
+            else:
+                # A database written before heartbeats were recorded.
+                completed_at = "tests.claimed_at"
+                claims_join = ""
+            settled, versions = self._unsettled_tests()
+            changed: Dict[str, Tuple[str, float]] = {}
+            for name, version, at in source.execute(
+                    f"SELECT tests.name, length(tests.summary) || ':' || {completed_at}, {completed_at} "
+                    f"FROM tests {claims_join} WHERE tests.summary IS NOT NULL"):
+                if name not in settled and versions.get(name) != version:
+                    changed[name] = (version, at)
+            tests: List[IndexedTest] = []
+            names: List[str] = sorted(changed.keys())
+            for start in range(0, len(names), DATABASE_BATCH_SIZE):
+                batch: List[str] = names[start:start + DATABASE_BATCH_SIZE]
+                for name, summary in source.execute(
+                        f"SELECT name, summary FROM tests WHERE name IN ({', '.join('?' * len(batch))})", batch):
+                    tests.append(IndexedTest(name=name, version=changed[name][0], completed_at=changed[name][1],
+                                             kill_summary=json.loads(summary)))
+            indexed_kills: Set[int] = self._indexed_kills()
+            kills: List[IndexedKill] = [IndexedKill(mutant=mutant, killing_test=killing_test, kill_type=kill_type,
+                                                    killed_at=killed_at)
+                                        for mutant, killing_test, kill_type, killed_at in source.execute(
+                                            "SELECT mutant, killing_test, kill_type, killed_at FROM kills")
+                                        if mutant not in indexed_kills]
+        finally:
+            source.close()
+        self._record(tests, kills)
+        return len(tests), len(kills)
+
+    def _record(self, tests: List[IndexedTest], kills: List[IndexedKill]) -> None:
+        covered: Dict[str, Set[int]] = {generator: set() for generator in GENERATORS}
+        if tests:
+            for generator, mutant in self.connection.execute("SELECT generator, mutant FROM coverage"):
+                covered[generator].add(mutant)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for test in tests:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO tests (name, generator, version, completed_at, terminated_early, covered, "
+                    "killed, skipped, survived) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (test.name, test.generator, test.version, test.completed_at, int(test.terminated_early),
+                     len(test.covered_mutants), test.killed, test.skipped, test.survived))
+                newly_covered: Set[int] = set(test.covered_mutants).difference(covered[test.generator])
+                self.connection.executemany("INSERT INTO coverage (generator, mutant) VALUES (?, ?)",
+                                            [(test.generator, mutant) for mutant in newly_covered])
+                covered[test.generator].update(newly_covered)
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO kills (mutant, killing_test, generator, kill_type, killed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(kill.mutant, kill.killing_test, kill.generator, kill.kill_type, kill.killed_at) for kill in kills])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    # Each of the following queries returns the names of the columns of its result, and its rows. Queries can be
+    # restricted to the tests (and kills by tests) of the given kinds.
+
+    @staticmethod
+    def _restrict(generators: Optional[List[str]], column: str = "generator") -> Tuple[str, List[str]]:
+        if not generators:
+            return "1", []
+        return f"{column} IN ({', '.join('?' * len(generators))})", list(generators)
+
+    def generator_summary(self, generators: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+        # For each kind of test, and overall ('all'): the number of tests, how many were terminated early, the number
+        # of mutants killed, the number of distinct mutants covered, how many of those survived every test (i.e. were
+        # not killed by any test, of any kind), and the ratio of the latter to the former.
+        condition, parameters = AnalysisIndex._restrict(generators)
+        rows: Dict[str, List] = {}
+        for generator, tests, terminated_early in self.connection.execute(
+                f"SELECT generator, COUNT(*), SUM(terminated_early) FROM tests WHERE {condition} GROUP BY generator",
+                parameters):
+            rows[generator] = [generator, tests, terminated_early, 0, 0, 0]
+        for generator, kills in self.connection.execute(
+                f"SELECT generator, COUNT(*) FROM kills WHERE {condition} GROUP BY generator", parameters):
+            rows.setdefault(generator, [generator, 0, 0, 0, 0, 0])[3] = kills
+        surviving: str = "NOT EXISTS (SELECT 1 FROM kills WHERE kills.mutant = coverage.mutant)"
+        for generator, covered, survived in self.connection.execute(
+                f"SELECT generator, COUNT(*), SUM({surviving}) FROM coverage WHERE {condition} GROUP BY generator",
+                parameters):
+            rows.setdefault(generator, [generator, 0, 0, 0, 0, 0])[4:6] = [covered, survived]
+        totals: List = ["all"] + [sum(row[column] for row in rows.values()) for column in range(1, 4)]
+        totals += list(self.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM({surviving}), 0) FROM "
+            f"(SELECT DISTINCT mutant FROM coverage WHERE {condition}) AS coverage", parameters).fetchone())
+        return (["generator", "tests", "terminated_early", "kills", "covered_mutants", "surviving_mutants",
+                 "surviving_ratio"],
+                [tuple(row + [row[5] / row[4] if row[4] else None])
+                 for row in [rows[generator] for generator in GENERATORS if generator in rows] + [totals]])
+
+    def kill_types(self, generators: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+        # The number of kills of each type, for each kind of killing test and overall ('all').
+        condition, parameters = AnalysisIndex._restrict(generators)
+        by_generator: List[Tuple] = self.connection.execute(
+            f"SELECT generator, kill_type, COUNT(*) FROM kills WHERE {condition} GROUP BY generator, kill_type "
+            f"ORDER BY generator, kill_type", parameters).fetchall()
+        overall: List[Tuple] = self.connection.execute(
+            f"SELECT 'all', kill_type, COUNT(*) FROM kills WHERE {condition} GROUP BY kill_type ORDER BY kill_type",
+            parameters).fetchall()
+        return ["generator", "kill_type", "kills"], by_generator + overall
+
+    def timeline(self, period: float, generators: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+        # For each period of 'period' seconds in which something happened, and for each kind of test and overall
+        # ('all'): the number of tests completed and of mutants killed during the period, and the number of mutants
+        # killed up to the end of the period.
+        condition, parameters = AnalysisIndex._restrict(generators)
+        counts: Dict[Tuple[int, str], List[int]] = {}
+        for timestamp_column, table, column in [("completed_at", "tests", 0), ("killed_at", "kills", 1)]:
+            for bucket, generator, count in self.connection.execute(
+                    f"SELECT CAST({timestamp_column} / ? AS INTEGER), generator, COUNT(*) FROM {table} "
+                    f"WHERE {condition} GROUP BY 1, 2", [period] + parameters):
+                for key in [(bucket, generator), (bucket, "all")]:
+                    counts.setdefault(key, [0, 0])[column] += count
+        cumulative_kills: Dict[str, int] = {}
+        rows: List[Tuple] = []
+        for bucket, generator in sorted(counts.keys(), key=lambda key: (key[0], (GENERATORS + ["all"]).index(key[1]))):
+            tests, kills = counts[(bucket, generator)]
+            cumulative_kills[generator] = cumulative_kills.get(generator, 0) + kills
+            rows.append((format_time(bucket * period), generator, tests, kills, cumulative_kills[generator]))
+        return ["period_start", "generator", "tests_completed", "kills", "cumulative_kills"], rows
+
+    def tests(self, generators: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+        # Every completed test, with the fraction of the mutants that it evaluated (i.e. that it covered and that had
+        # not already been killed) that survived it.
+        condition, parameters = AnalysisIndex._restrict(generators)
+        return (["test", "generator", "completed_at", "terminated_early", "covered", "killed", "skipped", "survived",
+                 "survived_ratio"],
+                [(name, generator, format_time(completed_at), bool(terminated_early), covered, killed, skipped,
+                  survived, survived / (killed + survived) if killed + survived else None)
+                 for name, generator, completed_at, terminated_early, covered, killed, skipped, survived
+                 in self.connection.execute(
+                    f"SELECT name, generator, completed_at, terminated_early, covered, killed, skipped, survived "
+                    f"FROM tests WHERE {condition} ORDER BY name", parameters)])
+
+    def actionable_kills(self, generators: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+        # The kills for which test case reduction will lead to a runnable killing test case with an oracle.
+        condition, parameters = AnalysisIndex._restrict(generators)
+        return (["mutant", "killing_test", "generator", "kill_type", "killed_at"],
+                [(mutant, killing_test, generator, kill_type, format_time(killed_at))
+                 for mutant, killing_test, generator, kill_type, killed_at in self.connection.execute(
+                    f"SELECT mutant, killing_test, generator, kill_type, killed_at FROM kills WHERE {condition} "
+                    f"AND kill_type IN ({', '.join('?' * len(ACTIONABLE_KILL_TYPES))}) ORDER BY killing_test, mutant",
+                    parameters + ACTIONABLE_KILL_TYPES)])
@@ -1,9 +1,19 @@
 import argparse
+import csv
 import json
+import os
 import sys
+import time
+
+from dredd_test_runners.analyse_results.analysis_index import GENERATORS, AnalysisIndex
 
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
+
+REPORTS: List[str] = ["summary", "kill_types", "timeline", "tests", "actionable"]
+
+# The lengths, in seconds, of the periods into which the timeline is divided.
+PERIODS: Dict[str, float] = {"hour": 3600.0, "day": 86400.0, "week": 604800.0}
 
 
 def main():
@@ -11,6 +21,43 @@ def main():
     parser.add_argument("work_dir",
                         help="Directory containing test results. It should have subdirectories, 'tests' and 'killed_mutants'.",
                         type=Path)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which results were recorded, if results were not recorded as files "
+                             "under the working directory.",
+                        type=Path)
+    parser.add_argument("--report",
+                        default="summary",
+                        choices=REPORTS,
+                        help="The analysis to report: a summary of the tests, kills and surviving mutants of each kind "
+                             "of test; the number of kills of each type; tests completed and mutants killed over time; "
+                             "the outcome of every test; or the kills for which test case reduction will lead to a "
+                             "runnable killing test case with an oracle.")
+    parser.add_argument("--generator",
+                        choices=GENERATORS,
+                        help="Restrict the analysis to tests of this kind, and to the kills that they made.")
+    parser.add_argument("--period",
+                        default="day",
+                        choices=list(PERIODS.keys()),
+                        help="The length of the periods into which the timeline is divided.")
+    parser.add_argument("--format",
+                        default="json",
+                        choices=["json", "csv"],
+                        help="Format in which to write the report.")
+    parser.add_argument("--output",
+                        help="File to which to write the report. Defaults to standard output.",
+                        type=Path)
+    parser.add_argument("--index",
+                        help="SQLite database in which to keep the analysis index, which is brought up to date with "
+                             "the results recorded since the previous analysis. Defaults to 'analysis_index.sqlite' in "
+                             "the working directory.",
+                        type=Path)
+    parser.add_argument("--rebuild_index",
+                        action="store_true",
+                        help="Discard the analysis index and index all results again.")
+    parser.add_argument("--jobs",
+                        default=os.cpu_count(),
+                        help="Number of threads with which to read result files.",
+                        type=int)
     args = parser.parse_args()
     work_dir: Path = args.work_dir
     if not work_dir.exists() or not work_dir.is_dir():
@@ -20,36 +67,61 @@ def main():
     if not tests_dir.exists() or not tests_dir.is_dir():
         print(f"Error: {str(tests_dir)} does not exist.")
         sys.exit(1)
-    killed_mutants_dir = work_dir / "killed_mutants"
-    if not killed_mutants_dir.exists() or not killed_mutants_dir.is_dir():
-        print(f"Error: {str(killed_mutants_dir)} does not exist.")
+    if args.result_database is not None:
+        if not args.result_database.exists():
+            print(f"Error: {str(args.result_database)} does not exist.")
+            sys.exit(1)
+    else:
+        killed_mutants_dir = work_dir / "killed_mutants"
+        if not killed_mutants_dir.exists() or not killed_mutants_dir.is_dir():
+            print(f"Error: {str(killed_mutants_dir)} does not exist.")
+            sys.exit(1)
+    if args.jobs < 1:
+        print("Error: --jobs must be at least 1.")
         sys.exit(1)
 
-    for test in tests_dir.glob('*'):
-        if not test.is_dir():
-            continue
-        if not test.name.startswith("csmith"):
-            continue
-        kill_summary: Path = test / "kill_summary.json"
-        if not kill_summary.exists():
-            continue
-        kill_summary_json: Dict = json.load(open(kill_summary, 'r'))
-        for mutant in kill_summary_json["killed_mutants"]:
-            mutant_summary = json.load(open(killed_mutants_dir / str(mutant) / "kill_info.json", 'r'))
-            kill_type: str = mutant_summary['kill_type']
-            if kill_type == 'KillStatus.KILL_DIFFERENT_STDOUT':
-                print(mutant_summary)
-            elif kill_type == 'KillStatus.KILL_RUNTIME_TIMEOUT':
-                print(mutant_summary)
-            elif kill_type == 'KillStatus.KILL_DIFFERENT_EXIT_CODES':
-                print(mutant_summary)
-            elif kill_type == 'KillStatus.KILL_COMPILER_CRASH':
-                pass
-            elif kill_type == 'KillStatus.KILL_COMPILER_TIMEOUT':
-                pass
-            else:
-                print(kill_type)
-                assert(False)
+    # The index is tied to the store from which it was built.
+    source: Path = args.result_database if args.result_database is not None else work_dir
+    index_path: Path = args.index if args.index is not None else work_dir / "analysis_index.sqlite"
+    index: AnalysisIndex = AnalysisIndex(path=index_path, source=str(source.resolve()))
+    if args.rebuild_index:
+        index.clear(source=str(source.resolve()))
+    start_time: float = time.time()
+    if args.result_database is not None:
+        num_tests, num_kills = index.update_from_database(database=args.result_database)
+    else:
+        num_tests, num_kills = index.update_from_directory(work_dir=work_dir, jobs=args.jobs)
+    # Progress goes to standard error, so that it does not get mixed up with a report written to standard output.
+    print(f"Indexed {num_tests} new or updated tests and {num_kills} new kills in {time.time() - start_time:.1f}s.",
+          file=sys.stderr)
+
+    generators: List[str] = [args.generator] if args.generator is not None else []
+    if args.report == "summary":
+        report: Tuple[List[str], List[Tuple]] = index.generator_summary(generators)
+    elif args.report == "kill_types":
+        report = index.kill_types(generators)
+    elif args.report == "timeline":
+        report = index.timeline(period=PERIODS[args.period], generators=generators)
+    elif args.report == "tests":
+        report = index.tests(generators)
+    else:
+        assert args.report == "actionable"
+        report = index.actionable_kills(generators)
+    index.close()
+
+    columns, rows = report
+    outfile = open(args.output, 'w', newline='') if args.output is not None else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump([dict(zip(columns, row)) for row in rows], outfile, indent=2)
+            outfile.write("\n")
+        else:
+            writer = csv.writer(outfile)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
 
 
 if __name__ == '__main__':
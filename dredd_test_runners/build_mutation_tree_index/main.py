@@ -0,0 +1,26 @@
+import argparse
+
+from dredd_test_runners.common.mutation_tree_index import build_mutation_tree_index
+
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mutation_info_files",
+                        help="Files containing information about mutations, generated by Dredd.",
+                        nargs='+',
+                        type=Path)
+    parser.add_argument("--mutation_tree_cache_dir",
+                        help="Directory in which to store the binary indexes of the mutation trees. Defaults to "
+                             "'mutation-tree-cache' alongside each mutation info file.",
+                        type=Path)
+    args = parser.parse_args()
+    for mutation_info_file in args.mutation_info_files:
+        index_path: Path = build_mutation_tree_index(mutation_info_file=mutation_info_file,
+                                                     cache_dir=args.mutation_tree_cache_dir)
+        print(f"{str(mutation_info_file)}: {str(index_path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,29 @@ MIN_TIMEOUT_FOR_MUTANT_EXECUTION: float = 1.0
 TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION: float = 5.0
 DEFAULT_COMPILATION_TIMEOUT: int = 5
 DEFAULT_RUNTIME_TIMEOUT: int = 10
+# At most this many bytes of each of a process's stdout and stderr are kept; the rest is drained and discarded.
+DEFAULT_OUTPUT_LIMIT: int = 16 * 1024 * 1024
+# How long a process group is given to exit after SIGTERM before it is sent SIGKILL.
+TERMINATION_GRACE_PERIOD: float = 2.0
+# A process that is stopped at its CPU time limit may be reported as having used up to this many seconds less than the
+# limit, since CPU time is accounted more finely than the limit is enforced.
+CPU_TIME_SLACK: float = 0.1
+# The number of times a test is compiled and run without mutation to calibrate the timeouts used for its mutants, and
+# the quantile of the observed CPU times on which those timeouts are based.
+DEFAULT_CALIBRATION_RUNS: int = 3
+DEFAULT_TIMEOUT_QUANTILE: float = 0.95
+# Mutant timeouts are in CPU time; a mutant is also given this multiple of its CPU time allowance in wall-clock time,
+# to catch mutants that are blocked rather than busy.
+WALL_CLOCK_TIMEOUT_MULTIPLIER: float = 4.0
+# While a worker evaluates a test, it records a heartbeat for the test every this many seconds, together with a
+# checkpoint of the mutants it has decided so far, and renews the leases of the mutants it is evaluating.
+HEARTBEAT_INTERVAL: float = 30.0
+# A claim on an unfinished test whose heartbeat is older than this many seconds is considered abandoned, and the test
+# may be resumed by another worker.
+STALE_CLAIM_TIMEOUT: float = 300.0
+# When workers share a coordinator, a worker leases the mutants it is about to evaluate for this many seconds, so that
+# other workers can defer them. Leases are renewed with each heartbeat, and released once the mutant's verdict is known,
+# so the lease of a worker that has died soon expires.
+MUTANT_LEASE_DURATION: float = 4 * HEARTBEAT_INTERVAL
+# How often, in seconds, a worker scans the result store for mutants killed by other workers.
+DEFAULT_KILL_REFRESH_INTERVAL: float = 2.0
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class ExecutionResultCache:
+    # Maps the hash of a mutant executable to the name of the kill status that was obtained by running it, for a single
+    # test program. Distinct mutants (or groups of mutants) frequently lead to byte-identical executables that differ
+    # from the non-mutated executable, and there is no need to run such an executable more than once. Entries are kept
+    # in memory, and in 'cache_dir' (one file per hash), so that they are shared by all worker processes evaluating
+    # mutants against the program, and can be kept alongside the test's results.
+    def __init__(self, cache_dir: Path):
+        self.cache_dir: Path = cache_dir
+        self.entries: Dict[str, str] = {}
+
+    def lookup(self, binary_hash: str) -> Optional[str]:
+        if binary_hash in self.entries:
+            return self.entries[binary_hash]
+        entry_path: Path = self.cache_dir / binary_hash
+        if not entry_path.exists():
+            return None
+        kill_status: str = entry_path.read_text().strip()
+        self.entries[binary_hash] = kill_status
+        return kill_status
+
+    def record(self, binary_hash: str, kill_status: str) -> None:
+        self.entries[binary_hash] = kill_status
+        # Entries are written to a temporary file that is then renamed into place, so that a worker never reads a
+        # partially-written entry. If two workers run the same executable concurrently, the last write wins; both will
+        # have observed the same outcome.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(prefix='.' + binary_hash, dir=self.cache_dir)
+        with os.fdopen(temp_fd, 'w') as outfile:
+            outfile.write(kill_status)
+        os.replace(temp_path, self.cache_dir / binary_hash)
+
+
+# The cache most recently used in this process. Mutants are evaluated against one program at a time, so caching only
+# the most recent one avoids re-reading entries from disk without retaining the caches of finished programs.
+_current_cache: Optional[ExecutionResultCache] = None
+
+
+def get_execution_result_cache(cache_dir: Path) -> ExecutionResultCache:
+    global _current_cache
+    if _current_cache is None or _current_cache.cache_dir != cache_dir:
+        _current_cache = ExecutionResultCache(cache_dir=cache_dir)
+    return _current_cache
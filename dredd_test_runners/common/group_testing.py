@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import List, Tuple
+
+from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.run_test_with_mutants import (KillStatus,
+                                                             MutantTestConfiguration,
+                                                             run_test_with_mutants_using_configuration)
+
+
+def pack_compatible_mutants(mutants: List[int], mutation_tree: MutationTree, max_group_size: int) -> List[List[int]]:
+    # Packs the given mutants into groups, such that the mutants in each group can be enabled simultaneously. Two
+    # mutants are incompatible if they belong to the same node of the mutation tree, or if the node of one is an
+    # ancestor of the node of the other: enabling the outer mutant would prevent the inner one from being reached, so
+    # that a group containing both could not be used to draw conclusions about each of them. Mutants are placed
+    # first-fit, so that the relative order of the given mutants is preserved within each group.
+    assert max_group_size >= 1
+    if max_group_size == 1:
+        return [[mutant] for mutant in mutants]
+    groups: List[List[int]] = []
+    for mutant in mutants:
+        for group in groups:
+            if len(group) < max_group_size and all(mutation_tree.are_compatible(mutant, other) for other in group):
+                group.append(mutant)
+                break
+        else:
+            groups.append([mutant])
+    return groups
+
+
+def evaluate_mutant_group(mutants: List[int],
+                          configuration: MutantTestConfiguration,
+                          mutant_exe_path: Path) -> List[Tuple[int, KillStatus]]:
+    # Evaluates a group of mutually compatible mutants using a single compilation. Most mutants survive, typically
+    # because they do not change the generated binary at all, in which case a single compilation suffices to show that
+    # every mutant in the group survives. Otherwise, the group is split in two and each half is evaluated in turn,
+    # until the mutant(s) responsible for the observed behaviour have been identified and given individual verdicts.
+    assert len(mutants) > 0
+    group_result: KillStatus = run_test_with_mutants_using_configuration(mutants=mutants,
+                                                                         configuration=configuration,
+                                                                         mutant_exe_path=mutant_exe_path)
+    if len(mutants) == 1 or group_result == KillStatus.SURVIVED_IDENTICAL:
+        return [(mutant, group_result) for mutant in mutants]
+    middle: int = len(mutants) // 2
+    return evaluate_mutant_group(mutants=mutants[:middle],
+                                 configuration=configuration,
+                                 mutant_exe_path=mutant_exe_path) \
+        + evaluate_mutant_group(mutants=mutants[middle:],
+                                configuration=configuration,
+                                mutant_exe_path=mutant_exe_path)
@@ -1,7 +1,86 @@
 import hashlib
+import mmap
+import os
 
+from typing import List, Optional, Tuple
 
-def hash_file(filename: str) -> str:
-    md5_hash = hashlib.md5()
-    md5_hash.update(open(filename, 'rb').read())
-    return md5_hash.hexdigest()
+# xxHash is much faster than the digests in hashlib, but is an optional dependency; BLAKE2 is the fastest alternative
+# available from hashlib. Hashes are saved to disk and shared between machines (e.g. in the coverage index, and as the
+# keys of execution result caches), which may differ in whether xxHash is installed, so each hash is prefixed with the
+# name of its digest: '<digest>-<size>-<hex digest>'. Hashes computed with different digests never compare equal;
+# file_matches_hash checks a file against a hash using the hash's own digest where it is available.
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+XXH3_DIGEST: str = "xxh3"
+BLAKE2_DIGEST: str = "blake2b"
+
+# Files are processed in chunks of this many bytes, so that memory use does not grow with the size of a file.
+CHUNK_SIZE: int = 1 << 20
+
+
+def default_digest_name() -> str:
+    return XXH3_DIGEST if xxhash is not None else BLAKE2_DIGEST
+
+
+def _new_digest(digest_name: str):
+    if digest_name == XXH3_DIGEST:
+        return xxhash.xxh3_128()
+    assert digest_name == BLAKE2_DIGEST
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(filename: str, digest_name: Optional[str] = None) -> str:
+    # The hash includes the size of the file, so that file_matches_hash can rule out a match without reading the file.
+    if digest_name is None:
+        digest_name = default_digest_name()
+    with open(filename, 'rb') as infile:
+        size: int = os.fstat(infile.fileno()).st_size
+        digest = _new_digest(digest_name)
+        if size > 0:
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file, \
+                    memoryview(mapped_file) as view:
+                for offset in range(0, size, CHUNK_SIZE):
+                    digest.update(view[offset:offset + CHUNK_SIZE])
+    return f"{digest_name}-{size}-{digest.hexdigest()}"
+
+
+def _parse_hash(file_hash: str) -> Tuple[Optional[str], Optional[int]]:
+    # Returns the digest name and the size recorded in a hash, or None for parts that are missing, e.g. in a hash
+    # saved before the digest was recorded.
+    parts: List[str] = file_hash.split('-')
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None, None
+    return parts[0], int(parts[1])
+
+
+def file_matches_hash(filename: str, file_hash: str) -> bool:
+    # Checks whether a file has the given hash (as computed by hash_file). The sizes are compared first, since a size
+    # mismatch is the common case when a file differs, and needs no hashing at all.
+    digest_name, expected_size = _parse_hash(file_hash)
+    if expected_size is not None and os.stat(filename).st_size != expected_size:
+        return False
+    if digest_name == BLAKE2_DIGEST or (digest_name == XXH3_DIGEST and xxhash is not None):
+        return hash_file(filename, digest_name=digest_name) == file_hash
+    # The hash was computed with a digest that is not available here, or is in an old format.
+    return False
+
+
+def files_identical(filename: str, other_filename: str) -> bool:
+    # Compares two files byte by byte, stopping at the first chunk that differs. This is cheaper than hashing when one
+    # of the files (e.g. a baseline executable that is compared against many mutants) is likely to be in the page cache,
+    # and no hash is needed for any other purpose.
+    with open(filename, 'rb') as infile, open(other_filename, 'rb') as other_infile:
+        size: int = os.fstat(infile.fileno()).st_size
+        if size != os.fstat(other_infile.fileno()).st_size:
+            return False
+        if size == 0:
+            return True
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file, \
+                mmap.mmap(other_infile.fileno(), 0, access=mmap.ACCESS_READ) as other_mapped_file:
+            for offset in range(0, size, CHUNK_SIZE):
+                if mapped_file[offset:offset + CHUNK_SIZE] != other_mapped_file[offset:offset + CHUNK_SIZE]:
+                    return False
+    return True
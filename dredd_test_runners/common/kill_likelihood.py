@@ -0,0 +1,150 @@
+import json
+
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Dict, List
+
+from dredd_test_runners.common.kill_matrix import Bitset, KillMatrix
+from dredd_test_runners.common.mutation_tree import MUTATION_KINDS, MutationTree
+from dredd_test_runners.common.mutation_tree_index import atomic_write
+
+# The weight, in trials, given to the prior for each kind, node and file. The prior for a kind is the kill rate over
+# all trials, and the priors for a node and a file are the estimate for the kind of the mutant in question, so that a
+# node or file about which little is known is judged by what is known about the kind of mutation.
+PRIOR_STRENGTH: float = 4.0
+
+# The counts learned from the kill matrix are cached in a file named after the fingerprint of the mutation tree, as the
+# counts are indexed by node and file. Layout: a line of JSON holding the overall counts and the offset up to which each
+# segment of the kill matrix was read, followed by the count arrays, in the order of COUNT_ARRAY_NAMES, as native 32-bit
+# integers.
+COUNT_ARRAY_NAMES: List[str] = ["kind_kills", "kind_trials", "node_kills", "node_trials", "file_kills", "file_trials"]
+
+
+def default_kill_likelihood_cache_dir(work_dir: Path) -> Path:
+    return work_dir / "kill_likelihood"
+
+
+class KillLikelihoodScheduler:
+    # Orders the candidate mutants for a test so that those most likely to be killed are tried first. When the time
+    # budget for testing runs out partway through a test, this means that the mutants that were left untried are those
+    # least likely to have been killed, so that more kills are found per CPU-hour.
+    #
+    # The likelihood that a mutant is killed is estimated from the outcomes of previous trials (a trial being an
+    # evaluation of a mutant against a test, which either kills or does not kill it) of mutants that share its kind, its
+    # mutation tree node, or its source file. Estimates are smoothed hierarchically: the kill rate for a kind is shrunk
+    # towards the overall kill rate, and the rates for a node and a file are shrunk towards the rate for the kind, so
+    # that an estimate based on few trials stays close to the more general one. The estimate for a mutant is the mean
+    # of its node, file and kind estimates. Counts are held in arrays indexed by kind, node and file, and are updated as
+    # each outcome is recorded, so that later tests (and later groups of the current test) benefit immediately.
+    def __init__(self, mutation_tree: MutationTree):
+        self.mutation_tree: MutationTree = mutation_tree
+        self.kills: int = 0
+        self.trials: int = 0
+        self.kind_kills: array = array('i', [0] * len(MUTATION_KINDS))
+        self.kind_trials: array = array('i', [0] * len(MUTATION_KINDS))
+        self.node_kills: array = array('i', [0] * mutation_tree.num_nodes)
+        self.node_trials: array = array('i', [0] * mutation_tree.num_nodes)
+        self.file_kills: array = array('i', [0] * len(mutation_tree.file_names))
+        self.file_trials: array = array('i', [0] * len(mutation_tree.file_names))
+        # The file of each node is found by binary search, so is cached for the nodes that have been seen.
+        self.node_to_file: Dict[int, int] = {}
+
+    def _file_for_node(self, node_id: int) -> int:
+        file_index: int = self.node_to_file.get(node_id, -1)
+        if file_index == -1:
+            file_index = self.mutation_tree.get_file_index_for_node(node_id)
+            self.node_to_file[node_id] = file_index
+        return file_index
+
+    def record(self, mutant: int, killed: bool) -> None:
+        if not 0 <= mutant < self.mutation_tree.num_mutations:
+            # E.g. a result recorded against a different version of the compiler.
+            return
+        node_id: int = self.mutation_tree.mutation_id_to_node_id[mutant]
+        kind: int = self.mutation_tree.mutation_kinds[mutant]
+        if node_id == -1 or kind == -1:
+            return
+        file_index: int = self._file_for_node(node_id)
+        outcome: int = 1 if killed else 0
+        self.kills += outcome
+        self.trials += 1
+        self.kind_kills[kind] += outcome
+        self.kind_trials[kind] += 1
+        self.node_kills[node_id] += outcome
+        self.node_trials[node_id] += 1
+        self.file_kills[file_index] += outcome
+        self.file_trials[file_index] += 1
+
+    def record_from_kill_matrix(self, kill_matrix_dir: Path, cache_dir: Path) -> None:
+        # Learns from the outcomes recorded in the kill matrix by earlier (or concurrent) runs. Mutants that a test
+        # skipped because they had been killed already were not tried, so they are not counted. The counts learned so
+        # far are cached together with the offset up to which each segment was read, so that only the records appended
+        # since are read, rather than the results of every test. A test that was resumed has a record for each attempt,
+        # and may be counted more than once; this only skews the estimates slightly.
+        assert self.trials == 0, "Outcomes must be learned from the kill matrix before any are recorded."
+        cache_path: Path = cache_dir / (self.mutation_tree.fingerprint.hex() + ".cache")
+        segment_offsets: Dict[str, int] = self._read_cache(cache_path)
+        kill_matrix: KillMatrix = KillMatrix(kill_matrix_dir, offsets={kill_matrix_dir / segment_name: offset
+                                                                       for segment_name, offset in
+                                                                       segment_offsets.items()})
+        for row in kill_matrix.rows.values():
+            for mutant in Bitset.decompress(row["killed"]):
+                self.record(mutant, killed=True)
+            for mutant in Bitset.decompress(row["survived"]):
+                self.record(mutant, killed=False)
+        if kill_matrix.rows:
+            self._write_cache(cache_path, {segment.name: offset for segment, offset in kill_matrix.offsets.items()})
+
+    def _read_cache(self, cache_path: Path) -> Dict[str, int]:
+        # Restores the counts from the cache, if there is a usable one, and returns the offsets up to which the
+        # segments of the kill matrix had been read.
+        try:
+            with open(cache_path, 'rb') as infile:
+                header: Dict = json.loads(infile.readline())
+                arrays: Dict[str, array] = {}
+                for name in COUNT_ARRAY_NAMES:
+                    arrays[name] = array('i')
+                    arrays[name].fromfile(infile, len(getattr(self, name)))
+            kills: int = header["kills"]
+            trials: int = header["trials"]
+            segment_offsets: Dict[str, int] = header["segment_offsets"]
+        except (OSError, ValueError, EOFError, KeyError):
+            return {}
+        self.kills = kills
+        self.trials = trials
+        for name in COUNT_ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        return segment_offsets
+
+    def _write_cache(self, cache_path: Path, segment_offsets: Dict[str, int]) -> None:
+        header: bytes = json.dumps({"kills": self.kills,
+                                    "trials": self.trials,
+                                    "segment_offsets": segment_offsets}).encode() + b"\n"
+
+        def write(outfile: BinaryIO) -> None:
+            outfile.write(header)
+            for name in COUNT_ARRAY_NAMES:
+                getattr(self, name).tofile(outfile)
+
+        atomic_write(cache_path, write)
+
+    def kill_likelihood(self, mutant: int) -> float:
+        assert 0 <= mutant < self.mutation_tree.num_mutations
+        # Until anything has been observed, every mutant is considered equally (and somewhat) likely to be killed.
+        overall_rate: float = (self.kills + 1.0) / (self.trials + 2.0)
+        kind: int = self.mutation_tree.mutation_kinds[mutant]
+        kind_rate: float = (self.kind_kills[kind] + PRIOR_STRENGTH * overall_rate) \
+            / (self.kind_trials[kind] + PRIOR_STRENGTH)
+        node_id: int = self.mutation_tree.mutation_id_to_node_id[mutant]
+        node_rate: float = (self.node_kills[node_id] + PRIOR_STRENGTH * kind_rate) \
+            / (self.node_trials[node_id] + PRIOR_STRENGTH)
+        file_index: int = self._file_for_node(node_id)
+        file_rate: float = (self.file_kills[file_index] + PRIOR_STRENGTH * kind_rate) \
+            / (self.file_trials[file_index] + PRIOR_STRENGTH)
+        return (kind_rate + node_rate + file_rate) / 3.0
+
+    def prioritise(self, mutants: List[int]) -> List[int]:
+        # Returns the given mutants, most likely to be killed first. Mutants that are equally likely to be killed keep
+        # their relative order.
+        likelihoods: Dict[int, float] = {mutant: self.kill_likelihood(mutant) for mutant in mutants}
+        return sorted(mutants, key=lambda mutant: -likelihoods[mutant])
@@ -0,0 +1,216 @@
+import os
+import socket
+import struct
+import uuid
+import zlib
+
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+# A kill matrix records, for each test, the sets of mutants that the test covered, killed, skipped (because they had
+# already been killed by other tests) and saw survive, as bitsets over mutant ids. Each bitset is compressed separately,
+# so that a query only decompresses the sets it needs, and a lookup of a single mutant only decompresses as far as the
+# byte holding the mutant's bit.
+#
+# Layout: a directory of segment files. Each runner process appends to a segment of its own, so that writers never
+# contend, and the segments of several machines can be combined by copying them into one directory. A segment starts
+# with MAGIC, followed by records, each of which is: the length of the rest of the record and its CRC-32; the length of
+# the test name and of each compressed bitset; the test name; and the bitsets, in the order of COLUMNS. A record that
+# was only partly written (e.g. because its writer was killed) is ignored. If a test has several records (e.g. because
+# it was resumed), the last one read wins.
+
+MAGIC: bytes = b"DKM\x01"
+COLUMNS: List[str] = ["covered", "killed", "skipped", "survived"]
+RECORD_PREFIX: struct.Struct = struct.Struct("<II")
+RECORD_HEADER: struct.Struct = struct.Struct("<H" + "I" * len(COLUMNS))
+SEGMENT_SUFFIX: str = ".dkm"
+
+
+def default_kill_matrix_dir(work_dir: Path) -> Path:
+    return work_dir / "kill_matrix"
+
+
+class Bitset:
+    # An immutable set of mutant ids, held as the bits of an integer so that unions and intersections are single
+    # operations on machine words.
+    def __init__(self, bits: int = 0):
+        assert bits >= 0
+        self.bits: int = bits
+
+    @staticmethod
+    def of(mutants: Iterable[int]) -> 'Bitset':
+        mutants = list(mutants)
+        if not mutants:
+            return Bitset()
+        data: bytearray = bytearray(max(mutants) // 8 + 1)
+        for mutant in mutants:
+            data[mutant // 8] |= 1 << (mutant % 8)
+        return Bitset(int.from_bytes(data, 'little'))
+
+    def compress(self) -> bytes:
+        return zlib.compress(self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little'))
+
+    @staticmethod
+    def decompress(data: bytes) -> 'Bitset':
+        return Bitset(int.from_bytes(zlib.decompress(data), 'little'))
+
+    def __contains__(self, mutant: int) -> bool:
+        return (self.bits >> mutant) & 1 == 1
+
+    def __iter__(self) -> Iterator[int]:
+        # In increasing order.
+        for mutant, bit in enumerate(reversed(bin(self.bits)[2:])):
+            if bit == '1':
+                yield mutant
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __or__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self.bits | other.bits)
+
+    def __and__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self.bits & other.bits)
+
+    def __sub__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self.bits & ~other.bits)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitset) and self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+
+def _compressed_contains(data: bytes, mutant: int) -> bool:
+    # Decompresses only as far as the byte holding the mutant's bit.
+    byte_index: int = mutant // 8
+    prefix: bytes = zlib.decompressobj().decompress(data, byte_index + 1)
+    return len(prefix) > byte_index and (prefix[byte_index] >> (mutant % 8)) & 1 == 1
+
+
+class KillMatrixWriter:
+    # Appends the results of tests to a segment of its own, which is created when the first result is appended.
+    def __init__(self, directory: Path):
+        self.directory: Path = directory
+        self.segment: Path = directory / f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+        self.fd: Optional[int] = None
+
+    def append(self,
+               test_name: str,
+               covered: Iterable[int],
+               killed: Iterable[int],
+               skipped: Iterable[int],
+               survived: Iterable[int]) -> None:
+        name: bytes = test_name.encode('utf-8')
+        bitsets: List[bytes] = [Bitset.of(mutants).compress() for mutants in [covered, killed, skipped, survived]]
+        body: bytes = RECORD_HEADER.pack(len(name), *[len(bitset) for bitset in bitsets]) + name + b"".join(bitsets)
+        if self.fd is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.fd = os.open(self.segment, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self.fd, MAGIC)
+        # A single write, so that a reader sees either nothing of the record or (once the write completes) all of it.
+        os.write(self.fd, RECORD_PREFIX.pack(len(body), zlib.crc32(body)) + body)
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class KillMatrix:
+    # Reads the kill matrix in a directory. Only the compressed bitsets are held in memory; 'refresh' reads the records
+    # that have been appended since the matrix was last read. Given the offsets up to which segments were read before,
+    # only the records after those offsets are read.
+    def __init__(self, directory: Path, offsets: Optional[Dict[Path, int]] = None):
+        self.directory: Path = directory
+        # For each test, its compressed bitsets, indexed by column.
+        self.rows: Dict[str, Dict[str, bytes]] = {}
+        # The offset up to which each segment has been read, and the files that turned out not to be segments.
+        self.offsets: Dict[Path, int] = dict(offsets) if offsets is not None else {}
+        self.ignored: Set[Path] = set()
+        self.refresh()
+
+    def refresh(self) -> None:
+        if not self.directory.is_dir():
+            return
+        for segment in sorted(self.directory.glob("*" + SEGMENT_SUFFIX)):
+            if segment in self.ignored:
+                continue
+            self.offsets[segment] = self._read_segment(segment, self.offsets.get(segment, 0))
+
+    def _read_segment(self, segment: Path, offset: int) -> int:
+        # Reads the complete records from the given offset, and returns the offset of the first record not read.
+        with open(segment, 'rb') as infile:
+            infile.seek(offset)
+            data: bytes = infile.read()
+        position: int = 0
+        if offset == 0:
+            if len(data) < len(MAGIC):
+                return 0
+            if data[:len(MAGIC)] != MAGIC:
+                print(f"Warning: ignoring {str(segment)}, which is not a kill matrix segment.")
+                self.ignored.add(segment)
+                return 0
+            position = len(MAGIC)
+        while position + RECORD_PREFIX.size <= len(data):
+            length, crc = RECORD_PREFIX.unpack_from(data, position)
+            body: bytes = data[position + RECORD_PREFIX.size:position + RECORD_PREFIX.size + length]
+            if len(body) < length:
+                # The record is still being written.
+                break
+            position += RECORD_PREFIX.size + length
+            if zlib.crc32(body) != crc:
+                print(f"Warning: ignoring a corrupt record in {str(segment)}.")
+                continue
+            header = RECORD_HEADER.unpack_from(body)
+            name_end: int = RECORD_HEADER.size + header[0]
+            test_name: str = body[RECORD_HEADER.size:name_end].decode('utf-8')
+            row: Dict[str, bytes] = {}
+            start: int = name_end
+            for column, size in zip(COLUMNS, header[1:]):
+                row[column] = body[start:start + size]
+                start += size
+            self.rows[test_name] = row
+        return offset + position
+
+    def tests(self) -> List[str]:
+        return sorted(self.rows.keys())
+
+    def mutants(self, test_name: str, column: str = "covered") -> Bitset:
+        return Bitset.decompress(self.rows[test_name][column])
+
+    def contains(self, test_name: str, mutant: int, column: str = "covered") -> bool:
+        return _compressed_contains(self.rows[test_name][column], mutant)
+
+    def union(self, column: str = "covered", tests: Optional[Iterable[str]] = None) -> Bitset:
+        # The mutants in the given column of any of the given tests (by default, all tests).
+        bits: int = 0
+        for test_name in (tests if tests is not None else self.rows.keys()):
+            bits |= self.mutants(test_name, column).bits
+        return Bitset(bits)
+
+    def intersection(self, column: str = "covered", tests: Optional[Iterable[str]] = None) -> Bitset:
+        # The mutants in the given column of every one of the given tests (by default, all tests).
+        bits: Optional[int] = None
+        for test_name in (tests if tests is not None else self.rows.keys()):
+            bits = self.mutants(test_name, column).bits if bits is None else bits & self.mutants(test_name, column).bits
+            if bits == 0:
+                break
+        return Bitset(bits if bits is not None else 0)
+
+    def tests_with(self, mutant: int, column: str = "covered") -> List[str]:
+        # The tests that have the given mutant in the given column, e.g. the tests that cover it.
+        return [test_name for test_name in self.tests() if self.contains(test_name, mutant, column)]
+
+    def mutant_outcomes(self, mutant: int) -> Dict[str, str]:
+        # The outcome ('killed', 'skipped' or 'survived') of the given mutant in each test that covered it. A test
+        # that was terminated early may cover the mutant without an outcome, in which case it is 'covered'.
+        outcomes: Dict[str, str] = {}
+        for test_name in self.tests_with(mutant, "covered"):
+            outcomes[test_name] = next((column for column in ["killed", "skipped", "survived"]
+                                        if self.contains(test_name, mutant, column)), "covered")
+        return outcomes
+
+    def covered_but_never_killed(self) -> Bitset:
+        return self.union("covered") - self.union("killed")
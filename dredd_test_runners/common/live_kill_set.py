@@ -0,0 +1,91 @@
+import threading
+
+from typing import Callable, Optional, Set
+
+from dredd_test_runners.common.constants import DEFAULT_KILL_REFRESH_INTERVAL
+from dredd_test_runners.common.result_store import ResultStore
+
+
+class LiveKillSet:
+    # An in-memory copy of the set of killed mutants, which a background thread keeps up to date by scanning the result
+    # store every 'refresh_interval' seconds. This lets a worker check whether a mutant has been killed without touching
+    # the store, and prune the mutants it has yet to try for a test as soon as another worker kills them, rather than
+    # only learning of such kills when it starts on its next test.
+    #
+    # Each scan asks the store only for the kills recorded since the previous scan (see killed_mutants_since): for a
+    # database, an indexed query for the kills since the latest kill time seen; with a coordinator, the kills that its
+    # listener has received since; and for the directory layout, a listing of the 'killed_mutants' directory only if
+    # the directory has been modified. File system notifications (inotify) are not used, because they do not report
+    # files created by other machines on a network file system, which is how workers on different machines share a
+    # work directory. The thread uses a store of its own, opened by 'open_store', since a store (e.g. a database
+    # connection) should not be used by several threads at once.
+    def __init__(self,
+                 open_store: Callable[[], ResultStore],
+                 refresh_interval: float = DEFAULT_KILL_REFRESH_INTERVAL):
+        assert refresh_interval > 0
+        self.refresh_interval: float = refresh_interval
+        self.lock: threading.Lock = threading.Lock()
+        self.killed: Set[int] = set()
+        self.stopped: threading.Event = threading.Event()
+        self.first_scan_done: threading.Event = threading.Event()
+        self.error: Optional[Exception] = None
+        self.thread: threading.Thread = threading.Thread(target=self._refresh_periodically,
+                                                         args=(open_store,),
+                                                         daemon=True)
+        self.thread.start()
+        # Wait for the first scan, so that the set is complete from the outset.
+        self.first_scan_done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self) -> 'LiveKillSet':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _refresh_periodically(self, open_store: Callable[[], ResultStore]) -> None:
+        try:
+            result_store: ResultStore = open_store()
+        except Exception as error:
+            self.error = error
+            self.first_scan_done.set()
+            return
+        cursor: Optional[float] = None
+        try:
+            while True:
+                try:
+                    killed_mutants: Set[int]
+                    killed_mutants, cursor = result_store.killed_mutants_since(cursor)
+                except Exception as error:
+                    if not self.first_scan_done.is_set():
+                        self.error = error
+                        self.first_scan_done.set()
+                        return
+                    # E.g. a transient network file system error: the next scan will catch up.
+                    print(f"Warning: failed to refresh the set of killed mutants: {error}")
+                else:
+                    with self.lock:
+                        self.killed.update(killed_mutants)
+                    self.first_scan_done.set()
+                if self.stopped.wait(self.refresh_interval):
+                    return
+        finally:
+            result_store.close()
+
+    def is_killed(self, mutant: int) -> bool:
+        with self.lock:
+            return mutant in self.killed
+
+    def killed_mutants(self) -> Set[int]:
+        with self.lock:
+            return set(self.killed)
+
+    def add(self, mutant: int) -> None:
+        # Notes a kill made by this worker, which the next scan would otherwise pick up.
+        with self.lock:
+            self.killed.add(mutant)
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
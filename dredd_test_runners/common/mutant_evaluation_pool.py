@@ -0,0 +1,90 @@
+import collections
+import concurrent.futures
+
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+from dredd_test_runners.common.group_testing import evaluate_mutant_group
+from dredd_test_runners.common.run_test_with_mutants import KillStatus, MutantTestConfiguration
+from dredd_test_runners.common.scratch_space import BuildDirectory, ScratchSpace
+
+
+# Each worker process builds mutants in its own scratch directory, so that concurrent compilations never clobber one
+# another's executables. The directory is set up once, when the worker process starts; whether it is RAM-backed is
+# decided afresh for each group of mutants, as the scratch space used by other workers grows and shrinks.
+_worker_build_directory: Optional[BuildDirectory] = None
+
+
+def _initialize_worker(scratch_space: ScratchSpace) -> None:
+    global _worker_build_directory
+    _worker_build_directory = scratch_space.build_directory(prefix='__worker_')
+
+
+def _evaluate_mutant_group_in_worker(mutants: List[int],
+                                     configuration: MutantTestConfiguration) -> List[Tuple[int, KillStatus]]:
+    assert _worker_build_directory is not None
+    return evaluate_mutant_group(mutants=mutants,
+                                 configuration=configuration,
+                                 mutant_exe_path=_worker_build_directory.for_build() / '__mutant.exe')
+
+
+class MutantEvaluationPool:
+    # Evaluates groups of mutants against a test, either in this process (when a single job is requested) or using a
+    # pool of worker processes. A group may consist of a single mutant; larger groups must be made up of mutually
+    # compatible mutants (see group_testing.py). Results are always reported in the order in which mutants were
+    # supplied, so that kill bookkeeping is deterministic regardless of the number of jobs.
+    def __init__(self, jobs: int, scratch_space: ScratchSpace):
+        assert jobs >= 1
+        self.jobs: int = jobs
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.build_directory: Optional[BuildDirectory] = None
+        if jobs > 1:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+                                                                   initializer=_initialize_worker,
+                                                                   initargs=(scratch_space,))
+        else:
+            self.build_directory = scratch_space.build_directory(prefix='__worker_')
+
+    def __enter__(self) -> 'MutantEvaluationPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def evaluate(self,
+                 mutant_groups: Iterable[List[int]],
+                 configuration: MutantTestConfiguration) -> Iterator[Tuple[int, KillStatus]]:
+        # Groups are drawn from the iterable lazily: only enough are requested to keep every worker busy. This means
+        # that a caller can stop supplying groups (e.g. because a time budget has expired), or can drop mutants from
+        # groups not yet supplied (e.g. because they have meanwhile been killed elsewhere), and no work will have been
+        # wasted beyond what is already in flight.
+        if self.executor is None:
+            for mutant_group in mutant_groups:
+                yield from evaluate_mutant_group(mutants=mutant_group,
+                                                 configuration=configuration,
+                                                 mutant_exe_path=self.build_directory.for_build() / '__mutant.exe')
+            return
+
+        in_flight: Deque[concurrent.futures.Future] = collections.deque()
+        mutant_groups_iterator = iter(mutant_groups)
+        mutant_groups_exhausted: bool = False
+        try:
+            while True:
+                while not mutant_groups_exhausted and len(in_flight) < 2 * self.jobs:
+                    mutant_group = next(mutant_groups_iterator, None)
+                    if mutant_group is None:
+                        mutant_groups_exhausted = True
+                        break
+                    in_flight.append(self.executor.submit(_evaluate_mutant_group_in_worker,
+                                                          mutant_group,
+                                                          configuration))
+                if not in_flight:
+                    return
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
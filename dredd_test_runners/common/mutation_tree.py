@@ -1,6 +1,19 @@
-import functools
+import hashlib
+import struct
 
-from typing import List
+from array import array
+from typing import List, Optional, Tuple
+
+# The kinds of mutation group that Dredd can apply to a node. The kind of each mutation is recorded as its index in
+# this list.
+MUTATION_KINDS: List[str] = ["replaceExpr", "replaceBinaryOperator", "replaceUnaryOperator", "removeStmt"]
+
+
+def get_mutation_kind_for_mutation_group(mutation_group) -> int:
+    for kind, kind_name in enumerate(MUTATION_KINDS):
+        if kind_name in mutation_group:
+            return kind
+    assert False
 
 
 def get_mutation_ids_for_mutation_group(mutation_group):
@@ -16,54 +29,251 @@ def get_mutation_ids_for_mutation_group(mutation_group):
 
 def get_mutation_ids_for_json_node(node):
     assert "mutationGroups" in node
-    return functools.reduce(lambda x, y: x + y, map(get_mutation_ids_for_mutation_group, node["mutationGroups"]), [])
-
-
-class MutationTreeNode:
-    def __init__(self, mutation_ids, children):
-        self.children = children
-        self.mutation_ids = mutation_ids
+    result = []
+    for mutation_group in node["mutationGroups"]:
+        result.extend(get_mutation_ids_for_mutation_group(mutation_group))
+    return result
 
 
 class MutationTree:
+    # The tree is stored as flat integer arrays rather than as an object per node. Nodes are numbered in pre-order
+    # (the order in which an Euler tour of the tree first visits them), with the roots of the trees for successive
+    # files following one another. This has the consequence that the nodes of the subtree rooted at node n are exactly
+    # the nodes numbered n, n + 1, ..., subtree_ends[n] - 1, and that the mutation ids of a subtree occupy a contiguous
+    # range of the 'mutation_ids' array. Subtree and ancestry queries are thus constant-time, and subtree mutation ids
+    # can be obtained via a single slice.
+    #
+    # - parents[n]: the parent of node n, or -1 if n is the root of a file's tree
+    # - subtree_ends[n]: one more than the largest node in the subtree rooted at n
+    # - children[children_offsets[n]:children_offsets[n + 1]]: the children of node n, in order
+    # - mutation_ids[mutation_offsets[n]:mutation_offsets[n + 1]]: the mutation ids associated with node n itself
+    # - mutation_id_to_node_id[m]: the node with which mutation m is associated, or -1 if there is no such node
+    # - mutation_kinds[m]: the kind of mutation m, as an index into MUTATION_KINDS, or -1 if there is no mutation m
+    # - file_roots[f]: the root node of the tree for the f-th file, whose name is file_names[f]
+    #
+    # While the tree is built, a fingerprint of each file's tree is computed, covering the shape of the tree, the
+    # mutation ids associated with each node and the kinds of those mutations (but not the file's name, which differs
+    # between e.g. a mutated copy and a mutant tracking copy of the same source tree). Two trees are structurally
+    # identical if and only if (with overwhelming probability) their fingerprints are equal.
     def __init__(self, json_data):
+        self.parents: array = array('i')
+        self.subtree_ends: array = array('i')
+        self.children_offsets: array = array('i')
+        self.children: array = array('i')
+        self.mutation_offsets: array = array('i', [0])
+        self.mutation_ids: array = array('i')
+        self.file_roots: array = array('i')
+        self.file_names: List[str] = []
+        self.file_fingerprints: List[bytes] = []
+        mutation_kinds_by_offset: array = array('i')
+
+        # Depth-first traversal, using an explicit stack so that deep trees do not exhaust Python's recursion limit.
+        # Children are pushed in reverse so that they are numbered in their original order.
+        num_children: List[int] = []
+        file_hash = None
+        stack = [(file["mutationTreeRoot"], -1, file.get("filename", ""))
+                 for file in reversed(json_data["infoForFiles"])]
+        while stack:
+            json_node, parent_node_id, filename = stack.pop()
+            node_id: int = len(self.parents)
+            if parent_node_id == -1:
+                if file_hash is not None:
+                    self.file_fingerprints.append(file_hash.digest())
+                file_hash = hashlib.blake2b(digest_size=16)
+                self.file_roots.append(node_id)
+                self.file_names.append(filename)
+            self.parents.append(parent_node_id)
+            num_children.append(len(json_node["children"]))
+            for mutation_group in json_node["mutationGroups"]:
+                group_mutation_ids: List[int] = get_mutation_ids_for_mutation_group(mutation_group)
+                self.mutation_ids.extend(group_mutation_ids)
+                mutation_kinds_by_offset.extend([get_mutation_kind_for_mutation_group(mutation_group)]
+                                                * len(group_mutation_ids))
+            self.mutation_offsets.append(len(self.mutation_ids))
+            file_hash.update(self._node_fingerprint_data(node_id=node_id,
+                                                         num_children=num_children[node_id],
+                                                         mutation_ids=self.mutation_ids,
+                                                         mutation_kinds=mutation_kinds_by_offset))
+            for child_json_node in reversed(json_node["children"]):
+                stack.append((child_json_node, node_id, filename))
+        if file_hash is not None:
+            self.file_fingerprints.append(file_hash.digest())
+        self.num_nodes: int = len(self.parents)
+
+        # In pre-order, every node is numbered after its parent, so subtree sizes can be accumulated bottom-up with a
+        # single backwards pass.
+        subtree_sizes: List[int] = [1] * self.num_nodes
+        for node_id in range(self.num_nodes - 1, -1, -1):
+            parent_node_id: int = self.parents[node_id]
+            if parent_node_id != -1:
+                subtree_sizes[parent_node_id] += subtree_sizes[node_id]
+        self.subtree_ends.extend(node_id + subtree_sizes[node_id] for node_id in range(self.num_nodes))
 
-        def populate(json_node, node_id):
-            children = []
-            for child_json_node in json_node["children"]:
-                child_node_id = self.num_nodes
-                children.append(child_node_id)
-                self.parent_map[child_node_id] = node_id
-                self.num_nodes += 1
-                populate(child_json_node, child_node_id)
-            self.nodes[node_id] = MutationTreeNode(get_mutation_ids_for_json_node(json_node), children)
-            temp: int = functools.reduce(max, self.nodes[node_id].mutation_ids, 0)
-            self.num_mutations = max(self.num_mutations, temp)
-            for mutation_id in self.nodes[node_id].mutation_ids:
-                self.mutation_id_to_node_id[mutation_id] = node_id
-
-        self.nodes = {}
-        self.parent_map = {}
-        self.mutation_id_to_node_id = {}
-        self.num_mutations = 0
-        self.num_nodes = 0
-
-        for root_json_node in [file["mutationTreeRoot"] for file in json_data["infoForFiles"]]:
-            root_node_id = self.num_nodes
-            self.num_nodes += 1
-            populate(root_json_node, root_node_id)
+        self.children_offsets.append(0)
+        for node_id in range(self.num_nodes):
+            self.children_offsets.append(self.children_offsets[node_id] + num_children[node_id])
+        self.children.extend([0] * self.children_offsets[self.num_nodes])
+        next_child_slot: List[int] = list(self.children_offsets[:self.num_nodes])
+        for node_id in range(self.num_nodes):
+            parent_node_id: int = self.parents[node_id]
+            if parent_node_id != -1:
+                self.children[next_child_slot[parent_node_id]] = node_id
+                next_child_slot[parent_node_id] += 1
+
+        # Mutation ids are numbered from 0, so the number of mutations is one more than the largest id.
+        self.num_mutations: int = max(self.mutation_ids, default=-1) + 1
+        self.mutation_id_to_node_id: array = array('i', [-1]) * self.num_mutations
+        self.mutation_kinds: array = array('i', [-1]) * self.num_mutations
+        for node_id in range(self.num_nodes):
+            for index in range(self.mutation_offsets[node_id], self.mutation_offsets[node_id + 1]):
+                self.mutation_id_to_node_id[self.mutation_ids[index]] = node_id
+                self.mutation_kinds[self.mutation_ids[index]] = mutation_kinds_by_offset[index]
+        self.fingerprint: bytes = hashlib.blake2b(b''.join(self.file_fingerprints), digest_size=16).digest()
+
+    def _node_fingerprint_data(self, node_id, num_children, mutation_ids, mutation_kinds) -> bytes:
+        # The data that contributes to the fingerprint of a node's file: the position of the node's parent relative to
+        # the root of the file, the number of children and the mutations of the node. 'mutation_ids' and
+        # 'mutation_kinds' are indexed by position in the mutation id array, rather than by mutation id.
+        # The node is in the most recently started file.
+        file_root: int = self.file_roots[-1]
+        parent_node_id: int = self.parents[node_id]
+        begin: int = self.mutation_offsets[node_id]
+        end: int = self.mutation_offsets[node_id + 1]
+        return struct.pack('<iii', -1 if parent_node_id == -1 else parent_node_id - file_root, num_children,
+                           end - begin) \
+            + mutation_ids[begin:end].tobytes() + mutation_kinds[begin:end].tobytes()
+
+    @classmethod
+    def from_arrays(cls, parents, subtree_ends, children_offsets, children, mutation_offsets, mutation_ids,
+                    mutation_id_to_node_id, mutation_kinds, file_roots, file_names: List[str],
+                    file_fingerprints: List[bytes]) -> 'MutationTree':
+        # Creates a tree from arrays that have already been computed, e.g. memory-mapped views of a mutation tree index
+        # (see mutation_tree_index.py). Any sequence type supporting indexing, slicing and 'tolist' can be used.
+        result: MutationTree = cls.__new__(cls)
+        result.parents = parents
+        result.subtree_ends = subtree_ends
+        result.children_offsets = children_offsets
+        result.children = children
+        result.mutation_offsets = mutation_offsets
+        result.mutation_ids = mutation_ids
+        result.mutation_id_to_node_id = mutation_id_to_node_id
+        result.mutation_kinds = mutation_kinds
+        result.file_roots = file_roots
+        result.file_names = file_names
+        result.file_fingerprints = file_fingerprints
+        result.num_nodes = len(parents)
+        result.num_mutations = len(mutation_id_to_node_id)
+        result.fingerprint = hashlib.blake2b(b''.join(file_fingerprints), digest_size=16).digest()
+        return result
+
+    def get_file_index_for_node(self, node_id) -> int:
+        assert 0 <= node_id < self.num_nodes
+        # File roots are in increasing order, so binary search for the last root that is no larger than the node.
+        low: int = 0
+        high: int = len(self.file_roots) - 1
+        while low < high:
+            middle: int = (low + high + 1) // 2
+            if self.file_roots[middle] <= node_id:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def get_mutation_kind(self, mutation_id) -> str:
+        assert 0 <= mutation_id < self.num_mutations
+        return MUTATION_KINDS[self.mutation_kinds[mutation_id]]
+
+    def get_children(self, node_id) -> List[int]:
+        assert 0 <= node_id < self.num_nodes
+        return self.children[self.children_offsets[node_id]:self.children_offsets[node_id + 1]].tolist()
+
+    def get_mutation_ids_for_node(self, node_id) -> List[int]:
+        assert 0 <= node_id < self.num_nodes
+        return self.mutation_ids[self.mutation_offsets[node_id]:self.mutation_offsets[node_id + 1]].tolist()
 
     def get_mutation_ids_for_subtree(self, node_id) -> List[int]:
         assert 0 <= node_id < self.num_nodes
-        return self.nodes[node_id].mutation_ids + functools.reduce(lambda x, y: x + y,
-                                                                   map(lambda x: self.get_mutation_ids_for_subtree(x),
-                                                                       self.nodes[node_id].children), [])
+        return self.mutation_ids[self.mutation_offsets[node_id]:
+                                 self.mutation_offsets[self.subtree_ends[node_id]]].tolist()
+
+    def is_in_subtree(self, node_id, subtree_root_node_id) -> bool:
+        # Node ids must be valid: in particular, -1 (e.g. for a mutation id with no node) would otherwise index the
+        # subtree end of the last node.
+        assert 0 <= node_id < self.num_nodes
+        assert 0 <= subtree_root_node_id < self.num_nodes
+        return subtree_root_node_id <= node_id < self.subtree_ends[subtree_root_node_id]
+
+    def are_compatible(self, first_mutation_id, second_mutation_id) -> bool:
+        # Two mutations are compatible (i.e. can be enabled simultaneously) unless they are associated with the same
+        # node, or the node of one is an ancestor of the node of the other.
+        assert 0 <= first_mutation_id < self.num_mutations
+        assert 0 <= second_mutation_id < self.num_mutations
+        first_node_id: int = self.mutation_id_to_node_id[first_mutation_id]
+        second_node_id: int = self.mutation_id_to_node_id[second_mutation_id]
+        return not self.is_in_subtree(first_node_id, second_node_id) \
+            and not self.is_in_subtree(second_node_id, first_node_id)
 
     def get_incompatible_mutation_ids(self, mutation_id) -> List[int]:
         assert 0 <= mutation_id < self.num_mutations
         node_id = self.mutation_id_to_node_id[mutation_id]
         result = self.get_mutation_ids_for_subtree(node_id)
-        while node_id in self.parent_map:
-            node_id = self.parent_map[node_id]
-            result += self.nodes[node_id].mutation_ids
+        node_id = self.parents[node_id]
+        while node_id != -1:
+            result += self.get_mutation_ids_for_node(node_id)
+            node_id = self.parents[node_id]
         return result
+
+
+def describe_mutation_tree_mismatch(mutation_tree: MutationTree, other_mutation_tree: MutationTree) -> Optional[str]:
+    # Returns None if the trees are structurally identical, and otherwise a description of the first point at which
+    # they diverge. The comparison of fingerprints is cheap; the trees themselves are only examined if the fingerprints
+    # differ, to locate the divergence.
+    if mutation_tree.fingerprint == other_mutation_tree.fingerprint:
+        return None
+    if len(mutation_tree.file_roots) != len(other_mutation_tree.file_roots):
+        return f"The trees are for different numbers of files ({len(mutation_tree.file_roots)} vs. " \
+               f"{len(other_mutation_tree.file_roots)})."
+    for file_index in range(len(mutation_tree.file_roots)):
+        if mutation_tree.file_fingerprints[file_index] == other_mutation_tree.file_fingerprints[file_index]:
+            continue
+        file_description: str = f"file {file_index} ({mutation_tree.file_names[file_index]} vs. " \
+                                f"{other_mutation_tree.file_names[file_index]})"
+        file_root: int = mutation_tree.file_roots[file_index]
+        other_file_root: int = other_mutation_tree.file_roots[file_index]
+        file_size: int = mutation_tree.subtree_ends[file_root] - file_root
+        other_file_size: int = other_mutation_tree.subtree_ends[other_file_root] - other_file_root
+        for offset in range(min(file_size, other_file_size)):
+            difference: Optional[Tuple[str, str, str]] = _describe_node_difference(
+                mutation_tree, file_root + offset, other_mutation_tree, other_file_root + offset)
+            if difference is not None:
+                aspect, value, other_value = difference
+                return f"The trees first differ in {file_description}, at node {offset} of the file (node " \
+                       f"{file_root + offset} overall): {aspect} {value} vs. {other_value}."
+        return f"The trees first differ in {file_description}, which has {file_size} vs. {other_file_size} nodes."
+    return "The trees have different fingerprints, but no difference was found between them."
+
+
+def _describe_node_difference(mutation_tree: MutationTree, node_id: int, other_mutation_tree: MutationTree,
+                              other_node_id: int) -> Optional[Tuple[str, str, str]]:
+    def relative_parent(tree: MutationTree, node: int) -> int:
+        parent: int = tree.parents[node]
+        return -1 if parent == -1 else parent - tree.file_roots[tree.get_file_index_for_node(node)]
+
+    mutation_ids: List[int] = mutation_tree.get_mutation_ids_for_node(node_id)
+    other_mutation_ids: List[int] = other_mutation_tree.get_mutation_ids_for_node(other_node_id)
+    comparisons = [
+        ("parent (relative to file root)",
+         relative_parent(mutation_tree, node_id),
+         relative_parent(other_mutation_tree, other_node_id)),
+        ("number of children",
+         len(mutation_tree.get_children(node_id)),
+         len(other_mutation_tree.get_children(other_node_id))),
+        ("mutation ids", mutation_ids, other_mutation_ids),
+        ("mutation kinds",
+         [mutation_tree.get_mutation_kind(m) for m in mutation_ids],
+         [other_mutation_tree.get_mutation_kind(m) for m in other_mutation_ids]),
+    ]
+    for aspect, value, other_value in comparisons:
+        if value != other_value:
+            return aspect, str(value), str(other_value)
+    return None
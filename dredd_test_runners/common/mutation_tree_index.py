@@ -0,0 +1,159 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from dredd_test_runners.common.mutation_tree import MutationTree
+
+# A mutation tree index is a compact binary form of a mutation tree, which can be memory-mapped by any number of
+# processes instead of every process parsing the (potentially very large) mutation info file and building its own copy
+# of the tree. Indexes are stored in a cache directory, named after a hash of the contents of the mutation info file
+# from which they were built, so that an index can never be used with a mutation info file that has since changed.
+# Hashing a large mutation info file takes a while, so the hash is recorded in a stamp file alongside the path, size
+# and modification time of the mutation info file, and the file is only hashed again if one of these has changed.
+#
+# Layout: a fixed-size header, followed by the arrays of the tree as native 32-bit integers, in the order given by
+# ARRAY_NAMES, followed by per-file metadata (file names and fingerprints) encoded as JSON. The header records the
+# length of every array and of the metadata, plus the native byte order, so that an index written on a machine with a
+# different byte order is rejected (and rebuilt) rather than misread.
+
+MAGIC: bytes = b'DREDDMTI'
+FORMAT_VERSION: int = 2
+ARRAY_NAMES: List[str] = ["parents",
+                          "subtree_ends",
+                          "children_offsets",
+                          "children",
+                          "mutation_offsets",
+                          "mutation_ids",
+                          "mutation_id_to_node_id",
+                          "mutation_kinds",
+                          "file_roots"]
+# Magic, format version, byte order, padding, then the length of each array and the length of the metadata. The header
+# size is a multiple of 8 so that the arrays that follow it are aligned.
+HEADER_FORMAT: str = '<8sIBxxx' + 'Q' * (len(ARRAY_NAMES) + 1)
+HEADER_SIZE: int = struct.calcsize(HEADER_FORMAT)
+NATIVE_BYTE_ORDER: int = 0 if sys.byteorder == 'little' else 1
+
+assert array('i').itemsize == 4
+
+
+def hash_mutation_info_file(mutation_info_file: Path) -> str:
+    sha256_hash = hashlib.sha256()
+    with open(mutation_info_file, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def default_cache_dir(mutation_info_file: Path) -> Path:
+    return mutation_info_file.parent / "mutation-tree-cache"
+
+
+def atomic_write(path: Path, write: Callable[[BinaryIO], None]) -> None:
+    # Writes to a temporary file that is then renamed into place, so that concurrent workers writing the same file do
+    # not interfere with one another, and a reader never observes a partially-written file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_fd, temp_path = tempfile.mkstemp(prefix=path.name + ".", dir=path.parent)
+    try:
+        with os.fdopen(temp_fd, 'wb') as outfile:
+            write(outfile)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def mutation_info_hash(mutation_info_file: Path, cache_dir: Optional[Path] = None) -> str:
+    # Returns the hash of the mutation info file's contents (see hash_mutation_info_file), as recorded in its stamp file
+    # in the cache directory if the file appears not to have changed since.
+    if cache_dir is None:
+        cache_dir = default_cache_dir(mutation_info_file)
+    resolved_path: str = str(mutation_info_file.resolve())
+    file_stat: os.stat_result = mutation_info_file.stat()
+    stamp: Dict = {"path": resolved_path, "size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+    # A cache directory may be shared by several mutation info files, so stamps are named after the file's path.
+    stamp_path: Path = cache_dir / (hashlib.sha256(resolved_path.encode()).hexdigest() + ".stamp")
+    try:
+        with open(stamp_path, 'r') as infile:
+            recorded_stamp: Dict = json.load(infile)
+        if all(recorded_stamp.get(key) == value for key, value in stamp.items()):
+            return recorded_stamp["hash"]
+    except (OSError, ValueError, KeyError):
+        pass
+    stamp["hash"] = hash_mutation_info_file(mutation_info_file)
+    atomic_write(stamp_path, lambda outfile: outfile.write(json.dumps(stamp).encode()))
+    return stamp["hash"]
+
+
+def index_path_for(mutation_info_file: Path, cache_dir: Optional[Path] = None) -> Path:
+    if cache_dir is None:
+        cache_dir = default_cache_dir(mutation_info_file)
+    return cache_dir / (mutation_info_hash(mutation_info_file, cache_dir) + ".mti")
+
+
+def write_mutation_tree_index(mutation_tree: MutationTree, index_path: Path) -> None:
+    arrays: List[array] = [array('i', getattr(mutation_tree, name)) for name in ARRAY_NAMES]
+    metadata: bytes = json.dumps({"file_names": mutation_tree.file_names,
+                                  "file_fingerprints": [f.hex() for f in mutation_tree.file_fingerprints]}).encode()
+
+    def write(outfile: BinaryIO) -> None:
+        outfile.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, NATIVE_BYTE_ORDER,
+                                  *[len(a) for a in arrays], len(metadata)))
+        for a in arrays:
+            a.tofile(outfile)
+        outfile.write(metadata)
+
+    atomic_write(index_path, write)
+
+
+def read_mutation_tree_index(index_path: Path) -> Optional[MutationTree]:
+    # Memory-maps the index read-only, so that the physical pages holding the tree are shared by all processes that
+    # use it. Returns None if the index is not usable, e.g. because it was written by an incompatible version.
+    with open(index_path, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size < HEADER_SIZE:
+            return None
+        index_mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, byte_order, *lengths, metadata_length = struct.unpack_from(HEADER_FORMAT, index_mmap)
+    if magic != MAGIC or version != FORMAT_VERSION or byte_order != NATIVE_BYTE_ORDER \
+            or len(index_mmap) != HEADER_SIZE + 4 * sum(lengths) + metadata_length:
+        index_mmap.close()
+        return None
+    views: List[memoryview] = []
+    offset: int = HEADER_SIZE
+    for length in lengths:
+        views.append(memoryview(index_mmap)[offset:offset + 4 * length].cast('i'))
+        offset += 4 * length
+    metadata = json.loads(index_mmap[offset:offset + metadata_length].decode())
+    return MutationTree.from_arrays(**dict(zip(ARRAY_NAMES, views)),
+                                    file_names=metadata["file_names"],
+                                    file_fingerprints=[bytes.fromhex(f) for f in metadata["file_fingerprints"]])
+
+
+def _open_mutation_tree_index(mutation_info_file: Path, cache_dir: Optional[Path]) -> Tuple[Path, MutationTree]:
+    # Returns the path to the index for the given mutation info file and the tree that it holds, building the index if
+    # it does not yet exist (or is unusable). A usable index is only read once.
+    index_path: Path = index_path_for(mutation_info_file, cache_dir)
+    mutation_tree: Optional[MutationTree] = read_mutation_tree_index(index_path) if index_path.exists() else None
+    if mutation_tree is None:
+        print(f"Building mutation tree index {str(index_path)}...")
+        with open(mutation_info_file, 'r') as json_input:
+            write_mutation_tree_index(MutationTree(json.load(json_input)), index_path)
+        # The tree is read back from the index, so that this process shares its pages with the others that use it.
+        mutation_tree = read_mutation_tree_index(index_path)
+        assert mutation_tree is not None
+    return index_path, mutation_tree
+
+
+def build_mutation_tree_index(mutation_info_file: Path, cache_dir: Optional[Path] = None) -> Path:
+    return _open_mutation_tree_index(mutation_info_file, cache_dir)[0]
+
+
+def load_mutation_tree(mutation_info_file: Path, cache_dir: Optional[Path] = None) -> MutationTree:
+    return _open_mutation_tree_index(mutation_info_file, cache_dir)[1]
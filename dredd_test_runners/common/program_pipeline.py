@@ -0,0 +1,127 @@
+import concurrent.futures
+import random
+import shutil
+
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult
+from dredd_test_runners.common.run_test_with_mutants import TranslationUnit
+from dredd_test_runners.common.scratch_space import ScratchSpace
+
+
+class ReadyProgram:
+    # A generated program that has been vetted and is ready for mutant evaluation. The program's files live in
+    # 'program_dir'; 'source_files' names those that should be kept as the test's artifacts. 'compiler_args' refer to
+    # files in 'program_dir', and the remaining fields describe the behaviour of the program without mutation, with
+    # 'compile_time' and 'run_time' in CPU time as calibrated by timeout_calibration.py. For a program whose source
+    # files are compiled separately, 'translation_units' describes each of them (see run_test_with_mutants).
+    def __init__(self,
+                 seed: int,
+                 program_dir: Path,
+                 source_files: List[str],
+                 compiler_args: List[str],
+                 compile_time: float,
+                 run_time: float,
+                 binary_hash_non_mutated: str,
+                 binary_path_non_mutated: str,
+                 execution_result_non_mutated: ProcessResult,
+                 covered_mutants: List[int],
+                 translation_units: Optional[List[TranslationUnit]] = None):
+        self.seed: int = seed
+        self.program_dir: Path = program_dir
+        self.source_files: List[str] = source_files
+        self.compiler_args: List[str] = compiler_args
+        self.compile_time: float = compile_time
+        self.run_time: float = run_time
+        self.binary_hash_non_mutated: str = binary_hash_non_mutated
+        self.binary_path_non_mutated: str = binary_path_non_mutated
+        self.execution_result_non_mutated: ProcessResult = execution_result_non_mutated
+        self.covered_mutants: List[int] = covered_mutants
+        self.translation_units: Optional[List[TranslationUnit]] = translation_units
+
+
+# Generates a program from the given seed in the given (empty) directory, returning None if the program should be
+# discarded, e.g. because generation timed out or the program exhibits undefined behaviour. Must be picklable, so that
+# it can be sent to a generator worker process.
+ProgramGenerator = Callable[[int, Path], Optional[ReadyProgram]]
+
+
+def _generate_program(generate_program: ProgramGenerator,
+                      seed: int,
+                      scratch_space: ScratchSpace) -> Optional[ReadyProgram]:
+    program_dir: Path = scratch_space.allocate(prefix='__program_')
+    ready_program: Optional[ReadyProgram] = generate_program(seed, program_dir)
+    if ready_program is None:
+        shutil.rmtree(program_dir, ignore_errors=True)
+    return ready_program
+
+
+class ProgramPipeline:
+    # Generates and vets programs ahead of mutant evaluation. With no workers, each program is generated in this process
+    # when it is requested, so that generation and mutant evaluation strictly alternate. Otherwise, a pool of worker
+    # processes generates programs in the background, with up to twice as many programs in progress or ready as there
+    # are workers, so that the next program is usually ready by the time mutant evaluation of the current one has
+    # finished. Seeds are obtained from 'next_seed' (by default, drawn from 'random') in this process, so a seeded run
+    # generates the same sequence of seeds regardless of the number of workers (although programs may become ready in a
+    # different order).
+    def __init__(self,
+                 generate_program: ProgramGenerator,
+                 workers: int,
+                 scratch_space: ScratchSpace,
+                 next_seed: Optional[Callable[[], int]] = None):
+        assert workers >= 0
+        self.generate_program: ProgramGenerator = generate_program
+        self.next_seed: Callable[[], int] = next_seed if next_seed is not None \
+            else lambda: random.randint(0, 2 ** 32 - 1)
+        self.workers: int = workers
+        self.scratch_space: ScratchSpace = scratch_space
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.in_progress: Set[concurrent.futures.Future] = set()
+        self.current_program: Optional[ReadyProgram] = None
+        if workers > 0:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+    def __enter__(self) -> 'ProgramPipeline':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._release_current_program()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self.in_progress = set()
+
+    def _release_current_program(self) -> None:
+        if self.current_program is not None:
+            shutil.rmtree(self.current_program.program_dir, ignore_errors=True)
+            self.current_program = None
+
+    def _submit(self) -> None:
+        self.in_progress.add(self.executor.submit(_generate_program,
+                                                  self.generate_program,
+                                                  self.next_seed(),
+                                                  self.scratch_space))
+
+    def next_program(self) -> Optional[ReadyProgram]:
+        # Returns the next generated program, or None if that program was discarded during vetting. The directory of the
+        # program remains valid until the next call to this method, or until the pipeline is shut down.
+        self._release_current_program()
+        if self.executor is None:
+            self.current_program = _generate_program(self.generate_program,
+                                                     self.next_seed(),
+                                                     self.scratch_space)
+            return self.current_program
+        while len(self.in_progress) < 2 * self.workers:
+            self._submit()
+        done, _ = concurrent.futures.wait(self.in_progress, return_when=concurrent.futures.FIRST_COMPLETED)
+        # Take a single finished program, leaving any others that finished at the same time for later calls, and
+        # immediately start on a replacement so that the pipeline stays full while this one is evaluated.
+        future: concurrent.futures.Future = next(iter(done))
+        self.in_progress.remove(future)
+        self._submit()
+        self.current_program = future.result()
+        return self.current_program
@@ -0,0 +1,717 @@
+import abc
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class ResultStore(abc.ABC):
+    # Records which tests have been claimed by workers, which mutants have been killed (and by which test), and the
+    # kill summary of every completed test. Program artifacts for a test (e.g. the generated source files) always live
+    # under 'tests/<test name>' in the work directory, regardless of how results are stored, so that they can be
+    # picked up by test case reduction.
+    def __init__(self, work_dir: Path):
+        self.work_dir: Path = work_dir
+        self.tests_dir: Path = work_dir / "tests"
+
+    def test_directory(self, test_name: str) -> Path:
+        return self.tests_dir / test_name
+
+    @abc.abstractmethod
+    def claim_test(self, test_name: str) -> bool:
+        # Atomically claims a test for this worker, returning False if the test has already been claimed (either by
+        # another worker, or in a previous run). On success, the test's artifact directory exists.
+        pass
+
+    @abc.abstractmethod
+    def is_mutant_killed(self, mutant: int) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def killed_mutants(self) -> Set[int]:
+        pass
+
+    def killed_mutants_since(self, cursor: Optional[float]) -> Tuple[Set[int], Optional[float]]:
+        # Returns (at least) the mutants whose kills have been recorded since the given cursor was returned, together
+        # with the cursor to pass to the next call. A cursor of None asks for every killed mutant. A store that cannot
+        # tell which kills are new returns every killed mutant each time.
+        return self.killed_mutants(), None
+
+    @abc.abstractmethod
+    def record_kill(self, mutant: int, kill_info: Dict) -> bool:
+        # Atomically records that a mutant has been killed, returning False if a kill for the mutant had already been
+        # recorded, e.g. because another worker independently killed it.
+        pass
+
+    @abc.abstractmethod
+    def kill_info(self, mutant: int) -> Optional[Dict]:
+        pass
+
+    @abc.abstractmethod
+    def record_test_summary(self, test_name: str, kill_summary: Dict) -> None:
+        pass
+
+    @abc.abstractmethod
+    def test_summaries(self) -> Iterator[Tuple[str, Dict]]:
+        # Yields the name and kill summary of every test for which a summary has been recorded.
+        pass
+
+    def next_seed(self) -> int:
+        # Seeds for generated programs are drawn at random. Two workers may occasionally draw the same seed, which is
+        # detected when they try to claim the corresponding test.
+        return random.randint(0, 2 ** 32 - 1)
+
+    def lease_mutants(self, mutants: List[int], duration: float) -> List[int]:
+        # Leases mutants to this worker for 'duration' seconds, while it evaluates them, returning the mutants that were
+        # leased. A mutant that is leased to another worker, which may be about to kill it, is best deferred. Workers
+        # that do not share a coordinator do not know what other workers are evaluating, so every mutant is leased.
+        return list(mutants)
+
+    def release_mutants(self, mutants: List[int]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def heartbeat_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        # Notes that the worker that claimed a test is still evaluating it, optionally recording a checkpoint of its
+        # progress (see TestProgress). If the heartbeats for a test stop before it is complete, e.g. because its worker
+        # was preempted, another worker can take the test over with reclaim_test and resume it from its checkpoint.
+        pass
+
+    @abc.abstractmethod
+    def test_checkpoint(self, test_name: str) -> Optional[Dict]:
+        pass
+
+    @abc.abstractmethod
+    def resumable_tests(self, stale_after: float) -> List[str]:
+        # Returns the tests that are incomplete (having no summary, or a summary recording that the test was terminated
+        # early) and whose last heartbeat was more than 'stale_after' seconds ago.
+        pass
+
+    @abc.abstractmethod
+    def reclaim_test(self, test_name: str, stale_after: float) -> bool:
+        # Atomically takes over the claim on a test that is resumable (see resumable_tests), returning False if the test
+        # is not resumable, or if another worker took it over first. On success, the test's artifact directory exists.
+        pass
+
+    @abc.abstractmethod
+    def record_shard_plan(self, plan_key: str, plan: Dict[str, int]) -> Dict[str, int]:
+        # Records a plan for splitting tests between shards (see sharding.py) under the given key, unless a plan has
+        # already been recorded under it, and returns the recorded plan, so that every worker uses the same plan.
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def is_complete(kill_summary: Optional[Dict]) -> bool:
+    return kill_summary is not None and not kill_summary.get("terminated_early", False)
+
+
+def skipped_test_summary(test: str, reason: str) -> Dict:
+    # The summary of a test that was claimed but turned out to be unusable, e.g. because it fails without mutation. The
+    # test covers no mutants, and is complete, so that it is not resumed.
+    return {"test": test,
+            "skip_reason": reason,
+            "covered_mutants": [],
+            "killed_mutants": [],
+            "skipped_mutants": [],
+            "survived_mutants": []}
+
+
+class DirectoryResultStore(ResultStore):
+    # The original layout: a directory per test under 'tests', containing 'kill_summary.json' once the test has been
+    # completed, and a directory per killed mutant under 'killed_mutants', containing 'kill_info.json'. Claims rely on
+    # directory creation being atomic.
+    #
+    # Each claim on a test also creates a directory 'claims/<generation>' in the test's directory, whose modification
+    # time is the claim's heartbeat; a worker that takes over an abandoned test creates the next generation, so that
+    # only one of several workers trying to do so succeeds. The latest checkpoint is kept in 'checkpoint.json'. A test
+    # that was claimed before heartbeats were recorded is treated as generation 0, with its directory's modification
+    # time as its heartbeat.
+
+    # The coarsest granularity of file modification times that is expected, in seconds.
+    MODIFICATION_TIME_GRANULARITY: float = 2.0
+
+    def __init__(self, work_dir: Path):
+        super().__init__(work_dir)
+        self.killed_mutants_dir: Path = work_dir / "killed_mutants"
+        # If these already exist that's OK - there may be other processes working on mutant killing, or we may be
+        # continuing a job that crashed previously.
+        self.work_dir.mkdir(exist_ok=True)
+        self.tests_dir.mkdir(exist_ok=True)
+        self.killed_mutants_dir.mkdir(exist_ok=True)
+
+    def claim_test(self, test_name: str) -> bool:
+        try:
+            self.test_directory(test_name).mkdir()
+        except FileExistsError:
+            return False
+        (self.test_directory(test_name) / "claims" / "0").mkdir(parents=True, exist_ok=True)
+        return True
+
+    def _latest_claim(self, test_name: str) -> Tuple[int, float]:
+        # Returns the generation of the latest claim on the test, and the time of its last heartbeat.
+        claims_dir: Path = self.test_directory(test_name) / "claims"
+        generations: List[int] = [int(entry.name) for entry in claims_dir.iterdir() if entry.name.isdigit()] \
+            if claims_dir.is_dir() else []
+        if not generations:
+            return 0, self.test_directory(test_name).stat().st_mtime
+        return max(generations), (claims_dir / str(max(generations))).stat().st_mtime
+
+    def _test_summary(self, test_name: str) -> Optional[Dict]:
+        kill_summary: Path = self.test_directory(test_name) / "kill_summary.json"
+        if not kill_summary.exists():
+            return None
+        return json.load(open(kill_summary, 'r'))
+
+    def heartbeat_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        if checkpoint is not None:
+            # The checkpoint is replaced atomically, so that a worker resuming the test never reads a partial file.
+            temp_fd, temp_path = tempfile.mkstemp(prefix=".checkpoint", dir=self.test_directory(test_name))
+            with os.fdopen(temp_fd, 'w') as outfile:
+                json.dump(checkpoint, outfile)
+            os.replace(temp_path, self.test_directory(test_name) / "checkpoint.json")
+        generation, _ = self._latest_claim(test_name)
+        claim_dir: Path = self.test_directory(test_name) / "claims" / str(generation)
+        claim_dir.mkdir(parents=True, exist_ok=True)
+        os.utime(claim_dir)
+
+    def test_checkpoint(self, test_name: str) -> Optional[Dict]:
+        checkpoint_file: Path = self.test_directory(test_name) / "checkpoint.json"
+        if not checkpoint_file.exists():
+            return None
+        return json.load(open(checkpoint_file, 'r'))
+
+    def _is_resumable(self, test_name: str, stale_after: float) -> Tuple[bool, int]:
+        # Also returns the generation of the latest claim, which a worker taking over the test must supersede.
+        generation, heartbeat = self._latest_claim(test_name)
+        if time.time() - heartbeat <= stale_after or is_complete(self._test_summary(test_name)):
+            return False, generation
+        return True, generation
+
+    def resumable_tests(self, stale_after: float) -> List[str]:
+        return [test.name for test in sorted(self.tests_dir.iterdir())
+                if test.is_dir() and self._is_resumable(test.name, stale_after)[0]]
+
+    def reclaim_test(self, test_name: str, stale_after: float) -> bool:
+        resumable, generation = self._is_resumable(test_name, stale_after)
+        if not resumable:
+            return False
+        claims_dir: Path = self.test_directory(test_name) / "claims"
+        claims_dir.mkdir(exist_ok=True)
+        try:
+            (claims_dir / str(generation + 1)).mkdir()
+            return True
+        except FileExistsError:
+            return False
+
+    def is_mutant_killed(self, mutant: int) -> bool:
+        return (self.killed_mutants_dir / str(mutant)).exists()
+
+    def killed_mutants(self) -> Set[int]:
+        return set([int(entry.name) for entry in self.killed_mutants_dir.iterdir() if entry.name.isdigit()])
+
+    def killed_mutants_since(self, cursor: Optional[float]) -> Tuple[Set[int], Optional[float]]:
+        # Recording a kill adds an entry to the killed mutants directory, which updates the directory's modification
+        # time, so the directory is only listed if its modification time differs from the cursor. As modification times
+        # may be coarse (e.g. on a network file system), a kill recorded just after the listing could leave the time
+        # unchanged, so a modification time is only used as a cursor once it is MODIFICATION_TIME_GRANULARITY seconds
+        # old.
+        modification_time: float = self.killed_mutants_dir.stat().st_mtime
+        if cursor is not None and modification_time == cursor:
+            return set(), cursor
+        killed_mutants: Set[int] = self.killed_mutants()
+        if time.time() - modification_time < DirectoryResultStore.MODIFICATION_TIME_GRANULARITY:
+            return killed_mutants, None
+        return killed_mutants, modification_time
+
+    def record_kill(self, mutant: int, kill_info: Dict) -> bool:
+        mutant_path: Path = self.killed_mutants_dir / str(mutant)
+        try:
+            mutant_path.mkdir()
+        except FileExistsError:
+            return False
+        with open(mutant_path / "kill_info.json", "w") as outfile:
+            json.dump(kill_info, outfile)
+        return True
+
+    def kill_info(self, mutant: int) -> Optional[Dict]:
+        kill_info_file: Path = self.killed_mutants_dir / str(mutant) / "kill_info.json"
+        if not kill_info_file.exists():
+            return None
+        return json.load(open(kill_info_file, 'r'))
+
+    def record_test_summary(self, test_name: str, kill_summary: Dict) -> None:
+        with open(self.test_directory(test_name) / "kill_summary.json", "w") as outfile:
+            json.dump(kill_summary, outfile)
+
+    def test_summaries(self) -> Iterator[Tuple[str, Dict]]:
+        for test in self.tests_dir.glob('*'):
+            kill_summary: Path = test / "kill_summary.json"
+            if not test.is_dir() or not kill_summary.exists():
+                continue
+            yield test.name, json.load(open(kill_summary, 'r'))
+
+    def record_shard_plan(self, plan_key: str, plan: Dict[str, int]) -> Dict[str, int]:
+        # A new plan is written to a temporary file and then linked into place, which fails if another worker has
+        # recorded a plan in the meantime.
+        plans_dir: Path = self.work_dir / "shard_plans"
+        plan_path: Path = plans_dir / (plan_key + ".json")
+        if not plan_path.exists():
+            plans_dir.mkdir(exist_ok=True)
+            temp_fd, temp_path = tempfile.mkstemp(prefix='.' + plan_key, dir=plans_dir)
+            with os.fdopen(temp_fd, 'w') as outfile:
+                json.dump(plan, outfile)
+            try:
+                os.link(temp_path, plan_path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(temp_path)
+        with open(plan_path, 'r') as infile:
+            return json.load(infile)
+
+
+class SqliteResultStore(ResultStore):
+    # Stores results in a single SQLite database, so that checking whether a mutant has been killed, or claiming a test
+    # or a mutant, is an indexed query or a single-row insert rather than a file system metadata operation. The
+    # database uses write-ahead logging so that readers never block the (short) write transactions of other workers.
+    # WAL mode requires that all workers using the database run on the same machine.
+
+    SCHEMA: List[str] = [
+        "CREATE TABLE IF NOT EXISTS tests (name TEXT PRIMARY KEY, claimed_at REAL NOT NULL, summary TEXT)",
+        "CREATE TABLE IF NOT EXISTS kills (mutant INTEGER PRIMARY KEY, killing_test TEXT NOT NULL, "
+        "kill_type TEXT NOT NULL, killed_at REAL NOT NULL, info TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS kills_by_test ON kills (killing_test)",
+        "CREATE INDEX IF NOT EXISTS kills_by_time ON kills (killed_at)",
+        "CREATE TABLE IF NOT EXISTS test_mutants (test TEXT NOT NULL, mutant INTEGER NOT NULL, "
+        "outcome TEXT NOT NULL, PRIMARY KEY (test, mutant))",
+        "CREATE INDEX IF NOT EXISTS test_mutants_by_mutant ON test_mutants (mutant, outcome)",
+        # The generation of the latest claim on each test, which is incremented when a worker takes over an abandoned
+        # test, and the claim's last heartbeat and checkpoint. A test claimed before heartbeats were recorded has no
+        # row here, and is treated as generation 0, with its claim time as its heartbeat.
+        "CREATE TABLE IF NOT EXISTS test_claims (name TEXT PRIMARY KEY, generation INTEGER NOT NULL, "
+        "heartbeat_at REAL NOT NULL, checkpoint TEXT)",
+        "CREATE TABLE IF NOT EXISTS shard_plans (plan_key TEXT PRIMARY KEY, plan TEXT NOT NULL)",
+    ]
+
+    # The lists of a kill summary that are broken down into one row per (test, mutant) pair, so that it is possible to
+    # ask e.g. which tests cover a given mutant without scanning every summary.
+    SUMMARY_OUTCOMES: Dict[str, str] = {
+        "killed_mutants": "killed",
+        "skipped_mutants": "skipped",
+        "survived_mutants": "survived",
+    }
+
+    def __init__(self, work_dir: Path, database: Path):
+        super().__init__(work_dir)
+        self.work_dir.mkdir(exist_ok=True)
+        self.tests_dir.mkdir(exist_ok=True)
+        self.database: Path = database
+        # Autocommit mode: transactions are started explicitly where several statements must be applied atomically. The
+        # connection may be used from several threads (e.g. by a coordinator), provided that they do not use it at the
+        # same time.
+        self.connection: sqlite3.Connection = sqlite3.connect(database, timeout=60.0, isolation_level=None,
+                                                              check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SqliteResultStore.SCHEMA:
+            self.connection.execute(statement)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def claim_test(self, test_name: str) -> bool:
+        now: float = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.connection.execute("INSERT OR IGNORE INTO tests (name, claimed_at) VALUES (?, ?)",
+                                             (test_name, now))
+            claimed: bool = cursor.rowcount == 1
+            if claimed:
+                self.connection.execute("INSERT OR REPLACE INTO test_claims (name, generation, heartbeat_at) "
+                                        "VALUES (?, 0, ?)", (test_name, now))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        if not claimed:
+            return False
+        self.test_directory(test_name).mkdir(parents=True, exist_ok=True)
+        return True
+
+    def heartbeat_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        self.connection.execute(
+            "INSERT INTO test_claims (name, generation, heartbeat_at, checkpoint) VALUES (?, 0, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, "
+            "checkpoint = COALESCE(excluded.checkpoint, test_claims.checkpoint)",
+            (test_name, time.time(), None if checkpoint is None else json.dumps(checkpoint)))
+
+    def test_checkpoint(self, test_name: str) -> Optional[Dict]:
+        row = self.connection.execute("SELECT checkpoint FROM test_claims WHERE name = ?", (test_name,)).fetchone()
+        return None if row is None or row[0] is None else json.loads(row[0])
+
+    # Selects the tests whose claims are stale and that are incomplete (see is_complete).
+    RESUMABLE_TESTS_QUERY: str = (
+        "SELECT tests.name, COALESCE(test_claims.generation, 0) FROM tests "
+        "LEFT JOIN test_claims ON test_claims.name = tests.name "
+        "WHERE COALESCE(test_claims.heartbeat_at, tests.claimed_at) < ? "
+        "AND (tests.summary IS NULL OR json_extract(tests.summary, '$.terminated_early') = 1)")
+
+    def resumable_tests(self, stale_after: float) -> List[str]:
+        rows = self.connection.execute(SqliteResultStore.RESUMABLE_TESTS_QUERY + " ORDER BY tests.name",
+                                       (time.time() - stale_after,)).fetchall()
+        return [name for name, _ in rows]
+
+    def reclaim_test(self, test_name: str, stale_after: float) -> bool:
+        now: float = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(SqliteResultStore.RESUMABLE_TESTS_QUERY + " AND tests.name = ?",
+                                          (now - stale_after, test_name)).fetchone()
+            reclaimed: bool = row is not None
+            if reclaimed:
+                self.connection.execute(
+                    "INSERT INTO test_claims (name, generation, heartbeat_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET generation = excluded.generation, "
+                    "heartbeat_at = excluded.heartbeat_at",
+                    (test_name, row[1] + 1, now))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        if not reclaimed:
+            return False
+        self.test_directory(test_name).mkdir(parents=True, exist_ok=True)
+        return True
+
+    def is_mutant_killed(self, mutant: int) -> bool:
+        return self.connection.execute("SELECT 1 FROM kills WHERE mutant = ?", (mutant,)).fetchone() is not None
+
+    def killed_mutants(self) -> Set[int]:
+        return set([row[0] for row in self.connection.execute("SELECT mutant FROM kills")])
+
+    def killed_mutants_since(self, cursor: Optional[float]) -> Tuple[Set[int], Optional[float]]:
+        # The cursor is the latest kill time seen. Kill times are taken while the write lock is held (see
+        # record_kills), so a kill that is committed later has a later time, unless the clock is stepped back. Kills at
+        # exactly the cursor's time are returned again, in case a later transaction took the same time.
+        if cursor is None:
+            rows = self.connection.execute("SELECT mutant, killed_at FROM kills")
+        else:
+            rows = self.connection.execute("SELECT mutant, killed_at FROM kills WHERE killed_at >= ?", (cursor,))
+        killed_mutants: Set[int] = set()
+        for mutant, killed_at in rows:
+            killed_mutants.add(mutant)
+            cursor = killed_at if cursor is None else max(cursor, killed_at)
+        return killed_mutants, cursor
+
+    def record_kill(self, mutant: int, kill_info: Dict) -> bool:
+        return self.record_kills([(mutant, kill_info)]) == [mutant]
+
+    def record_kills(self, kills: List[Tuple[int, Dict]]) -> List[int]:
+        # Records a batch of kills in a single transaction, returning the mutants whose kills were newly recorded.
+        newly_recorded: List[int] = []
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for mutant, kill_info in kills:
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO kills (mutant, killing_test, kill_type, killed_at, info) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (mutant, kill_info["killing_test"], kill_info["kill_type"], time.time(), json.dumps(kill_info)))
+                if cursor.rowcount == 1:
+                    newly_recorded.append(mutant)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return newly_recorded
+
+    def kill_info(self, mutant: int) -> Optional[Dict]:
+        row = self.connection.execute("SELECT info FROM kills WHERE mutant = ?", (mutant,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def record_test_summary(self, test_name: str, kill_summary: Dict) -> None:
+        self.record_test_summaries([(test_name, kill_summary)])
+
+    def record_test_summaries(self, summaries: List[Tuple[str, Dict]]) -> None:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for test_name, kill_summary in summaries:
+                self.connection.execute(
+                    "INSERT INTO tests (name, claimed_at, summary) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET summary = excluded.summary",
+                    (test_name, time.time(), json.dumps(kill_summary)))
+                self.connection.execute("DELETE FROM test_mutants WHERE test = ?", (test_name,))
+                for key, outcome in SqliteResultStore.SUMMARY_OUTCOMES.items():
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO test_mutants (test, mutant, outcome) VALUES (?, ?, ?)",
+                        [(test_name, mutant, outcome) for mutant in kill_summary.get(key, [])])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def test_summaries(self) -> Iterator[Tuple[str, Dict]]:
+        for name, summary in self.connection.execute(
+                "SELECT name, summary FROM tests WHERE summary IS NOT NULL ORDER BY name").fetchall():
+            yield name, json.loads(summary)
+
+    def record_shard_plan(self, plan_key: str, plan: Dict[str, int]) -> Dict[str, int]:
+        self.connection.execute("INSERT OR IGNORE INTO shard_plans (plan_key, plan) VALUES (?, ?)",
+                                (plan_key, json.dumps(plan)))
+        row = self.connection.execute("SELECT plan FROM shard_plans WHERE plan_key = ?", (plan_key,)).fetchone()
+        return json.loads(row[0])
+
+    def tests_covering_mutant(self, mutant: int) -> List[Tuple[str, str]]:
+        # Returns (test name, outcome) for every completed test that covers the given mutant.
+        return self.connection.execute("SELECT test, outcome FROM test_mutants WHERE mutant = ? ORDER BY test",
+                                       (mutant,)).fetchall()
+
+
+class CoordinatorError(RuntimeError):
+    # Raised when the coordinator received a request but could not carry it out.
+    pass
+
+
+class CoordinatorResultStore(ResultStore):
+    # Records results via a coordinator (see dredd_test_runners/coordinator), which serialises claims, kills and mutant
+    # leases for workers on many machines, so that they do not need to share a file system. Program artifacts are
+    # still kept under the local work directory.
+    #
+    # Requests are JSON objects posted to '<coordinator URL>/<method>' over a persistent connection per thread. New
+    # kills are broadcast: a background thread long-polls the coordinator for kills since the last one it has seen,
+    # so that checking whether a mutant has been killed is a local lookup that is at most moments out of date.
+
+    # The number of times a request is attempted before the coordinator is considered to be unreachable, and the delay
+    # before the first retry, which doubles with each attempt.
+    REQUEST_ATTEMPTS: int = 8
+    RETRY_DELAY: float = 0.5
+
+    # How long the coordinator may hold a request for new kills before answering that there are none.
+    KILL_POLL_SECONDS: float = 30.0
+
+    def __init__(self, work_dir: Path, coordinator_url: str):
+        super().__init__(work_dir)
+        self.work_dir.mkdir(exist_ok=True)
+        self.tests_dir.mkdir(exist_ok=True)
+        url = urllib.parse.urlsplit(coordinator_url)
+        if url.scheme != "http" or url.hostname is None:
+            raise ValueError(f"Unsupported coordinator URL {coordinator_url}; expected http://<host>:<port>")
+        self.host: str = url.hostname
+        self.port: int = url.port if url.port is not None else 80
+        self.worker: str = f"{socket.gethostname()}-{os.getpid()}"
+        self.connections = threading.local()
+        self.kills_lock: threading.Lock = threading.Lock()
+        self.known_kills: Set[int] = set()
+        # The known kills in the order in which they became known, so that those since a given point can be found.
+        self.kill_log: List[int] = []
+        self.kill_position: int = 0
+        self.closed: threading.Event = threading.Event()
+        self._receive_kills(wait=0.0)
+        self.kill_listener: threading.Thread = threading.Thread(target=self._listen_for_kills, daemon=True)
+        self.kill_listener.start()
+
+    def _request(self, method: str, timeout: float = 60.0, **arguments):
+        delay: float = CoordinatorResultStore.RETRY_DELAY
+        for attempt in range(CoordinatorResultStore.REQUEST_ATTEMPTS):
+            connection: Optional[http.client.HTTPConnection] = getattr(self.connections, 'connection', None)
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+                self.connections.connection = connection
+            # The timeout given to a connection only applies when it connects, so an open socket is given the timeout
+            # of this request directly.
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            try:
+                connection.request("POST", "/" + method, body=json.dumps(arguments).encode('utf-8'),
+                                   headers={"Content-Type": "application/json"})
+                response: http.client.HTTPResponse = connection.getresponse()
+                body = json.loads(response.read())
+            except (OSError, http.client.HTTPException, json.JSONDecodeError):
+                # The connection is reopened, since it may be left in an unusable state. A request that reached the
+                # coordinator may be repeated; every request is safe to repeat, although e.g. a repeated claim is
+                # reported as failed.
+                connection.close()
+                self.connections.connection = None
+                if attempt == CoordinatorResultStore.REQUEST_ATTEMPTS - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+                continue
+            if response.status >= 500:
+                # The request reached the coordinator, which failed to carry it out (e.g. because its result store
+                # raised an error). Repeating it could repeat whatever part of it took effect, so the failure is
+                # reported instead.
+                raise CoordinatorError(f"Coordinator failed to carry out {method}: {body.get('error')}")
+            if response.status != 200:
+                raise RuntimeError(f"Coordinator request {method} failed: {body.get('error')}")
+            return body["result"]
+
+    def _receive_kills(self, wait: float) -> None:
+        result = self._request("kills_since", timeout=wait + 60.0, position=self.kill_position, wait=wait)
+        with self.kills_lock:
+            for mutant in result["kills"]:
+                self._note_kill(mutant)
+            self.kill_position = result["position"]
+
+    def _note_kill(self, mutant: int) -> None:
+        # Must be called with the kills lock held.
+        if mutant not in self.known_kills:
+            self.known_kills.add(mutant)
+            self.kill_log.append(mutant)
+
+    def _listen_for_kills(self) -> None:
+        while not self.closed.is_set():
+            try:
+                self._receive_kills(wait=CoordinatorResultStore.KILL_POLL_SECONDS)
+            except (OSError, http.client.HTTPException, json.JSONDecodeError, RuntimeError) as error:
+                # Requests that need the coordinator will report the problem; keep listening in case it comes back.
+                if not self.closed.is_set():
+                    print(f"Lost contact with coordinator: {error}")
+                    self.closed.wait(CoordinatorResultStore.KILL_POLL_SECONDS)
+
+    def next_seed(self) -> int:
+        return self._request("next_seed")
+
+    def claim_test(self, test_name: str) -> bool:
+        if not self._request("claim_test", test_name=test_name):
+            return False
+        self.test_directory(test_name).mkdir(parents=True, exist_ok=True)
+        return True
+
+    def is_mutant_killed(self, mutant: int) -> bool:
+        with self.kills_lock:
+            return mutant in self.known_kills
+
+    def killed_mutants(self) -> Set[int]:
+        with self.kills_lock:
+            return set(self.known_kills)
+
+    def killed_mutants_since(self, cursor: Optional[float]) -> Tuple[Set[int], Optional[float]]:
+        # The cursor is a position in the log of known kills.
+        with self.kills_lock:
+            return set(self.kill_log[int(cursor or 0):]), len(self.kill_log)
+
+    def record_kill(self, mutant: int, kill_info: Dict) -> bool:
+        recorded: bool = self._request("record_kill", worker=self.worker, mutant=mutant, kill_info=kill_info)
+        with self.kills_lock:
+            self._note_kill(mutant)
+        return recorded
+
+    def kill_info(self, mutant: int) -> Optional[Dict]:
+        return self._request("kill_info", mutant=mutant)
+
+    def record_test_summary(self, test_name: str, kill_summary: Dict) -> None:
+        self._request("record_test_summary", test_name=test_name, kill_summary=kill_summary)
+
+    def test_summaries(self) -> Iterator[Tuple[str, Dict]]:
+        for test_name, kill_summary in self._request("test_summaries", timeout=600.0):
+            yield test_name, kill_summary
+
+    def lease_mutants(self, mutants: List[int], duration: float) -> List[int]:
+        return self._request("lease_mutants", worker=self.worker, mutants=mutants, duration=duration)
+
+    def release_mutants(self, mutants: List[int]) -> None:
+        self._request("release_mutants", worker=self.worker, mutants=mutants)
+
+    def heartbeat_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        self._request("heartbeat_test", test_name=test_name, checkpoint=checkpoint)
+
+    def test_checkpoint(self, test_name: str) -> Optional[Dict]:
+        return self._request("test_checkpoint", test_name=test_name)
+
+    def resumable_tests(self, stale_after: float) -> List[str]:
+        return self._request("resumable_tests", timeout=600.0, stale_after=stale_after)
+
+    def reclaim_test(self, test_name: str, stale_after: float) -> bool:
+        if not self._request("reclaim_test", test_name=test_name, stale_after=stale_after):
+            return False
+        self.test_directory(test_name).mkdir(parents=True, exist_ok=True)
+        return True
+
+    def record_shard_plan(self, plan_key: str, plan: Dict[str, int]) -> Dict[str, int]:
+        return self._request("record_shard_plan", plan_key=plan_key, plan=plan)
+
+    def close(self) -> None:
+        # The kill listener is a daemon thread, so it does not need to be waited for.
+        self.closed.set()
+        connection: Optional[http.client.HTTPConnection] = getattr(self.connections, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+def open_result_store(work_dir: Path,
+                      result_database: Optional[Path] = None,
+                      coordinator: Optional[str] = None) -> ResultStore:
+    if coordinator is not None:
+        return CoordinatorResultStore(work_dir=work_dir, coordinator_url=coordinator)
+    if result_database is not None:
+        return SqliteResultStore(work_dir=work_dir, database=result_database)
+    return DirectoryResultStore(work_dir=work_dir)
+
+
+# The kill information recorded for a mutant that is known to have been killed, but whose kill information was never
+# written (see import_work_directory).
+UNKNOWN_KILLING_TEST: str = "unknown"
+UNKNOWN_KILL_TYPE: str = "unknown"
+
+
+def import_work_directory(work_dir: Path, store: SqliteResultStore, batch_size: int = 10000) -> Tuple[int, int]:
+    # Imports the results of a campaign that used the directory layout, so that it can be continued (or analysed)
+    # using a database. Tests that were claimed but never completed are imported as claimed, so that they are not
+    # repeated. Returns the number of kills and the number of tests imported.
+    source = DirectoryResultStore(work_dir=work_dir)
+
+    kills: List[Tuple[int, Dict]] = []
+    num_kills: int = 0
+    # Mutants whose killer crashed before writing the kill information. They are still imported as killed, so that they
+    # are not tested again, with the killing test taken from the summary of the test that killed them if there is one.
+    without_kill_info: Set[int] = set()
+    for mutant in sorted(source.killed_mutants()):
+        kill_info: Optional[Dict] = source.kill_info(mutant)
+        if kill_info is None:
+            without_kill_info.add(mutant)
+            continue
+        kills.append((mutant, kill_info))
+        if len(kills) == batch_size:
+            num_kills += len(store.record_kills(kills))
+            kills = []
+    num_kills += len(store.record_kills(kills))
+
+    summaries: List[Tuple[str, Dict]] = []
+    num_tests: int = 0
+    killing_tests: Dict[int, str] = {}
+    for test in sorted(source.tests_dir.glob('*')):
+        if not test.is_dir():
+            continue
+        num_tests += 1
+        kill_summary: Path = test / "kill_summary.json"
+        if not kill_summary.exists():
+            store.claim_test(test.name)
+            continue
+        summaries.append((test.name, json.load(open(kill_summary, 'r'))))
+        for mutant in summaries[-1][1].get("killed_mutants", []):
+            if mutant in without_kill_info:
+                killing_tests.setdefault(mutant, test.name)
+        if len(summaries) == batch_size:
+            store.record_test_summaries(summaries)
+            summaries = []
+    store.record_test_summaries(summaries)
+
+    if without_kill_info:
+        print(f"{len(without_kill_info)} killed mutants have no kill information, and are imported with kill type "
+              f"'{UNKNOWN_KILL_TYPE}'.")
+        num_kills += len(store.record_kills(
+            [(mutant, {"killing_test": killing_tests.get(mutant, UNKNOWN_KILLING_TEST), "kill_type": UNKNOWN_KILL_TYPE})
+             for mutant in sorted(without_kill_info)]))
+    return num_kills, num_tests
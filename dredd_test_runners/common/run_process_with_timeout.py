@@ -1,32 +1,269 @@
+import asyncio
+import hashlib
+import math
 import os
+import resource
 import signal
 import subprocess
+import threading
 
 from pathlib import Path
 from typing import AnyStr, Dict, List, Optional
 
+from dredd_test_runners.common.constants import CPU_TIME_SLACK, DEFAULT_OUTPUT_LIMIT, TERMINATION_GRACE_PERIOD
+
 
 class ProcessResult:
-    def __init__(self, returncode: int, stdout: bytes, stderr: bytes):
+    def __init__(self,
+                 returncode: int,
+                 stdout: bytes,
+                 stderr: bytes,
+                 cpu_time: float = 0.0,
+                 output_truncated: bool = False,
+                 stdout_digest: Optional[bytes] = None,
+                 stderr_digest: Optional[bytes] = None):
         self.returncode: int = returncode
         self.stdout: bytes = stdout
         self.stderr: bytes = stderr
+        # User plus system CPU time of the process and the descendants it waited for, e.g. the compiler processes
+        # started by a compiler driver.
+        self.cpu_time: float = cpu_time
+        # Whether stdout or stderr exceeded the output limit, in which case only a prefix of it was kept. The digests
+        # cover the whole of each stream, so that truncated outputs can still be compared.
+        self.output_truncated: bool = output_truncated
+        self.stdout_digest: Optional[bytes] = stdout_digest
+        self.stderr_digest: Optional[bytes] = stderr_digest
 
+    def same_stdout(self, other: 'ProcessResult') -> bool:
+        return self._same_output(self.stdout, self.stdout_digest, other, other.stdout, other.stdout_digest)
 
-def run_process_with_timeout(cmd: List[str],
-                             timeout_seconds: int,
-                             env: Optional[Dict[AnyStr, AnyStr]] = None,
-                             cwd: Path = None) -> Optional[ProcessResult]:
-    process = None
-    try:
-        process = subprocess.Popen(cmd,
+    def same_stderr(self, other: 'ProcessResult') -> bool:
+        return self._same_output(self.stderr, self.stderr_digest, other, other.stderr, other.stderr_digest)
+
+    def _same_output(self, output: bytes, digest: Optional[bytes], other: 'ProcessResult', other_output: bytes,
+                     other_digest: Optional[bytes]) -> bool:
+        # If either output was truncated, the kept prefixes may be equal even though the outputs differ, so the digests
+        # of the whole outputs are compared instead. Without digests, truncated outputs are conservatively deemed to
+        # differ.
+        if not self.output_truncated and not other.output_truncated:
+            return output == other_output
+        return digest is not None and digest == other_digest
+
+
+class _OutputCollector:
+    # Drains a pipe without blocking the event loop, keeping at most 'limit' bytes. The pipe is drained until the end
+    # even once the limit has been reached, so that the process never blocks writing to a full pipe, and everything
+    # read contributes to a digest of the whole output.
+    def __init__(self, loop: asyncio.AbstractEventLoop, pipe, limit: int):
+        self.loop: asyncio.AbstractEventLoop = loop
+        self.pipe = pipe
+        self.limit: int = limit
+        self.chunks: List[bytes] = []
+        self.size: int = 0
+        self.truncated: bool = False
+        self.hash = hashlib.blake2b(digest_size=32)
+        self.closed: asyncio.Future = loop.create_future()
+        os.set_blocking(pipe.fileno(), False)
+        loop.add_reader(pipe.fileno(), self._on_readable)
+
+    def _on_readable(self) -> None:
+        try:
+            data: bytes = os.read(self.pipe.fileno(), 1 << 16)
+        except BlockingIOError:
+            return
+        if not data:
+            self.close()
+            return
+        self.hash.update(data)
+        if self.size < self.limit:
+            self.chunks.append(data[:self.limit - self.size])
+        self.truncated = self.truncated or self.size + len(data) > self.limit
+        self.size += len(data)
+
+    def close(self) -> None:
+        if self.pipe.closed:
+            return
+        self.loop.remove_reader(self.pipe.fileno())
+        self.pipe.close()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def output(self) -> bytes:
+        return b''.join(self.chunks)
+
+    def digest(self) -> bytes:
+        return self.hash.digest()
+
+
+class ProcessEngine:
+    # Runs processes on an asyncio event loop, so that any number of processes can be managed concurrently from a single
+    # thread. Each process is started in its own session, so that on timeout (or cancellation) the whole process group
+    # can be terminated: first with SIGTERM and then, if it has not exited within a grace period, with SIGKILL. Every
+    # process is reaped, and its pipes closed, before 'run' returns.
+    #
+    # Processes are reaped using os.wait4, which provides their resource usage. Exit is detected using a pidfd where the
+    # platform supports it, and otherwise by polling.
+    #
+    # A process can additionally be limited in the CPU time that it uses, which unlike wall-clock time does not depend
+    # on how loaded the machine is. The limit is enforced by the kernel (via RLIMIT_CPU, which has a granularity of one
+    # second) in the process and in each process that it starts, and a process that exits unsuccessfully having used at
+    # least its CPU time allowance is deemed to have timed out. The wall-clock timeout still applies, e.g. to catch
+    # processes that are blocked rather than busy.
+    #
+    # The limit is set by this process once the child has been started, with prlimit, rather than by the child before
+    # it executes the command: code run in the child between fork and exec (preexec_fn) is unsafe when this process has
+    # other threads, which the runners do. Any process that the child starts before the limit is set is not limited in
+    # CPU time, but is still subject to the wall-clock timeout.
+    def __init__(self,
+                 output_limit: int = DEFAULT_OUTPUT_LIMIT,
+                 termination_grace_period: float = TERMINATION_GRACE_PERIOD):
+        self.output_limit: int = output_limit
+        self.termination_grace_period: float = termination_grace_period
+
+    async def run(self,
+                  cmd: List[str],
+                  timeout_seconds: float,
+                  env: Optional[Dict[AnyStr, AnyStr]] = None,
+                  cwd: Path = None,
+                  cpu_timeout_seconds: Optional[float] = None) -> Optional[ProcessResult]:
+        # Returns None if the process did not complete within the timeout.
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        process = subprocess.Popen([str(arg) for arg in cmd],
                                    start_new_session=True,
+                                   stdin=subprocess.DEVNULL,
                                    stdout=subprocess.PIPE,
                                    stderr=subprocess.PIPE,
                                    env=env,
                                    cwd=cwd)
-        process_stdout, process_stderr = process.communicate(timeout=timeout_seconds)
-        return ProcessResult(returncode=process.returncode, stdout=process_stdout, stderr=process_stderr)
-    except subprocess.TimeoutExpired:
-        os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-        return None
+        if cpu_timeout_seconds is not None:
+            limit_cpu_time(process.pid, cpu_timeout_seconds)
+        stdout_collector = _OutputCollector(loop, process.stdout, self.output_limit)
+        stderr_collector = _OutputCollector(loop, process.stderr, self.output_limit)
+        exited: asyncio.Task = asyncio.ensure_future(self._wait_for_exit(process))
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.gather(exited,
+                                                                 stdout_collector.closed,
+                                                                 stderr_collector.closed)),
+                                   timeout=timeout_seconds)
+            status, rusage = exited.result()
+            returncode: int = os.waitstatus_to_exitcode(status)
+            cpu_time: float = rusage.ru_utime + rusage.ru_stime
+            if cpu_timeout_seconds is not None and _exceeded_cpu_time(returncode, cpu_time, cpu_timeout_seconds):
+                return None
+            return ProcessResult(returncode=returncode,
+                                 stdout=stdout_collector.output(),
+                                 stderr=stderr_collector.output(),
+                                 cpu_time=cpu_time,
+                                 output_truncated=stdout_collector.truncated or stderr_collector.truncated,
+                                 stdout_digest=stdout_collector.digest(),
+                                 stderr_digest=stderr_collector.digest())
+        except asyncio.TimeoutError:
+            await asyncio.shield(self._terminate(process, exited))
+            return None
+        except asyncio.CancelledError:
+            await asyncio.shield(self._terminate(process, exited))
+            raise
+        finally:
+            stdout_collector.close()
+            stderr_collector.close()
+
+    async def _wait_for_exit(self, process: subprocess.Popen):
+        pidfd: Optional[int] = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                # E.g. the kernel is too old to support pidfds.
+                pidfd = None
+        try:
+            while True:
+                pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+                if pid != 0:
+                    # Let the Popen object know that the process has been reaped, so that it does not try to reap it.
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    return status, rusage
+                if pidfd is None:
+                    await asyncio.sleep(0.01)
+                    continue
+                readable: asyncio.Future = asyncio.get_running_loop().create_future()
+                asyncio.get_running_loop().add_reader(pidfd, readable.set_result, None)
+                try:
+                    await readable
+                finally:
+                    asyncio.get_running_loop().remove_reader(pidfd)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+    async def _terminate(self, process: subprocess.Popen, exited: asyncio.Task) -> None:
+        # Terminates the process group and waits for the process to be reaped. This is shielded from cancellation, as
+        # interrupting it would leave a process behind.
+        _signal_process_group(process.pid, signal.SIGTERM)
+        done, _ = await asyncio.wait([exited], timeout=self.termination_grace_period)
+        if not done:
+            _signal_process_group(process.pid, signal.SIGKILL)
+            await asyncio.shield(exited)
+
+
+def limit_cpu_time(pid: int, cpu_timeout_seconds: float) -> None:
+    # The process receives SIGXCPU once it reaches the soft limit, and SIGKILL a second later in case it handles
+    # SIGXCPU. CPU time that the process used before the limit was set counts towards the limit.
+    soft_limit: int = max(1, math.ceil(cpu_timeout_seconds))
+    try:
+        resource.prlimit(pid, resource.RLIMIT_CPU, (soft_limit, soft_limit + 1))
+    except ProcessLookupError:
+        # The process has already exited.
+        pass
+
+
+def _exceeded_cpu_time(returncode: int, cpu_time: float, cpu_timeout_seconds: float) -> bool:
+    return returncode == -signal.SIGXCPU or (returncode != 0 and cpu_time >= cpu_timeout_seconds - CPU_TIME_SLACK)
+
+
+def _signal_process_group(pid: int, sig: int) -> None:
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        # The process group has already exited.
+        pass
+
+
+# The engine and event loops used by the synchronous API. Each thread has a loop of its own, since a loop can only be
+# run by one thread at a time. Loops are created lazily in each process: a loop inherited across fork shares its
+# selector with the parent, so it must not be used.
+_default_engine: ProcessEngine = ProcessEngine()
+_sync_loops: threading.local = threading.local()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    if getattr(_sync_loops, 'loop', None) is None or _sync_loops.pid != os.getpid():
+        _sync_loops.loop = asyncio.new_event_loop()
+        _sync_loops.pid = os.getpid()
+    return _sync_loops.loop
+
+
+def run_process_with_timeout(cmd: List[str],
+                             timeout_seconds: float,
+                             env: Optional[Dict[AnyStr, AnyStr]] = None,
+                             cwd: Path = None,
+                             cpu_timeout_seconds: Optional[float] = None) -> Optional[ProcessResult]:
+    return _get_sync_loop().run_until_complete(_default_engine.run(cmd=cmd,
+                                                                   timeout_seconds=timeout_seconds,
+                                                                   env=env,
+                                                                   cwd=cwd,
+                                                                   cpu_timeout_seconds=cpu_timeout_seconds))
+
+
+async def run_process_with_timeout_async(cmd: List[str],
+                                         timeout_seconds: float,
+                                         env: Optional[Dict[AnyStr, AnyStr]] = None,
+                                         cwd: Path = None,
+                                         cpu_timeout_seconds: Optional[float] = None) -> Optional[ProcessResult]:
+    # As run_process_with_timeout, for use when several processes should run concurrently. If the awaiting task is
+    # cancelled, e.g. because a concurrently-running process has already determined the outcome, the process (and any
+    # processes it has started) are terminated.
+    return await _default_engine.run(cmd=cmd,
+                                     timeout_seconds=timeout_seconds,
+                                     env=env,
+                                     cwd=cwd,
+                                     cpu_timeout_seconds=cpu_timeout_seconds)
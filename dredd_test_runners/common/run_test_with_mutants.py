@@ -1,14 +1,16 @@
 from enum import Enum
 import os
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, List, Optional
 
 from dredd_test_runners.common.constants import (MIN_TIMEOUT_FOR_MUTANT_COMPILATION,
                                                  MIN_TIMEOUT_FOR_MUTANT_EXECUTION,
                                                  TIMEOUT_MULTIPLIER_FOR_MUTANT_COMPILATION,
                                                  TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION)
-from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.common.execution_result_cache import ExecutionResultCache, get_execution_result_cache
+from dredd_test_runners.common.hash_file import file_matches_hash, files_identical, hash_file
 from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+from dredd_test_runners.common.timeout_calibration import mutant_timeout, wall_clock_timeout
 
 
 class KillStatus(Enum):
@@ -22,6 +24,45 @@ class KillStatus(Enum):
     KILL_DIFFERENT_STDERR = 8
 
 
+class TranslationUnit:
+    # A source file of a multi-file test, which is compiled separately: 'object_non_mutated' is the result of compiling
+    # it without mutation, and 'covered_mutants' are the mutants reached while compiling it. A mutant can only affect
+    # the object files of the translation units that cover it, so the others can be reused from the unmutated build.
+    def __init__(self, source: str, object_non_mutated: str, covered_mutants: FrozenSet[int]):
+        self.source: str = source
+        self.object_non_mutated: str = object_non_mutated
+        self.covered_mutants: FrozenSet[int] = covered_mutants
+
+
+class MutantTestConfiguration:
+    # Everything that is needed, beyond the mutants themselves, to evaluate mutants against a test. This is sent to
+    # worker processes along with each group of mutants, so it should be kept small. 'compile_time' and 'run_time' are
+    # the CPU times taken to compile and run the test without mutation, as calibrated by timeout_calibration.py.
+    def __init__(self,
+                 compiler_path: str,
+                 compiler_args: List[str],
+                 compile_time: float,
+                 run_time: float,
+                 binary_hash_non_mutated: str,
+                 execution_result_non_mutated: ProcessResult,
+                 translation_units: Optional[List[TranslationUnit]] = None,
+                 execution_cache_dir: Optional[str] = None,
+                 binary_path_non_mutated: Optional[str] = None):
+        self.compiler_path: str = compiler_path
+        self.compiler_args: List[str] = compiler_args
+        self.compile_time: float = compile_time
+        self.run_time: float = run_time
+        self.binary_hash_non_mutated: str = binary_hash_non_mutated
+        self.execution_result_non_mutated: ProcessResult = execution_result_non_mutated
+        self.translation_units: Optional[List[TranslationUnit]] = translation_units
+        # If given, the verdicts for mutant executables that differ from the non-mutated executable are cached here, by
+        # executable hash (see execution_result_cache.py).
+        self.execution_cache_dir: Optional[str] = execution_cache_dir
+        # If given, the non-mutated executable, which mutant executables are compared against directly rather than by
+        # hash. It must remain in place while mutants are evaluated.
+        self.binary_path_non_mutated: Optional[str] = binary_path_non_mutated
+
+
 def run_test_with_mutants(mutants: List[int],
                           compiler_path: str,
                           compiler_args: List[str],
@@ -29,41 +70,107 @@ def run_test_with_mutants(mutants: List[int],
                           run_time: float,
                           binary_hash_non_mutated: str,
                           execution_result_non_mutated: ProcessResult,
-                          mutant_exe_path: Path) -> KillStatus:
+                          mutant_exe_path: Path,
+                          translation_units: Optional[List[TranslationUnit]] = None,
+                          execution_cache_dir: Optional[str] = None,
+                          binary_path_non_mutated: Optional[str] = None) -> KillStatus:
+    # If 'translation_units' is given, 'compiler_args' are the flags common to compiling and linking every translation
+    # unit. Only the translation units that cover one of the mutants are recompiled; the unmutated objects of the
+    # others are linked in. Linking is always done with the mutants enabled, since the mutants may affect the compiler
+    # driver.
     mutated_environment = os.environ.copy()
     mutated_environment["DREDD_ENABLED_MUTATION"] = ','.join([str(m) for m in mutants])
     if mutant_exe_path.exists():
         os.remove(mutant_exe_path)
-    mutated_cmd = [compiler_path] + compiler_args + ['-o', str(mutant_exe_path)]
-    mutated_result: ProcessResult = run_process_with_timeout(
-        cmd=mutated_cmd,
-        timeout_seconds=int(max(
-            MIN_TIMEOUT_FOR_MUTANT_COMPILATION,
-            TIMEOUT_MULTIPLIER_FOR_MUTANT_COMPILATION * compile_time)),
-        env=mutated_environment)
-    if mutated_result is None:
-        return KillStatus.KILL_COMPILER_TIMEOUT
-
-    if mutated_result.returncode != 0:
-        return KillStatus.KILL_COMPILER_CRASH
-
-    if binary_hash_non_mutated == hash_file(str(mutant_exe_path)):
+    if translation_units is None:
+        mutated_cmds: List[List[str]] = [[compiler_path] + compiler_args + ['-o', str(mutant_exe_path)]]
+    else:
+        mutated_cmds: List[List[str]] = []
+        object_files: List[str] = []
+        for index, translation_unit in enumerate(translation_units):
+            if not any(mutant in translation_unit.covered_mutants for mutant in mutants):
+                object_files.append(translation_unit.object_non_mutated)
+                continue
+            mutated_object_file: str = str(mutant_exe_path.with_name(f'__mutant_{index}.o'))
+            mutated_cmds.append([compiler_path] + compiler_args + ['-c', translation_unit.source,
+                                                                   '-o', mutated_object_file])
+            object_files.append(mutated_object_file)
+        mutated_cmds.append([compiler_path] + compiler_args + object_files + ['-o', str(mutant_exe_path)])
+    compile_timeout: float = mutant_timeout(baseline=compile_time,
+                                            multiplier=TIMEOUT_MULTIPLIER_FOR_MUTANT_COMPILATION,
+                                            minimum=MIN_TIMEOUT_FOR_MUTANT_COMPILATION)
+    for mutated_cmd in mutated_cmds:
+        mutated_result: ProcessResult = run_process_with_timeout(
+            cmd=mutated_cmd,
+            timeout_seconds=wall_clock_timeout(compile_timeout),
+            env=mutated_environment,
+            cpu_timeout_seconds=compile_timeout)
+        if mutated_result is None:
+            return KillStatus.KILL_COMPILER_TIMEOUT
+
+        if mutated_result.returncode != 0:
+            return KillStatus.KILL_COMPILER_CRASH
+
+    if binary_path_non_mutated is not None:
+        binary_identical: bool = files_identical(binary_path_non_mutated, str(mutant_exe_path))
+    else:
+        binary_identical: bool = file_matches_hash(str(mutant_exe_path), binary_hash_non_mutated)
+    if binary_identical:
         return KillStatus.SURVIVED_IDENTICAL
 
+    if execution_cache_dir is None:
+        return run_mutant_executable(run_time=run_time,
+                                     execution_result_non_mutated=execution_result_non_mutated,
+                                     mutant_exe_path=mutant_exe_path)
+    # Another mutant may already have led to an identical executable, in which case there is no need to run it again.
+    execution_cache: ExecutionResultCache = get_execution_result_cache(Path(execution_cache_dir))
+    binary_hash_mutated: str = hash_file(str(mutant_exe_path))
+    cached_kill_status: Optional[str] = execution_cache.lookup(binary_hash_mutated)
+    if cached_kill_status is not None:
+        return KillStatus[cached_kill_status]
+    kill_status: KillStatus = run_mutant_executable(run_time=run_time,
+                                                    execution_result_non_mutated=execution_result_non_mutated,
+                                                    mutant_exe_path=mutant_exe_path)
+    execution_cache.record(binary_hash_mutated, kill_status.name)
+    return kill_status
+
+
+def run_mutant_executable(run_time: float,
+                          execution_result_non_mutated: ProcessResult,
+                          mutant_exe_path: Path) -> KillStatus:
+    run_timeout: float = mutant_timeout(baseline=run_time,
+                                        multiplier=TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION,
+                                        minimum=MIN_TIMEOUT_FOR_MUTANT_EXECUTION)
     mutated_execution_result: ProcessResult = run_process_with_timeout(
         cmd=[str(mutant_exe_path)],
-        timeout_seconds=int(max(MIN_TIMEOUT_FOR_MUTANT_EXECUTION,
-                                TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION * run_time)))
+        timeout_seconds=wall_clock_timeout(run_timeout),
+        cpu_timeout_seconds=run_timeout)
     if mutated_execution_result is None:
         return KillStatus.KILL_RUNTIME_TIMEOUT
 
     if execution_result_non_mutated.returncode != mutated_execution_result.returncode:
         return KillStatus.KILL_DIFFERENT_EXIT_CODES
 
-    if execution_result_non_mutated.stdout != mutated_execution_result.stdout:
+    if not execution_result_non_mutated.same_stdout(mutated_execution_result):
         return KillStatus.KILL_DIFFERENT_STDOUT
 
-    if execution_result_non_mutated.stderr != mutated_execution_result.stderr:
+    if not execution_result_non_mutated.same_stderr(mutated_execution_result):
         return KillStatus.KILL_DIFFERENT_STDERR
 
     return KillStatus.SURVIVED_BINARY_DIFFERENCE
+
+
+def run_test_with_mutants_using_configuration(mutants: List[int],
+                                              configuration: MutantTestConfiguration,
+                                              mutant_exe_path: Path) -> KillStatus:
+    return run_test_with_mutants(mutants=mutants,
+                                 compiler_path=configuration.compiler_path,
+                                 compiler_args=configuration.compiler_args,
+                                 compile_time=configuration.compile_time,
+                                 run_time=configuration.run_time,
+                                 binary_hash_non_mutated=configuration.binary_hash_non_mutated,
+                                 execution_result_non_mutated=configuration.execution_result_non_mutated,
+                                 mutant_exe_path=mutant_exe_path,
+                                 translation_units=configuration.translation_units,
+                                 execution_cache_dir=configuration.execution_cache_dir,
+                                 binary_path_non_mutated=configuration.binary_path_non_mutated)
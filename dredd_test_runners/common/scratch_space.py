@@ -0,0 +1,167 @@
+import atexit
+import os
+import re
+import shutil
+import signal
+import tempfile
+
+from pathlib import Path
+from typing import Optional
+
+# The default RAM-backed location for scratch space, used if it exists.
+DEFAULT_RAM_DIR: Path = Path("/dev/shm")
+
+# The default number of megabytes of RAM-backed scratch space that a runner may use.
+DEFAULT_RAM_BUDGET_MB: int = 1024
+
+# Scratch space roots are named after the process that owns them, so that roots left behind by a process that was
+# killed outright (e.g. with SIGKILL, or by the OOM killer) can be recognised and removed by a later run.
+_ROOT_PREFIX: str = "dredd-scratch-"
+_ROOT_PATTERN = re.compile(re.escape(_ROOT_PREFIX) + r"(\d+)-")
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, but belongs to another user.
+        return True
+    return True
+
+
+def _remove_stale_roots(parent_dir: Path) -> None:
+    try:
+        entries = list(parent_dir.iterdir())
+    except OSError:
+        return
+    for entry in entries:
+        match = _ROOT_PATTERN.match(entry.name)
+        if match is not None and not _process_exists(int(match.group(1))):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def _disk_usage(directory: Path) -> int:
+    # The number of bytes occupied by the files under 'directory', which other processes may be modifying.
+    total: int = 0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class ScratchSpace:
+    # Provides directories for short-lived build artifacts, such as mutant executables, which are written and deleted
+    # thousands of times per hour. Directories are placed on a RAM-backed file system (by default /dev/shm) for as long
+    # as the scratch space used there is within a budget, and on disk (under the system's temporary directory)
+    # otherwise, or if no RAM-backed file system is available.
+    #
+    # A scratch space is owned by the process that creates it, and is removed when it is shut down, when that process
+    # exits, or when the process is terminated with SIGTERM. Roots left behind by a process that could not clean up are
+    # removed the next time a scratch space is created. Scratch spaces can be sent to worker processes, which may
+    # allocate directories but never remove the scratch space.
+    def __init__(self, ram_dir: Optional[Path] = None, ram_budget_mb: int = DEFAULT_RAM_BUDGET_MB):
+        if ram_dir is None and DEFAULT_RAM_DIR.is_dir() and os.access(DEFAULT_RAM_DIR, os.W_OK):
+            ram_dir = DEFAULT_RAM_DIR
+        self.ram_budget: int = ram_budget_mb * 1024 * 1024
+        self.owner_pid: int = os.getpid()
+        disk_dir: Path = Path(tempfile.gettempdir())
+        _remove_stale_roots(disk_dir)
+        self.disk_root: Path = Path(tempfile.mkdtemp(prefix=f"{_ROOT_PREFIX}{self.owner_pid}-", dir=disk_dir))
+        self.ram_root: Optional[Path] = None
+        if ram_dir is not None and self.ram_budget > 0:
+            _remove_stale_roots(ram_dir)
+            self.ram_root = Path(tempfile.mkdtemp(prefix=f"{_ROOT_PREFIX}{self.owner_pid}-", dir=ram_dir))
+        self._previous_sigterm_handler = None
+        atexit.register(self.cleanup)
+        # Turn SIGTERM into an orderly exit, so that scratch space is removed when a runner is terminated. This is only
+        # done if SIGTERM has not been given a handler already.
+        if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            self._previous_sigterm_handler = signal.SIG_DFL
+            signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    def __enter__(self) -> 'ScratchSpace':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cleanup()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_previous_sigterm_handler'] = None
+        return state
+
+    def within_ram_budget(self) -> bool:
+        return self.ram_root is not None and _disk_usage(self.ram_root) < self.ram_budget
+
+    def allocate(self, prefix: str) -> Path:
+        # Creates a new, empty directory, preferring RAM-backed space. The caller may remove the directory when it is no
+        # longer needed; otherwise it is removed along with the scratch space.
+        if self.within_ram_budget():
+            try:
+                return Path(tempfile.mkdtemp(prefix=prefix, dir=self.ram_root))
+            except OSError:
+                # E.g. the RAM-backed file system is full.
+                pass
+        return Path(tempfile.mkdtemp(prefix=prefix, dir=self.disk_root))
+
+    def build_directory(self, prefix: str) -> 'BuildDirectory':
+        return BuildDirectory(self, prefix)
+
+    def cleanup(self) -> None:
+        if os.getpid() != self.owner_pid:
+            return
+        if self.ram_root is not None:
+            shutil.rmtree(self.ram_root, ignore_errors=True)
+        shutil.rmtree(self.disk_root, ignore_errors=True)
+        if self._previous_sigterm_handler is not None and signal.getsignal(signal.SIGTERM) == _exit_on_sigterm:
+            signal.signal(signal.SIGTERM, self._previous_sigterm_handler)
+            self._previous_sigterm_handler = None
+
+
+class BuildDirectory:
+    # A directory that is used for one build after another, such as the directory in which a worker builds mutant
+    # executables. Since the artifacts of a build can be much larger than those of earlier builds, the RAM budget is
+    # checked before every build rather than once: a build that would exceed it is placed on disk, and RAM-backed space
+    # is used again once usage falls below the budget. The budget can be overshot by the artifacts of the builds in
+    # flight when it is checked, so it should leave some headroom.
+    def __init__(self, scratch_space: ScratchSpace, prefix: str):
+        self.scratch_space: ScratchSpace = scratch_space
+        self.prefix: str = prefix
+        self.ram_dir: Optional[Path] = None
+        self.disk_dir: Optional[Path] = None
+
+    def for_build(self) -> Path:
+        # Returns the directory in which to place the artifacts of the next build. Artifacts of earlier builds are
+        # removed when the build moves to other space, so that they no longer count against the budget, and should not
+        # be relied upon.
+        if self.scratch_space.within_ram_budget():
+            if self.ram_dir is None:
+                try:
+                    self.ram_dir = Path(tempfile.mkdtemp(prefix=self.prefix, dir=self.scratch_space.ram_root))
+                except OSError:
+                    # E.g. the RAM-backed file system is full.
+                    pass
+            if self.ram_dir is not None:
+                self.disk_dir = _remove(self.disk_dir)
+                return self.ram_dir
+        self.ram_dir = _remove(self.ram_dir)
+        if self.disk_dir is None:
+            self.disk_dir = Path(tempfile.mkdtemp(prefix=self.prefix, dir=self.scratch_space.disk_root))
+        return self.disk_dir
+
+
+def _remove(directory: Optional[Path]) -> None:
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+    return None
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    # Worker processes inherit this handler; they have no scratch space of their own to remove, and exiting in the same
+    # way is harmless.
+    raise SystemExit(128 + signum)
@@ -0,0 +1,88 @@
+import hashlib
+import heapq
+import json
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from dredd_test_runners.common.timeout_calibration import TimingHistory
+
+# Splitting the tests of a suite between workers (e.g. one per machine) so that each worker gets a disjoint slice of
+# the tests. Workers arrive at the same split without talking to each other, so a worker never has to compete with the
+# others to claim tests.
+#
+# - "hash" assigns each test according to a hash of its name, so a test stays in the same shard even if tests are
+#   added to or removed from the suite, or if workers see slightly different sets of tests.
+# - "duration" balances the shards by the time that the tests are expected to take, based on the durations recorded in
+#   the timing history (see TimingHistory). Tests are assigned in decreasing order of expected duration, each to the
+#   shard with the least total so far (the longest-processing-time-first heuristic), which gives shards whose totals
+#   are within a small factor of the optimum. Tests with no recorded duration are assumed to take the median of the
+#   recorded durations. Since the timing history grows as tests are evaluated (and may differ between machines), a
+#   worker that starts later would see different durations from one that started earlier, and compute a different
+#   split. The first worker to compute the split for a given set of tests and number of shards therefore records it as
+#   a plan in the result store (see ResultStore.record_shard_plan), and the other workers use that plan; workers must
+#   therefore share a result store.
+
+SHARDING_STRATEGIES: List[str] = ["hash", "duration"]
+
+
+def _stable_hash(name: str) -> int:
+    # Python's built-in hash of a string differs between processes, so a digest is used instead.
+    return int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'little')
+
+
+def shard_by_hash(test_names: List[str], shard_index: int, shard_count: int) -> Set[str]:
+    return {name for name in test_names if _stable_hash(name) % shard_count == shard_index}
+
+
+def plan_by_cost(test_names: List[str], costs: Dict[str, float], shard_count: int) -> Dict[str, int]:
+    # Maps each test to the index of its shard.
+    known_costs: List[float] = sorted(costs[name] for name in test_names if name in costs)
+    default_cost: float = known_costs[len(known_costs) // 2] if known_costs else 1.0
+    # Ties are broken by name, and shards of equal total by index, so that every worker computes the same assignment.
+    ordered: List[Tuple[float, str]] = sorted(((-costs.get(name, default_cost), name) for name in set(test_names)))
+    shard_totals: List[Tuple[float, int]] = [(0.0, index) for index in range(shard_count)]
+    plan: Dict[str, int] = {}
+    for negated_cost, name in ordered:
+        total, index = heapq.heappop(shard_totals)
+        plan[name] = index
+        heapq.heappush(shard_totals, (total - negated_cost, index))
+    return plan
+
+
+def _plan_by_duration(test_names: List[str], shard_count: int, timing_history_dir: Optional[Path]) -> Dict[str, int]:
+    costs: Dict[str, float] = {}
+    if timing_history_dir is not None:
+        timing_history: TimingHistory = TimingHistory(timing_history_dir)
+        for name in test_names:
+            duration: Optional[float] = timing_history.recorded_duration(name)
+            if duration is not None:
+                costs[name] = duration
+    return plan_by_cost(test_names=test_names, costs=costs, shard_count=shard_count)
+
+
+def shard_plan_key(test_names: List[str], shard_count: int) -> str:
+    # Plans are identified by a hash of the tests and the number of shards.
+    return hashlib.sha256(json.dumps([shard_count, sorted(set(test_names))]).encode('utf-8')).hexdigest()
+
+
+def select_shard(test_names: List[str],
+                 shard_index: int,
+                 shard_count: int,
+                 strategy: str,
+                 timing_history_dir: Optional[Path] = None,
+                 record_plan: Optional[Callable[[str, Dict[str, int]], Dict[str, int]]] = None) -> Set[str]:
+    # Returns the names of the tests that belong to the given shard. With the "duration" strategy, the split is only
+    # shared with other workers if 'record_plan' is given (see ResultStore.record_shard_plan).
+    assert 0 <= shard_index < shard_count
+    assert strategy in SHARDING_STRATEGIES
+    if shard_count == 1:
+        return set(test_names)
+    if strategy == "hash":
+        return shard_by_hash(test_names=test_names, shard_index=shard_index, shard_count=shard_count)
+    plan: Dict[str, int] = _plan_by_duration(test_names=test_names,
+                                             shard_count=shard_count,
+                                             timing_history_dir=timing_history_dir)
+    if record_plan is not None:
+        plan = record_plan(shard_plan_key(test_names=test_names, shard_count=shard_count), plan)
+    return {name for name, index in plan.items() if index == shard_index}
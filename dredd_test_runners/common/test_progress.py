@@ -0,0 +1,111 @@
+import threading
+
+from typing import Callable, Dict, List, Optional, Set
+
+from dredd_test_runners.common.constants import HEARTBEAT_INTERVAL, MUTANT_LEASE_DURATION
+from dredd_test_runners.common.result_store import ResultStore
+
+
+class TestProgress:
+    # Keeps a worker's claim on the test it is evaluating alive, and checkpoints the worker's progress through the test,
+    # so that if the worker stops partway through (e.g. because it ran on a preemptible machine that was reclaimed),
+    # another worker can resume the test where it stopped instead of the remaining mutants going untried.
+    #
+    # A checkpoint records the mutants that the test has killed and those that survived it; mutants that were already
+    # killed by other tests need no record. A background thread records a heartbeat for the test every 'interval'
+    # seconds, together with the checkpoint if it has changed, and renews the leases of the mutants being evaluated, so
+    # that leases can be short without expiring while a mutant is still being evaluated. The thread uses a store of its
+    # own, opened by 'open_store' (see LiveKillSet).
+    def __init__(self,
+                 open_store: Callable[[], ResultStore],
+                 interval: float = HEARTBEAT_INTERVAL):
+        assert interval > 0
+        self.interval: float = interval
+        self.result_store: ResultStore = open_store()
+        # All state is guarded by this condition, which is notified when a heartbeat is requested or has been recorded.
+        self.condition: threading.Condition = threading.Condition()
+        self.test_name: Optional[str] = None
+        self.killed: List[int] = []
+        self.survived: List[int] = []
+        self.checkpoint_changed: bool = False
+        self.leased: Set[int] = set()
+        self.heartbeats_requested: int = 0
+        self.heartbeats_recorded: int = 0
+        self.stopped: bool = False
+        self.thread: threading.Thread = threading.Thread(target=self._heartbeat_periodically, daemon=True)
+        self.thread.start()
+
+    def __enter__(self) -> 'TestProgress':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _heartbeat_periodically(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopped or self.heartbeats_requested > self.heartbeats_recorded,
+                                        timeout=self.interval)
+                if self.stopped:
+                    return
+                heartbeats_requested: int = self.heartbeats_requested
+                test_name: Optional[str] = self.test_name
+                checkpoint: Optional[Dict] = None
+                if self.checkpoint_changed:
+                    checkpoint = {"killed_mutants": sorted(self.killed), "survived_mutants": sorted(self.survived)}
+                    self.checkpoint_changed = False
+                leased: List[int] = sorted(self.leased)
+            try:
+                if test_name is not None:
+                    self.result_store.heartbeat_test(test_name, checkpoint)
+                if leased:
+                    self.result_store.lease_mutants(mutants=leased, duration=MUTANT_LEASE_DURATION)
+            except Exception as error:
+                # E.g. a transient network file system error: the next heartbeat will try again.
+                print(f"Warning: failed to record a heartbeat: {error}")
+                if checkpoint is not None:
+                    with self.condition:
+                        self.checkpoint_changed = True
+            with self.condition:
+                self.heartbeats_recorded = heartbeats_requested
+                self.condition.notify_all()
+
+    def start_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        # Starts tracking the progress of a test that this worker has claimed, from the given checkpoint if the test is
+        # being resumed.
+        with self.condition:
+            self.test_name = test_name
+            self.killed = list(checkpoint.get("killed_mutants", [])) if checkpoint is not None else []
+            self.survived = list(checkpoint.get("survived_mutants", [])) if checkpoint is not None else []
+            self.checkpoint_changed = False
+            self.leased = set()
+
+    def hold(self, mutants: List[int]) -> None:
+        # Notes that the given mutants have been leased to this worker, so that their leases are renewed until they are
+        # decided.
+        with self.condition:
+            self.leased.update(mutants)
+
+    def record(self, mutant: int, killed: bool) -> None:
+        with self.condition:
+            self.leased.discard(mutant)
+            (self.killed if killed else self.survived).append(mutant)
+            self.checkpoint_changed = True
+
+    def finish_test(self) -> None:
+        # Records a final checkpoint for the test, so that a test that was terminated early can be resumed from exactly
+        # where it stopped, and stops tracking it.
+        with self.condition:
+            self.heartbeats_requested += 1
+            heartbeat: int = self.heartbeats_requested
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: self.heartbeats_recorded >= heartbeat)
+            self.test_name = None
+            self.leased = set()
+
+    def close(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.result_store.close()
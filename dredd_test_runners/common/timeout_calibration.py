@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import tempfile
+
+from pathlib import Path
+from typing import AnyStr, Dict, List, Optional
+
+from dredd_test_runners.common.constants import (DEFAULT_CALIBRATION_RUNS,
+                                                 DEFAULT_TIMEOUT_QUANTILE,
+                                                 WALL_CLOCK_TIMEOUT_MULTIPLIER)
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+
+# The number of most recent samples of each kind that are kept in the history of a test.
+MAX_HISTORY_SAMPLES: int = 32
+
+
+def quantile(samples: List[float], q: float) -> float:
+    # The q-quantile of the samples, interpolating linearly between the closest ranks.
+    assert len(samples) > 0
+    assert 0.0 <= q <= 1.0
+    ordered: List[float] = sorted(samples)
+    position: float = q * (len(ordered) - 1)
+    lower: int = math.floor(position)
+    upper: int = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def mutant_timeout(baseline: float, multiplier: float, minimum: float) -> float:
+    # The CPU time allowed to a mutated version of a step that takes 'baseline' seconds of CPU time without mutation.
+    return max(minimum, multiplier * baseline)
+
+
+def wall_clock_timeout(cpu_timeout: float) -> float:
+    return WALL_CLOCK_TIMEOUT_MULTIPLIER * cpu_timeout
+
+
+class TimingHistory:
+    # Records the CPU times observed for each step (e.g. "compile" or "run") of each test, in a JSON file per test under
+    # 'history_dir', so that timeouts for a test that is evaluated again (e.g. against a rebuilt compiler, or when a
+    # campaign is continued) are based on every measurement taken so far, rather than on a single run that may have
+    # coincided with a burst of load. Only the most recent samples of each kind are kept.
+    def __init__(self, history_dir: Path):
+        self.history_dir: Path = history_dir
+
+    def _history_path(self, test_name: str) -> Path:
+        return self.history_dir / f"{test_name}.json"
+
+    def _load(self, test_name: str) -> Dict[str, List[float]]:
+        try:
+            with open(self._history_path(test_name), 'r') as infile:
+                return json.load(infile)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def record(self, test_name: str, kind: str, new_samples: List[float]) -> List[float]:
+        # Adds the given samples to the history, returning the samples of this kind that are now recorded. The history
+        # is replaced atomically, so that a reader never observes a partially-written file; if two processes record
+        # samples for the same test concurrently, the samples of one of them may be lost, which is harmless.
+        history: Dict[str, List[float]] = self._load(test_name)
+        history[kind] = (history.get(kind, []) + new_samples)[-MAX_HISTORY_SAMPLES:]
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(prefix='.' + test_name, dir=self.history_dir)
+        with os.fdopen(temp_fd, 'w') as outfile:
+            json.dump(history, outfile)
+        os.replace(temp_path, self._history_path(test_name))
+        return history[kind]
+
+    def recorded_duration(self, test_name: str) -> Optional[float]:
+        # The typical CPU time taken by all the recorded steps of the test together, or None if nothing is recorded.
+        history: Dict[str, List[float]] = self._load(test_name)
+        if not any(history.values()):
+            return None
+        return sum(quantile(samples, 0.5) for samples in history.values() if samples)
+
+
+class TimeoutCalibration:
+    # Determines the CPU time that a step of a test (such as compiling it, or running the resulting executable) takes
+    # without mutation, as a basis for the timeouts used when the step is performed with mutants enabled. The step is
+    # measured 'runs' times, in CPU time rather than wall-clock time so that measurements are not inflated by other
+    # work on the machine, and the given quantile of the measurements (together with those previously recorded for the
+    # test, if there is a history) is used. Instances are sent to generator worker processes, so they only hold plain
+    # data.
+    def __init__(self,
+                 runs: int = DEFAULT_CALIBRATION_RUNS,
+                 timeout_quantile: float = DEFAULT_TIMEOUT_QUANTILE,
+                 history_dir: Optional[Path] = None):
+        assert runs >= 1
+        self.runs: int = runs
+        self.timeout_quantile: float = timeout_quantile
+        self.history_dir: Optional[Path] = history_dir
+
+    def calibrate(self,
+                  test_name: str,
+                  kind: str,
+                  cmds: List[List[str]],
+                  first_sample: float,
+                  timeout_seconds: float,
+                  env: Optional[Dict[AnyStr, AnyStr]] = None,
+                  cwd: Path = None) -> Optional[float]:
+        # 'cmds' are the commands that make up the step, which the caller has already performed once, taking
+        # 'first_sample' seconds of CPU time; the commands must be safe to repeat. Returns None if a repetition of the
+        # step does not complete within 'timeout_seconds', in which case the step is too unreliable to base timeouts on.
+        samples: List[float] = [first_sample]
+        for _ in range(self.runs - 1):
+            sample: float = 0.0
+            for cmd in cmds:
+                result: Optional[ProcessResult] = run_process_with_timeout(cmd=cmd,
+                                                                           timeout_seconds=timeout_seconds,
+                                                                           env=env,
+                                                                           cwd=cwd)
+                if result is None:
+                    return None
+                sample += result.cpu_time
+            samples.append(sample)
+        return self.baseline_from_samples(test_name=test_name, kind=kind, samples=samples)
+
+    def baseline_from_samples(self, test_name: str, kind: str, samples: List[float]) -> float:
+        # For a step that the caller has measured itself, 'runs' times: records the measurements, and returns the
+        # baseline on which timeouts should be based.
+        if self.history_dir is not None:
+            samples = TimingHistory(self.history_dir).record(test_name=test_name, kind=kind, new_samples=samples)
+        return quantile(samples, self.timeout_quantile)
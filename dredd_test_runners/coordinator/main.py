@@ -0,0 +1,216 @@
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class Coordinator:
+    # Serialises the decisions that workers would otherwise make by racing to create files in a shared work directory:
+    # which seeds and tests each worker takes on (including which worker resumes an abandoned test), which mutants have
+    # been killed, and which mutants are currently being evaluated (leased) by which worker. Results are recorded in an
+    # ordinary result store on the coordinator's machine.
+    #
+    # Kills are kept in a log, in the order in which they were recorded, so that a worker can ask for the kills since
+    # the last position it has seen. Such a request is held until there is a new kill (or until it has waited for a
+    # given time), so that kills are broadcast to all workers as soon as they are recorded.
+    def __init__(self, result_store: ResultStore, seed: Optional[int] = None):
+        self.result_store: ResultStore = result_store
+        # All state, including the result store, is guarded by this condition, which is notified when a kill is
+        # recorded.
+        self.condition: threading.Condition = threading.Condition()
+        self.random: random.Random = random.Random(seed)
+        self.issued_seeds: Set[int] = set()
+        self.kill_log: List[int] = sorted(result_store.killed_mutants())
+        self.killed: Set[int] = set(self.kill_log)
+        # The worker to which each leased mutant is leased, and when the lease expires.
+        self.leases: Dict[int, Tuple[str, float]] = {}
+
+    def next_seed(self) -> int:
+        with self.condition:
+            while True:
+                seed: int = self.random.randint(0, 2 ** 32 - 1)
+                if seed not in self.issued_seeds:
+                    self.issued_seeds.add(seed)
+                    return seed
+
+    def claim_test(self, test_name: str) -> bool:
+        with self.condition:
+            return self.result_store.claim_test(test_name)
+
+    def record_kill(self, worker: str, mutant: int, kill_info: Dict) -> bool:
+        with self.condition:
+            self._release(worker, [mutant])
+            if not self.result_store.record_kill(mutant, kill_info):
+                return False
+            self.kill_log.append(mutant)
+            self.killed.add(mutant)
+            self.condition.notify_all()
+            return True
+
+    def kills_since(self, position: int, wait: float) -> Dict:
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.kill_log) > position, timeout=wait)
+            return {"kills": self.kill_log[position:], "position": len(self.kill_log)}
+
+    def kill_info(self, mutant: int) -> Optional[Dict]:
+        with self.condition:
+            return self.result_store.kill_info(mutant)
+
+    def record_test_summary(self, test_name: str, kill_summary: Dict) -> None:
+        with self.condition:
+            self.result_store.record_test_summary(test_name, kill_summary)
+
+    def test_summaries(self) -> List[Tuple[str, Dict]]:
+        with self.condition:
+            return list(self.result_store.test_summaries())
+
+    def lease_mutants(self, worker: str, mutants: List[int], duration: float) -> List[int]:
+        # Leases each of the given mutants that is not killed and not leased to another worker (a worker may renew its
+        # own leases). Leases expire, so that the mutants of a worker that has died become available again.
+        now: float = time.time()
+        leased: List[int] = []
+        with self.condition:
+            for mutant in mutants:
+                if mutant in self.killed:
+                    continue
+                lease: Optional[Tuple[str, float]] = self.leases.get(mutant)
+                if lease is not None and lease[0] != worker and lease[1] > now:
+                    continue
+                self.leases[mutant] = (worker, now + duration)
+                leased.append(mutant)
+        return leased
+
+    def release_mutants(self, worker: str, mutants: List[int]) -> None:
+        with self.condition:
+            self._release(worker, mutants)
+
+    def heartbeat_test(self, test_name: str, checkpoint: Optional[Dict] = None) -> None:
+        with self.condition:
+            self.result_store.heartbeat_test(test_name, checkpoint)
+
+    def test_checkpoint(self, test_name: str) -> Optional[Dict]:
+        with self.condition:
+            return self.result_store.test_checkpoint(test_name)
+
+    def resumable_tests(self, stale_after: float) -> List[str]:
+        with self.condition:
+            return self.result_store.resumable_tests(stale_after)
+
+    def reclaim_test(self, test_name: str, stale_after: float) -> bool:
+        with self.condition:
+            return self.result_store.reclaim_test(test_name, stale_after)
+
+    def record_shard_plan(self, plan_key: str, plan: Dict[str, int]) -> Dict[str, int]:
+        with self.condition:
+            return self.result_store.record_shard_plan(plan_key, plan)
+
+    def _release(self, worker: str, mutants: List[int]) -> None:
+        for mutant in mutants:
+            lease: Optional[Tuple[str, float]] = self.leases.get(mutant)
+            if lease is not None and lease[0] == worker:
+                del self.leases[mutant]
+
+
+# The coordinator methods that workers may call.
+REQUEST_METHODS: Set[str] = {"next_seed", "claim_test", "record_kill", "kills_since", "kill_info",
+                             "record_test_summary", "test_summaries", "lease_mutants", "release_mutants",
+                             "heartbeat_test", "test_checkpoint", "resumable_tests", "reclaim_test",
+                             "record_shard_plan"}
+
+
+class CoordinatorRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Each request is a POST to '/<method>', with the method's arguments as a JSON object; the response is a JSON object
+    # holding either the method's result, or an error. HTTP/1.1 is used so that workers can keep their connections open.
+    protocol_version = "HTTP/1.1"
+    # Responses are written as headers followed by a body; with Nagle's algorithm, the body would wait for the worker
+    # to acknowledge the headers, which it may delay.
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        method: str = self.path.lstrip("/")
+        if method not in REQUEST_METHODS:
+            self._respond(404, {"error": f"Unknown method {method}"})
+            return
+        try:
+            arguments: Dict = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            result = getattr(self.server.coordinator, method)(**arguments)
+        except (TypeError, ValueError, KeyError) as error:
+            self._respond(400, {"error": f"{type(error).__name__}: {error}"})
+            return
+        except Exception as error:
+            # E.g. the result store could not be written to. The worker is told, rather than having its connection
+            # dropped, so that it does not mistake the failure for a network problem and repeat the request.
+            print(f"Request {method} failed: {type(error).__name__}: {error}")
+            self._respond(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+        self._respond(200, {"result": result})
+
+    def _respond(self, status: int, body: Dict) -> None:
+        encoded: bytes = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args) -> None:
+        # With many workers, logging every request would swamp the output.
+        pass
+
+
+class CoordinatorServer(http.server.ThreadingHTTPServer):
+    # Each connection is handled by its own thread, so that requests held while waiting for kills do not block other
+    # requests.
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], coordinator: Coordinator):
+        super().__init__(address, CoordinatorRequestHandler)
+        self.coordinator: Coordinator = coordinator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host",
+                        default="127.0.0.1",
+                        help="Address on which to listen for workers. Use 0.0.0.0 to accept workers on other "
+                             "machines.")
+    parser.add_argument("--port",
+                        default=8130,
+                        help="Port on which to listen for workers.",
+                        type=int)
+    parser.add_argument("--work_dir",
+                        default=Path("work"),
+                        help="Directory in which to record results.",
+                        type=Path)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which to record results. If omitted, results are recorded as "
+                             "files under the work directory.",
+                        type=Path)
+    parser.add_argument("--seed",
+                        help="Seed for the random number generator from which program seeds are drawn.",
+                        type=int)
+    args = parser.parse_args()
+
+    result_store: ResultStore = open_result_store(work_dir=args.work_dir, result_database=args.result_database)
+    coordinator: Coordinator = Coordinator(result_store=result_store, seed=args.seed)
+    server: CoordinatorServer = CoordinatorServer((args.host, args.port), coordinator)
+    print(f"Coordinator listening on http://{server.server_address[0]}:{server.server_address[1]} "
+          f"({len(coordinator.kill_log)} mutants already killed)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        result_store.close()
+
+
+if __name__ == '__main__':
+    main()
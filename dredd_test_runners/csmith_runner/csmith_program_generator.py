@@ -0,0 +1,242 @@
+import asyncio
+import os
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.common.program_pipeline import ReadyProgram
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+from dredd_test_runners.common.run_process_with_timeout import (ProcessResult,
+                                                                run_process_with_timeout,
+                                                                run_process_with_timeout_async)
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
+from dredd_test_runners.csmith_runner.prepare_csmith_program import prepare_csmith_program
+
+
+# The sanitizers with which a generated program is vetted: a name for the sanitized executable, a description used
+# when reporting problems, and the compiler flags that enable the sanitizer(s).
+SANITIZERS: List[Tuple[str, str, List[str]]] = [
+    ("asan_ubsan", "asan/ubsan", ["-fsanitize=address,undefined", "-fno-sanitize-recover=undefined"]),
+    ("msan", "msan", ["-fsanitize=memory"]),
+]
+
+
+# The result store used by generators in this process. It is opened on first use, rather than being sent with the
+# generator, since a store (e.g. a database connection) cannot be shared between processes.
+_result_store: Optional[ResultStore] = None
+_result_store_pid: Optional[int] = None
+
+
+def _get_result_store(work_dir: Path, result_database: Optional[Path], coordinator: Optional[str]) -> ResultStore:
+    global _result_store, _result_store_pid
+    if _result_store is None or _result_store_pid != os.getpid():
+        _result_store = open_result_store(work_dir=work_dir, result_database=result_database, coordinator=coordinator)
+        _result_store_pid = os.getpid()
+    return _result_store
+
+
+async def vet_with_sanitizer(name: str,
+                             description: str,
+                             sanitizer_flags: List[str],
+                             compiler_args: List[str],
+                             program_dir: Path,
+                             compile_timeout: int,
+                             run_timeout: int) -> Optional[str]:
+    # Compiles and runs the program with a sanitizer, returning None if it ran without error, and otherwise a
+    # description of the problem.
+    sanitizer_compiled_exe: Path = program_dir / f'__{name}.exe'
+    compilation_result: Optional[ProcessResult] = await run_process_with_timeout_async(
+        cmd=["clang-15"] + compiler_args + sanitizer_flags + ["-o", str(sanitizer_compiled_exe)],
+        timeout_seconds=compile_timeout * 10)
+    if compilation_result is None:
+        return f"Compilation of generated program with {description} timed out."
+    if compilation_result.returncode != 0:
+        return f"Compilation of generated program with {description} failed."
+    execution_result: Optional[ProcessResult] = await run_process_with_timeout_async(
+        cmd=[str(sanitizer_compiled_exe)], timeout_seconds=run_timeout * 10)
+    if execution_result is None:
+        return f"Execution of generated program with {description} timed out."
+    if execution_result.returncode != 0:
+        return f"{description.capitalize()} error detected in generated program."
+    return None
+
+
+async def vet_with_sanitizers(compiler_args: List[str],
+                              program_dir: Path,
+                              compile_timeout: int,
+                              run_timeout: int) -> bool:
+    # Vets the program with all sanitizers concurrently. As soon as one sanitizer rejects the program, the processes
+    # for the others are terminated, since their outcome no longer matters.
+    vetting_tasks: List[asyncio.Task] = [
+        asyncio.create_task(vet_with_sanitizer(name=name,
+                                               description=description,
+                                               sanitizer_flags=sanitizer_flags,
+                                               compiler_args=compiler_args,
+                                               program_dir=program_dir,
+                                               compile_timeout=compile_timeout,
+                                               run_timeout=run_timeout))
+        for name, description, sanitizer_flags in SANITIZERS]
+    try:
+        for vetting_task in asyncio.as_completed(vetting_tasks):
+            problem: Optional[str] = await vetting_task
+            if problem is not None:
+                print(problem)
+                return False
+        return True
+    finally:
+        for vetting_task in vetting_tasks:
+            vetting_task.cancel()
+        await asyncio.gather(*vetting_tasks, return_exceptions=True)
+
+
+class CsmithProgramGenerator:
+    # Generates a Csmith program, compiles and runs it without mutation, determines which mutants it covers, and vets it
+    # for undefined behaviour using sanitizers. Instances are sent to generator worker processes, so they only hold
+    # plain data.
+    def __init__(self,
+                 csmith_root: Path,
+                 mutated_compiler_executable: Path,
+                 mutant_tracking_compiler_executable: Path,
+                 generator_timeout: int,
+                 compile_timeout: int,
+                 run_timeout: int,
+                 work_dir: Path,
+                 result_database: Optional[Path],
+                 timeout_calibration: TimeoutCalibration,
+                 coordinator: Optional[str] = None):
+        self.csmith_root: Path = csmith_root
+        self.mutated_compiler_executable: Path = mutated_compiler_executable
+        self.mutant_tracking_compiler_executable: Path = mutant_tracking_compiler_executable
+        self.generator_timeout: int = generator_timeout
+        self.compile_timeout: int = compile_timeout
+        self.run_timeout: int = run_timeout
+        # Used to open the result store in whichever process the generator runs, so that programs covering only killed
+        # mutants can be discarded.
+        self.work_dir: Path = work_dir
+        self.result_database: Optional[Path] = result_database
+        self.coordinator: Optional[str] = coordinator
+        self.timeout_calibration: TimeoutCalibration = timeout_calibration
+
+    def __call__(self, csmith_seed: int, program_dir: Path) -> Optional[ReadyProgram]:
+        csmith_generated_program: Path = program_dir / 'prog.c'
+        dredd_covered_mutants_path: Path = program_dir / '__dredd_covered_mutants'
+        generated_program_exe_compiled_with_no_mutants = program_dir / '__regular.exe'
+        generated_program_exe_compiled_with_mutant_tracking = program_dir / '__tracking.exe'
+
+        # Generate a Csmith program
+        csmith_cmd = [str(self.csmith_root / "build" / "src" / "csmith"), "--seed", str(csmith_seed), "-o",
+                      str(csmith_generated_program)]
+
+        if run_process_with_timeout(cmd=csmith_cmd, timeout_seconds=self.generator_timeout) is None:
+            print(f"Csmith timed out (seed {csmith_seed})")
+            return None
+
+        # Inline some immediate header files into the Csmith-generated program
+        prepare_csmith_program(original_program=csmith_generated_program,
+                               prepared_program=csmith_generated_program,
+                               csmith_root=self.csmith_root)
+
+        compiler_args: List[str] = ["-O3",
+                                    "-I",
+                                    str(self.csmith_root / "runtime"),
+                                    "-I",
+                                    str(self.csmith_root / "build" / "runtime"),
+                                    str(csmith_generated_program)]
+
+        # Compile the program without mutation.
+        regular_compile_cmd = [str(self.mutated_compiler_executable)]\
+            + compiler_args\
+            + ["-o", str(generated_program_exe_compiled_with_no_mutants)]
+
+        regular_compile_result: ProcessResult = run_process_with_timeout(cmd=regular_compile_cmd,
+                                                                         timeout_seconds=self.compile_timeout)
+
+        if regular_compile_result is None:
+            print("Compiler timeout.")
+            return None
+        if regular_compile_result.returncode != 0:
+            print("Compilation failed without mutants.")
+            print(f"stdout: {regular_compile_result.stdout.decode('utf-8')}")
+            print(f"stderr: {regular_compile_result.stderr.decode('utf-8')}")
+            return None
+
+        regular_hash = hash_file(str(generated_program_exe_compiled_with_no_mutants))
+
+        regular_execution_result: ProcessResult = run_process_with_timeout(
+            cmd=[str(generated_program_exe_compiled_with_no_mutants)], timeout_seconds=self.run_timeout)
+
+        if regular_execution_result is None:
+            print("Runtime timeout.")
+            return None
+        if regular_execution_result.returncode != 0:
+            print("Execution of generated program failed without mutants.")
+            return None
+
+        # Compile the program with the mutant tracking compiler. This is cheap compared with vetting the program using
+        # sanitizers, so it is done first, and the program is discarded if it covers no mutants that are still unkilled.
+        tracking_environment = os.environ.copy()
+        tracking_environment["DREDD_MUTANT_TRACKING_FILE"] = str(dredd_covered_mutants_path)
+        tracking_compile_cmd = [str(self.mutant_tracking_compiler_executable)]\
+            + compiler_args\
+            + ["-o", str(generated_program_exe_compiled_with_mutant_tracking)]
+        if run_process_with_timeout(cmd=tracking_compile_cmd, timeout_seconds=self.compile_timeout,
+                                    env=tracking_environment) is None:
+            print("Mutant tracking compilation timed out.")
+            return None
+
+        # Load file contents into a list. We go from list to set to list to eliminate duplicates.
+        covered_mutants: List[int] = list(set([int(line.strip()) for line in
+                                               open(dredd_covered_mutants_path, 'r').readlines()]))
+        covered_mutants.sort()
+
+        result_store: ResultStore = _get_result_store(work_dir=self.work_dir,
+                                                      result_database=self.result_database,
+                                                      coordinator=self.coordinator)
+        if all(result_store.is_mutant_killed(mutant) for mutant in covered_mutants):
+            print("Generated program does not cover any unkilled mutants.")
+            return None
+
+        # Compile and run the program with sanitizers - it should run without error. This is to guard against Csmith
+        # sometimes emitting programs that feature undefined behaviour.
+        if not asyncio.run(vet_with_sanitizers(compiler_args=compiler_args,
+                                               program_dir=program_dir,
+                                               compile_timeout=self.compile_timeout,
+                                               run_timeout=self.run_timeout)):
+            return None
+        # End of use of sanitizers on the generated program - it's looking good!
+
+        # Measure the program's compile and run times repeatedly, to calibrate the timeouts used for its mutants. This
+        # is left until the program is known to be worth evaluating. The calibration compilations use a separate
+        # output file, so that the executable that was hashed is left untouched.
+        csmith_test_name: str = "csmith_" + str(csmith_seed)
+        compile_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=csmith_test_name,
+            kind="compile",
+            cmds=[[str(self.mutated_compiler_executable)] + compiler_args
+                  + ["-o", str(program_dir / '__calibration.exe')]],
+            first_sample=regular_compile_result.cpu_time,
+            timeout_seconds=self.compile_timeout)
+        if compile_time is None:
+            print("Compiler timeout during timeout calibration.")
+            return None
+        run_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=csmith_test_name,
+            kind="run",
+            cmds=[[str(generated_program_exe_compiled_with_no_mutants)]],
+            first_sample=regular_execution_result.cpu_time,
+            timeout_seconds=self.run_timeout)
+        if run_time is None:
+            print("Runtime timeout during timeout calibration.")
+            return None
+
+        return ReadyProgram(seed=csmith_seed,
+                            program_dir=program_dir,
+                            source_files=['prog.c'],
+                            compiler_args=compiler_args,
+                            compile_time=compile_time,
+                            run_time=run_time,
+                            binary_hash_non_mutated=regular_hash,
+                            binary_path_non_mutated=str(generated_program_exe_compiled_with_no_mutants),
+                            execution_result_non_mutated=regular_execution_result,
+                            covered_mutants=covered_mutants)
@@ -0,0 +1,36 @@
+import argparse
+import sys
+
+from dredd_test_runners.common.result_store import SqliteResultStore, import_work_directory
+
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("work_dir",
+                        help="Directory containing test results recorded as files. It should have subdirectories, "
+                             "'tests' and 'killed_mutants'.",
+                        type=Path)
+    parser.add_argument("result_database",
+                        help="SQLite database into which the results should be imported. It is created if it does "
+                             "not exist; results that it already holds are kept.",
+                        type=Path)
+    args = parser.parse_args()
+    work_dir: Path = args.work_dir
+    if not work_dir.exists() or not work_dir.is_dir():
+        print(f"Error: {str(work_dir)} is not a working directory.")
+        sys.exit(1)
+    for subdirectory in ["tests", "killed_mutants"]:
+        if not (work_dir / subdirectory).is_dir():
+            print(f"Error: {str(work_dir / subdirectory)} does not exist.")
+            sys.exit(1)
+
+    store = SqliteResultStore(work_dir=work_dir, database=args.result_database)
+    num_kills, num_tests = import_work_directory(work_dir=work_dir, store=store)
+    store.close()
+    print(f"Imported {num_kills} kills and {num_tests} tests into {str(args.result_database)}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.llvm_regression_tests_runner.lit_runner import (LitProcessRunner,
+                                                                        LitResult,
+                                                                        LitRunner,
+                                                                        PersistentLitRunner)
+
+# A coverage index records, for each regression test, the mutants that the test covers, as observed by running the test
+# with the mutant-tracking build of the compiler. Entries are keyed by the path of the test in the mutant-tracking
+# tree and by a hash of the test's contents, so that a test that has changed since its coverage was collected is
+# collected again. An index should only be used with the mutant-tracking build for which it was collected; by default
+# it is named after a hash of that build's mutation info file (see default_coverage_index_path).
+#
+# Layout: a JSON object holding the format version and, for each test, its hash, the lit result code of the tracking
+# run and the sorted list of covered mutants. The covered mutants are null if the tracking run failed (e.g. because the
+# tracking build behaves differently from the mutated build), in which case the test cannot be used.
+
+FORMAT_VERSION: int = 1
+# Wall-clock time allowed for a test to run with the mutant-tracking build.
+TRACKING_TIMEOUT_SECONDS: float = 60.0
+
+
+def default_coverage_index_path(work_dir: Path, tracking_mutation_info_hash: str) -> Path:
+    return work_dir / "coverage_index" / (tracking_mutation_info_hash + ".json")
+
+
+class CoverageEntry:
+    def __init__(self, test_hash: str, code: str, covered_mutants: Optional[List[int]]):
+        self.test_hash: str = test_hash
+        self.code: str = code
+        self.covered_mutants: Optional[List[int]] = covered_mutants
+
+
+class CoverageIndex:
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self.lock: threading.Lock = threading.Lock()
+        self.entries: Dict[str, CoverageEntry] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        # Reads the index from disk, e.g. after another process has added to it. A missing index, or one in another
+        # format, is treated as empty.
+        entries: Dict[str, CoverageEntry] = {}
+        try:
+            with open(self.path, 'r') as infile:
+                index_json: Dict = json.load(infile)
+        except FileNotFoundError:
+            index_json = {}
+        if index_json.get("format_version") == FORMAT_VERSION:
+            for test, entry_json in index_json["tests"].items():
+                entries[test] = CoverageEntry(test_hash=entry_json["hash"],
+                                              code=entry_json["code"],
+                                              covered_mutants=entry_json["covered_mutants"])
+        with self.lock:
+            self.entries = entries
+
+    def save(self) -> None:
+        # The index is replaced atomically, so that a reader never observes a partially-written file.
+        with self.lock:
+            index_json: Dict = {"format_version": FORMAT_VERSION,
+                                "tests": {test: {"hash": entry.test_hash,
+                                                 "code": entry.code,
+                                                 "covered_mutants": entry.covered_mutants}
+                                          for test, entry in sorted(self.entries.items())}}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(prefix='.' + self.path.name, dir=self.path.parent)
+        with os.fdopen(temp_fd, 'w') as outfile:
+            json.dump(index_json, outfile)
+        os.replace(temp_path, self.path)
+
+    @contextmanager
+    def exclusive(self) -> Iterator['CoverageIndex']:
+        # Holds a lock on the index across processes, so that when several runners are started at once only one of
+        # them collects coverage; the others wait, and then find the coverage already collected. The index is reloaded
+        # once the lock is acquired.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.reload()
+                yield self
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def lookup(self, test: str, test_hash: str) -> Optional[CoverageEntry]:
+        # Returns the coverage of the test, or None if it has not been collected for the test's current contents.
+        with self.lock:
+            entry: Optional[CoverageEntry] = self.entries.get(test)
+        if entry is None or entry.test_hash != test_hash:
+            return None
+        return entry
+
+    def record(self, test: str, entry: CoverageEntry) -> None:
+        with self.lock:
+            self.entries[test] = entry
+
+
+def hash_tests(tests: List[str]) -> Dict[str, str]:
+    return {test: hash_file(test) for test in tests}
+
+
+def _read_covered_mutants(tracking_file: Path) -> List[int]:
+    # A test that covers no mutants leaves no tracking file. The file records a mutant each time it is covered, so
+    # duplicates are eliminated.
+    if not tracking_file.exists():
+        return []
+    with open(tracking_file, 'r') as infile:
+        covered_mutants: List[int] = sorted(set(int(line.strip()) for line in infile if line.strip()))
+    os.remove(tracking_file)
+    return covered_mutants
+
+
+def collect_coverage(coverage_index: CoverageIndex,
+                     test_hashes: Dict[str, str],
+                     mutant_tracking_llvm_lit: Path,
+                     tracking_dir: Path,
+                     jobs: int,
+                     lit_processes: bool = False) -> None:
+    # Runs every test that the index does not yet cover with the mutant-tracking build, 'jobs' tests at a time, each
+    # test writing the mutants it covers to a tracking file of its own, and records the results in the index. Each
+    # thread runs its tests in a persistent lit worker of its own (or, if 'lit_processes' is set, in fresh llvm-lit
+    # processes). The index is saved on completion, and also if collection is interrupted, so that collected coverage
+    # is not lost.
+    assert jobs > 0
+    tests_to_collect: List[str] = [test for test, test_hash in sorted(test_hashes.items())
+                                   if coverage_index.lookup(test, test_hash) is None]
+    if not tests_to_collect:
+        return
+    print(f"Collecting coverage for {len(tests_to_collect)} tests using {jobs} jobs...")
+    thread_state = threading.local()
+    lit_runners: List[LitRunner] = []
+    progress_lock: threading.Lock = threading.Lock()
+    num_collected: List[int] = [0]
+
+    def collect(test_number: int, test: str) -> None:
+        lit_runner: Optional[LitRunner] = getattr(thread_state, "lit_runner", None)
+        if lit_runner is None:
+            lit_runner = (LitProcessRunner(mutant_tracking_llvm_lit) if lit_processes
+                          else PersistentLitRunner(mutant_tracking_llvm_lit))
+            thread_state.lit_runner = lit_runner
+            with progress_lock:
+                lit_runners.append(lit_runner)
+        tracking_file: Path = tracking_dir / f"__dredd_covered_mutants_{test_number}"
+        result: Optional[LitResult] = lit_runner.run(test=test,
+                                                     mutation=None,
+                                                     timeout_seconds=TRACKING_TIMEOUT_SECONDS,
+                                                     tracking_file=tracking_file)
+        covered_mutants: Optional[List[int]] = _read_covered_mutants(tracking_file)
+        code: str = "TIMEOUT" if result is None else result.code
+        if result is None or result.is_failure():
+            covered_mutants = None
+        coverage_index.record(test, CoverageEntry(test_hash=test_hashes[test],
+                                                  code=code,
+                                                  covered_mutants=covered_mutants))
+        with progress_lock:
+            num_collected[0] += 1
+            if num_collected[0] % 100 == 0 or num_collected[0] == len(tests_to_collect):
+                print(f"Collected coverage for {num_collected[0]} of {len(tests_to_collect)} tests")
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for future in [executor.submit(collect, test_number, test)
+                           for test_number, test in enumerate(tests_to_collect)]:
+                future.result()
+    finally:
+        for lit_runner in lit_runners:
+            lit_runner.close()
+        coverage_index.save()
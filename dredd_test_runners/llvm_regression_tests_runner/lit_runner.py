@@ -0,0 +1,162 @@
+import abc
+import json
+import os
+import re
+import selectors
+import signal
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+from typing import Dict, Optional
+
+from dredd_test_runners.common.constants import CPU_TIME_SLACK
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+
+# The lit result codes that denote a failing test. Other codes (e.g. PASS, XFAIL and UNSUPPORTED) do not.
+FAILURE_CODES = {"FAIL", "XPASS", "UNRESOLVED", "TIMEOUT"}
+
+
+class LitResult:
+    # The outcome of running a lit test: its lit result code (e.g. "PASS"), and the CPU time taken by its commands.
+    def __init__(self, code: str, cpu_time: float):
+        self.code: str = code
+        self.cpu_time: float = cpu_time
+
+    def is_failure(self) -> bool:
+        return self.code in FAILURE_CODES
+
+
+class LitRunner(abc.ABC):
+    # Runs lit tests, optionally with a mutation enabled, or (for a mutant-tracking build) recording the mutants that
+    # the test covers in 'tracking_file'. 'run' returns None if the test did not complete within 'timeout_seconds' of
+    # wall-clock time or, if it failed, used at least 'cpu_timeout_seconds' of CPU time. The CPU time limit is applied
+    # to each of the test's commands as it runs, so that a command stuck in a busy loop is stopped once it reaches it.
+    @abc.abstractmethod
+    def run(self,
+            test: str,
+            mutation: Optional[int],
+            timeout_seconds: float,
+            cpu_timeout_seconds: Optional[float] = None,
+            tracking_file: Optional[Path] = None) -> Optional[LitResult]:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'LitRunner':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class LitProcessRunner(LitRunner):
+    # Runs each test in a fresh llvm-lit process.
+    def __init__(self, llvm_lit: Path):
+        self.llvm_lit: Path = llvm_lit
+
+    def run(self,
+            test: str,
+            mutation: Optional[int],
+            timeout_seconds: float,
+            cpu_timeout_seconds: Optional[float] = None,
+            tracking_file: Optional[Path] = None) -> Optional[LitResult]:
+        environment: Dict[str, str] = os.environ.copy()
+        if mutation is not None:
+            environment["DREDD_ENABLED_MUTATION"] = str(mutation)
+        if tracking_file is not None:
+            environment["DREDD_MUTANT_TRACKING_FILE"] = str(tracking_file)
+        result: Optional[ProcessResult] = run_process_with_timeout(cmd=[str(self.llvm_lit), test],
+                                                                   timeout_seconds=timeout_seconds,
+                                                                   env=environment,
+                                                                   cpu_timeout_seconds=cpu_timeout_seconds)
+        if result is None:
+            return None
+        # lit reports the result of each test on a line of the form "<code>: <suite> :: <test> (1 of 1)".
+        match = re.search(r"^([A-Z]+): .* :: ", result.stdout.decode('utf-8', errors='replace'), re.MULTILINE)
+        if match is not None:
+            code: str = match.group(1)
+        else:
+            code = "PASS" if result.returncode == 0 else "UNRESOLVED"
+        if result.returncode != 0 and code not in FAILURE_CODES:
+            code = "UNRESOLVED"
+        return LitResult(code=code, cpu_time=result.cpu_time)
+
+
+class PersistentLitRunner(LitRunner):
+    # Runs tests in a persistent lit worker process (see lit_worker.py), which loads lit once and discovers each test
+    # once, so that running a test with a mutation enabled costs little more than running the test's commands. If a
+    # test times out, the worker is killed (along with the commands it started), and a new worker is started for the
+    # next test.
+    def __init__(self, llvm_lit: Path):
+        self.llvm_lit: Path = llvm_lit
+        self.worker: Optional[subprocess.Popen] = None
+
+    def _start_worker(self) -> subprocess.Popen:
+        if self.worker is None:
+            self.worker = subprocess.Popen(
+                [sys.executable, "-m", "dredd_test_runners.llvm_regression_tests_runner.lit_worker",
+                 str(self.llvm_lit)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                # The worker gets a process group of its own, so that it can be killed along with the commands it has
+                # started.
+                start_new_session=True,
+                text=True)
+        return self.worker
+
+    def _kill_worker(self) -> None:
+        if self.worker is None:
+            return
+        try:
+            os.killpg(self.worker.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.worker.wait()
+        self.worker.stdin.close()
+        self.worker.stdout.close()
+        self.worker = None
+
+    def run(self,
+            test: str,
+            mutation: Optional[int],
+            timeout_seconds: float,
+            cpu_timeout_seconds: Optional[float] = None,
+            tracking_file: Optional[Path] = None) -> Optional[LitResult]:
+        worker: subprocess.Popen = self._start_worker()
+        deadline: float = time.monotonic() + timeout_seconds
+        try:
+            worker.stdin.write(json.dumps({"test": test,
+                                           "mutation": mutation,
+                                           "tracking_file": None if tracking_file is None else str(tracking_file),
+                                           "cpu_timeout": cpu_timeout_seconds})
+                               + "\n")
+            worker.stdin.flush()
+        except BrokenPipeError:
+            self._kill_worker()
+            return LitResult(code="UNRESOLVED", cpu_time=0.0)
+        with selectors.DefaultSelector() as selector:
+            selector.register(worker.stdout, selectors.EVENT_READ)
+            # The worker writes each response as a single line, so once the first byte of a response is available the
+            # rest of it follows immediately.
+            if not selector.select(timeout=max(0.0, deadline - time.monotonic())):
+                self._kill_worker()
+                return None
+        response: str = worker.stdout.readline()
+        if not response:
+            # The worker died, e.g. because a mutation made lit itself crash.
+            self._kill_worker()
+            return LitResult(code="UNRESOLVED", cpu_time=0.0)
+        result_json: Dict = json.loads(response)
+        result: LitResult = LitResult(code=result_json["code"], cpu_time=result_json["cpu_time"])
+        # A command that reached the CPU time limit was stopped by the kernel, which makes the test fail.
+        if result.is_failure() and cpu_timeout_seconds is not None \
+                and result.cpu_time >= cpu_timeout_seconds - CPU_TIME_SLACK:
+            return None
+        return result
+
+    def close(self) -> None:
+        self._kill_worker()
@@ -0,0 +1,152 @@
+import inspect
+import json
+import os
+import platform
+import resource
+import runpy
+import subprocess
+import sys
+
+from typing import Dict, List, Optional
+
+from dredd_test_runners.common.run_process_with_timeout import limit_cpu_time
+
+# A persistent lit process, which runs lit tests on request so that the cost of starting Python, importing lit and
+# discovering each test (which involves loading the site and local lit configuration files) is paid once, rather than
+# once per (test, mutant) pair. It is started by PersistentLitRunner (see lit_runner.py) as:
+#
+#   python -m dredd_test_runners.llvm_regression_tests_runner.lit_worker <path to llvm-lit>
+#
+# The llvm-lit script of an LLVM build is executed (without running lit's main program) to locate lit and to obtain
+# the parameters that map the source directories of test suites to the site configurations of the build. The worker
+# then reads jobs from stdin, one JSON object per line:
+#
+#   {"test": "<path to test file>", "mutation": <mutation id, or null>, "tracking_file": <path, or null>,
+#    "cpu_timeout": <seconds, or null>}
+#
+# and for each job writes one JSON line to its original stdout:
+#
+#   {"code": "<lit result code, e.g. PASS or FAIL>", "cpu_time": <CPU time of the test's commands, in seconds>}
+#
+# The enabled mutation is passed to the test's commands via the DREDD_ENABLED_MUTATION environment variable, and the
+# file in which a mutant-tracking build should record the mutants covered by the test via DREDD_MUTANT_TRACKING_FILE;
+# the lit patches under 'lit-patches' forward these to RUN lines. Each command that the test starts is limited to the
+# job's CPU timeout (see run_process_with_timeout.py), and the wall-clock timeout is enforced by the runner, which kills
+# the worker (along with the commands of the test it was running) if a job takes too long.
+
+
+def _call_with_supported_arguments(function, **arguments):
+    # lit's internal API varies between LLVM releases; pass only the arguments that this release accepts.
+    parameters = inspect.signature(function).parameters
+    return function(**{name: value for name, value in arguments.items() if name in parameters})
+
+
+def _make_lit_config(lit, builtin_parameters: Dict):
+    return _call_with_supported_arguments(lit.LitConfig.LitConfig,
+                                          progname="lit",
+                                          path=[],
+                                          quiet=True,
+                                          useValgrind=False,
+                                          valgrindLeakCheck=False,
+                                          valgrindArgs=[],
+                                          noExecute=False,
+                                          debug=False,
+                                          isWindows=platform.system() == "Windows",
+                                          order="lexical",
+                                          params=builtin_parameters,
+                                          config_prefix=None,
+                                          maxIndividualTestTime=0,
+                                          parallelism_groups={},
+                                          echo_all_commands=False,
+                                          per_test_coverage=False,
+                                          gtest_sharding=True)
+
+
+# The CPU time limit for each command started by the current job, if any.
+_command_cpu_timeout: Optional[float] = None
+
+
+def _limit_cpu_time_of_commands() -> None:
+    # lit starts a test's commands with subprocess.Popen; each is given the CPU time limit once it has been started.
+    # The limit cannot be set on the worker itself, since the worker's own CPU time accumulates across jobs.
+    execute_child = subprocess.Popen._execute_child
+
+    def execute_child_with_cpu_limit(process: subprocess.Popen, *args, **kwargs) -> None:
+        execute_child(process, *args, **kwargs)
+        if _command_cpu_timeout is not None:
+            limit_cpu_time(process.pid, _command_cpu_timeout)
+
+    subprocess.Popen._execute_child = execute_child_with_cpu_limit
+
+
+def _children_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    global _command_cpu_timeout
+    llvm_lit: str = sys.argv[1]
+    _limit_cpu_time_of_commands()
+    lit_globals = runpy.run_path(llvm_lit, run_name="__dredd_lit_worker__")
+    import lit.discovery
+    import lit.LitConfig
+    import lit.Test
+    lit_config = _make_lit_config(lit, lit_globals.get("builtin_parameters", {}))
+
+    # Responses are written to a private copy of stdout, and stdout is redirected to stderr, so that anything that lit
+    # or a test format prints cannot corrupt the responses.
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Tests are discovered once, when first requested; running a test again (e.g. with a different mutation enabled)
+    # reuses its configuration.
+    discovered_tests: Dict[str, List] = {}
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job: Dict = json.loads(line)
+        test_path: str = os.path.abspath(job["test"])
+        for variable, value in [("DREDD_ENABLED_MUTATION", job.get("mutation")),
+                                ("DREDD_MUTANT_TRACKING_FILE", job.get("tracking_file"))]:
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = str(value)
+        _command_cpu_timeout = job.get("cpu_timeout")
+        cpu_time_before: float = _children_cpu_time()
+        code: str = "PASS"
+        try:
+            if test_path not in discovered_tests:
+                discovered_tests[test_path] = _call_with_supported_arguments(lit.discovery.find_tests_for_inputs,
+                                                                            lit_config=lit_config,
+                                                                            inputs=[test_path],
+                                                                            indirectlyRunCheck=False)
+            tests: List = discovered_tests[test_path]
+            if not tests:
+                code = "UNRESOLVED"
+            for test in tests:
+                result = test.config.test_format.execute(test, lit_config)
+                if isinstance(result, tuple):
+                    result = lit.Test.Result(*result)
+                # Recording the result applies the test's expectations, e.g. turning a failure of a test that is
+                # expected to fail into XFAIL. A test that is run again already has a result, which is replaced.
+                test.result = None
+                test.setResult(result)
+                result = test.result
+                if result.code.isFailure or code == "PASS":
+                    code = result.code.name
+                if result.code.isFailure:
+                    break
+        except (Exception, SystemExit) as error:
+            # lit reports an exception raised while running a test as an unresolved result. lit exits if a test cannot
+            # be discovered (e.g. because it does not exist), which should not bring down the worker.
+            print(f"Exception while running {test_path}: {error}", file=sys.stderr)
+            code = "UNRESOLVED"
+        responses.write(json.dumps({"code": code, "cpu_time": _children_cpu_time() - cpu_time_before}) + "\n")
+        responses.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,34 @@
 import argparse
-import json
 import os
-import tempfile
-import time
+import sys
 
 from enum import Enum
 from pathlib import Path
-from dredd_test_runners.common.mutation_tree import MutationTree
-from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+from dredd_test_runners.common.constants import (DEFAULT_CALIBRATION_RUNS,
+                                                 DEFAULT_KILL_REFRESH_INTERVAL,
+                                                 DEFAULT_TIMEOUT_QUANTILE,
+                                                 MIN_TIMEOUT_FOR_MUTANT_EXECUTION,
+                                                 STALE_CLAIM_TIMEOUT,
+                                                 TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION)
+from dredd_test_runners.common.kill_matrix import KillMatrixWriter, default_kill_matrix_dir
+from dredd_test_runners.common.live_kill_set import LiveKillSet
+from dredd_test_runners.common.mutation_tree import MutationTree, describe_mutation_tree_mismatch
+from dredd_test_runners.common.mutation_tree_index import load_mutation_tree, mutation_info_hash
+from dredd_test_runners.common.result_store import ResultStore, open_result_store, skipped_test_summary
+from dredd_test_runners.common.scratch_space import DEFAULT_RAM_BUDGET_MB, ScratchSpace
+from dredd_test_runners.common.sharding import SHARDING_STRATEGIES, select_shard
+from dredd_test_runners.common.test_progress import TestProgress
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration, mutant_timeout, wall_clock_timeout
+from dredd_test_runners.llvm_regression_tests_runner.coverage_index import (CoverageEntry,
+                                                                            CoverageIndex,
+                                                                            collect_coverage,
+                                                                            default_coverage_index_path,
+                                                                            hash_tests)
+from dredd_test_runners.llvm_regression_tests_runner.lit_runner import (LitProcessRunner,
+                                                                        LitResult,
+                                                                        PersistentLitRunner)
 
-from typing import AnyStr, Dict, List, Set
+from typing import Dict, List, Optional, Set
 
 
 class KillStatus(Enum):
@@ -41,37 +60,139 @@ def main():
     parser.add_argument("regression_tests_mutant_tracking_root",
                         help="Corresponding path to this directory under the mutant tracking build of the compiler.",
                         type=Path)
+    parser.add_argument("--calibration_runs",
+                        default=DEFAULT_CALIBRATION_RUNS,
+                        help="Number of times to compile and run each test without mutation, to calibrate the "
+                             "timeouts used for its mutants. Mutant timeouts are in CPU time, and are based on a "
+                             "quantile of the CPU times observed.",
+                        type=int)
+    parser.add_argument("--timeout_quantile",
+                        default=DEFAULT_TIMEOUT_QUANTILE,
+                        help="Quantile of the CPU times observed for a test (in this and previous runs) on which the "
+                             "timeouts for its mutants are based.",
+                        type=float)
+    parser.add_argument("--timing_history_dir",
+                        default=Path("work") / "timing_history",
+                        help="Directory in which to record the CPU times observed for each test, so that timeouts "
+                             "for a test that is evaluated again are calibrated using every measurement taken.",
+                        type=Path)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which to record results. If omitted, results are recorded as "
+                             "files under the 'work' directory.",
+                        type=Path)
+    parser.add_argument("--coordinator",
+                        help="URL (e.g. http://localhost:8130) of a coordinator (see 'dredd-coordinator') through "
+                             "which to record results and coordinate with other workers, possibly on other machines. "
+                             "Program artifacts are still kept under the local 'work' directory.")
+    parser.add_argument("--kill_refresh_interval",
+                        default=DEFAULT_KILL_REFRESH_INTERVAL,
+                        help="How often, in seconds, to scan the results for mutants killed by other workers, so that "
+                             "they can be skipped.",
+                        type=float)
+    parser.add_argument("--resume",
+                        action="store_true",
+                        help="Resume the tests that workers abandoned partway through (e.g. because they were "
+                             "preempted), trying only the mutants that had not yet been decided for them.")
+    parser.add_argument("--stale_claim_timeout",
+                        default=STALE_CLAIM_TIMEOUT,
+                        help="Number of seconds after the last heartbeat of an unfinished test after which --resume "
+                             "considers the test to be abandoned.",
+                        type=float)
+    parser.add_argument("--shard_index",
+                        default=0,
+                        help="Index (from 0) of the shard of the tests that this worker should consider, when the "
+                             "tests are split between --shard_count workers.",
+                        type=int)
+    parser.add_argument("--shard_count",
+                        default=1,
+                        help="Number of shards into which to split the tests, so that each of several workers (e.g. "
+                             "one per machine) considers a disjoint slice of the tests.",
+                        type=int)
+    parser.add_argument("--shard_strategy",
+                        default="hash",
+                        choices=SHARDING_STRATEGIES,
+                        help="How to split the tests between shards. 'hash' assigns each test by a hash of its name, "
+                             "which needs nothing shared between workers and keeps each test in the same shard as the "
+                             "suite changes; 'duration' balances the shards by the test durations recorded in the "
+                             "timing history. The first worker records its 'duration' split in the result store, so "
+                             "workers must share a result store (a work directory, database or coordinator).")
+    parser.add_argument("--lit_processes",
+                        action="store_true",
+                        help="Run a fresh llvm-lit process for each run of a test, rather than running tests in a "
+                             "persistent lit worker that loads lit and each test's configuration only once.")
+    parser.add_argument("--coverage_jobs",
+                        default=os.cpu_count(),
+                        help="Number of tests to run in parallel with the mutant-tracking build when collecting the "
+                             "mutants covered by each test.",
+                        type=int)
+    parser.add_argument("--coverage_index",
+                        help="File in which to record the mutants covered by each test, keyed by the test's path and "
+                             "a hash of its contents, so that coverage is only collected for new or changed tests. "
+                             "Defaults to a file under 'work/coverage_index' named after a hash of the mutant-tracking "
+                             "mutation info file.",
+                        type=Path)
+    parser.add_argument("--collect_coverage_only",
+                        action="store_true",
+                        help="Collect the coverage of the tests, and then exit without trying any mutants.")
+    parser.add_argument("--scratch_dir",
+                        help="RAM-backed directory (e.g. a tmpfs mount) in which to build mutants and other "
+                             "short-lived files. Defaults to /dev/shm, if available.",
+                        type=Path)
+    parser.add_argument("--scratch_budget_mb",
+                        default=DEFAULT_RAM_BUDGET_MB,
+                        help="Maximum number of megabytes of RAM-backed scratch space to use. Once this is exceeded, "
+                             "further builds are placed on disk. Pass 0 to only use disk.",
+                        type=int)
+    parser.add_argument("--mutation_tree_cache_dir",
+                        help="Directory in which to cache binary indexes of the mutation trees, so that mutation info "
+                             "files only need to be parsed once. Defaults to 'mutation-tree-cache' alongside each "
+                             "mutation info file.",
+                        type=Path)
     args = parser.parse_args()
 
+    if not 0 <= args.shard_index < args.shard_count:
+        print(f"Error: the shard index must be at least 0 and less than the shard count ({args.shard_count}).")
+        sys.exit(1)
+
     assert args.mutation_info_file != args.mutation_info_file_for_mutant_coverage_tracking
 
-    print("Building the real mutation tree...")
-    with open(args.mutation_info_file, 'r') as json_input:
-        mutation_tree = MutationTree(json.load(json_input))
-    print("Built!")
-    print("Building the mutation tree associated with mutant coverage tracking...")
-    with open(args.mutation_info_file_for_mutant_coverage_tracking, 'r') as json_input:
-        mutation_tree_for_coverage_tracking = MutationTree(json.load(json_input))
-    print("Built!")
+    print("Loading the real mutation tree...")
+    mutation_tree: MutationTree = load_mutation_tree(mutation_info_file=args.mutation_info_file,
+                                                     cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
+    print("Loading the mutation tree associated with mutant coverage tracking...")
+    mutation_tree_for_coverage_tracking: MutationTree = load_mutation_tree(
+        mutation_info_file=args.mutation_info_file_for_mutant_coverage_tracking,
+        cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
     print("Checking that the two mutation trees match...")
-    assert mutation_tree.mutation_id_to_node_id == mutation_tree_for_coverage_tracking.mutation_id_to_node_id
-    assert mutation_tree.parent_map == mutation_tree_for_coverage_tracking.parent_map
-    assert mutation_tree.num_nodes == mutation_tree_for_coverage_tracking.num_nodes
-    assert mutation_tree.num_mutations == mutation_tree_for_coverage_tracking.num_mutations
+    mutation_tree_mismatch: Optional[str] = describe_mutation_tree_mismatch(mutation_tree,
+                                                                            mutation_tree_for_coverage_tracking)
+    if mutation_tree_mismatch is not None:
+        print(f"Error: the mutation trees do not match. {mutation_tree_mismatch}")
+        sys.exit(1)
     print("Check complete!")
 
-    with tempfile.TemporaryDirectory() as temp_dir_for_generated_code:
-        dredd_covered_mutants_path: Path = Path(temp_dir_for_generated_code, '__dredd_covered_mutants')
+    # Keep an up-to-date copy of the set of killed mutants, so that mutants killed by other workers can be skipped
+    # without querying the store for each mutant.
+    live_kill_set: LiveKillSet = LiveKillSet(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator),
+        refresh_interval=args.kill_refresh_interval)
 
-        killed_mutants: Set[int] = set()
-        unkilled_mutants: Set[int] = set(range(0, mutation_tree.num_mutations))
+    # Record heartbeats and checkpoints for the test being evaluated, so that it can be resumed if this worker stops.
+    test_progress: TestProgress = TestProgress(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator))
 
-        # Make a work directory in which information about the mutant killing process will be stored. If this already
-        # exists that's OK - there may be other processes working on mutant killing, or we may be continuing a job that
-        # crashed previously.
-        Path("work").mkdir(exist_ok=True)
-        Path("work/tests").mkdir(exist_ok=True)
-        Path("work/killed_mutants").mkdir(exist_ok=True)
+    llvm_lit: Path = args.mutated_compiler_bin_dir / "llvm-lit"
+    with ScratchSpace(ram_dir=args.scratch_dir, ram_budget_mb=args.scratch_budget_mb) as scratch_space, \
+            (LitProcessRunner(llvm_lit) if args.lit_processes else PersistentLitRunner(llvm_lit)) as lit_runner, \
+            live_kill_set, \
+            test_progress:
+        temp_dir_for_generated_code: Path = scratch_space.allocate(prefix='__runner_')
 
         # Find all the regression tests under the regression tests root directory. These are all the files with the
         # '.ll' extension.
@@ -82,99 +203,167 @@ def main():
                     tests.append(os.path.join(root, file))
         tests.sort()
 
+        # Open the store in which information about the mutant killing process will be recorded. If results already
+        # exist that's OK - there may be other processes working on mutant killing, or we may be continuing a job that
+        # crashed previously.
+        result_store: ResultStore = open_result_store(work_dir=Path("work"),
+                                                      result_database=args.result_database,
+                                                      coordinator=args.coordinator)
+
+        # Only the tests in this worker's shard are considered. Tests are identified by their directory names (see
+        # below).
+        tests_in_shard: Set[str] = select_shard(
+            test_names=[test[len(str(args.regression_tests_root) + os.sep):].replace("/", "_") for test in tests],
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+            strategy=args.shard_strategy,
+            timing_history_dir=args.timing_history_dir,
+            record_plan=result_store.record_shard_plan)
+        tests = [test for test in tests
+                 if test[len(str(args.regression_tests_root) + os.sep):].replace("/", "_") in tests_in_shard]
+
+        # Collect the mutants covered by every test up front, running the tests with the mutant-tracking build in
+        # parallel, so that trying the mutants for a test below only requires a lookup in the coverage index. Coverage
+        # collected previously is reused for tests whose contents have not changed.
+        tests_in_mutant_tracking_build: Dict[str, str] = {
+            test: str(args.regression_tests_mutant_tracking_root) + test[len(str(args.regression_tests_root)):]
+            for test in tests}
+        test_hashes: Dict[str, str] = hash_tests(list(tests_in_mutant_tracking_build.values()))
+        coverage_index_path: Path = args.coverage_index if args.coverage_index is not None \
+            else default_coverage_index_path(
+                work_dir=Path("work"),
+                tracking_mutation_info_hash=mutation_info_hash(
+                    mutation_info_file=args.mutation_info_file_for_mutant_coverage_tracking,
+                    cache_dir=args.mutation_tree_cache_dir))
+        coverage_index: CoverageIndex = CoverageIndex(coverage_index_path)
+        with coverage_index.exclusive():
+            collect_coverage(coverage_index=coverage_index,
+                             test_hashes=test_hashes,
+                             mutant_tracking_llvm_lit=args.mutant_tracking_compiler_bin_dir / "llvm-lit",
+                             tracking_dir=temp_dir_for_generated_code,
+                             jobs=args.coverage_jobs,
+                             lit_processes=args.lit_processes)
+        if args.collect_coverage_only:
+            return
+
+        timeout_calibration = TimeoutCalibration(runs=args.calibration_runs,
+                                                 timeout_quantile=args.timeout_quantile,
+                                                 history_dir=args.timing_history_dir)
+
+        killed_mutants: Set[int] = set()
+        unkilled_mutants: Set[int] = set(range(0, mutation_tree.num_mutations))
+
+        # Record the mutants covered, killed, skipped and survived by each test in the kill matrix, which can be queried
+        # without reading every test's summary.
+        kill_matrix: KillMatrixWriter = KillMatrixWriter(default_kill_matrix_dir(Path("work")))
+
+        def skip_test(test_name: str, test: str, reason: str) -> None:
+            # Records a claimed test that cannot be used as complete, so that it is not resumed.
+            print(f"Skipping test {test} as {reason}.")
+            test_progress.finish_test()
+            result_store.record_test_summary(test_name, skipped_test_summary(test=test, reason=reason))
+
         for test_filename in tests:
 
-            # We attempt to create a directory that has the same name as this test file, except that we strip off the
+            # We attempt to claim a test that has the same name as this test file, except that we strip off the
             # regression tests root prefix, and change '/' to '_'.
             test_filename_without_prefix = test_filename[len(str(args.regression_tests_root) + os.sep):]
             test_directory_name = test_filename_without_prefix.replace("/", "_")
 
-            # Try to create the directory; if it already exists then skip this test as that means that results for this
-            # test have already been computed or are being computed in parallel.
-            test_output_directory: Path = Path("work/tests/" + test_directory_name)
-            try:
-                test_output_directory.mkdir()
-            except FileExistsError:
-                print("Skipping test " + test_filename + " as a directory for it already exists")
+            # Try to claim the test; if it has already been claimed then skip this test as that means that results for
+            # this test have already been computed or are being computed in parallel. When resuming, a test whose claim
+            # has been abandoned is taken over instead.
+            checkpoint: Optional[Dict] = None
+            if not result_store.claim_test(test_directory_name):
+                if not args.resume or not result_store.reclaim_test(test_directory_name,
+                                                                    stale_after=args.stale_claim_timeout):
+                    print("Skipping test " + test_filename + " as it has already been claimed")
+                    continue
+                checkpoint = result_store.test_checkpoint(test_directory_name) or {}
+                print("Resuming test " + test_filename)
+            test_progress.start_test(test_directory_name, checkpoint)
+
+            test_in_mutant_tracking_build: str = tests_in_mutant_tracking_build[test_filename]
+            coverage: Optional[CoverageEntry] = coverage_index.lookup(test_in_mutant_tracking_build,
+                                                                      test_hashes[test_in_mutant_tracking_build])
+            if coverage is None or coverage.covered_mutants is None:
+                print(f"Mutant-tracking result: {'none' if coverage is None else coverage.code}")
+                skip_test(test_directory_name, test_filename_without_prefix,
+                          "the regular and mutant-tracking compilers yield different results")
                 continue
+            covered_by_this_test: List[int] = coverage.covered_mutants
 
-            test_time_start: float = time.time()
-            test_result: ProcessResult = run_process_with_timeout(
-                cmd=[args.mutated_compiler_bin_dir / "llvm-lit",
-                     test_filename],
-                timeout_seconds=60)
-            test_time_end: float = time.time()
-            test_time = test_time_end - test_time_start
-            if test_result.returncode != 0:
-                print(f"Skipping test {test_filename} as it returned non-zero result {test_result.returncode}.")
-                print(f"stdout: {test_result.stdout}")
-                print(f"stderr: {test_result.stderr}")
+            test_result: Optional[LitResult] = lit_runner.run(test=test_filename, mutation=None, timeout_seconds=60)
+            if test_result is None:
+                skip_test(test_directory_name, test_filename_without_prefix, "it timed out")
+                continue
+            if test_result.is_failure():
+                skip_test(test_directory_name, test_filename_without_prefix,
+                          f"it fails without mutation ({test_result.code})")
                 continue
-            if "PASS" not in test_result.stdout.decode('utf-8'):
-                print(f"Skipping test {test_filename} as it is not expected to pass.")
-                print(f"stdout: {test_result.stdout}")
-                print(f"stderr: {test_result.stderr}")
+            if test_result.code != "PASS":
+                skip_test(test_directory_name, test_filename_without_prefix,
+                          f"it is not expected to pass ({test_result.code})")
                 continue
 
-            if dredd_covered_mutants_path.exists():
-                os.remove(dredd_covered_mutants_path)
-
-            tracking_environment: Dict[AnyStr, AnyStr] = os.environ.copy()
-            tracking_environment["DREDD_MUTANT_TRACKING_FILE"] = str(dredd_covered_mutants_path)
-            test_in_mutant_tracking_build = str(args.regression_tests_mutant_tracking_root) + test_filename[len(str(
-                args.regression_tests_root)):]
-            mutant_tracking_cmd = [str(args.mutant_tracking_compiler_bin_dir / "llvm-lit"),
-                                   test_in_mutant_tracking_build]
-            mutant_tracking_result: ProcessResult = run_process_with_timeout(cmd=mutant_tracking_cmd,
-                                                                             timeout_seconds=60,
-                                                                             env=tracking_environment)
-            if mutant_tracking_result.returncode != 0:
-                print(
-                    f"Warning: skipping test {test_filename} "
-                    f"as the regular and mutant-tracking compilers yield different results")
-                print(f"Return codes: {test_result.returncode} vs. {mutant_tracking_result.returncode}")
-                print(
-                    f"stdout: {test_result.stdout.decode('utf-8')} vs. {mutant_tracking_result.stdout.decode('utf-8')}")
-                print(
-                    f"stdout: {test_result.stderr.decode('utf-8')} vs. {mutant_tracking_result.stderr.decode('utf-8')}")
+            # Measure the test's run time repeatedly, to calibrate the timeout used for its mutants.
+            test_times: List[float] = [test_result.cpu_time]
+            while test_result is not None and len(test_times) < timeout_calibration.runs:
+                test_result = lit_runner.run(test=test_filename, mutation=None, timeout_seconds=60)
+                if test_result is not None:
+                    test_times.append(test_result.cpu_time)
+            if test_result is None:
+                skip_test(test_directory_name, test_filename_without_prefix, "it timed out during timeout calibration")
                 continue
+            test_time: float = timeout_calibration.baseline_from_samples(test_name=test_directory_name,
+                                                                         kind="test",
+                                                                         samples=test_times)
+
+            # Catch up on kills recorded by other workers.
+            killed_elsewhere: Set[int] = live_kill_set.killed_mutants() - killed_mutants
+            killed_mutants.update(killed_elsewhere)
+            unkilled_mutants.difference_update(killed_elsewhere)
 
-            # Load file contents into a list. We go from list to set to list to eliminate duplicates.
-            covered_by_this_test: List[int] = list(set([int(line.strip()) for line in
-                                                        open(dredd_covered_mutants_path, 'r').readlines()]))
-            covered_by_this_test.sort()
-            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test if m not in killed_mutants])
+            # When resuming a test, the mutants decided before it was interrupted are not tried again.
+            killed_by_this_test: List[int] = list(checkpoint.get("killed_mutants", [])) if checkpoint is not None \
+                else []
+            covered_but_not_killed_by_this_test: List[int] = list(checkpoint.get("survived_mutants", [])) \
+                if checkpoint is not None else []
+            decided_mutants: Set[int] = set(killed_by_this_test + covered_but_not_killed_by_this_test)
+
+            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test
+                                                           if m not in killed_mutants and m not in decided_mutants])
             print("Number of mutants to try: " + str(len(candidate_mutants_for_this_test)))
 
-            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test if m in killed_mutants])
-            killed_by_this_test: List[int] = []
-            covered_but_not_killed_by_this_test: List[int] = []
+            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test
+                                                         if m in killed_mutants and m not in decided_mutants])
 
             for mutant in candidate_mutants_for_this_test:
-                mutant_path = Path("work/killed_mutants/" + str(mutant))
-                if mutant_path.exists():
+                if live_kill_set.is_killed(mutant):
                     print("Skipping mutant " + str(mutant) + " as it is noted as already killed.")
                     unkilled_mutants.remove(mutant)
                     killed_mutants.add(mutant)
                     already_killed_by_other_tests.append(mutant)
                     continue
                 print("Trying mutant " + str(mutant))
-                mutated_environment = os.environ.copy()
-                mutated_environment["DREDD_ENABLED_MUTATION"] = str(mutant)
-                mutated_test_result: ProcessResult = run_process_with_timeout(
-                    cmd=[args.mutated_compiler_bin_dir / "llvm-lit",
-                         test_filename],
-                    timeout_seconds=int(max(1.0, 5.0 * test_time)),
-                    env=mutated_environment)
-
-                if mutated_test_result is None:
+                mutated_test_timeout: float = mutant_timeout(baseline=test_time,
+                                                             multiplier=TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION,
+                                                             minimum=MIN_TIMEOUT_FOR_MUTANT_EXECUTION)
+                mutated_test_result: Optional[LitResult] = lit_runner.run(
+                    test=test_filename,
+                    mutation=mutant,
+                    timeout_seconds=wall_clock_timeout(mutated_test_timeout),
+                    cpu_timeout_seconds=mutated_test_timeout)
+
+                if mutated_test_result is None or mutated_test_result.code == "TIMEOUT":
                     mutant_result = KillStatus.KILL_TIMEOUT
-                elif mutated_test_result.returncode != 0:
+                elif mutated_test_result.is_failure():
                     mutant_result = KillStatus.KILL_FAIL
                 else:
                     mutant_result = KillStatus.SURVIVED
 
                 print("Mutant result: " + str(mutant_result))
+                test_progress.record(mutant, killed=mutant_result != KillStatus.SURVIVED)
                 if mutant_result == KillStatus.SURVIVED:
                     covered_but_not_killed_by_this_test.append(mutant)
                     continue
@@ -183,15 +372,12 @@ def main():
                 killed_mutants.add(mutant)
                 killed_by_this_test.append(mutant)
                 print(f"Kill! Mutants killed so far: {len(killed_mutants)}")
-                try:
-                    mutant_path.mkdir()
-                    print("Writing kill info to file.")
-                    with open(mutant_path / "kill_info.json", "w") as outfile:
-                        json.dump({"killing_test": test_filename_without_prefix, "kill_type": str(mutant_result)},
-                                  outfile)
-                except FileExistsError:
+                print("Recording kill info.")
+                if not result_store.record_kill(mutant, {"killing_test": test_filename_without_prefix,
+                                                         "kill_type": str(mutant_result)}):
                     print(f"Mutant {mutant} was independently discovered to be killed.")
-                    continue
+                # Let the live kill set know at once, rather than at its next scan of the result store.
+                live_kill_set.add(mutant)
 
             # Now that analysis for this test case has completed, write summary information to its directory
             all_considered_mutants = killed_by_this_test \
@@ -200,15 +386,21 @@ def main():
             all_considered_mutants.sort()
             # We should have put every mutant into some bucket or other
             assert covered_by_this_test == all_considered_mutants
+            test_progress.finish_test()
             killed_by_this_test.sort()
             covered_but_not_killed_by_this_test.sort()
             already_killed_by_other_tests.sort()
-            with open(test_output_directory / "kill_summary.json", "w") as outfile:
-                json.dump({"test": test_filename_without_prefix,
-                           "covered_mutants": covered_by_this_test,
-                           "killed_mutants": killed_by_this_test,
-                           "skipped_mutants": already_killed_by_other_tests,
-                           "survived_mutants": covered_but_not_killed_by_this_test}, outfile)
+            result_store.record_test_summary(test_directory_name,
+                                             {"test": test_filename_without_prefix,
+                                              "covered_mutants": covered_by_this_test,
+                                              "killed_mutants": killed_by_this_test,
+                                              "skipped_mutants": already_killed_by_other_tests,
+                                              "survived_mutants": covered_but_not_killed_by_this_test})
+            kill_matrix.append(test_directory_name,
+                               covered=covered_by_this_test,
+                               killed=killed_by_this_test,
+                               skipped=already_killed_by_other_tests,
+                               survived=covered_but_not_killed_by_this_test)
 
 
 if __name__ == '__main__':
@@ -1,16 +1,32 @@
 import argparse
 import json
 import os
-import time
-import tempfile
+import shutil
+import sys
 
 from pathlib import Path
-from dredd_test_runners.common.hash_file import hash_file
-from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.constants import (DEFAULT_CALIBRATION_RUNS,
+                                                 DEFAULT_KILL_REFRESH_INTERVAL,
+                                                 DEFAULT_TIMEOUT_QUANTILE,
+                                                 MUTANT_LEASE_DURATION,
+                                                 STALE_CLAIM_TIMEOUT)
+from dredd_test_runners.common.hash_file import files_identical, hash_file
+from dredd_test_runners.common.group_testing import pack_compatible_mutants
+from dredd_test_runners.common.kill_likelihood import KillLikelihoodScheduler, default_kill_likelihood_cache_dir
+from dredd_test_runners.common.kill_matrix import KillMatrixWriter, default_kill_matrix_dir
+from dredd_test_runners.common.live_kill_set import LiveKillSet
+from dredd_test_runners.common.mutant_evaluation_pool import MutantEvaluationPool
+from dredd_test_runners.common.mutation_tree import MutationTree, describe_mutation_tree_mismatch
+from dredd_test_runners.common.mutation_tree_index import load_mutation_tree
+from dredd_test_runners.common.result_store import ResultStore, open_result_store, skipped_test_summary
 from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
-from dredd_test_runners.common.run_test_with_mutants import run_test_with_mutants, KillStatus
+from dredd_test_runners.common.run_test_with_mutants import KillStatus, MutantTestConfiguration
+from dredd_test_runners.common.scratch_space import DEFAULT_RAM_BUDGET_MB, BuildDirectory, ScratchSpace
+from dredd_test_runners.common.sharding import SHARDING_STRATEGIES, select_shard
+from dredd_test_runners.common.test_progress import TestProgress
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
 
-from typing import AnyStr, List, Set
+from typing import AnyStr, Dict, Iterator, List, Optional, Set
 
 
 def main():
@@ -35,68 +51,232 @@ def main():
     parser.add_argument("llvm_test_suite_compilation_database",
                         help="Path to a compilation database for the LLVM test suite (generated using CMake).",
                         type=Path)
+    parser.add_argument("--jobs",
+                        default=1,
+                        help="Number of mutants to evaluate in parallel for each test.",
+                        type=int)
+    parser.add_argument("--group_size",
+                        default=1,
+                        help="Maximum number of mutually compatible mutants to enable in a single compilation. Groups "
+                             "that do not survive with an identical binary are split until each mutant has its own "
+                             "verdict. The default of 1 evaluates every mutant separately.",
+                        type=int)
+    parser.add_argument("--mutant_order",
+                        default="likelihood",
+                        choices=["likelihood", "id"],
+                        help="Order in which to try the candidate mutants for each test. 'likelihood' tries first the "
+                             "mutants most likely to be killed, as predicted from the outcomes so far for mutants of "
+                             "the same kind, mutation tree node and source file, so that more mutants are killed "
+                             "before the time budget runs out. 'id' tries mutants in ascending order of id.")
+    parser.add_argument("--persist_execution_cache",
+                        action="store_true",
+                        help="Keep the cache that maps the hashes of mutant executables to the outcomes of running "
+                             "them in each test's results directory, rather than discarding it once the test is "
+                             "complete.")
+    parser.add_argument("--calibration_runs",
+                        default=DEFAULT_CALIBRATION_RUNS,
+                        help="Number of times to compile and run each test without mutation, to calibrate the "
+                             "timeouts used for its mutants. Mutant timeouts are in CPU time, and are based on a "
+                             "quantile of the CPU times observed.",
+                        type=int)
+    parser.add_argument("--timeout_quantile",
+                        default=DEFAULT_TIMEOUT_QUANTILE,
+                        help="Quantile of the CPU times observed for a test (in this and previous runs) on which the "
+                             "timeouts for its mutants are based.",
+                        type=float)
+    parser.add_argument("--timing_history_dir",
+                        default=Path("work") / "timing_history",
+                        help="Directory in which to record the CPU times observed for each test, so that timeouts "
+                             "for a test that is evaluated again are calibrated using every measurement taken.",
+                        type=Path)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which to record results. If omitted, results are recorded as "
+                             "files under the 'work' directory.",
+                        type=Path)
+    parser.add_argument("--coordinator",
+                        help="URL (e.g. http://localhost:8130) of a coordinator (see 'dredd-coordinator') through "
+                             "which to record results and coordinate with other workers, possibly on other machines. "
+                             "Program artifacts are still kept under the local 'work' directory.")
+    parser.add_argument("--kill_refresh_interval",
+                        default=DEFAULT_KILL_REFRESH_INTERVAL,
+                        help="How often, in seconds, to scan the results for mutants killed by other workers, so that "
+                             "they can be skipped.",
+                        type=float)
+    parser.add_argument("--resume",
+                        action="store_true",
+                        help="Resume the tests that workers abandoned partway through (e.g. because they were "
+                             "preempted), trying only the mutants that had not yet been decided for them.")
+    parser.add_argument("--stale_claim_timeout",
+                        default=STALE_CLAIM_TIMEOUT,
+                        help="Number of seconds after the last heartbeat of an unfinished test after which --resume "
+                             "considers the test to be abandoned.",
+                        type=float)
+    parser.add_argument("--shard_index",
+                        default=0,
+                        help="Index (from 0) of the shard of the tests that this worker should consider, when the "
+                             "tests are split between --shard_count workers.",
+                        type=int)
+    parser.add_argument("--shard_count",
+                        default=1,
+                        help="Number of shards into which to split the tests, so that each of several workers (e.g. "
+                             "one per machine) considers a disjoint slice of the tests.",
+                        type=int)
+    parser.add_argument("--shard_strategy",
+                        default="hash",
+                        choices=SHARDING_STRATEGIES,
+                        help="How to split the tests between shards. 'hash' assigns each test by a hash of its name, "
+                             "which needs nothing shared between workers and keeps each test in the same shard as the "
+                             "suite changes; 'duration' balances the shards by the test durations recorded in the "
+                             "timing history. The first worker records its 'duration' split in the result store, so "
+                             "workers must share a result store (a work directory, database or coordinator).")
+    parser.add_argument("--scratch_dir",
+                        help="RAM-backed directory (e.g. a tmpfs mount) in which to build mutants and other "
+                             "short-lived files. Defaults to /dev/shm, if available.",
+                        type=Path)
+    parser.add_argument("--scratch_budget_mb",
+                        default=DEFAULT_RAM_BUDGET_MB,
+                        help="Maximum number of megabytes of RAM-backed scratch space to use. Once this is exceeded, "
+                             "further builds are placed on disk. Pass 0 to only use disk.",
+                        type=int)
+    parser.add_argument("--mutation_tree_cache_dir",
+                        help="Directory in which to cache binary indexes of the mutation trees, so that mutation info "
+                             "files only need to be parsed once. Defaults to 'mutation-tree-cache' alongside each "
+                             "mutation info file.",
+                        type=Path)
     args = parser.parse_args()
 
+    if not 0 <= args.shard_index < args.shard_count:
+        print(f"Error: the shard index must be at least 0 and less than the shard count ({args.shard_count}).")
+        sys.exit(1)
+
     assert args.mutation_info_file != args.mutation_info_file_for_mutant_coverage_tracking
 
-    print("Building the real mutation tree...")
-    with open(args.mutation_info_file, 'r') as json_input:
-        mutation_tree = MutationTree(json.load(json_input))
-    print("Built!")
-    print("Building the mutation tree associated with mutant coverage tracking...")
-    with open(args.mutation_info_file_for_mutant_coverage_tracking, 'r') as json_input:
-        mutation_tree_for_coverage_tracking = MutationTree(json.load(json_input))
-    print("Built!")
+    print("Loading the real mutation tree...")
+    mutation_tree: MutationTree = load_mutation_tree(mutation_info_file=args.mutation_info_file,
+                                                     cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
+    print("Loading the mutation tree associated with mutant coverage tracking...")
+    mutation_tree_for_coverage_tracking: MutationTree = load_mutation_tree(
+        mutation_info_file=args.mutation_info_file_for_mutant_coverage_tracking,
+        cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
     print("Checking that the two mutation trees match...")
-    assert mutation_tree.mutation_id_to_node_id == mutation_tree_for_coverage_tracking.mutation_id_to_node_id
-    assert mutation_tree.parent_map == mutation_tree_for_coverage_tracking.parent_map
-    assert mutation_tree.num_nodes == mutation_tree_for_coverage_tracking.num_nodes
-    assert mutation_tree.num_mutations == mutation_tree_for_coverage_tracking.num_mutations
+    mutation_tree_mismatch: Optional[str] = describe_mutation_tree_mismatch(mutation_tree,
+                                                                            mutation_tree_for_coverage_tracking)
+    if mutation_tree_mismatch is not None:
+        print(f"Error: the mutation trees do not match. {mutation_tree_mismatch}")
+        sys.exit(1)
     print("Check complete!")
 
-    with tempfile.TemporaryDirectory() as temp_dir_for_generated_code:
-        regular_exe_path: Path = Path(temp_dir_for_generated_code, '__exe')
-        dredd_covered_mutants_path: Path = Path(temp_dir_for_generated_code, '__dredd_covered_mutants')
-        mutant_tracking_exe_path: Path = Path(temp_dir_for_generated_code, '__mutant_tracking_exe')
-        mutant_exe_path: Path = Path(temp_dir_for_generated_code, '__mutant_exe')
+    # Keep an up-to-date copy of the set of killed mutants, so that mutants killed by other workers can be skipped
+    # without querying the store for each mutant.
+    live_kill_set: LiveKillSet = LiveKillSet(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator),
+        refresh_interval=args.kill_refresh_interval)
+
+    # Record heartbeats and checkpoints for the test being evaluated, so that it can be resumed if this worker stops.
+    test_progress: TestProgress = TestProgress(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator))
+
+    with ScratchSpace(ram_dir=args.scratch_dir, ram_budget_mb=args.scratch_budget_mb) as scratch_space, \
+            MutantEvaluationPool(jobs=args.jobs, scratch_space=scratch_space) \
+            as mutant_evaluation_pool, \
+            live_kill_set, \
+            test_progress:
+        # The code generated for a test is placed in RAM-backed scratch space if it is within its budget when the test
+        # is started.
+        runner_build_directory: BuildDirectory = scratch_space.build_directory(prefix='__runner_')
+        timeout_calibration = TimeoutCalibration(runs=args.calibration_runs,
+                                                 timeout_quantile=args.timeout_quantile,
+                                                 history_dir=args.timing_history_dir)
 
         killed_mutants: Set[int] = set()
         unkilled_mutants: Set[int] = set(range(0, mutation_tree.num_mutations))
 
-        # Make a work directory in which information about the mutant killing process will be stored. If this already
-        # exists that's OK - there may be other processes working on mutant killing, or we may be continuing a job that
+        # Open the store in which information about the mutant killing process will be recorded. If results already
+        # exist that's OK - there may be other processes working on mutant killing, or we may be continuing a job that
         # crashed previously.
-        Path("work").mkdir(exist_ok=True)
-        Path("work/tests").mkdir(exist_ok=True)
-        Path("work/killed_mutants").mkdir(exist_ok=True)
+        result_store: ResultStore = open_result_store(work_dir=Path("work"),
+                                                      result_database=args.result_database,
+                                                      coordinator=args.coordinator)
+
+        # Record the mutants covered, killed, skipped and survived by each test in the kill matrix, which can be queried
+        # without reading every test's summary.
+        kill_matrix: KillMatrixWriter = KillMatrixWriter(default_kill_matrix_dir(Path("work")))
+
+        kill_likelihood_scheduler: Optional[KillLikelihoodScheduler] = None
+        if args.mutant_order == "likelihood":
+            kill_likelihood_scheduler = KillLikelihoodScheduler(mutation_tree=mutation_tree)
+            kill_likelihood_scheduler.record_from_kill_matrix(
+                kill_matrix_dir=default_kill_matrix_dir(Path("work")),
+                cache_dir=default_kill_likelihood_cache_dir(Path("work")))
 
         llvm_test_suite_compile_commands = json.load(open(args.llvm_test_suite_compilation_database, 'r'))
         regression_prefix = str(args.llvm_test_suite_root) + "/SingleSource/Regression"
         unit_tests_prefix = str(args.llvm_test_suite_root) + "/SingleSource/UnitTests"
+
+        # Only the tests in this worker's shard are considered. Tests are identified by their directory names (see
+        # below).
+        tests_in_shard: Set[str] = select_shard(
+            test_names=[test["file"][len(str(args.llvm_test_suite_root) + "/"):].replace("/", "_")
+                        for test in llvm_test_suite_compile_commands
+                        if test["file"].startswith(regression_prefix) or test["file"].startswith(unit_tests_prefix)],
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+            strategy=args.shard_strategy,
+            timing_history_dir=args.timing_history_dir,
+            record_plan=result_store.record_shard_plan)
+
+        def skip_test(test_name: str, test: str, reason: str) -> None:
+            # Records a claimed test that cannot be used as complete, so that it is not resumed.
+            print(f"Skipping test {test} as {reason}.")
+            test_progress.finish_test()
+            result_store.record_test_summary(test_name, skipped_test_summary(test=test, reason=reason))
+
         for test in llvm_test_suite_compile_commands:
             test_filename = test["file"]
             if not test_filename.startswith(regression_prefix) and not test_filename.startswith(unit_tests_prefix):
                 print("Skipping test " + test_filename + " as it is not in a relevant directory")
                 continue
 
-            # We attempt to create a directory that has the same name as this test file, except that we strip off the
-            # LLVM test suite prefix, and change '/' to '_'.
+            # We attempt to claim a test that has the same name as this test file, except that we strip off the LLVM
+            # test suite prefix, and change '/' to '_'.
             test_filename_without_llvm_test_suite_prefix = test_filename[len(str(args.llvm_test_suite_root) + "/"):]
             test_directory_name = test_filename_without_llvm_test_suite_prefix.replace("/", "_")
-
-            # Try to create the directory; if it already exists then skip this test as that means that results for this
-            # test have already been computed or are being computed in parallel.
-            test_output_directory: Path = Path("work/tests/" + test_directory_name)
-            try:
-                test_output_directory.mkdir()
-            except FileExistsError:
-                print("Skipping test " + test_filename + " as a directory for it already exists")
+            if test_directory_name not in tests_in_shard:
                 continue
 
+            # Try to claim the test; if it has already been claimed then skip this test as that means that results for
+            # this test have already been computed or are being computed in parallel. When resuming, a test whose claim
+            # has been abandoned is taken over instead.
+            checkpoint: Optional[Dict] = None
+            if not result_store.claim_test(test_directory_name):
+                if not args.resume or not result_store.reclaim_test(test_directory_name,
+                                                                    stale_after=args.stale_claim_timeout):
+                    print("Skipping test " + test_filename + " as it has already been claimed")
+                    continue
+                checkpoint = result_store.test_checkpoint(test_directory_name) or {}
+                print("Resuming test " + test_filename)
+            test_progress.start_test(test_directory_name, checkpoint)
+
             print("Analysing kills for test " + test_filename)
             print("Remaining unkilled mutants: " + str(len(unkilled_mutants)))
             print("Mutants killed so far:       " + str(len(killed_mutants)))
 
+            temp_dir_for_generated_code: Path = runner_build_directory.for_build()
+            regular_exe_path: Path = Path(temp_dir_for_generated_code, '__exe')
+            dredd_covered_mutants_path: Path = Path(temp_dir_for_generated_code, '__dredd_covered_mutants')
+            mutant_tracking_exe_path: Path = Path(temp_dir_for_generated_code, '__mutant_tracking_exe')
+            calibration_exe_path: Path = Path(temp_dir_for_generated_code, '__calibration_exe')
+
+            test_output_directory: Path = result_store.test_directory(test_directory_name)
+            execution_cache_dir: Path = test_output_directory / "execution_cache" if args.persist_execution_cache \
+                else Path(temp_dir_for_generated_code, '__execution_cache', test_directory_name)
+
             is_c: bool = os.path.splitext(test_filename)[1] == ".c"
 
             compiler_args = []
@@ -127,27 +307,42 @@ def main():
                 args.mutated_compiler_bin_dir) + os.sep + "clang++"] + compiler_args + ['-o', str(regular_exe_path)]
             print("Compile command:")
             print(' '.join(regular_cmd))
-            compile_time_start: float = time.time()
             regular_result: ProcessResult = run_process_with_timeout(cmd=regular_cmd, timeout_seconds=60)
             assert regular_result is not None  # We do not expect regular compilation to time out.
-            compile_time_end: float = time.time()
-            compile_time = compile_time_end - compile_time_start
 
             if regular_result.returncode != 0:
-                print("Skipping test " + test_filename + " as it failed to compile. Details:")
+                print("Compilation failed. Details:")
                 print(' '.join(regular_cmd))
                 print(regular_result.stdout.decode('utf-8'))
                 print(regular_result.stderr.decode('utf-8'))
+                skip_test(test_directory_name, test_filename_without_llvm_test_suite_prefix, "it failed to compile")
                 continue
 
             regular_hash = hash_file(str(regular_exe_path))
 
-            run_time_start: float = time.time()
             regular_execution_result: ProcessResult = run_process_with_timeout(cmd=[str(regular_exe_path)],
                                                                                timeout_seconds=60)
             assert regular_execution_result is not None  # We do not expect regular compilation to time out.
-            run_time_end: float = time.time()
-            run_time = run_time_end - run_time_start
+
+            # Measure the test's compile and run times repeatedly, to calibrate the timeouts used for its mutants. The
+            # calibration compilations use a separate output file, so that the executable that was hashed is left
+            # untouched.
+            compile_time: Optional[float] = timeout_calibration.calibrate(
+                test_name=test_directory_name,
+                kind="compile",
+                cmds=[regular_cmd[:-1] + [str(calibration_exe_path)]],
+                first_sample=regular_result.cpu_time,
+                timeout_seconds=60)
+            run_time: Optional[float] = timeout_calibration.calibrate(
+                test_name=test_directory_name,
+                kind="run",
+                cmds=[[str(regular_exe_path)]],
+                first_sample=regular_execution_result.cpu_time,
+                timeout_seconds=60)
+            if compile_time is None or run_time is None:
+                skip_test(test_directory_name, test_filename_without_llvm_test_suite_prefix,
+                          "it timed out during timeout calibration")
+                continue
 
             tracking_environment: dict[AnyStr, AnyStr] = os.environ.copy()
             tracking_environment["DREDD_MUTANT_TRACKING_FILE"] = str(dredd_covered_mutants_path)
@@ -160,41 +355,84 @@ def main():
                                      env=tracking_environment)
 
             # Sanity check: confirm that the mutant tracking exe is no different to the regular exe.
-            assert regular_hash == hash_file(str(mutant_tracking_exe_path))
+            assert files_identical(str(regular_exe_path), str(mutant_tracking_exe_path))
 
             # Load file contents into a list. We go from list to set to list to eliminate duplicates.
             covered_by_this_test: List[int] = list(set([int(line.strip()) for line in
                                                         open(dredd_covered_mutants_path, 'r').readlines()]))
             covered_by_this_test.sort()
 
-            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test if m not in killed_mutants])
+            # Catch up on kills recorded by other workers.
+            killed_elsewhere: Set[int] = live_kill_set.killed_mutants() - killed_mutants
+            killed_mutants.update(killed_elsewhere)
+            unkilled_mutants.difference_update(killed_elsewhere)
+
+            # When resuming a test, the mutants decided before it was interrupted are not tried again.
+            killed_by_this_test: List[int] = list(checkpoint.get("killed_mutants", [])) if checkpoint is not None \
+                else []
+            covered_but_not_killed_by_this_test: List[int] = list(checkpoint.get("survived_mutants", [])) \
+                if checkpoint is not None else []
+            decided_mutants: Set[int] = set(killed_by_this_test + covered_but_not_killed_by_this_test)
+
+            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test
+                                                           if m not in killed_mutants and m not in decided_mutants])
+            if kill_likelihood_scheduler is not None:
+                candidate_mutants_for_this_test = kill_likelihood_scheduler.prioritise(candidate_mutants_for_this_test)
             print("Number of mutants to try: " + str(len(candidate_mutants_for_this_test)))
 
-            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test if m in killed_mutants])
-            killed_by_this_test: List[int] = []
-            covered_but_not_killed_by_this_test: List[int] = []
-
-            for mutant in candidate_mutants_for_this_test:
-                mutant_path = Path("work/killed_mutants/" + str(mutant))
-                if mutant_path.exists():
-                    print("Skipping mutant " + str(mutant) + " as it is noted as already killed.")
-                    unkilled_mutants.remove(mutant)
-                    killed_mutants.add(mutant)
-                    already_killed_by_other_tests.append(mutant)
-                    continue
-                print("Trying mutant " + str(mutant))
-                mutant_result = run_test_with_mutants(mutants=[mutant],
-                                                      compiler_path=str(
-                                                          args.mutated_compiler_bin_dir) + os.sep + exe_name,
-                                                      compiler_args=compiler_args,
-                                                      compile_time=compile_time,
-                                                      run_time=run_time,
-                                                      binary_hash_non_mutated=regular_hash,
-                                                      execution_result_non_mutated=regular_execution_result,
-                                                      mutant_exe_path=mutant_exe_path)
+            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test
+                                                         if m in killed_mutants and m not in decided_mutants])
+
+            def mutant_groups_to_try() -> Iterator[List[int]]:
+                # Groups of mutants are requested lazily by the evaluation pool, so the check for whether a mutant has
+                # already been killed elsewhere is made as late as possible.
+                # Mutants that are leased to another worker, which is evaluating them against another test, are deferred
+                # until the other mutants for this test have been tried, by which time they may have been killed.
+                deferred_mutants: List[int] = []
+                for first_pass in [True, False]:
+                    for candidate_group in pack_compatible_mutants(
+                            mutants=candidate_mutants_for_this_test if first_pass else deferred_mutants,
+                            mutation_tree=mutation_tree,
+                            max_group_size=args.group_size):
+                        group_to_try: List[int] = []
+                        for candidate_mutant in candidate_group:
+                            if live_kill_set.is_killed(candidate_mutant):
+                                print("Skipping mutant " + str(candidate_mutant) + " as it is noted as already killed.")
+                                unkilled_mutants.remove(candidate_mutant)
+                                killed_mutants.add(candidate_mutant)
+                                already_killed_by_other_tests.append(candidate_mutant)
+                                continue
+                            group_to_try.append(candidate_mutant)
+                        if first_pass and group_to_try:
+                            leased_mutants: List[int] = result_store.lease_mutants(mutants=group_to_try,
+                                                                                   duration=MUTANT_LEASE_DURATION)
+                            deferred_mutants.extend([m for m in group_to_try if m not in leased_mutants])
+                            group_to_try = leased_mutants
+                        test_progress.hold(group_to_try)
+                        if group_to_try:
+                            print("Trying mutants " + ", ".join([str(m) for m in group_to_try]))
+                            yield group_to_try
+
+            mutant_test_configuration = MutantTestConfiguration(
+                compiler_path=str(args.mutated_compiler_bin_dir) + os.sep + exe_name,
+                compiler_args=compiler_args,
+                compile_time=compile_time,
+                run_time=run_time,
+                binary_hash_non_mutated=regular_hash,
+                binary_path_non_mutated=str(regular_exe_path),
+                execution_result_non_mutated=regular_execution_result,
+                execution_cache_dir=str(execution_cache_dir))
+
+            for mutant, mutant_result in mutant_evaluation_pool.evaluate(mutant_groups=mutant_groups_to_try(),
+                                                                         configuration=mutant_test_configuration):
                 print("Mutant result: " + str(mutant_result))
-                if mutant_result == KillStatus.SURVIVED_IDENTICAL\
-                        or mutant_result == KillStatus.SURVIVED_BINARY_DIFFERENCE:
+                survived: bool = mutant_result == KillStatus.SURVIVED_IDENTICAL \
+                    or mutant_result == KillStatus.SURVIVED_BINARY_DIFFERENCE
+                if kill_likelihood_scheduler is not None:
+                    kill_likelihood_scheduler.record(mutant, killed=not survived)
+                test_progress.record(mutant, killed=not survived)
+                if survived:
+                    result_store.release_mutants([mutant])
                     covered_but_not_killed_by_this_test.append(mutant)
                     continue
 
@@ -202,15 +440,12 @@ def main():
                 killed_mutants.add(mutant)
                 killed_by_this_test.append(mutant)
                 print(f"Kill! Mutants killed so far: {len(killed_mutants)}")
-                try:
-                    mutant_path.mkdir()
-                    print("Writing kill info to file.")
-                    with open(mutant_path / "kill_info.json", "w") as outfile:
-                        json.dump({"killing_test": test_filename_without_llvm_test_suite_prefix,
-                                   "kill_type": str(mutant_result)}, outfile)
-                except FileExistsError:
+                print("Recording kill info.")
+                if not result_store.record_kill(mutant, {"killing_test": test_filename_without_llvm_test_suite_prefix,
+                                                         "kill_type": str(mutant_result)}):
                     print(f"Mutant {mutant} was independently discovered to be killed.")
-                    continue
+                # Let the live kill set know at once, rather than at its next scan of the result store.
+                live_kill_set.add(mutant)
 
             # Now that analysis for this test case has completed, write summary information to its directory
             all_considered_mutants = killed_by_this_test\
@@ -219,15 +454,23 @@ def main():
             all_considered_mutants.sort()
             # We should have put every mutant into some bucket or other
             assert covered_by_this_test == all_considered_mutants
+            test_progress.finish_test()
             killed_by_this_test.sort()
             covered_but_not_killed_by_this_test.sort()
             already_killed_by_other_tests.sort()
-            with open(test_output_directory / "kill_summary.json", "w") as outfile:
-                json.dump({"test": test_filename_without_llvm_test_suite_prefix,
-                           "covered_mutants": covered_by_this_test,
-                           "killed_mutants": killed_by_this_test,
-                           "skipped_mutants": already_killed_by_other_tests,
-                           "survived_mutants": covered_but_not_killed_by_this_test}, outfile)
+            result_store.record_test_summary(test_directory_name,
+                                             {"test": test_filename_without_llvm_test_suite_prefix,
+                                              "covered_mutants": covered_by_this_test,
+                                              "killed_mutants": killed_by_this_test,
+                                              "skipped_mutants": already_killed_by_other_tests,
+                                              "survived_mutants": covered_but_not_killed_by_this_test})
+            kill_matrix.append(test_directory_name,
+                               covered=covered_by_this_test,
+                               killed=killed_by_this_test,
+                               skipped=already_killed_by_other_tests,
+                               survived=covered_but_not_killed_by_this_test)
+            if not args.persist_execution_cache:
+                shutil.rmtree(execution_cache_dir, ignore_errors=True)
 
 
 if __name__ == '__main__':
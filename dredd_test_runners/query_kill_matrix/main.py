@@ -0,0 +1,104 @@
+import argparse
+import json
+import sys
+
+from dredd_test_runners.common.kill_matrix import COLUMNS, KillMatrix, KillMatrixWriter, default_kill_matrix_dir
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+
+from pathlib import Path
+from typing import Dict, List
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("work_dir",
+                        help="Directory containing test results.",
+                        type=Path)
+    parser.add_argument("--kill_matrix_dir",
+                        help="Directory containing the kill matrix. Defaults to 'kill_matrix' in the working "
+                             "directory.",
+                        type=Path)
+    parser.add_argument("--import_results",
+                        action="store_true",
+                        help="Add to the kill matrix the tests whose summaries have been recorded in the result store, "
+                             "but that are not yet in the kill matrix, e.g. tests completed before the kill matrix "
+                             "was introduced.")
+    parser.add_argument("--result_database",
+                        help="SQLite database from which to import results, if results were not recorded as files "
+                             "under the working directory.",
+                        type=Path)
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--tests_covering",
+                       help="List the tests that cover the given mutant.",
+                       type=int)
+    query.add_argument("--tests_killing",
+                       help="List the tests that killed the given mutant.",
+                       type=int)
+    query.add_argument("--mutant_outcomes",
+                       help="Give the outcome of the given mutant in each test that covers it.",
+                       type=int)
+    query.add_argument("--covered_but_never_killed",
+                       action="store_true",
+                       help="List the mutants that are covered by some test but killed by none.")
+    query.add_argument("--union",
+                       choices=COLUMNS,
+                       help="List the mutants that some test covered, killed, skipped or saw survive.")
+    query.add_argument("--intersection",
+                       choices=COLUMNS,
+                       help="List the mutants that every test covered, killed, skipped or saw survive.")
+    parser.add_argument("--tests",
+                        nargs='+',
+                        help="Restrict --union and --intersection to these tests.")
+    args = parser.parse_args()
+    kill_matrix_dir: Path = args.kill_matrix_dir if args.kill_matrix_dir is not None \
+        else default_kill_matrix_dir(args.work_dir)
+
+    kill_matrix: KillMatrix = KillMatrix(kill_matrix_dir)
+    if args.import_results:
+        if not args.work_dir.is_dir():
+            print(f"Error: {str(args.work_dir)} is not a working directory.")
+            sys.exit(1)
+        result_store: ResultStore = open_result_store(work_dir=args.work_dir, result_database=args.result_database)
+        writer: KillMatrixWriter = KillMatrixWriter(kill_matrix_dir)
+        num_imported: int = 0
+        for test_name, kill_summary in result_store.test_summaries():
+            if test_name in kill_matrix.rows:
+                continue
+            writer.append(test_name,
+                          covered=kill_summary["covered_mutants"],
+                          killed=kill_summary["killed_mutants"],
+                          skipped=kill_summary["skipped_mutants"],
+                          survived=kill_summary["survived_mutants"])
+            num_imported += 1
+        writer.close()
+        result_store.close()
+        print(f"Imported {num_imported} tests into {str(kill_matrix_dir)}.", file=sys.stderr)
+        kill_matrix.refresh()
+
+    if args.tests is not None:
+        unknown_tests: List[str] = [test_name for test_name in args.tests if test_name not in kill_matrix.rows]
+        if unknown_tests:
+            print(f"Error: the kill matrix has no results for {', '.join(unknown_tests)}.")
+            sys.exit(1)
+
+    result: Dict
+    if args.tests_covering is not None:
+        result = {"mutant": args.tests_covering, "tests": kill_matrix.tests_with(args.tests_covering, "covered")}
+    elif args.tests_killing is not None:
+        result = {"mutant": args.tests_killing, "tests": kill_matrix.tests_with(args.tests_killing, "killed")}
+    elif args.mutant_outcomes is not None:
+        result = {"mutant": args.mutant_outcomes, "outcomes": kill_matrix.mutant_outcomes(args.mutant_outcomes)}
+    elif args.covered_but_never_killed:
+        result = {"mutants": list(kill_matrix.covered_but_never_killed())}
+    elif args.union is not None:
+        result = {"mutants": list(kill_matrix.union(args.union, args.tests))}
+    elif args.intersection is not None:
+        result = {"mutants": list(kill_matrix.intersection(args.intersection, args.tests))}
+    else:
+        result = {"tests": len(kill_matrix.rows)}
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
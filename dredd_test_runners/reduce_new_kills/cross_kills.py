@@ -0,0 +1,140 @@
+import json
+import shutil
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dredd_test_runners.common.constants import DEFAULT_COMPILATION_TIMEOUT, DEFAULT_RUNTIME_TIMEOUT
+from dredd_test_runners.common.group_testing import pack_compatible_mutants
+from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.common.mutant_evaluation_pool import MutantEvaluationPool
+from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+from dredd_test_runners.common.run_test_with_mutants import KillStatus, MutantTestConfiguration
+from dredd_test_runners.common.scratch_space import ScratchSpace
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
+
+# The kills that make a reduced program an actionable test case for a mutant, as for the kills that are reduced in the
+# first place: the mutated compiler produces a program that runs, but that deviates from the expected result.
+ACTIONABLE_KILL_STATUSES: List[KillStatus] = [KillStatus.KILL_DIFFERENT_STDOUT,
+                                              KillStatus.KILL_DIFFERENT_EXIT_CODES,
+                                              KillStatus.KILL_RUNTIME_TIMEOUT]
+
+
+class CrossKillChecker:
+    # Evaluates a reduced program against other mutants, so that mutants that it also kills need not be reduced
+    # separately. The program is evaluated in the same way as the runners evaluate a test: it is compiled and run
+    # without mutation, to calibrate timeouts, and then compiled with each mutant enabled. If a mutation tree is given,
+    # mutants are evaluated in groups of compatible mutants (see group_testing.py), since most mutants are not even
+    # reached by a small reduced program.
+    def __init__(self,
+                 mutated_compiler_executable: Path,
+                 csmith_root: Path,
+                 timeout_calibration: TimeoutCalibration,
+                 scratch_space: ScratchSpace,
+                 mutation_tree: Optional[MutationTree] = None,
+                 group_size: int = 1):
+        self.mutated_compiler_executable: Path = mutated_compiler_executable
+        self.csmith_root: Path = csmith_root
+        self.timeout_calibration: TimeoutCalibration = timeout_calibration
+        self.scratch_space: ScratchSpace = scratch_space
+        self.mutation_tree: Optional[MutationTree] = mutation_tree
+        self.group_size: int = group_size if mutation_tree is not None else 1
+
+    def check(self, reduction_dir: Path, mutants: List[int], jobs: int) -> Dict[int, KillStatus]:
+        # Returns the mutants among those given that the program 'prog.c' in the reduction directory kills in an
+        # actionable way, using 'jobs' processes.
+        work_dir: Path = self.scratch_space.allocate(prefix='__cross_kills_')
+        try:
+            return self._check(reduction_dir=reduction_dir, mutants=mutants, jobs=jobs, work_dir=work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _check(self, reduction_dir: Path, mutants: List[int], jobs: int, work_dir: Path) -> Dict[int, KillStatus]:
+        compiler_args: List[str] = ["-O3",
+                                    "-I",
+                                    str(self.csmith_root / "runtime"),
+                                    "-I",
+                                    str(self.csmith_root / "build" / "runtime"),
+                                    str((reduction_dir / 'prog.c').resolve())]
+        regular_exe: Path = work_dir / '__regular.exe'
+        regular_compile_cmd: List[str] = [str(self.mutated_compiler_executable)] + compiler_args \
+            + ["-o", str(regular_exe)]
+        regular_compile_result: Optional[ProcessResult] = run_process_with_timeout(
+            cmd=regular_compile_cmd, timeout_seconds=DEFAULT_COMPILATION_TIMEOUT)
+        if regular_compile_result is None or regular_compile_result.returncode != 0:
+            print(f"Not checking {str(reduction_dir / 'prog.c')} for further kills, as it does not compile.")
+            return {}
+        regular_execution_result: Optional[ProcessResult] = run_process_with_timeout(
+            cmd=[str(regular_exe)], timeout_seconds=DEFAULT_RUNTIME_TIMEOUT)
+        if regular_execution_result is None or regular_execution_result.returncode != 0:
+            print(f"Not checking {str(reduction_dir / 'prog.c')} for further kills, as it does not run successfully.")
+            return {}
+
+        # Each reduced program is only evaluated once, so there is no point in recording its timings in a history.
+        test_name: str = f"reduction_{reduction_dir.name}"
+        compile_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=test_name,
+            kind="compile",
+            cmds=[[str(self.mutated_compiler_executable)] + compiler_args
+                  + ["-o", str(work_dir / '__calibration.exe')]],
+            first_sample=regular_compile_result.cpu_time,
+            timeout_seconds=DEFAULT_COMPILATION_TIMEOUT)
+        run_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=test_name,
+            kind="run",
+            cmds=[[str(regular_exe)]],
+            first_sample=regular_execution_result.cpu_time,
+            timeout_seconds=DEFAULT_RUNTIME_TIMEOUT)
+        if compile_time is None or run_time is None:
+            print(f"Not checking {str(reduction_dir / 'prog.c')} for further kills, as it timed out during timeout "
+                  f"calibration.")
+            return {}
+
+        configuration: MutantTestConfiguration = MutantTestConfiguration(
+            compiler_path=str(self.mutated_compiler_executable),
+            compiler_args=compiler_args,
+            compile_time=compile_time,
+            run_time=run_time,
+            binary_hash_non_mutated=hash_file(str(regular_exe)),
+            binary_path_non_mutated=str(regular_exe),
+            execution_result_non_mutated=regular_execution_result)
+        if self.mutation_tree is not None:
+            mutant_groups: List[List[int]] = pack_compatible_mutants(mutants=mutants,
+                                                                     mutation_tree=self.mutation_tree,
+                                                                     max_group_size=self.group_size)
+        else:
+            mutant_groups = [[mutant] for mutant in mutants]
+        kills: Dict[int, KillStatus] = {}
+        with MutantEvaluationPool(jobs=jobs, scratch_space=self.scratch_space) as mutant_evaluation_pool:
+            for mutant, mutant_result in mutant_evaluation_pool.evaluate(mutant_groups=mutant_groups,
+                                                                         configuration=configuration):
+                if mutant_result in ACTIONABLE_KILL_STATUSES:
+                    kills[mutant] = mutant_result
+        return kills
+
+
+def write_cross_kills(reduction_dir: Path, mutant: int, kills: Dict[int, KillStatus]) -> None:
+    with open(reduction_dir / 'cross_kills.json', 'w') as outfile:
+        json.dump({"mutant": mutant,
+                   "cross_killed_mutants": {str(killed): str(kill_status)
+                                            for killed, kill_status in sorted(kills.items())}},
+                  outfile)
+
+
+def read_reduced_program_kills(reductions_dir: Path) -> Dict[str, List[int]]:
+    # Maps each reduced program (relative to the reductions directory) whose cross-kill check is complete to the mutants
+    # that it kills: the mutant for which it was reduced, and those found by the check.
+    reduced_program_kills: Dict[str, List[int]] = {}
+    for cross_kills_file in sorted(reductions_dir.glob('*/cross_kills.json')):
+        with open(cross_kills_file, 'r') as infile:
+            cross_kills: Dict = json.load(infile)
+        reduced_program_kills[f"{cross_kills_file.parent.name}/prog.c"] = sorted(
+            [cross_kills["mutant"]] + [int(killed) for killed in cross_kills["cross_killed_mutants"].keys()])
+    return reduced_program_kills
+
+
+def write_reduced_program_kills(reductions_dir: Path) -> None:
+    # Writes 'reduced_program_kills.json' (see read_reduced_program_kills). Reductions from previous runs are included.
+    with open(reductions_dir / 'reduced_program_kills.json', 'w') as outfile:
+        json.dump(read_reduced_program_kills(reductions_dir), outfile, indent=2)
@@ -1,20 +1,36 @@
 import argparse
 import jinja2
-import json
 import os
 import shutil
 import stat
 import sys
 
-from dredd_test_runners.common.constants import (DEFAULT_RUNTIME_TIMEOUT,
+from dredd_test_runners.common.constants import (DEFAULT_CALIBRATION_RUNS,
+                                                 DEFAULT_RUNTIME_TIMEOUT,
+                                                 DEFAULT_TIMEOUT_QUANTILE,
                                                  MIN_TIMEOUT_FOR_MUTANT_COMPILATION,
                                                  TIMEOUT_MULTIPLIER_FOR_MUTANT_COMPILATION,
                                                  MIN_TIMEOUT_FOR_MUTANT_EXECUTION,
-                                                 TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION)
-from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+                                                 TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION,
+                                                 WALL_CLOCK_TIMEOUT_MULTIPLIER)
+from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.mutation_tree_index import load_mutation_tree
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+from dredd_test_runners.common.run_test_with_mutants import KillStatus
+from dredd_test_runners.common.scratch_space import ScratchSpace
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
+from dredd_test_runners.reduce_new_kills.cross_kills import (CrossKillChecker,
+                                                             read_reduced_program_kills,
+                                                             write_cross_kills,
+                                                             write_reduced_program_kills)
+from dredd_test_runners.reduce_new_kills.reduction_scheduler import (DEFAULT_CORES_PER_REDUCTION,
+                                                                    DEFAULT_REDUCTION_TIMEOUT,
+                                                                    Reduction,
+                                                                    ReductionScheduler,
+                                                                    ReductionStats)
 
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 
 def main():
@@ -29,7 +45,64 @@ def main():
     parser.add_argument("csmith_root",
                         help="Path to Csmith checkout, built in 'build' directory under this path.",
                         type=Path)
+    parser.add_argument("--calibration_runs",
+                        default=DEFAULT_CALIBRATION_RUNS,
+                        help="Number of times the interestingness test compiles and runs each candidate program "
+                             "without mutation, to calibrate the timeouts used for the mutated compiler and program. "
+                             "These timeouts are in CPU time, and are based on a quantile of the CPU times observed.",
+                        type=int)
+    parser.add_argument("--timeout_quantile",
+                        default=DEFAULT_TIMEOUT_QUANTILE,
+                        help="Quantile of the CPU times observed by the interestingness test on which timeouts are "
+                             "based.",
+                        type=float)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which results were recorded, if results were not recorded as files "
+                             "under the working directory.",
+                        type=Path)
+    parser.add_argument("--cores",
+                        default=os.cpu_count(),
+                        help="Number of cores that the reductions, together, may use.",
+                        type=int)
+    parser.add_argument("--cores_per_reduction",
+                        default=DEFAULT_CORES_PER_REDUCTION,
+                        help="Number of cores given to each reduction (via creduce's --n option), and so the number of "
+                             "interestingness tests that each reduction runs at once. Reductions are run concurrently "
+                             "as long as the budget of cores allows; reductions started when there are too few left "
+                             "to fill the budget are given more cores.",
+                        type=int)
+    parser.add_argument("--reduction_timeout",
+                        default=DEFAULT_REDUCTION_TIMEOUT,
+                        help="Time in seconds after which a reduction is stopped.",
+                        type=float)
+    parser.add_argument("--no_cross_kills",
+                        action="store_true",
+                        help="Do not check each reduced program against the mutants whose reductions have not yet "
+                             "been started. By default, a mutant that a reduced program also kills is not reduced "
+                             "separately.")
+    parser.add_argument("--mutation_info_file",
+                        help="Mutation info file for the mutated compiler. If given, cross-kill checks evaluate "
+                             "mutually compatible mutants together, in groups of up to --group_size mutants.",
+                        type=Path)
+    parser.add_argument("--mutation_tree_cache_dir",
+                        help="Directory in which to cache a binary index of the mutation tree. Defaults to "
+                             "'mutation-tree-cache' alongside the mutation info file.",
+                        type=Path)
+    parser.add_argument("--group_size",
+                        default=1,
+                        help="Maximum number of mutually compatible mutants to enable in a single compilation during "
+                             "cross-kill checks. Requires --mutation_info_file.",
+                        type=int)
     args = parser.parse_args()
+    if args.cores < 1 or args.cores_per_reduction < 1:
+        print("Error: --cores and --cores_per_reduction must be at least 1.")
+        sys.exit(1)
+    if args.group_size < 1:
+        print("Error: --group_size must be at least 1.")
+        sys.exit(1)
+    if args.group_size > 1 and args.mutation_info_file is None:
+        print("Error: --group_size requires --mutation_info_file.")
+        sys.exit(1)
     work_dir: Path = args.work_dir
     if not work_dir.exists() or not work_dir.is_dir():
         print(f"Error: {str(work_dir)} is not a working directory.")
@@ -38,10 +111,16 @@ def main():
     if not tests_dir.exists() or not tests_dir.is_dir():
         print(f"Error: {str(tests_dir)} does not exist.")
         sys.exit(1)
-    killed_mutants_dir = work_dir / "killed_mutants"
-    if not killed_mutants_dir.exists() or not killed_mutants_dir.is_dir():
-        print(f"Error: {str(killed_mutants_dir)} does not exist.")
-        sys.exit(1)
+    if args.result_database is not None:
+        if not args.result_database.exists():
+            print(f"Error: {str(args.result_database)} does not exist.")
+            sys.exit(1)
+    else:
+        killed_mutants_dir = work_dir / "killed_mutants"
+        if not killed_mutants_dir.exists() or not killed_mutants_dir.is_dir():
+            print(f"Error: {str(killed_mutants_dir)} does not exist.")
+            sys.exit(1)
+    result_store: ResultStore = open_result_store(work_dir=work_dir, result_database=args.result_database)
 
     killed_mutant_to_test_info: Dict[int, Dict] = {}
 
@@ -49,17 +128,11 @@ def main():
     # actionable. The reason for determining all such tests upfront is that when we reduce one
     # such test, we can quickly see whether it kills any of the mutants killed by the other
     # tests, avoiding the need to reduce those tests too if so.
-    for test in tests_dir.glob('*'):
-        if not test.is_dir():
-            continue
-        if not test.name.startswith("csmith"):
-            continue
-        kill_summary: Path = test / "kill_summary.json"
-        if not kill_summary.exists():
+    for test_name, kill_summary_json in result_store.test_summaries():
+        if not test_name.startswith("csmith"):
             continue
-        kill_summary_json: Dict = json.load(open(kill_summary, 'r'))
         for mutant in kill_summary_json["killed_mutants"]:
-            mutant_summary = json.load(open(killed_mutants_dir / str(mutant) / "kill_info.json", 'r'))
+            mutant_summary = result_store.kill_info(mutant)
             kill_type: str = mutant_summary['kill_type']
             if (kill_type == 'KillStatus.KILL_DIFFERENT_STDOUT'
                     or kill_type == 'KillStatus.KILL_RUNTIME_TIMEOUT'
@@ -67,58 +140,107 @@ def main():
                 # This is an actionable kill: the mutated compiler produces a compilable program
                 # that runs, but that deviates from the expected result at runtime.
                 killed_mutant_to_test_info[mutant] = mutant_summary
-    
-    reduction_queue: List[int] = list(killed_mutant_to_test_info.keys())
-    reduction_queue.sort()
 
     reductions_dir: Path = work_dir / "reductions"
-    if not work_dir.exists():
-        os.makedirs(reductions_dir)
-        
-    while reduction_queue:
-        mutant_to_reduce = reduction_queue.pop(0)
-        current_reduction_dir: Path = reductions_dir / str(mutant_to_reduce)
-        if current_reduction_dir.exists():
-            print(f"Skipping reduction for mutant {mutant_to_reduce} as {current_reduction_dir} already exists.")
-            continue
-        os.makedirs(current_reduction_dir)
+    reductions_dir.mkdir(exist_ok=True)
+
+    interestingness_test_template = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(
+            searchpath=os.path.dirname(os.path.realpath(__file__)))).get_template("interesting.py.template")
 
-        print(f"Preparing to reduce mutant {mutant_to_reduce}. Details: {killed_mutant_to_test_info[mutant_to_reduce]}")
+    def prepare_reduction(reduction: Reduction) -> Optional[Path]:
+        current_reduction_dir: Path = reductions_dir / str(reduction.mutant)
+        try:
+            current_reduction_dir.mkdir()
+        except FileExistsError:
+            print(f"Skipping reduction for mutant {reduction.mutant} as {current_reduction_dir} already exists.")
+            return None
+
+        print(f"Preparing to reduce mutant {reduction.mutant}. Details: {reduction.kill_info}")
 
-        interestingness_test_template = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(
-                searchpath=os.path.dirname(os.path.realpath(__file__)))).get_template("interesting.py.template")
         open(current_reduction_dir / 'interesting.py', 'w').write(interestingness_test_template.render(
             program_to_check="prog.c",
             mutated_compiler_executable=args.mutated_compiler_executable,
             csmith_root=args.csmith_root,
-            mutation_ids=str(mutant_to_reduce),
+            mutation_ids=str(reduction.mutant),
             min_timeout_for_mutant_compilation=MIN_TIMEOUT_FOR_MUTANT_COMPILATION,
             timeout_multiplier_for_mutant_compilation=TIMEOUT_MULTIPLIER_FOR_MUTANT_COMPILATION,
             min_timeout_for_mutant_execution=MIN_TIMEOUT_FOR_MUTANT_EXECUTION,
             timeout_multiplier_for_mutant_execution=TIMEOUT_MULTIPLIER_FOR_MUTANT_EXECUTION,
-            default_runtime_timeout=DEFAULT_RUNTIME_TIMEOUT
+            default_runtime_timeout=DEFAULT_RUNTIME_TIMEOUT,
+            calibration_runs=args.calibration_runs,
+            timeout_quantile=args.timeout_quantile,
+            wall_clock_timeout_multiplier=WALL_CLOCK_TIMEOUT_MULTIPLIER
         ))
 
         # Make the interestingness test executable.
         st = os.stat(current_reduction_dir / 'interesting.py')
         os.chmod(current_reduction_dir / 'interesting.py', st.st_mode | stat.S_IEXEC)
-        shutil.copy(src=tests_dir / killed_mutant_to_test_info[mutant_to_reduce]['killing_test'] / 'prog.c',
-                    dst=current_reduction_dir / 'prog.c')
-
-        # 12 hour timeout
-        maybe_result: Optional[ProcessResult] = run_process_with_timeout(
-            cmd=['creduce', 'interesting.py', 'prog.c'],
-            timeout_seconds=43200,
-            cwd=current_reduction_dir)
-        if maybe_result is None:
-            print(f"Reduction of {mutant_to_reduce} timed out.")
-
-        # TODO: Check for additional kills for the reduced program
-        # TODO: Emit a summary of the mutants that the reduced program kills
-        # TODO: Look into potential for automated cleanup of reduced program, e.g. to use standard data types or to
-        #       be better formatted.
+        shutil.copy(src=reduction.program, dst=current_reduction_dir / 'prog.c')
+        return current_reduction_dir
+
+    # A mutant that a program reduced by a previous run was found to kill needs no reduction of its own.
+    killed_by_reduced_programs: Set[int] = set()
+    for killed in read_reduced_program_kills(reductions_dir).values():
+        killed_by_reduced_programs.update(killed)
+
+    reductions: List[Reduction] = []
+    for mutant, kill_info in sorted(killed_mutant_to_test_info.items()):
+        if mutant in killed_by_reduced_programs:
+            print(f"Skipping reduction for mutant {mutant} as a previously reduced program already kills it.")
+            continue
+        program: Path = tests_dir / kill_info['killing_test'] / 'prog.c'
+        if not program.exists():
+            print(f"Skipping reduction for mutant {mutant} as {program} does not exist.")
+            continue
+        reductions.append(Reduction(mutant=mutant, kill_info=kill_info, program=program))
+
+    mutation_tree: Optional[MutationTree] = None
+    if not args.no_cross_kills and args.mutation_info_file is not None:
+        print("Loading the mutation tree...")
+        mutation_tree = load_mutation_tree(mutation_info_file=args.mutation_info_file,
+                                           cache_dir=args.mutation_tree_cache_dir)
+        print("Loaded!")
+
+    with ScratchSpace() as scratch_space:
+        cross_kill_checker: CrossKillChecker = CrossKillChecker(
+            mutated_compiler_executable=args.mutated_compiler_executable,
+            csmith_root=args.csmith_root,
+            timeout_calibration=TimeoutCalibration(runs=args.calibration_runs,
+                                                   timeout_quantile=args.timeout_quantile),
+            scratch_space=scratch_space,
+            mutation_tree=mutation_tree,
+            group_size=args.group_size)
+
+        def check_cross_kills(reduction: Reduction,
+                              reduction_dir: Path,
+                              mutants: List[int],
+                              cores: int) -> Dict[int, KillStatus]:
+            kills: Dict[int, KillStatus] = cross_kill_checker.check(reduction_dir=reduction_dir,
+                                                                     mutants=mutants,
+                                                                     jobs=cores) if mutants else {}
+            write_cross_kills(reduction_dir=reduction_dir, mutant=reduction.mutant, kills=kills)
+            return kills
+
+        scheduler: ReductionScheduler = ReductionScheduler(
+            cores=args.cores,
+            cores_per_reduction=args.cores_per_reduction,
+            timeout=args.reduction_timeout,
+            prepare=prepare_reduction,
+            check_cross_kills=None if args.no_cross_kills else check_cross_kills)
+        finished: List[ReductionStats] = scheduler.run(reductions)
+    if finished:
+        print(f"Completed {len(finished)} reductions ({sum(stats.timed_out for stats in finished)} timed out), "
+              f"using {sum(stats.wall_time * stats.cores for stats in finished) / 3600:.1f} core-hours; "
+              f"on average {100 * sum(stats.size_reduction() for stats in finished) / len(finished):.1f}% of each "
+              f"program was removed.")
+        if not args.no_cross_kills:
+            print(f"The reduced programs also killed {sum(len(stats.cross_kills) for stats in finished)} mutants "
+                  f"whose reductions were therefore skipped.")
+    write_reduced_program_kills(reductions_dir)
 
+    # TODO: Look into potential for automated cleanup of reduced program, e.g. to use standard data types or to
+    #       be better formatted.
 
 if __name__ == '__main__':
     main()
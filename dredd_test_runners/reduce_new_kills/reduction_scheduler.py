@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import json
+import time
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout_async
+from dredd_test_runners.common.run_test_with_mutants import KillStatus
+
+# The actionable kill types, in the order in which their reductions are scheduled. Kills due to differing output are
+# reduced first, since they make the most useful test cases. Runtime timeouts come last: each run of their
+# interestingness test must wait for the mutated program to time out, so they are the slowest to reduce.
+KILL_TYPE_PRIORITY: List[str] = ['KillStatus.KILL_DIFFERENT_STDOUT',
+                                 'KillStatus.KILL_DIFFERENT_EXIT_CODES',
+                                 'KillStatus.KILL_RUNTIME_TIMEOUT']
+
+DEFAULT_REDUCTION_TIMEOUT: float = 12 * 60 * 60
+DEFAULT_CORES_PER_REDUCTION: int = 4
+
+# Checks a reduced program for kills of other mutants (see ReductionScheduler).
+CrossKillCheck = Callable[['Reduction', Path, List[int], int], Dict[int, KillStatus]]
+
+
+class Reduction:
+    # A killed mutant whose killing program is to be reduced. Among reductions of the same kill type, those of smaller
+    # programs are scheduled first, since they finish sooner.
+    def __init__(self, mutant: int, kill_info: Dict, program: Path):
+        self.mutant: int = mutant
+        self.kill_info: Dict = kill_info
+        self.program: Path = program
+        self.program_size: int = program.stat().st_size
+
+    def priority(self) -> Tuple[int, int, int]:
+        kill_type: str = self.kill_info['kill_type']
+        return (KILL_TYPE_PRIORITY.index(kill_type) if kill_type in KILL_TYPE_PRIORITY else len(KILL_TYPE_PRIORITY),
+                self.program_size,
+                self.mutant)
+
+
+class ReductionStats:
+    # What a reduction cost and achieved, recorded so that the core budget can be tuned. 'cpu_time' covers creduce and
+    # the interestingness tests it ran; comparing it with 'wall_time' times 'cores' shows how well the cores given to
+    # the reduction were used.
+    def __init__(self,
+                 reduction: Reduction,
+                 cores: int,
+                 wall_time: float,
+                 cpu_time: Optional[float],
+                 timed_out: bool,
+                 reduced_size: int,
+                 cross_kills: Dict[int, KillStatus],
+                 cross_kill_check_time: float):
+        self.mutant: int = reduction.mutant
+        self.killing_test: str = reduction.kill_info['killing_test']
+        self.kill_type: str = reduction.kill_info['kill_type']
+        self.cores: int = cores
+        self.wall_time: float = wall_time
+        self.cpu_time: Optional[float] = cpu_time
+        self.timed_out: bool = timed_out
+        self.original_size: int = reduction.program_size
+        self.reduced_size: int = reduced_size
+        # The queued mutants that the reduced program was found to kill too, and the time taken to find them.
+        self.cross_kills: Dict[int, KillStatus] = cross_kills
+        self.cross_kill_check_time: float = cross_kill_check_time
+
+    def size_reduction(self) -> float:
+        # The fraction of the original program that was removed.
+        return 1.0 - self.reduced_size / self.original_size if self.original_size > 0 else 0.0
+
+    def to_json(self) -> Dict:
+        return {"mutant": self.mutant,
+                "killing_test": self.killing_test,
+                "kill_type": self.kill_type,
+                "cores": self.cores,
+                "wall_time": self.wall_time,
+                "cpu_time": self.cpu_time,
+                "timed_out": self.timed_out,
+                "original_size": self.original_size,
+                "reduced_size": self.reduced_size,
+                "size_reduction": self.size_reduction(),
+                "cross_killed_mutants": sorted(self.cross_kills.keys()),
+                "cross_kill_check_time": self.cross_kill_check_time}
+
+
+class ReductionScheduler:
+    # Runs creduce on several programs at once, within a budget of 'cores' cores. Each reduction is given (via
+    # creduce's '--n' option) at least 'cores_per_reduction' cores, or the whole budget if that is smaller. Cores that
+    # would otherwise be left idle, e.g. because the budget is not a multiple of 'cores_per_reduction' or because there
+    # are too few reductions left to fill it, are shared among the reductions being started. Reductions are started in
+    # order of priority (see Reduction).
+    #
+    # 'prepare' sets up the directory in which a reduction is to run, with the program to reduce as 'prog.c' and the
+    # interestingness test as 'interesting.py', and returns it; it returns None if the reduction should be skipped (e.g.
+    # because it was already done by a previous run). The statistics of each reduction are written to
+    # 'reduction_stats.json' in its directory.
+    #
+    # If 'check_cross_kills' is given, it is called when a reduction finishes, with the reduction, its directory, the
+    # mutants whose reductions have not yet been started, and the number of cores it may use (those that were used by
+    # the reduction). It returns the mutants among those given that the reduced program kills, whose reductions are
+    # then dropped. Checks are made one at a time, in a separate thread so that other reductions continue meanwhile;
+    # a reduction's cores are only released once its check is complete, so that the queue has been pruned by the time
+    # they are used for another reduction.
+    def __init__(self,
+                 cores: int,
+                 cores_per_reduction: int,
+                 timeout: float,
+                 prepare: Callable[[Reduction], Optional[Path]],
+                 check_cross_kills: Optional[CrossKillCheck] = None):
+        assert cores >= 1
+        assert cores_per_reduction >= 1
+        self.cores: int = cores
+        self.cores_per_reduction: int = cores_per_reduction
+        self.timeout: float = timeout
+        self.prepare: Callable[[Reduction], Optional[Path]] = prepare
+        self.check_cross_kills: Optional[CrossKillCheck] = check_cross_kills
+        # The reductions that have not yet been started, ordered by priority (see Reduction).
+        self.queue: List[Tuple[Tuple[int, int, int], Reduction]] = []
+        # Held while a reduced program is checked for cross-kills, so that each check sees the queue as pruned by the
+        # previous one.
+        self.cross_kill_lock: Optional[asyncio.Lock] = None
+
+    def run(self, reductions: List[Reduction]) -> List[ReductionStats]:
+        # Returns the statistics of the reductions that were run, in the order in which they finished.
+        self.queue = [(reduction.priority(), reduction) for reduction in reductions]
+        heapq.heapify(self.queue)
+        return asyncio.run(self._run())
+
+    async def _run(self) -> List[ReductionStats]:
+        queue: List[Tuple[Tuple[int, int, int], Reduction]] = self.queue
+        self.cross_kill_lock = asyncio.Lock()
+        running: Dict[asyncio.Task, int] = {}
+        free_cores: int = self.cores
+        finished: List[ReductionStats] = []
+        while queue or running:
+            while queue and (free_cores >= self.cores_per_reduction or not running):
+                _, reduction = heapq.heappop(queue)
+                reduction_dir: Optional[Path] = self.prepare(reduction)
+                if reduction_dir is None:
+                    continue
+                # The free cores are shared among as many reductions as they can accommodate, or as are left to start.
+                slots: int = max(1, free_cores // self.cores_per_reduction)
+                cores: int = free_cores // min(slots, len(queue) + 1)
+                free_cores -= cores
+                running[asyncio.create_task(self._reduce(reduction, reduction_dir, cores))] = cores
+            if not running:
+                break
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                free_cores += running.pop(task)
+                finished.append(task.result())
+        return finished
+
+    async def _reduce(self, reduction: Reduction, reduction_dir: Path, cores: int) -> ReductionStats:
+        print(f"Reducing mutant {reduction.mutant} ({reduction.kill_info['kill_type']}, "
+              f"{reduction.program_size} bytes) with {cores} cores.")
+        start_time: float = time.time()
+        maybe_result: Optional[ProcessResult] = await run_process_with_timeout_async(
+            cmd=['creduce', '--n', str(cores), 'interesting.py', 'prog.c'],
+            timeout_seconds=self.timeout,
+            cwd=reduction_dir)
+        wall_time: float = time.time() - start_time
+        if maybe_result is None:
+            print(f"Reduction of {reduction.mutant} timed out.")
+
+        # Even if the reduction timed out, the program is the smallest found that still kills the mutant.
+        cross_kills: Dict[int, KillStatus] = {}
+        check_start_time: float = time.time()
+        if self.check_cross_kills is not None:
+            async with self.cross_kill_lock:
+                check_start_time = time.time()
+                queued_mutants: List[int] = [queued.mutant for _, queued in self.queue]
+                print(f"Checking whether the reduced program for mutant {reduction.mutant} kills any of the "
+                      f"{len(queued_mutants)} mutants whose reductions have not yet been started.")
+                cross_kills = await asyncio.get_running_loop().run_in_executor(None,
+                                                                               self.check_cross_kills,
+                                                                               reduction,
+                                                                               reduction_dir,
+                                                                               queued_mutants,
+                                                                               cores)
+                if cross_kills:
+                    print(f"The reduced program for mutant {reduction.mutant} also kills mutants "
+                          f"{', '.join([str(mutant) for mutant in sorted(cross_kills.keys())])}, which will not be "
+                          f"reduced separately.")
+                    # The queue is pruned in place, since it is shared with the scheduling loop.
+                    self.queue[:] = [queued for queued in self.queue if queued[1].mutant not in cross_kills]
+                    heapq.heapify(self.queue)
+
+        stats: ReductionStats = ReductionStats(reduction=reduction,
+                                               cores=cores,
+                                               wall_time=wall_time,
+                                               cpu_time=maybe_result.cpu_time if maybe_result is not None else None,
+                                               timed_out=maybe_result is None,
+                                               reduced_size=(reduction_dir / 'prog.c').stat().st_size,
+                                               cross_kills=cross_kills,
+                                               cross_kill_check_time=time.time() - check_start_time)
+        with open(reduction_dir / 'reduction_stats.json', 'w') as outfile:
+            json.dump(stats.to_json(), outfile)
+        print(f"Reduced mutant {reduction.mutant} from {stats.original_size} to {stats.reduced_size} bytes in "
+              f"{stats.wall_time:.0f}s.")
+        return stats
@@ -1,19 +1,32 @@
 import argparse
 import shutil
 
-import json
-import os
 import random
-import tempfile
+import sys
 import time
 
-from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
-from dredd_test_runners.common.run_test_with_mutants import run_test_with_mutants, KillStatus
-from dredd_test_runners.common.mutation_tree import MutationTree
-from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.common.constants import (DEFAULT_CALIBRATION_RUNS,
+                                                 DEFAULT_KILL_REFRESH_INTERVAL,
+                                                 DEFAULT_TIMEOUT_QUANTILE,
+                                                 MUTANT_LEASE_DURATION,
+                                                 STALE_CLAIM_TIMEOUT)
+from dredd_test_runners.common.run_test_with_mutants import KillStatus, MutantTestConfiguration
+from dredd_test_runners.common.group_testing import pack_compatible_mutants
+from dredd_test_runners.common.kill_likelihood import KillLikelihoodScheduler, default_kill_likelihood_cache_dir
+from dredd_test_runners.common.kill_matrix import KillMatrixWriter, default_kill_matrix_dir
+from dredd_test_runners.common.live_kill_set import LiveKillSet
+from dredd_test_runners.common.mutant_evaluation_pool import MutantEvaluationPool
+from dredd_test_runners.common.mutation_tree import MutationTree, describe_mutation_tree_mismatch
+from dredd_test_runners.common.mutation_tree_index import load_mutation_tree
+from dredd_test_runners.common.program_pipeline import ProgramPipeline, ReadyProgram
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+from dredd_test_runners.common.scratch_space import DEFAULT_RAM_BUDGET_MB, ScratchSpace
+from dredd_test_runners.common.test_progress import TestProgress
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
+from dredd_test_runners.yarpgen_runner.yarpgen_program_generator import YarpgenProgramGenerator
 
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Iterator, List, Optional, Set
 
 
 def still_testing(start_time_for_overall_testing: float,
@@ -75,180 +88,291 @@ def main():
                         help="Cease testing if a kill has not occurred for this length of time. Default is 24 hours. "
                              "To test indefinitely, pass 0.",
                         type=int)
+    parser.add_argument("--generator_workers",
+                        default=0,
+                        help="Number of processes to use for generating programs in the background, so that the next "
+                             "program is ready as soon as mutant evaluation of the current program has finished. The "
+                             "default of 0 generates each program only once the previous one has been evaluated.",
+                        type=int)
+    parser.add_argument("--jobs",
+                        default=1,
+                        help="Number of mutants to evaluate in parallel for each generated program.",
+                        type=int)
+    parser.add_argument("--group_size",
+                        default=1,
+                        help="Maximum number of mutually compatible mutants to enable in a single compilation. Groups "
+                             "that do not survive with an identical binary are split until each mutant has its own "
+                             "verdict. The default of 1 evaluates every mutant separately.",
+                        type=int)
+    parser.add_argument("--mutant_order",
+                        default="likelihood",
+                        choices=["likelihood", "id"],
+                        help="Order in which to try the candidate mutants for each test. 'likelihood' tries first the "
+                             "mutants most likely to be killed, as predicted from the outcomes so far for mutants of "
+                             "the same kind, mutation tree node and source file, so that more mutants are killed "
+                             "before the time budget runs out. 'id' tries mutants in ascending order of id.")
+    parser.add_argument("--persist_execution_cache",
+                        action="store_true",
+                        help="Keep the cache that maps the hashes of mutant executables to the outcomes of running "
+                             "them in each test's results directory, rather than discarding it once the test is "
+                             "complete.")
+    parser.add_argument("--calibration_runs",
+                        default=DEFAULT_CALIBRATION_RUNS,
+                        help="Number of times to compile and run each test without mutation, to calibrate the "
+                             "timeouts used for its mutants. Mutant timeouts are in CPU time, and are based on a "
+                             "quantile of the CPU times observed.",
+                        type=int)
+    parser.add_argument("--timeout_quantile",
+                        default=DEFAULT_TIMEOUT_QUANTILE,
+                        help="Quantile of the CPU times observed for a test (in this and previous runs) on which the "
+                             "timeouts for its mutants are based.",
+                        type=float)
+    parser.add_argument("--timing_history_dir",
+                        default=Path("work") / "timing_history",
+                        help="Directory in which to record the CPU times observed for each test, so that timeouts "
+                             "for a test that is evaluated again are calibrated using every measurement taken.",
+                        type=Path)
+    parser.add_argument("--result_database",
+                        help="SQLite database in which to record results. If omitted, results are recorded as "
+                             "files under the 'work' directory.",
+                        type=Path)
+    parser.add_argument("--coordinator",
+                        help="URL (e.g. http://localhost:8130) of a coordinator (see 'dredd-coordinator') through "
+                             "which to record results and coordinate with other workers, possibly on other machines. "
+                             "Program artifacts are still kept under the local 'work' directory.")
+    parser.add_argument("--kill_refresh_interval",
+                        default=DEFAULT_KILL_REFRESH_INTERVAL,
+                        help="How often, in seconds, to scan the results for mutants killed by other workers, so that "
+                             "they can be skipped.",
+                        type=float)
+    parser.add_argument("--resume",
+                        action="store_true",
+                        help="Before generating new programs, resume the tests that workers abandoned partway through "
+                             "(e.g. because they were preempted) or terminated early, trying only the mutants that had "
+                             "not yet been decided for them.")
+    parser.add_argument("--stale_claim_timeout",
+                        default=STALE_CLAIM_TIMEOUT,
+                        help="Number of seconds after the last heartbeat of an unfinished test after which --resume "
+                             "considers the test to be abandoned.",
+                        type=float)
+    parser.add_argument("--scratch_dir",
+                        help="RAM-backed directory (e.g. a tmpfs mount) in which to build mutants and other "
+                             "short-lived files. Defaults to /dev/shm, if available.",
+                        type=Path)
+    parser.add_argument("--scratch_budget_mb",
+                        default=DEFAULT_RAM_BUDGET_MB,
+                        help="Maximum number of megabytes of RAM-backed scratch space to use. Once this is exceeded, "
+                             "further builds are placed on disk. Pass 0 to only use disk.",
+                        type=int)
+    parser.add_argument("--mutation_tree_cache_dir",
+                        help="Directory in which to cache binary indexes of the mutation trees, so that mutation info "
+                             "files only need to be parsed once. Defaults to 'mutation-tree-cache' alongside each "
+                             "mutation info file.",
+                        type=Path)
     args = parser.parse_args()
 
     assert args.mutation_info_file != args.mutation_info_file_for_mutant_coverage_tracking
 
-    print("Building the real mutation tree...")
-    with open(args.mutation_info_file, 'r') as json_input:
-        mutation_tree = MutationTree(json.load(json_input))
-    print("Built!")
-    print("Building the mutation tree associated with mutant coverage tracking...")
-    with open(args.mutation_info_file_for_mutant_coverage_tracking, 'r') as json_input:
-        mutation_tree_for_coverage_tracking = MutationTree(json.load(json_input))
-    print("Built!")
+    print("Loading the real mutation tree...")
+    mutation_tree: MutationTree = load_mutation_tree(mutation_info_file=args.mutation_info_file,
+                                                     cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
+    print("Loading the mutation tree associated with mutant coverage tracking...")
+    mutation_tree_for_coverage_tracking: MutationTree = load_mutation_tree(
+        mutation_info_file=args.mutation_info_file_for_mutant_coverage_tracking,
+        cache_dir=args.mutation_tree_cache_dir)
+    print("Loaded!")
     print("Checking that the two mutation trees match...")
-    assert mutation_tree.mutation_id_to_node_id == mutation_tree_for_coverage_tracking.mutation_id_to_node_id
-    assert mutation_tree.parent_map == mutation_tree_for_coverage_tracking.parent_map
-    assert mutation_tree.num_nodes == mutation_tree_for_coverage_tracking.num_nodes
-    assert mutation_tree.num_mutations == mutation_tree_for_coverage_tracking.num_mutations
+    mutation_tree_mismatch: Optional[str] = describe_mutation_tree_mismatch(mutation_tree,
+                                                                            mutation_tree_for_coverage_tracking)
+    if mutation_tree_mismatch is not None:
+        print(f"Error: the mutation trees do not match. {mutation_tree_mismatch}")
+        sys.exit(1)
     print("Check complete!")
 
     if args.seed is not None:
         random.seed(args.seed)
 
-    with tempfile.TemporaryDirectory() as temp_dir_for_generated_code:
-        dredd_covered_mutants_path: Path = Path(temp_dir_for_generated_code, '__dredd_covered_mutants')
-        generated_program_exe_compiled_with_no_mutants = Path(temp_dir_for_generated_code, '__regular.exe')
-        generated_program_exe_compiled_with_mutant_tracking = Path(temp_dir_for_generated_code, '__tracking.exe')
-        mutant_exe = Path(temp_dir_for_generated_code, '__mutant.exe')
-        yarpgen_out_dir = Path(temp_dir_for_generated_code, '__gen')
-
+    timeout_calibration = TimeoutCalibration(runs=args.calibration_runs,
+                                             timeout_quantile=args.timeout_quantile,
+                                             history_dir=args.timing_history_dir)
+    yarpgen_program_generator = YarpgenProgramGenerator(
+        yarpgen_root=args.yarpgen_root,
+        mutated_compiler_executable=args.mutated_compiler_executable,
+        mutant_tracking_compiler_executable=args.mutant_tracking_compiler_executable,
+        generator_timeout=args.generator_timeout,
+        compile_timeout=args.compile_timeout,
+        run_timeout=args.run_timeout,
+        timeout_calibration=timeout_calibration)
+
+    # Open the store in which information about the mutant killing process will be recorded. If results already exist
+    # that's OK - there may be other processes working on mutant killing, or we may be continuing a job that crashed
+    # previously. The store is opened before programs are generated, since it provides their seeds.
+    result_store: ResultStore = open_result_store(work_dir=Path("work"),
+                                                  result_database=args.result_database,
+                                                  coordinator=args.coordinator)
+
+    # Record the mutants covered, killed, skipped and survived by each test in the kill matrix, which can be queried
+    # without reading every test's summary.
+    kill_matrix: KillMatrixWriter = KillMatrixWriter(default_kill_matrix_dir(Path("work")))
+
+    # Keep an up-to-date copy of the set of killed mutants, so that mutants killed by other workers can be skipped
+    # without querying the store for each mutant.
+    live_kill_set: LiveKillSet = LiveKillSet(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator),
+        refresh_interval=args.kill_refresh_interval)
+
+    # Record heartbeats and checkpoints for the test being evaluated, so that it can be resumed if this worker stops.
+    test_progress: TestProgress = TestProgress(
+        open_store=lambda: open_result_store(work_dir=Path("work"),
+                                             result_database=args.result_database,
+                                             coordinator=args.coordinator))
+
+    # The seeds of tests to resume are generated first, since YARPgen generates the same program from the same seed.
+    seeds_to_resume: List[int] = []
+    if args.resume:
+        seeds_to_resume = [int(test_name[len("yarpgen_"):])
+                           for test_name in result_store.resumable_tests(stale_after=args.stale_claim_timeout)
+                           if test_name.startswith("yarpgen_") and test_name[len("yarpgen_"):].isdigit()]
+        print(f"Tests to resume: {len(seeds_to_resume)}")
+    seeds_being_resumed: Set[int] = set(seeds_to_resume)
+
+    def next_seed() -> int:
+        if seeds_to_resume:
+            return seeds_to_resume.pop(0)
+        return result_store.next_seed()
+
+    with ScratchSpace(ram_dir=args.scratch_dir, ram_budget_mb=args.scratch_budget_mb) as scratch_space, \
+            ProgramPipeline(generate_program=yarpgen_program_generator,
+                            workers=args.generator_workers,
+                            scratch_space=scratch_space,
+                            next_seed=next_seed) as program_pipeline, \
+            MutantEvaluationPool(jobs=args.jobs, scratch_space=scratch_space) \
+            as mutant_evaluation_pool, \
+            live_kill_set, \
+            test_progress:
         killed_mutants: Set[int] = set()
         unkilled_mutants: Set[int] = set(range(0, mutation_tree.num_mutations))
 
-        # Make a work directory in which information about the mutant killing process will be stored. If this already
-        # exists that's OK - there may be other processes working on mutant killing, or we may be continuing a job that
-        # crashed previously.
-        Path("work").mkdir(exist_ok=True)
-        Path("work/tests").mkdir(exist_ok=True)
-        Path("work/killed_mutants").mkdir(exist_ok=True)
+        kill_likelihood_scheduler: Optional[KillLikelihoodScheduler] = None
+        if args.mutant_order == "likelihood":
+            kill_likelihood_scheduler = KillLikelihoodScheduler(mutation_tree=mutation_tree)
+            kill_likelihood_scheduler.record_from_kill_matrix(
+                kill_matrix_dir=default_kill_matrix_dir(Path("work")),
+                cache_dir=default_kill_likelihood_cache_dir(Path("work")))
 
         while still_testing(total_test_time=args.total_test_time,
                             maximum_time_since_last_kill=args.maximum_time_since_last_kill,
                             start_time_for_overall_testing=start_time_for_overall_testing,
                             time_of_last_kill=time_of_last_kill):
-            if dredd_covered_mutants_path.exists():
-                os.remove(dredd_covered_mutants_path)
-            if generated_program_exe_compiled_with_no_mutants.exists():
-                os.remove(generated_program_exe_compiled_with_no_mutants)
-            if generated_program_exe_compiled_with_mutant_tracking.exists():
-                os.remove(generated_program_exe_compiled_with_mutant_tracking)
-            if yarpgen_out_dir.exists():
-                shutil.rmtree(yarpgen_out_dir)
-
-            os.mkdir(yarpgen_out_dir)
-
-            # Generate a Yarpgen program
-            yarpgen_seed = random.randint(0, 2 ** 32 - 1)
-            yarpgen_cmd = [str(args.yarpgen_root / "build" / "yarpgen"),
-                           "--std=c",
-                           "--seed=" + str(yarpgen_seed),
-                           "-o",
-                           str(yarpgen_out_dir)]
-
-            yarpgen_result: ProcessResult = run_process_with_timeout(cmd=yarpgen_cmd,
-                                                                     timeout_seconds=args.generator_timeout)
-            if yarpgen_result is None:
-                print(f"YARPgen timed out (seed {yarpgen_seed})")
-                continue
-
-            if yarpgen_result.returncode != 0:
-                print("YARPgen terminated abnormally.")
-                print(' '.join(yarpgen_cmd))
-                print(f"stdout: {yarpgen_result.stdout}")
-                print(f"stderr: {yarpgen_result.stderr}")
+            # Get the next YARPgen program that has been generated, checked to run without mutation, and compiled with
+            # the mutant tracking compiler to find out which mutants it covers.
+            ready_program: Optional[ReadyProgram] = program_pipeline.next_program()
+            if ready_program is None:
                 continue
+            yarpgen_seed: int = ready_program.seed
 
-            compiler_args = ["-O3", yarpgen_out_dir / "driver.c", yarpgen_out_dir / "func.c"]
-
-            # Compile the program without mutation.
-            regular_compile_cmd = [args.mutated_compiler_executable]\
-                + compiler_args\
-                + ["-o", generated_program_exe_compiled_with_no_mutants]
-
-            compile_time_start: float = time.time()
-            regular_compile_result: ProcessResult = run_process_with_timeout(cmd=regular_compile_cmd,
-                                                                             timeout_seconds=args.compile_timeout)
-            compile_time_end: float = time.time()
-            compile_time = compile_time_end - compile_time_start
-
-            if regular_compile_result is None:
-                print("Compiler timeout.")
-                continue
-            if regular_compile_result.returncode != 0:
-                print("Compilation failed without mutants.")
-                print(f"stdout: {regular_compile_result.stdout.decode('utf-8')}")
-                print(f"stderr: {regular_compile_result.stderr.decode('utf-8')}")
-                continue
-
-            regular_hash = hash_file(str(generated_program_exe_compiled_with_no_mutants))
-
-            run_time_start: float = time.time()
-            regular_execution_result: ProcessResult = run_process_with_timeout(
-                cmd=[str(generated_program_exe_compiled_with_no_mutants)], timeout_seconds=args.run_timeout)
-            run_time_end: float = time.time()
-            run_time = run_time_end - run_time_start
-
-            if regular_execution_result is None:
-                print("Runtime timeout.")
-                continue
-            if regular_execution_result.returncode != 0:
-                print("Execution of generated program failed without mutants.")
-                continue
-
-            # Compile the program with the mutant tracking compiler.
-            tracking_environment = os.environ.copy()
-            tracking_environment["DREDD_MUTANT_TRACKING_FILE"] = str(dredd_covered_mutants_path)
-            tracking_compile_cmd = [args.mutant_tracking_compiler_executable]\
-                + compiler_args\
-                + ["-o", generated_program_exe_compiled_with_mutant_tracking]
-            if run_process_with_timeout(cmd=tracking_compile_cmd, timeout_seconds=args.compile_timeout,
-                                        env=tracking_environment) is None:
-                print("Mutant tracking compilation timed out.")
-                continue
-
-            # Try to create a directory for this YARPgen test. It is very unlikely that it already exists, but this
-            # could happen if two test workers pick the same seed. If that happens, this worker will skip the test.
+            # Try to claim this YARPgen test. It is very unlikely that it has already been claimed, but this could
+            # happen if two test workers pick the same seed. If that happens, this worker will skip the test.
             yarpgen_test_name: str = "yarpgen_" + str(yarpgen_seed)
-            test_output_directory: Path = Path("work/tests/" + yarpgen_test_name)
-            try:
-                test_output_directory.mkdir()
-            except FileExistsError:
-                print(f"Skipping seed {yarpgen_seed} as a directory for it already exists")
+            checkpoint: Optional[Dict] = None
+            if yarpgen_seed in seeds_being_resumed:
+                seeds_being_resumed.remove(yarpgen_seed)
+                if not result_store.reclaim_test(yarpgen_test_name, stale_after=args.stale_claim_timeout):
+                    print(f"Skipping seed {yarpgen_seed} as it has already been resumed")
+                    continue
+                checkpoint = result_store.test_checkpoint(yarpgen_test_name) or {}
+                print(f"Resuming seed {yarpgen_seed}")
+            elif not result_store.claim_test(yarpgen_test_name):
+                print(f"Skipping seed {yarpgen_seed} as it has already been claimed")
                 continue
-            shutil.copy(src=yarpgen_out_dir / "driver.c", dst=test_output_directory / "driver.c")
-            shutil.copy(src=yarpgen_out_dir / "func.c", dst=test_output_directory / "func.c")
-            shutil.copy(src=yarpgen_out_dir / "init.h", dst=test_output_directory / "init.h")
-
-            # Load file contents into a list. We go from list to set to list to eliminate duplicates.
-            covered_by_this_test: List[int] = list(set([int(line.strip()) for line in
-                                                        open(dredd_covered_mutants_path, 'r').readlines()]))
-            covered_by_this_test.sort()
-            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test if m not in killed_mutants])
+            test_progress.start_test(yarpgen_test_name, checkpoint)
+            test_output_directory: Path = result_store.test_directory(yarpgen_test_name)
+            for source_file in ready_program.source_files:
+                shutil.copy(src=ready_program.program_dir / source_file, dst=test_output_directory / source_file)
+
+            covered_by_this_test: List[int] = ready_program.covered_mutants
+
+            # Catch up on kills recorded by other workers.
+            killed_elsewhere: Set[int] = live_kill_set.killed_mutants() - killed_mutants
+            killed_mutants.update(killed_elsewhere)
+            unkilled_mutants.difference_update(killed_elsewhere)
+
+            # When resuming a test, the mutants decided before it was interrupted are not tried again.
+            killed_by_this_test: List[int] = list(checkpoint.get("killed_mutants", [])) if checkpoint is not None \
+                else []
+            covered_but_not_killed_by_this_test: List[int] = list(checkpoint.get("survived_mutants", [])) \
+                if checkpoint is not None else []
+            decided_mutants: Set[int] = set(killed_by_this_test + covered_but_not_killed_by_this_test)
+
+            candidate_mutants_for_this_test: List[int] = ([m for m in covered_by_this_test
+                                                           if m not in killed_mutants and m not in decided_mutants])
+            if kill_likelihood_scheduler is not None:
+                candidate_mutants_for_this_test = kill_likelihood_scheduler.prioritise(candidate_mutants_for_this_test)
             print("Number of mutants to try: " + str(len(candidate_mutants_for_this_test)))
 
-            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test if m in killed_mutants])
-            killed_by_this_test: List[int] = []
-            covered_but_not_killed_by_this_test: List[int] = []
-
-            for mutant in candidate_mutants_for_this_test:
-
-                if not still_testing(total_test_time=args.total_test_time,
-                                     maximum_time_since_last_kill=args.maximum_time_since_last_kill,
-                                     start_time_for_overall_testing=start_time_for_overall_testing,
-                                     time_of_last_kill=time_of_last_kill):
-                    break
-
-                mutant_path = Path("work/killed_mutants/" + str(mutant))
-                if mutant_path.exists():
-                    print("Skipping mutant " + str(mutant) + " as it is noted as already killed.")
-                    unkilled_mutants.remove(mutant)
-                    killed_mutants.add(mutant)
-                    already_killed_by_other_tests.append(mutant)
-                    continue
-                print("Trying mutant " + str(mutant))
-                mutant_result = run_test_with_mutants(mutants=[mutant],
-                                                      compiler_path=str(args.mutated_compiler_executable),
-                                                      compiler_args=compiler_args,
-                                                      compile_time=compile_time,
-                                                      run_time=run_time,
-                                                      binary_hash_non_mutated=regular_hash,
-                                                      execution_result_non_mutated=regular_execution_result,
-                                                      mutant_exe_path=mutant_exe)
+            already_killed_by_other_tests: List[int] = ([m for m in covered_by_this_test
+                                                         if m in killed_mutants and m not in decided_mutants])
+
+            def mutant_groups_to_try() -> Iterator[List[int]]:
+                # Groups of mutants are requested lazily by the evaluation pool, so the checks for whether testing
+                # should continue, and whether a mutant has already been killed elsewhere, are made as late as possible.
+                # Mutants that are leased to another worker, which is evaluating them against another test, are deferred
+                # until the other mutants for this test have been tried, by which time they may have been killed.
+                deferred_mutants: List[int] = []
+                for first_pass in [True, False]:
+                    for candidate_group in pack_compatible_mutants(
+                            mutants=candidate_mutants_for_this_test if first_pass else deferred_mutants,
+                            mutation_tree=mutation_tree,
+                            max_group_size=args.group_size):
+                        if not still_testing(total_test_time=args.total_test_time,
+                                             maximum_time_since_last_kill=args.maximum_time_since_last_kill,
+                                             start_time_for_overall_testing=start_time_for_overall_testing,
+                                             time_of_last_kill=time_of_last_kill):
+                            return
+                        group_to_try: List[int] = []
+                        for candidate_mutant in candidate_group:
+                            if live_kill_set.is_killed(candidate_mutant):
+                                print("Skipping mutant " + str(candidate_mutant) + " as it is noted as already killed.")
+                                unkilled_mutants.remove(candidate_mutant)
+                                killed_mutants.add(candidate_mutant)
+                                already_killed_by_other_tests.append(candidate_mutant)
+                                continue
+                            group_to_try.append(candidate_mutant)
+                        if first_pass and group_to_try:
+                            leased_mutants: List[int] = result_store.lease_mutants(mutants=group_to_try,
+                                                                                   duration=MUTANT_LEASE_DURATION)
+                            deferred_mutants.extend([m for m in group_to_try if m not in leased_mutants])
+                            group_to_try = leased_mutants
+                        test_progress.hold(group_to_try)
+                        if group_to_try:
+                            print("Trying mutants " + ", ".join([str(m) for m in group_to_try]))
+                            yield group_to_try
+
+            mutant_test_configuration = MutantTestConfiguration(
+                compiler_path=str(args.mutated_compiler_executable),
+                compiler_args=ready_program.compiler_args,
+                compile_time=ready_program.compile_time,
+                run_time=ready_program.run_time,
+                binary_hash_non_mutated=ready_program.binary_hash_non_mutated,
+                binary_path_non_mutated=ready_program.binary_path_non_mutated,
+                execution_result_non_mutated=ready_program.execution_result_non_mutated,
+                translation_units=ready_program.translation_units,
+                execution_cache_dir=str(test_output_directory / "execution_cache" if args.persist_execution_cache
+                                        else ready_program.program_dir / "__execution_cache"))
+
+            for mutant, mutant_result in mutant_evaluation_pool.evaluate(mutant_groups=mutant_groups_to_try(),
+                                                                         configuration=mutant_test_configuration):
                 print("Mutant result: " + str(mutant_result))
-                if mutant_result == KillStatus.SURVIVED_IDENTICAL \
-                        or mutant_result == KillStatus.SURVIVED_BINARY_DIFFERENCE:
+                survived: bool = mutant_result == KillStatus.SURVIVED_IDENTICAL \
+                    or mutant_result == KillStatus.SURVIVED_BINARY_DIFFERENCE
+                if kill_likelihood_scheduler is not None:
+                    kill_likelihood_scheduler.record(mutant, killed=not survived)
+                test_progress.record(mutant, killed=not survived)
+                if survived:
+                    result_store.release_mutants([mutant])
                     covered_but_not_killed_by_this_test.append(mutant)
                     continue
 
@@ -257,15 +381,12 @@ def main():
                 killed_by_this_test.append(mutant)
                 time_of_last_kill = time.time()
                 print(f"Kill! Mutants killed so far: {len(killed_mutants)}")
-                try:
-                    mutant_path.mkdir()
-                    print("Writing kill info to file.")
-                    with open(mutant_path / "kill_info.json", "w") as outfile:
-                        json.dump({"killing_test": yarpgen_test_name,
-                                   "kill_type": str(mutant_result)}, outfile)
-                except FileExistsError:
+                print("Recording kill info.")
+                if not result_store.record_kill(mutant, {"killing_test": yarpgen_test_name,
+                                                         "kill_type": str(mutant_result)}):
                     print(f"Mutant {mutant} was independently discovered to be killed.")
-                    continue
+                # Let the live kill set know at once, rather than at its next scan of the result store.
+                live_kill_set.add(mutant)
 
             terminating_test_process: bool = not still_testing(
                 total_test_time=args.total_test_time,
@@ -284,15 +405,21 @@ def main():
             else:
                 terminated_early: bool = False
 
+            test_progress.finish_test()
             killed_by_this_test.sort()
             covered_but_not_killed_by_this_test.sort()
             already_killed_by_other_tests.sort()
-            with open(test_output_directory / "kill_summary.json", "w") as outfile:
-                json.dump({"terminated_early": terminated_early,
-                           "covered_mutants": covered_by_this_test,
-                           "killed_mutants": killed_by_this_test,
-                           "skipped_mutants": already_killed_by_other_tests,
-                           "survived_mutants": covered_but_not_killed_by_this_test}, outfile)
+            result_store.record_test_summary(yarpgen_test_name,
+                                             {"terminated_early": terminated_early,
+                                              "covered_mutants": covered_by_this_test,
+                                              "killed_mutants": killed_by_this_test,
+                                              "skipped_mutants": already_killed_by_other_tests,
+                                              "survived_mutants": covered_but_not_killed_by_this_test})
+            kill_matrix.append(yarpgen_test_name,
+                               covered=covered_by_this_test,
+                               killed=killed_by_this_test,
+                               skipped=already_killed_by_other_tests,
+                               survived=covered_but_not_killed_by_this_test)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+import os
+
+from pathlib import Path
+from typing import List, Optional, Set
+
+from dredd_test_runners.common.hash_file import hash_file
+from dredd_test_runners.common.program_pipeline import ReadyProgram
+from dredd_test_runners.common.run_process_with_timeout import ProcessResult, run_process_with_timeout
+from dredd_test_runners.common.run_test_with_mutants import TranslationUnit
+from dredd_test_runners.common.timeout_calibration import TimeoutCalibration
+
+# The source files of a YARPgen program that are compiled as separate translation units.
+TRANSLATION_UNITS: List[str] = ["driver.c", "func.c"]
+
+
+class YarpgenProgramGenerator:
+    # Generates a YARPgen program, compiles and runs it without mutation, and determines which mutants it covers.
+    # Instances are sent to generator worker processes, so they only hold plain data.
+    def __init__(self,
+                 yarpgen_root: Path,
+                 mutated_compiler_executable: Path,
+                 mutant_tracking_compiler_executable: Path,
+                 generator_timeout: int,
+                 compile_timeout: int,
+                 run_timeout: int,
+                 timeout_calibration: TimeoutCalibration):
+        self.yarpgen_root: Path = yarpgen_root
+        self.mutated_compiler_executable: Path = mutated_compiler_executable
+        self.mutant_tracking_compiler_executable: Path = mutant_tracking_compiler_executable
+        self.generator_timeout: int = generator_timeout
+        self.compile_timeout: int = compile_timeout
+        self.run_timeout: int = run_timeout
+        self.timeout_calibration: TimeoutCalibration = timeout_calibration
+
+    def __call__(self, yarpgen_seed: int, program_dir: Path) -> Optional[ReadyProgram]:
+        generated_program_exe_compiled_with_no_mutants = program_dir / '__regular.exe'
+        generated_program_exe_compiled_with_mutant_tracking = program_dir / '__tracking.exe'
+
+        # Generate a Yarpgen program
+        yarpgen_cmd = [str(self.yarpgen_root / "build" / "yarpgen"),
+                       "--std=c",
+                       "--seed=" + str(yarpgen_seed),
+                       "-o",
+                       str(program_dir)]
+
+        yarpgen_result: ProcessResult = run_process_with_timeout(cmd=yarpgen_cmd,
+                                                                 timeout_seconds=self.generator_timeout)
+        if yarpgen_result is None:
+            print(f"YARPgen timed out (seed {yarpgen_seed})")
+            return None
+
+        if yarpgen_result.returncode != 0:
+            print("YARPgen terminated abnormally.")
+            print(' '.join(yarpgen_cmd))
+            print(f"stdout: {yarpgen_result.stdout}")
+            print(f"stderr: {yarpgen_result.stderr}")
+            return None
+
+        # The translation units are compiled separately and then linked, so that mutant coverage can be tracked per
+        # translation unit, and mutant evaluation only needs to recompile the translation units that cover a mutant.
+        compiler_args: List[str] = ["-O3"]
+        sources: List[str] = [str(program_dir / source_name) for source_name in TRANSLATION_UNITS]
+        objects_non_mutated: List[str] = [str(program_dir / f"__{source_name}.o") for source_name in TRANSLATION_UNITS]
+
+        def regular_compile_cmds(object_files: List[str], exe_file: Path) -> List[List[str]]:
+            return [[str(self.mutated_compiler_executable)] + compiler_args + ["-c", source, "-o", object_file]
+                    for source, object_file in zip(sources, object_files)] \
+                + [[str(self.mutated_compiler_executable)] + compiler_args + object_files + ["-o", str(exe_file)]]
+
+        # Compile the program without mutation.
+        first_compile_time: float = 0.0
+        for regular_compile_cmd in regular_compile_cmds(objects_non_mutated,
+                                                        generated_program_exe_compiled_with_no_mutants):
+            regular_compile_result: ProcessResult = run_process_with_timeout(cmd=regular_compile_cmd,
+                                                                             timeout_seconds=self.compile_timeout)
+            if regular_compile_result is None:
+                print("Compiler timeout.")
+                return None
+            if regular_compile_result.returncode != 0:
+                print("Compilation failed without mutants.")
+                print(f"stdout: {regular_compile_result.stdout.decode('utf-8')}")
+                print(f"stderr: {regular_compile_result.stderr.decode('utf-8')}")
+                return None
+            first_compile_time += regular_compile_result.cpu_time
+
+        regular_hash = hash_file(str(generated_program_exe_compiled_with_no_mutants))
+
+        regular_execution_result: ProcessResult = run_process_with_timeout(
+            cmd=[str(generated_program_exe_compiled_with_no_mutants)], timeout_seconds=self.run_timeout)
+
+        if regular_execution_result is None:
+            print("Runtime timeout.")
+            return None
+        if regular_execution_result.returncode != 0:
+            print("Execution of generated program failed without mutants.")
+            return None
+
+        # Compile the program with the mutant tracking compiler, one translation unit at a time, recording the mutants
+        # covered by each. Mutants covered during linking are also tracked: mutant evaluation always relinks, so they
+        # are evaluated without recompiling any translation unit.
+        tracking_objects: List[str] = [str(program_dir / f"__tracking_{source_name}.o")
+                                       for source_name in TRANSLATION_UNITS]
+        tracking_cmds: List[List[str]] = \
+            [[str(self.mutant_tracking_compiler_executable)] + compiler_args + ["-c", source, "-o", object_file]
+             for source, object_file in zip(sources, tracking_objects)] \
+            + [[str(self.mutant_tracking_compiler_executable)] + compiler_args + tracking_objects
+               + ["-o", str(generated_program_exe_compiled_with_mutant_tracking)]]
+        covered_mutants_per_step: List[Set[int]] = []
+        for step, tracking_compile_cmd in enumerate(tracking_cmds):
+            dredd_covered_mutants_path: Path = program_dir / f"__dredd_covered_mutants_{step}"
+            tracking_environment = os.environ.copy()
+            tracking_environment["DREDD_MUTANT_TRACKING_FILE"] = str(dredd_covered_mutants_path)
+            if run_process_with_timeout(cmd=tracking_compile_cmd, timeout_seconds=self.compile_timeout,
+                                        env=tracking_environment) is None:
+                print("Mutant tracking compilation timed out.")
+                return None
+            covered_mutants_per_step.append(set([int(line.strip()) for line in
+                                                 open(dredd_covered_mutants_path, 'r').readlines()])
+                                            if dredd_covered_mutants_path.exists() else set())
+
+        covered_mutants: List[int] = list(set().union(*covered_mutants_per_step))
+        covered_mutants.sort()
+
+        # Measure the program's compile and run times repeatedly, to calibrate the timeouts used for its mutants. The
+        # calibration compilations use separate output files, so that the objects and executable built above are left
+        # untouched. Each compilation step of a mutant is allowed time based on the total time to compile the program.
+        yarpgen_test_name: str = "yarpgen_" + str(yarpgen_seed)
+        compile_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=yarpgen_test_name,
+            kind="compile",
+            cmds=regular_compile_cmds([str(program_dir / f"__calibration_{source_name}.o")
+                                       for source_name in TRANSLATION_UNITS],
+                                      program_dir / '__calibration.exe'),
+            first_sample=first_compile_time,
+            timeout_seconds=self.compile_timeout)
+        if compile_time is None:
+            print("Compiler timeout during timeout calibration.")
+            return None
+        run_time: Optional[float] = self.timeout_calibration.calibrate(
+            test_name=yarpgen_test_name,
+            kind="run",
+            cmds=[[str(generated_program_exe_compiled_with_no_mutants)]],
+            first_sample=regular_execution_result.cpu_time,
+            timeout_seconds=self.run_timeout)
+        if run_time is None:
+            print("Runtime timeout during timeout calibration.")
+            return None
+
+        translation_units: List[TranslationUnit] = [
+            TranslationUnit(source=source, object_non_mutated=object_file, covered_mutants=frozenset(covered))
+            for source, object_file, covered in zip(sources, objects_non_mutated, covered_mutants_per_step)]
+
+        return ReadyProgram(seed=yarpgen_seed,
+                            program_dir=program_dir,
+                            source_files=['driver.c', 'func.c', 'init.h'],
+                            compiler_args=compiler_args,
+                            compile_time=compile_time,
+                            run_time=run_time,
+                            binary_hash_non_mutated=regular_hash,
+                            binary_path_non_mutated=str(generated_program_exe_compiled_with_no_mutants),
+                            execution_result_non_mutated=regular_execution_result,
+                            covered_mutants=covered_mutants,
+                            translation_units=translation_units)
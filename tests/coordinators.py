@@ -0,0 +1,29 @@
+import threading
+
+from pathlib import Path
+
+from dredd_test_runners.common.result_store import CoordinatorResultStore, ResultStore, SqliteResultStore
+from dredd_test_runners.coordinator.main import Coordinator, CoordinatorServer
+
+# Helpers for running a coordinator in the test process, for use in tests.
+
+
+class RunningCoordinator:
+    # A coordinator that records results in a database under 'directory', served on an ephemeral port.
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.result_store: ResultStore = SqliteResultStore(work_dir=directory / "work",
+                                                           database=directory / "results.sqlite")
+        self.coordinator: Coordinator = Coordinator(result_store=self.result_store, seed=0)
+        self.server: CoordinatorServer = CoordinatorServer(("127.0.0.1", 0), self.coordinator)
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url: str = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def client(self, work_dir: Path) -> CoordinatorResultStore:
+        return CoordinatorResultStore(work_dir=work_dir, coordinator_url=self.url)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.result_store.close()
@@ -0,0 +1,34 @@
+from typing import Dict, List
+
+# Helpers for building mutation info JSON, in the format that Dredd writes, for use in tests.
+
+
+def node(mutation_ids: List[int], children: List[Dict] = None, kind: str = "replaceExpr") -> Dict:
+    # A node with a single mutation group of the given kind, containing the given mutation ids.
+    if not mutation_ids:
+        mutation_groups: List[Dict] = []
+    elif kind == "removeStmt":
+        mutation_groups = [{"removeStmt": {"mutationId": mutation_id}} for mutation_id in mutation_ids]
+    else:
+        mutation_groups = [{kind: {"instances": [{"mutationId": mutation_id} for mutation_id in mutation_ids]}}]
+    return {"mutationGroups": mutation_groups, "children": children if children is not None else []}
+
+
+def mutation_info(*roots: Dict) -> Dict:
+    return {"infoForFiles": [{"filename": f"file{index}.cc", "mutationTreeRoot": root}
+                             for index, root in enumerate(roots)]}
+
+
+# A tree for two files:
+#
+# file0:    node 0 []
+#           ├── node 1 [0, 1]
+#           │   ├── node 2 [2]
+#           │   └── node 3 [3, 4]
+#           └── node 4 [5]
+# file1:    node 5 [6]
+#           └── node 6 [7] (removeStmt)
+SAMPLE_MUTATION_INFO: Dict = mutation_info(
+    node([], [node([0, 1], [node([2]), node([3, 4])]),
+              node([5])]),
+    node([6], [node([7], kind="removeStmt")]))
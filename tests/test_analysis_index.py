@@ -0,0 +1,133 @@
+import pytest
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from dredd_test_runners.analyse_results import analysis_index
+from dredd_test_runners.analyse_results.analysis_index import AnalysisIndex
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+
+# (test name, killing test recorded with kills, summary, kills as (mutant, kill type)).
+CAMPAIGN: List[Tuple[str, str, Dict, List[Tuple[int, str]]]] = [
+    ("csmith_1", "csmith_1",
+     {"covered_mutants": [1, 2, 3], "killed_mutants": [1], "skipped_mutants": [], "survived_mutants": [2, 3],
+      "terminated_early": False},
+     [(1, "KillStatus.KILL_DIFFERENT_STDOUT")]),
+    ("yarpgen_1", "yarpgen_1",
+     {"covered_mutants": [2, 4], "killed_mutants": [4], "skipped_mutants": [], "survived_mutants": [],
+      "terminated_early": True},
+     [(4, "KillStatus.KILL_RUNTIME_TIMEOUT")]),
+    ("SingleSource_Regression_C_x.c", "SingleSource/Regression/C/x.c",
+     {"covered_mutants": [1, 3], "killed_mutants": [3], "skipped_mutants": [1], "survived_mutants": []},
+     [(3, "KillStatus.KILL_COMPILER_CRASH")]),
+]
+
+
+class Campaign:
+    # A result store holding the results of CAMPAIGN, and an analysis index built from it.
+    def __init__(self, tmp_path: Path, use_database: bool):
+        self.work_dir: Path = tmp_path / "work"
+        self.database: Path = tmp_path / "results.sqlite"
+        self.use_database: bool = use_database
+        self.store: ResultStore = open_result_store(work_dir=self.work_dir,
+                                                    result_database=self.database if use_database else None)
+        for test_name, killing_test, kill_summary, kills in CAMPAIGN:
+            assert self.store.claim_test(test_name)
+            for mutant, kill_type in kills:
+                assert self.store.record_kill(mutant, {"killing_test": killing_test, "kill_type": kill_type})
+            self.store.record_test_summary(test_name, kill_summary)
+        self.index: AnalysisIndex = AnalysisIndex(tmp_path / "analysis.sqlite", source="test")
+
+    def update(self) -> Tuple[int, int]:
+        if self.use_database:
+            return self.index.update_from_database(self.database)
+        return self.index.update_from_directory(self.work_dir, jobs=2)
+
+    def close(self) -> None:
+        self.index.close()
+        self.store.close()
+
+
+@pytest.fixture(params=["directory", "sqlite"])
+def campaign(request, tmp_path: Path):
+    result: Campaign = Campaign(tmp_path, use_database=request.param == "sqlite")
+    yield result
+    result.close()
+
+
+def test_test_generator():
+    # Imported via the module, so that pytest does not collect it as a test.
+    test_generator = analysis_index.test_generator
+    assert test_generator("csmith_12") == "csmith"
+    assert test_generator("yarpgen_3") == "yarpgen"
+    assert test_generator("SingleSource/UnitTests/x.c") == "llvm-test-suite"
+    assert test_generator("SingleSource_UnitTests_x.c") == "llvm-test-suite"
+    assert test_generator("CodeGen/X86/add.ll") == "llvm-regression"
+    assert test_generator("something_else") == "other"
+
+
+def test_generator_summary(campaign: Campaign):
+    assert campaign.update() == (3, 3)
+    columns, rows = campaign.index.generator_summary()
+    assert columns == ["generator", "tests", "terminated_early", "kills", "covered_mutants", "surviving_mutants",
+                       "surviving_ratio"]
+    assert rows == [("csmith", 1, 0, 1, 3, 1, pytest.approx(1 / 3)),
+                    ("yarpgen", 1, 1, 1, 2, 1, 0.5),
+                    ("llvm-test-suite", 1, 0, 1, 2, 0, 0.0),
+                    ("all", 3, 1, 3, 4, 1, 0.25)]
+    _, rows = campaign.index.generator_summary(generators=["csmith"])
+    assert rows == [("csmith", 1, 0, 1, 3, 1, pytest.approx(1 / 3)),
+                    ("all", 1, 0, 1, 3, 1, pytest.approx(1 / 3))]
+
+
+def test_kill_types_and_actionable_kills(campaign: Campaign):
+    campaign.update()
+    _, rows = campaign.index.kill_types(generators=["csmith", "llvm-test-suite"])
+    assert rows == [("csmith", "KillStatus.KILL_DIFFERENT_STDOUT", 1),
+                    ("llvm-test-suite", "KillStatus.KILL_COMPILER_CRASH", 1),
+                    ("all", "KillStatus.KILL_COMPILER_CRASH", 1),
+                    ("all", "KillStatus.KILL_DIFFERENT_STDOUT", 1)]
+    _, rows = campaign.index.actionable_kills()
+    assert [(mutant, killing_test) for mutant, killing_test, *_ in rows] == [(1, "csmith_1"), (4, "yarpgen_1")]
+
+
+def test_tests(campaign: Campaign):
+    campaign.update()
+    _, rows = campaign.index.tests()
+    assert [row[0] for row in rows] == ["SingleSource_Regression_C_x.c", "csmith_1", "yarpgen_1"]
+    name, generator, _, terminated_early, covered, killed, skipped, survived, survived_ratio = rows[1]
+    assert (name, generator, terminated_early, covered, killed, skipped, survived) == \
+        ("csmith_1", "csmith", False, 3, 1, 0, 2)
+    assert survived_ratio == pytest.approx(2 / 3)
+
+
+def test_timeline(campaign: Campaign):
+    campaign.update()
+    # A period long enough that everything happened in the first one.
+    _, rows = campaign.index.timeline(period=1e12)
+    assert [row[1:] for row in rows] == [("csmith", 1, 1, 1),
+                                         ("yarpgen", 1, 1, 1),
+                                         ("llvm-test-suite", 1, 1, 1),
+                                         ("all", 3, 3, 3)]
+
+
+def test_update_is_incremental(campaign: Campaign):
+    assert campaign.update() == (3, 3)
+    assert campaign.update() == (0, 0)
+    # A test that was terminated early is indexed again once it has been resumed.
+    campaign.store.heartbeat_test("yarpgen_1")
+    campaign.store.record_test_summary("yarpgen_1", {"covered_mutants": [2, 4, 5], "killed_mutants": [4],
+                                                     "skipped_mutants": [], "survived_mutants": [2, 5],
+                                                     "terminated_early": False})
+    assert campaign.store.record_kill(6, {"killing_test": "csmith_2", "kill_type": "KillStatus.KILL_FAIL"})
+    assert campaign.update() == (1, 1)
+    _, rows = campaign.index.generator_summary(generators=["yarpgen"])
+    assert rows[0] == ("yarpgen", 1, 0, 1, 3, 2, pytest.approx(2 / 3))
+
+
+def test_index_for_another_source_is_rebuilt(campaign: Campaign, tmp_path: Path):
+    campaign.update()
+    campaign.index.close()
+    campaign.index = AnalysisIndex(tmp_path / "analysis.sqlite", source="another")
+    assert campaign.index.generator_summary()[1] == [("all", 0, 0, 0, 0, 0, None)]
+    assert campaign.update() == (3, 3)
@@ -0,0 +1,140 @@
+import pytest
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from typing import List
+
+from dredd_test_runners.common.result_store import CoordinatorError, CoordinatorResultStore
+from tests.coordinators import RunningCoordinator
+
+KILL_INFO = {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"}
+
+
+@pytest.fixture
+def coordinator(tmp_path: Path):
+    result: RunningCoordinator = RunningCoordinator(tmp_path / "coordinator")
+    yield result
+    result.close()
+
+
+@pytest.fixture
+def clients(coordinator: RunningCoordinator, tmp_path: Path):
+    result: List[CoordinatorResultStore] = [coordinator.client(tmp_path / f"worker{index}") for index in range(2)]
+    # Workers are named after their machine and process, which these share.
+    for index, client in enumerate(result):
+        client.worker = f"worker{index}"
+    yield result
+    for client in result:
+        client.close()
+
+
+def test_seeds_are_not_issued_twice(clients: List[CoordinatorResultStore]):
+    seeds: List[int] = [client.next_seed() for client in clients for _ in range(20)]
+    assert len(set(seeds)) == len(seeds)
+
+
+def test_only_one_worker_claims_a_test(clients: List[CoordinatorResultStore]):
+    assert clients[0].claim_test("csmith_1")
+    assert not clients[1].claim_test("csmith_1")
+    assert clients[0].test_directory("csmith_1").is_dir()
+    assert not clients[1].test_directory("csmith_1").exists()
+
+
+def test_kills_are_broadcast(clients: List[CoordinatorResultStore]):
+    assert clients[0].record_kill(3, KILL_INFO)
+    # The other worker learns of the kill from its long-polling listener, without asking.
+    deadline: float = time.time() + 10.0
+    while not clients[1].is_mutant_killed(3):
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert not clients[1].record_kill(3, KILL_INFO)
+    assert clients[1].killed_mutants_since(None)[0] == {3}
+
+
+def test_existing_kills_are_known_on_connecting(coordinator: RunningCoordinator, clients: List[CoordinatorResultStore],
+                                                tmp_path: Path):
+    clients[0].record_kill(1, KILL_INFO)
+    clients[0].record_kill(2, KILL_INFO)
+    late: CoordinatorResultStore = coordinator.client(tmp_path / "late_worker")
+    assert late.killed_mutants() == {1, 2}
+    late.close()
+
+
+def test_leases(clients: List[CoordinatorResultStore]):
+    first, second = clients
+    assert first.lease_mutants([1, 2, 3], duration=3600.0) == [1, 2, 3]
+    # Mutants leased to another worker are not leased, but a worker may renew its own leases.
+    assert second.lease_mutants([2, 3, 4], duration=3600.0) == [4]
+    assert first.lease_mutants([1, 4], duration=3600.0) == [1]
+    first.release_mutants([2])
+    assert second.lease_mutants([2], duration=3600.0) == [2]
+    # Recording a kill releases the mutant, and killed mutants are never leased.
+    assert first.record_kill(3, KILL_INFO)
+    assert second.lease_mutants([3], duration=3600.0) == []
+
+
+def test_expired_leases_are_available(clients: List[CoordinatorResultStore]):
+    assert clients[0].lease_mutants([1], duration=-1.0) == [1]
+    assert clients[1].lease_mutants([1], duration=3600.0) == [1]
+
+
+def test_store_errors_are_reported_without_retrying(coordinator: RunningCoordinator,
+                                                    clients: List[CoordinatorResultStore]):
+    attempts: List[str] = []
+
+    def failing_claim(test_name: str) -> bool:
+        attempts.append(test_name)
+        raise sqlite3.OperationalError("database is locked")
+
+    coordinator.result_store.claim_test = failing_claim
+    with pytest.raises(CoordinatorError, match="database is locked"):
+        clients[0].claim_test("csmith_1")
+    assert attempts == ["csmith_1"]
+    # The connection remains usable.
+    assert clients[0].lease_mutants([1], duration=3600.0) == [1]
+
+
+def test_long_request_on_open_connection_uses_its_own_timeout(coordinator: RunningCoordinator,
+                                                              clients: List[CoordinatorResultStore]):
+    attempts: List[float] = []
+    test_summaries = coordinator.result_store.test_summaries
+
+    def slow_test_summaries():
+        attempts.append(time.time())
+        time.sleep(0.5)
+        return test_summaries()
+
+    coordinator.result_store.test_summaries = slow_test_summaries
+    results: List = []
+
+    def request_summaries() -> None:
+        # Each thread has its own connection; this one is opened with a short timeout.
+        clients[0]._request("next_seed", timeout=0.2)
+        results.append(list(clients[0].test_summaries()))
+
+    thread: threading.Thread = threading.Thread(target=request_summaries)
+    thread.start()
+    thread.join()
+    assert results == [[]]
+    assert len(attempts) == 1
+
+
+def test_requests_from_many_threads(clients: List[CoordinatorResultStore]):
+    claimed: List[str] = []
+    lock: threading.Lock = threading.Lock()
+
+    def claim_all(client: CoordinatorResultStore) -> None:
+        for index in range(20):
+            if client.claim_test(f"test{index}"):
+                with lock:
+                    claimed.append(f"test{index}")
+
+    threads: List[threading.Thread] = [threading.Thread(target=claim_all, args=(client,))
+                                       for client in clients for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"test{index}" for index in range(20))
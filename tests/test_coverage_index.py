@@ -0,0 +1,83 @@
+import os
+import sys
+
+from pathlib import Path
+from typing import Dict, List
+
+from dredd_test_runners.llvm_regression_tests_runner.coverage_index import (CoverageIndex,
+                                                                            collect_coverage,
+                                                                            hash_tests)
+
+# Stands in for llvm-lit: reports the test as passing, after recording as covered the mutants whose ids are listed in
+# the test file. A test containing "fail" fails instead.
+FAKE_LLVM_LIT: str = f"""#!{sys.executable}
+import os
+import sys
+import time
+
+test = sys.argv[1]
+contents = open(test).read()
+time.sleep(0.05)
+if "fail" in contents:
+    print(f"FAIL: fake :: {{test}} (1 of 1)")
+    sys.exit(1)
+with open(os.environ["DREDD_MUTANT_TRACKING_FILE"], "a") as outfile:
+    for mutant in contents.split():
+        outfile.write(mutant + "\\n")
+        outfile.write(mutant + "\\n")
+print(f"PASS: fake :: {{test}} (1 of 1)")
+"""
+
+
+def write_fake_llvm_lit(directory: Path) -> Path:
+    llvm_lit: Path = directory / "llvm-lit"
+    llvm_lit.write_text(FAKE_LLVM_LIT)
+    os.chmod(llvm_lit, 0o755)
+    return llvm_lit
+
+
+def write_tests(directory: Path, contents: Dict[str, str]) -> List[str]:
+    tests: List[str] = []
+    for name, text in contents.items():
+        (directory / name).write_text(text)
+        tests.append(str(directory / name))
+    return tests
+
+
+def test_collect_coverage_with_several_jobs(tmp_path: Path):
+    llvm_lit: Path = write_fake_llvm_lit(tmp_path)
+    tests: List[str] = write_tests(tmp_path, {f"test{index}.ll": f"{index} {index + 10}" for index in range(8)})
+    tests += write_tests(tmp_path, {"failing.ll": "fail", "uncovered.ll": ""})
+    tracking_dir: Path = tmp_path / "tracking"
+    tracking_dir.mkdir()
+    coverage_index: CoverageIndex = CoverageIndex(tmp_path / "coverage_index.json")
+    test_hashes: Dict[str, str] = hash_tests(tests)
+    collect_coverage(coverage_index=coverage_index,
+                     test_hashes=test_hashes,
+                     mutant_tracking_llvm_lit=llvm_lit,
+                     tracking_dir=tracking_dir,
+                     jobs=4,
+                     lit_processes=True)
+
+    reloaded: CoverageIndex = CoverageIndex(tmp_path / "coverage_index.json")
+    for index in range(8):
+        test: str = str(tmp_path / f"test{index}.ll")
+        assert reloaded.lookup(test, test_hashes[test]).covered_mutants == [index, index + 10]
+    failing: str = str(tmp_path / "failing.ll")
+    assert reloaded.lookup(failing, test_hashes[failing]).code == "FAIL"
+    assert reloaded.lookup(failing, test_hashes[failing]).covered_mutants is None
+    uncovered: str = str(tmp_path / "uncovered.ll")
+    assert reloaded.lookup(uncovered, test_hashes[uncovered]).covered_mutants == []
+    assert list(tracking_dir.iterdir()) == []
+
+
+def test_changed_tests_are_collected_again(tmp_path: Path):
+    coverage_index: CoverageIndex = CoverageIndex(tmp_path / "coverage_index.json")
+    llvm_lit: Path = write_fake_llvm_lit(tmp_path)
+    tests: List[str] = write_tests(tmp_path, {"test.ll": "1"})
+    collect_coverage(coverage_index, hash_tests(tests), llvm_lit, tmp_path, jobs=2, lit_processes=True)
+    write_tests(tmp_path, {"test.ll": "2"})
+    test_hashes: Dict[str, str] = hash_tests(tests)
+    assert coverage_index.lookup(tests[0], test_hashes[tests[0]]) is None
+    collect_coverage(coverage_index, test_hashes, llvm_lit, tmp_path, jobs=2, lit_processes=True)
+    assert coverage_index.lookup(tests[0], test_hashes[tests[0]]).covered_mutants == [2]
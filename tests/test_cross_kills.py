@@ -0,0 +1,22 @@
+import json
+
+from pathlib import Path
+
+from dredd_test_runners.common.run_test_with_mutants import KillStatus
+from dredd_test_runners.reduce_new_kills.cross_kills import (read_reduced_program_kills,
+                                                             write_cross_kills,
+                                                             write_reduced_program_kills)
+
+
+def test_reduced_program_kills(tmp_path: Path):
+    for mutant, kills in [(1, {3: KillStatus.KILL_DIFFERENT_STDOUT, 2: KillStatus.KILL_RUNTIME_TIMEOUT}), (4, {})]:
+        (tmp_path / str(mutant)).mkdir()
+        write_cross_kills(reduction_dir=tmp_path / str(mutant), mutant=mutant, kills=kills)
+    # A reduction whose cross-kill check has not completed.
+    (tmp_path / "5").mkdir()
+    assert read_reduced_program_kills(tmp_path) == {"1/prog.c": [1, 2, 3], "4/prog.c": [4]}
+    write_reduced_program_kills(tmp_path)
+    assert json.loads((tmp_path / "reduced_program_kills.json").read_text()) == {"1/prog.c": [1, 2, 3],
+                                                                                 "4/prog.c": [4]}
+    assert json.loads((tmp_path / "1" / "cross_kills.json").read_text())["cross_killed_mutants"] == {
+        "2": "KillStatus.KILL_RUNTIME_TIMEOUT", "3": "KillStatus.KILL_DIFFERENT_STDOUT"}
@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import List
+
+from dredd_test_runners.common import group_testing
+from dredd_test_runners.common.group_testing import evaluate_mutant_group, pack_compatible_mutants
+from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.run_test_with_mutants import KillStatus
+from tests.mutation_trees import SAMPLE_MUTATION_INFO
+
+
+def test_groups_of_one_preserve_order():
+    tree = MutationTree(SAMPLE_MUTATION_INFO)
+    assert pack_compatible_mutants([3, 0, 7], tree, 1) == [[3], [0], [7]]
+
+
+def test_incompatible_mutants_are_separated():
+    tree = MutationTree(SAMPLE_MUTATION_INFO)
+    # 0 and 1 share a node, and 2 and 3 are in the subtree of 0's node. 5 and 6 are compatible with all of them.
+    groups = pack_compatible_mutants([0, 1, 2, 3, 5, 6], tree, 10)
+    assert groups == [[0, 5, 6], [1], [2, 3]]
+    for group in groups:
+        for index, first in enumerate(group):
+            for second in group[index + 1:]:
+                assert tree.are_compatible(first, second)
+
+
+def test_group_size_is_bounded():
+    tree = MutationTree(SAMPLE_MUTATION_INFO)
+    groups = pack_compatible_mutants([2, 3, 5, 6, 7], tree, 2)
+    assert [len(group) for group in groups] == [2, 2, 1]
+    assert sorted(mutant for group in groups for mutant in group) == [2, 3, 5, 6, 7]
+
+
+def test_bisection_isolates_killing_mutants(monkeypatch):
+    killers = {3: KillStatus.KILL_DIFFERENT_STDOUT, 6: KillStatus.KILL_COMPILER_CRASH}
+    compilations: List[List[int]] = []
+
+    def fake_run(mutants: List[int], configuration, mutant_exe_path: Path) -> KillStatus:
+        compilations.append(list(mutants))
+        for mutant in mutants:
+            if mutant in killers:
+                return killers[mutant]
+        return KillStatus.SURVIVED_IDENTICAL
+
+    monkeypatch.setattr(group_testing, "run_test_with_mutants_using_configuration", fake_run)
+    verdicts = dict(evaluate_mutant_group(mutants=[1, 2, 3, 4, 5, 6, 7, 8], configuration=None,
+                                          mutant_exe_path=Path("unused")))
+    assert verdicts == {1: KillStatus.SURVIVED_IDENTICAL, 2: KillStatus.SURVIVED_IDENTICAL,
+                        3: KillStatus.KILL_DIFFERENT_STDOUT, 4: KillStatus.SURVIVED_IDENTICAL,
+                        5: KillStatus.SURVIVED_IDENTICAL, 6: KillStatus.KILL_COMPILER_CRASH,
+                        7: KillStatus.SURVIVED_IDENTICAL, 8: KillStatus.SURVIVED_IDENTICAL}
+    # Halves in which every mutant survives with an identical binary are not split further.
+    assert [1, 2] in compilations and [1] not in compilations
+
+
+def test_surviving_group_needs_one_compilation(monkeypatch):
+    compilations: List[List[int]] = []
+
+    def fake_run(mutants: List[int], configuration, mutant_exe_path: Path) -> KillStatus:
+        compilations.append(list(mutants))
+        return KillStatus.SURVIVED_IDENTICAL
+
+    monkeypatch.setattr(group_testing, "run_test_with_mutants_using_configuration", fake_run)
+    assert evaluate_mutant_group(mutants=[4, 5, 6], configuration=None, mutant_exe_path=Path("unused")) \
+        == [(4, KillStatus.SURVIVED_IDENTICAL), (5, KillStatus.SURVIVED_IDENTICAL), (6, KillStatus.SURVIVED_IDENTICAL)]
+    assert compilations == [[4, 5, 6]]
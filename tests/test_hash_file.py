@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from dredd_test_runners.common import hash_file as hash_file_module
+from dredd_test_runners.common.hash_file import BLAKE2_DIGEST, file_matches_hash, files_identical, hash_file
+
+
+def test_hash_records_digest_and_size(tmp_path: Path):
+    file: Path = tmp_path / "file"
+    file.write_bytes(b"x" * 3000000)
+    digest_name, size, hex_digest = hash_file(str(file)).split('-')
+    assert digest_name == hash_file_module.default_digest_name() and size == "3000000" and len(hex_digest) == 32
+    assert hash_file(str(file), digest_name=BLAKE2_DIGEST).startswith("blake2b-3000000-")
+    empty: Path = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert hash_file(str(empty)).split('-')[1] == "0"
+
+
+def test_file_matches_hash(tmp_path: Path):
+    file: Path = tmp_path / "file"
+    file.write_bytes(b"contents")
+    file_hash: str = hash_file(str(file))
+    assert file_matches_hash(str(file), file_hash)
+    # A hash computed with another available digest is checked with that digest.
+    assert file_matches_hash(str(file), hash_file(str(file), digest_name=BLAKE2_DIGEST))
+    file.write_bytes(b"Contents")
+    assert not file_matches_hash(str(file), file_hash)
+    file.write_bytes(b"longer contents")
+    assert not file_matches_hash(str(file), file_hash)
+
+
+def test_hashes_with_unavailable_or_unknown_digests_do_not_match(tmp_path: Path, monkeypatch):
+    file: Path = tmp_path / "file"
+    file.write_bytes(b"contents")
+    monkeypatch.setattr(hash_file_module, "xxhash", None)
+    assert not file_matches_hash(str(file), "xxh3-8-" + "0" * 32)
+    # A hash saved before the digest was recorded.
+    assert not file_matches_hash(str(file), "8-" + hash_file(str(file)).split('-')[2])
+
+
+def test_files_identical(tmp_path: Path):
+    first: Path = tmp_path / "first"
+    second: Path = tmp_path / "second"
+    first.write_bytes(b"a" * 5000000)
+    second.write_bytes(b"a" * 5000000)
+    assert files_identical(str(first), str(second))
+    second.write_bytes(b"a" * 4999999 + b"b")
+    assert not files_identical(str(first), str(second))
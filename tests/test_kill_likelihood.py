@@ -0,0 +1,89 @@
+from pathlib import Path
+
+from dredd_test_runners.common.kill_likelihood import KillLikelihoodScheduler
+from dredd_test_runners.common.kill_matrix import KillMatrixWriter
+from dredd_test_runners.common.mutation_tree import MutationTree
+from tests.mutation_trees import SAMPLE_MUTATION_INFO
+
+
+def new_scheduler() -> KillLikelihoodScheduler:
+    return KillLikelihoodScheduler(mutation_tree=MutationTree(SAMPLE_MUTATION_INFO))
+
+
+def same_counts(scheduler: KillLikelihoodScheduler, other: KillLikelihoodScheduler) -> bool:
+    return all(getattr(scheduler, name) == getattr(other, name)
+               for name in ["kills", "trials", "kind_kills", "kind_trials", "node_kills", "node_trials", "file_kills",
+                            "file_trials"])
+
+
+def test_untried_mutants_are_equally_likely():
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    assert len({scheduler.kill_likelihood(mutant) for mutant in range(8)}) == 1
+    assert scheduler.prioritise([3, 1, 2]) == [3, 1, 2]
+
+
+def test_record_counts_by_kind_node_and_file():
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    scheduler.record(3, killed=True)
+    scheduler.record(4, killed=False)
+    scheduler.record(7, killed=True)
+    assert (scheduler.kills, scheduler.trials) == (2, 3)
+    assert (scheduler.node_kills[3], scheduler.node_trials[3]) == (1, 2)
+    assert (scheduler.node_kills[6], scheduler.node_trials[6]) == (1, 1)
+    assert list(scheduler.file_kills) == [1, 1]
+    assert list(scheduler.file_trials) == [2, 1]
+
+
+def test_mutants_for_other_trees_are_ignored():
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    scheduler.record(8, killed=True)
+    assert scheduler.trials == 0
+
+
+def test_prioritise_prefers_nodes_with_kills():
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    for _ in range(5):
+        scheduler.record(2, killed=True)
+        scheduler.record(5, killed=False)
+    # Mutants 3 and 4 share a node, about which nothing is known, so they are judged by their kind and file.
+    assert scheduler.prioritise([5, 3, 2, 4]) == [2, 3, 4, 5]
+
+
+def test_record_from_kill_matrix_only_reads_new_records(tmp_path: Path):
+    kill_matrix_dir: Path = tmp_path / "kill_matrix"
+    cache_dir: Path = tmp_path / "cache"
+    writer: KillMatrixWriter = KillMatrixWriter(kill_matrix_dir)
+    writer.append("test1", covered=[0, 1, 2, 3], killed=[0, 1], skipped=[2], survived=[3])
+
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    scheduler.record_from_kill_matrix(kill_matrix_dir=kill_matrix_dir, cache_dir=cache_dir)
+    # The skipped mutant was not tried, so is not counted.
+    assert (scheduler.kills, scheduler.trials) == (2, 3)
+
+    writer.append("test2", covered=[5, 7], killed=[7], skipped=[], survived=[5])
+    writer.close()
+    resumed: KillLikelihoodScheduler = new_scheduler()
+    resumed.record_from_kill_matrix(kill_matrix_dir=kill_matrix_dir, cache_dir=cache_dir)
+    expected: KillLikelihoodScheduler = new_scheduler()
+    for mutant, killed in [(0, True), (1, True), (3, False), (7, True), (5, False)]:
+        expected.record(mutant, killed)
+    assert same_counts(resumed, expected)
+
+    # With nothing new in the kill matrix, the counts come from the cache alone.
+    (kill_matrix_dir / writer.segment.name).unlink()
+    cached: KillLikelihoodScheduler = new_scheduler()
+    cached.record_from_kill_matrix(kill_matrix_dir=kill_matrix_dir, cache_dir=cache_dir)
+    assert same_counts(cached, expected)
+
+
+def test_unusable_cache_is_ignored(tmp_path: Path):
+    kill_matrix_dir: Path = tmp_path / "kill_matrix"
+    cache_dir: Path = tmp_path / "cache"
+    writer: KillMatrixWriter = KillMatrixWriter(kill_matrix_dir)
+    writer.append("test1", covered=[0, 6], killed=[6], skipped=[], survived=[0])
+    writer.close()
+    scheduler: KillLikelihoodScheduler = new_scheduler()
+    cache_dir.mkdir()
+    (cache_dir / (scheduler.mutation_tree.fingerprint.hex() + ".cache")).write_bytes(b'{"kills": 1}\n\x00\x00')
+    scheduler.record_from_kill_matrix(kill_matrix_dir=kill_matrix_dir, cache_dir=cache_dir)
+    assert (scheduler.kills, scheduler.trials) == (1, 2)
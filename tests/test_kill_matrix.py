@@ -0,0 +1,133 @@
+import os
+
+from pathlib import Path
+from typing import List
+
+from dredd_test_runners.common.kill_matrix import (MAGIC,
+                                                   RECORD_PREFIX,
+                                                   Bitset,
+                                                   KillMatrix,
+                                                   KillMatrixWriter,
+                                                   _compressed_contains)
+
+
+def test_bitset_operations():
+    bitset: Bitset = Bitset.of([0, 3, 9, 64, 1000])
+    assert list(bitset) == [0, 3, 9, 64, 1000]
+    assert len(bitset) == 5
+    assert 9 in bitset and 10 not in bitset and 5000 not in bitset
+    other: Bitset = Bitset.of([3, 4, 1000])
+    assert list(bitset | other) == [0, 3, 4, 9, 64, 1000]
+    assert list(bitset & other) == [3, 1000]
+    assert list(bitset - other) == [0, 9, 64]
+    assert Bitset.of([]) == Bitset() and len(Bitset()) == 0 and list(Bitset()) == []
+    assert Bitset.of([2, 1]) == Bitset.of([1, 2]) and hash(Bitset.of([2, 1])) == hash(Bitset.of([1, 2]))
+
+
+def test_bitset_compression_round_trip():
+    for mutants in [[], [0], [7, 8], list(range(0, 100000, 3))]:
+        compressed: bytes = Bitset.of(mutants).compress()
+        assert list(Bitset.decompress(compressed)) == mutants
+        for mutant in [0, 1, 7, 8, 99999, 200000]:
+            assert _compressed_contains(compressed, mutant) == (mutant in mutants)
+
+
+def write_matrix(directory: Path) -> KillMatrixWriter:
+    writer: KillMatrixWriter = KillMatrixWriter(directory)
+    writer.append("test1", covered=[1, 2, 3, 4], killed=[1], skipped=[2], survived=[3, 4])
+    writer.append("test2", covered=[3, 5], killed=[3, 5], skipped=[], survived=[])
+    return writer
+
+
+def test_queries(tmp_path: Path):
+    write_matrix(tmp_path).close()
+    kill_matrix: KillMatrix = KillMatrix(tmp_path)
+    assert kill_matrix.tests() == ["test1", "test2"]
+    assert list(kill_matrix.mutants("test1", "survived")) == [3, 4]
+    assert kill_matrix.contains("test2", 5, "killed") and not kill_matrix.contains("test2", 4, "killed")
+    assert list(kill_matrix.union("killed")) == [1, 3, 5]
+    assert list(kill_matrix.intersection("covered")) == [3]
+    assert list(kill_matrix.intersection("killed", tests=["test1"])) == [1]
+    assert kill_matrix.tests_with(3, "covered") == ["test1", "test2"]
+    assert kill_matrix.mutant_outcomes(3) == {"test1": "survived", "test2": "killed"}
+    assert kill_matrix.mutant_outcomes(2) == {"test1": "skipped"}
+    assert list(kill_matrix.covered_but_never_killed()) == [2, 4]
+
+
+def test_later_records_win_and_refresh_reads_new_records(tmp_path: Path):
+    writer: KillMatrixWriter = write_matrix(tmp_path)
+    kill_matrix: KillMatrix = KillMatrix(tmp_path)
+    # E.g. the test was resumed, and completed.
+    writer.append("test1", covered=[1, 2, 3, 4], killed=[1, 4], skipped=[2], survived=[3])
+    writer.append("test3", covered=[6], killed=[], skipped=[], survived=[6])
+    writer.close()
+    assert list(kill_matrix.mutants("test1", "killed")) == [1]
+    kill_matrix.refresh()
+    assert kill_matrix.tests() == ["test1", "test2", "test3"]
+    assert list(kill_matrix.mutants("test1", "killed")) == [1, 4]
+
+
+def test_reading_from_offsets(tmp_path: Path):
+    writer: KillMatrixWriter = write_matrix(tmp_path)
+    offsets = KillMatrix(tmp_path).offsets
+    writer.append("test3", covered=[6], killed=[6], skipped=[], survived=[])
+    writer.close()
+    assert KillMatrix(tmp_path, offsets=offsets).tests() == ["test3"]
+
+
+def test_segments_are_combined(tmp_path: Path):
+    write_matrix(tmp_path).close()
+    writer: KillMatrixWriter = KillMatrixWriter(tmp_path)
+    writer.append("other_machine_test", covered=[7], killed=[7], skipped=[], survived=[])
+    writer.close()
+    assert KillMatrix(tmp_path).tests() == ["other_machine_test", "test1", "test2"]
+
+
+def segment_of(tmp_path: Path) -> Path:
+    segments: List[Path] = list(tmp_path.glob("*.dkm"))
+    assert len(segments) == 1
+    return segments[0]
+
+
+def test_torn_record_is_read_once_complete(tmp_path: Path):
+    write_matrix(tmp_path).close()
+    segment: Path = segment_of(tmp_path)
+    data: bytes = segment.read_bytes()
+    # Only part of the last record has been written.
+    segment.write_bytes(data[:-5])
+    kill_matrix: KillMatrix = KillMatrix(tmp_path)
+    assert kill_matrix.tests() == ["test1"]
+    segment.write_bytes(data)
+    kill_matrix.refresh()
+    assert kill_matrix.tests() == ["test1", "test2"]
+    # A prefix that is shorter than the record prefix is likewise left for later.
+    segment.write_bytes(data[:len(MAGIC) + RECORD_PREFIX.size - 1])
+    assert KillMatrix(tmp_path).tests() == []
+
+
+def test_corrupt_record_is_skipped(tmp_path: Path, capsys):
+    write_matrix(tmp_path).close()
+    segment: Path = segment_of(tmp_path)
+    data: bytearray = bytearray(segment.read_bytes())
+    # Flip a bit in the body of the first record; its length is intact, so the record after it is still found.
+    data[len(MAGIC) + RECORD_PREFIX.size + 2] ^= 1
+    segment.write_bytes(bytes(data))
+    assert KillMatrix(tmp_path).tests() == ["test2"]
+    assert "corrupt record" in capsys.readouterr().out
+
+
+def test_files_that_are_not_segments_are_ignored(tmp_path: Path, capsys):
+    (tmp_path / "stray.dkm").write_bytes(b"not a segment")
+    (tmp_path / "empty.dkm").write_bytes(b"")
+    write_matrix(tmp_path).close()
+    kill_matrix: KillMatrix = KillMatrix(tmp_path)
+    assert kill_matrix.tests() == ["test1", "test2"]
+    assert kill_matrix.ignored == {tmp_path / "stray.dkm"}
+    assert "not a kill matrix segment" in capsys.readouterr().out
+    # An empty segment may be one whose writer has yet to write the magic bytes, so it is read again later.
+    assert kill_matrix.offsets[tmp_path / "empty.dkm"] == 0
+
+
+def test_missing_directory_is_empty(tmp_path: Path):
+    assert KillMatrix(tmp_path / "missing").tests() == []
+    assert not os.path.exists(tmp_path / "missing")
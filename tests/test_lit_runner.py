@@ -0,0 +1,162 @@
+import os
+import pytest
+import sys
+import time
+
+from pathlib import Path
+from typing import Optional
+
+from dredd_test_runners.llvm_regression_tests_runner.lit_runner import (LitProcessRunner,
+                                                                          LitResult,
+                                                                          LitRunner,
+                                                                          PersistentLitRunner)
+
+# A minimal stand-in for lit, providing just the parts that lit_worker.py and llvm-lit use. Each test is a shell script,
+# which passes if it exits successfully.
+FAKE_LIT_MODULES = {
+    "__init__.py": "",
+    "LitConfig.py": """
+class LitConfig:
+    def __init__(self, progname, params):
+        self.params = params
+""",
+    "Test.py": """
+class ResultCode:
+    def __init__(self, name, isFailure):
+        self.name = name
+        self.isFailure = isFailure
+
+
+PASS = ResultCode("PASS", False)
+FAIL = ResultCode("FAIL", True)
+
+
+class Result:
+    def __init__(self, code, output=""):
+        self.code = code
+        self.output = output
+""",
+    "discovery.py": """
+import subprocess
+
+import lit.Test
+
+
+class ShellTest:
+    def execute(self, test, lit_config):
+        completed = subprocess.run(["/bin/sh", test.path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return lit.Test.Result(lit.Test.PASS if completed.returncode == 0 else lit.Test.FAIL)
+
+
+class Config:
+    test_format = ShellTest()
+
+
+class Test:
+    def __init__(self, path):
+        self.path = path
+        self.config = Config()
+        self.result = None
+
+    def setResult(self, result):
+        assert self.result is None
+        self.result = result
+
+
+def find_tests_for_inputs(lit_config, inputs):
+    return [Test(path) for path in inputs]
+""",
+    "main.py": """
+import sys
+
+import lit.discovery
+
+
+def main():
+    failed = False
+    for test in lit.discovery.find_tests_for_inputs(None, sys.argv[1:]):
+        result = test.config.test_format.execute(test, None)
+        print(f"{result.code.name}: fake :: {test.path} (1 of 1)")
+        failed = failed or result.code.isFailure
+    sys.exit(1 if failed else 0)
+""",
+}
+
+FAKE_LLVM_LIT: str = f"""#!{sys.executable}
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_lit"))
+builtin_parameters = {{}}
+
+if __name__ == "__main__":
+    import lit.main
+    lit.main.main()
+"""
+
+
+@pytest.fixture
+def llvm_lit(tmp_path: Path) -> Path:
+    package: Path = tmp_path / "bin" / "fake_lit" / "lit"
+    package.mkdir(parents=True)
+    for name, contents in FAKE_LIT_MODULES.items():
+        (package / name).write_text(contents)
+    result: Path = tmp_path / "bin" / "llvm-lit"
+    result.write_text(FAKE_LLVM_LIT)
+    os.chmod(result, 0o755)
+    return result
+
+
+@pytest.fixture(params=["persistent", "process"])
+def lit_runner(request, llvm_lit: Path):
+    runner: LitRunner = PersistentLitRunner(llvm_lit) if request.param == "persistent" else LitProcessRunner(llvm_lit)
+    with runner:
+        yield runner
+
+
+def write_test(tmp_path: Path, name: str, script: str) -> str:
+    test: Path = tmp_path / name
+    test.write_text(script)
+    return str(test)
+
+
+def test_lit_runner_is_abstract():
+    with pytest.raises(TypeError):
+        LitRunner()
+
+
+def test_results_and_mutations(lit_runner: LitRunner, tmp_path: Path):
+    test: str = write_test(tmp_path, "mutation.test", 'test "$DREDD_ENABLED_MUTATION" != 3\n')
+    result: Optional[LitResult] = lit_runner.run(test=test, mutation=None, timeout_seconds=60)
+    assert result is not None and result.code == "PASS" and not result.is_failure()
+    # The same test can be run again, e.g. with a mutation enabled.
+    result = lit_runner.run(test=test, mutation=3, timeout_seconds=60)
+    assert result is not None and result.code == "FAIL" and result.is_failure()
+    result = lit_runner.run(test=test, mutation=4, timeout_seconds=60)
+    assert result is not None and result.code == "PASS"
+
+
+def test_tracking_file(lit_runner: LitRunner, tmp_path: Path):
+    test: str = write_test(tmp_path, "tracking.test", 'echo 7 > "$DREDD_MUTANT_TRACKING_FILE"\n')
+    tracking_file: Path = tmp_path / "tracking"
+    result: Optional[LitResult] = lit_runner.run(test=test, mutation=None, timeout_seconds=60,
+                                                 tracking_file=tracking_file)
+    assert result is not None and result.code == "PASS"
+    assert tracking_file.read_text() == "7\n"
+
+
+def test_wall_clock_timeout(lit_runner: LitRunner, tmp_path: Path):
+    test: str = write_test(tmp_path, "sleep.test", "sleep 30\n")
+    assert lit_runner.run(test=test, mutation=None, timeout_seconds=0.5) is None
+    # A new worker is started for the next test.
+    passing: str = write_test(tmp_path, "pass.test", "true\n")
+    assert lit_runner.run(test=passing, mutation=None, timeout_seconds=60).code == "PASS"
+
+
+def test_command_in_busy_loop_is_stopped_at_the_cpu_limit(lit_runner: LitRunner, tmp_path: Path):
+    test: str = write_test(tmp_path, "busy.test", f'"{sys.executable}" -c "while True: pass"\n')
+    start: float = time.monotonic()
+    assert lit_runner.run(test=test, mutation=None, timeout_seconds=60, cpu_timeout_seconds=1.0) is None
+    assert time.monotonic() - start < 30
+    passing: str = write_test(tmp_path, "pass.test", "true\n")
+    assert lit_runner.run(test=passing, mutation=None, timeout_seconds=60, cpu_timeout_seconds=1.0).code == "PASS"
@@ -0,0 +1,27 @@
+import time
+
+from pathlib import Path
+
+from dredd_test_runners.common.live_kill_set import LiveKillSet
+from dredd_test_runners.common.result_store import ResultStore, open_result_store
+
+
+def test_kills_recorded_elsewhere_are_picked_up(tmp_path: Path):
+    def open_store() -> ResultStore:
+        return open_result_store(work_dir=tmp_path / "work", result_database=tmp_path / "results.sqlite")
+
+    store: ResultStore = open_store()
+    kill_info = {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"}
+    store.record_kill(1, kill_info)
+    with LiveKillSet(open_store=open_store, refresh_interval=0.01) as live_kill_set:
+        # The first scan is complete before the set is returned.
+        assert live_kill_set.is_killed(1)
+        store.record_kill(2, kill_info)
+        deadline: float = time.time() + 10.0
+        while not live_kill_set.is_killed(2) and time.time() < deadline:
+            time.sleep(0.01)
+        assert live_kill_set.killed_mutants() == {1, 2}
+        live_kill_set.add(3)
+        assert live_kill_set.is_killed(3)
+    assert not live_kill_set.thread.is_alive()
+    store.close()
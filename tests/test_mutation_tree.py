@@ -0,0 +1,130 @@
+import json
+import pytest
+import random
+
+from typing import Dict, List, Set
+
+from dredd_test_runners.common.mutation_tree import (MutationTree,
+                                                     describe_mutation_tree_mismatch,
+                                                     get_mutation_ids_for_json_node)
+from tests.mutation_trees import SAMPLE_MUTATION_INFO, mutation_info, node
+
+
+class ReferenceTree:
+    # An object-per-node tree, built recursively from the JSON in the way that MutationTree used to be, against which
+    # the flat arrays are checked.
+    def __init__(self, json_data: Dict):
+        self.mutation_to_node: Dict[int, Dict] = {}
+        self.ancestors: Dict[int, List[Dict]] = {}
+        for file in json_data["infoForFiles"]:
+            self._visit(file["mutationTreeRoot"], [])
+
+    def _visit(self, json_node: Dict, ancestors: List[Dict]) -> None:
+        for mutation_id in get_mutation_ids_for_json_node(json_node):
+            self.mutation_to_node[mutation_id] = json_node
+            self.ancestors[mutation_id] = ancestors
+        for child in json_node["children"]:
+            self._visit(child, ancestors + [json_node])
+
+    @staticmethod
+    def subtree_mutation_ids(json_node: Dict) -> List[int]:
+        result: List[int] = get_mutation_ids_for_json_node(json_node)
+        for child in json_node["children"]:
+            result += ReferenceTree.subtree_mutation_ids(child)
+        return result
+
+    def incompatible_mutation_ids(self, mutation_id: int) -> Set[int]:
+        result: Set[int] = set(ReferenceTree.subtree_mutation_ids(self.mutation_to_node[mutation_id]))
+        for ancestor in self.ancestors[mutation_id]:
+            result.update(get_mutation_ids_for_json_node(ancestor))
+        return result
+
+
+def random_mutation_info(seed: int, num_files: int = 3, num_nodes: int = 60) -> Dict:
+    rng: random.Random = random.Random(seed)
+    next_mutation_id: List[int] = [0]
+
+    def random_node(budget: int) -> Dict:
+        mutation_ids: List[int] = list(range(next_mutation_id[0], next_mutation_id[0] + rng.randint(0, 3)))
+        next_mutation_id[0] += len(mutation_ids)
+        children: List[Dict] = []
+        budget -= 1
+        while budget > 0 and rng.random() < 0.7:
+            child_budget: int = rng.randint(1, budget)
+            children.append(random_node(child_budget))
+            budget -= child_budget
+        return node(mutation_ids, children, kind=rng.choice(["replaceExpr", "replaceBinaryOperator", "removeStmt"]))
+
+    return mutation_info(*[random_node(num_nodes) for _ in range(num_files)])
+
+
+def test_sample_tree_arrays():
+    tree = MutationTree(SAMPLE_MUTATION_INFO)
+    assert tree.num_nodes == 7
+    assert tree.num_mutations == 8
+    assert list(tree.parents) == [-1, 0, 1, 1, 0, -1, 5]
+    assert list(tree.subtree_ends) == [5, 4, 3, 4, 5, 7, 7]
+    assert list(tree.file_roots) == [0, 5]
+    assert tree.get_children(0) == [1, 4]
+    assert tree.get_mutation_ids_for_subtree(1) == [0, 1, 2, 3, 4]
+    assert tree.get_mutation_ids_for_node(3) == [3, 4]
+    assert tree.get_mutation_kind(7) == "removeStmt"
+    assert [tree.get_file_index_for_node(node_id) for node_id in range(7)] == [0, 0, 0, 0, 0, 1, 1]
+
+
+def test_arrays_match_reference_tree():
+    for seed in range(5):
+        json_data: Dict = random_mutation_info(seed)
+        tree = MutationTree(json_data)
+        reference = ReferenceTree(json_data)
+        assert tree.num_mutations == len(reference.mutation_to_node)
+        for mutation_id in range(tree.num_mutations):
+            incompatible: Set[int] = reference.incompatible_mutation_ids(mutation_id)
+            assert set(tree.get_incompatible_mutation_ids(mutation_id)) == incompatible
+            assert sorted(tree.get_mutation_ids_for_subtree(tree.mutation_id_to_node_id[mutation_id])) \
+                == sorted(ReferenceTree.subtree_mutation_ids(reference.mutation_to_node[mutation_id]))
+            for other in range(tree.num_mutations):
+                assert tree.are_compatible(mutation_id, other) == (other not in incompatible)
+
+
+def test_deep_tree_does_not_recurse():
+    deep: Dict = node([0])
+    for mutation_id in range(1, 5000):
+        deep = node([mutation_id], [deep])
+    tree = MutationTree(mutation_info(deep))
+    assert tree.num_nodes == 5000
+    assert len(tree.get_incompatible_mutation_ids(2500)) == 5000
+
+
+
+def test_mutation_ids_without_nodes_are_rejected():
+    # Mutation id 1 is not associated with any node.
+    tree = MutationTree(mutation_info(node([0], [node([2])]), node([3])))
+    assert tree.mutation_id_to_node_id[1] == -1
+    assert not tree.are_compatible(0, 2)
+    assert tree.are_compatible(2, 3)
+    with pytest.raises(AssertionError):
+        tree.are_compatible(1, 3)
+    with pytest.raises(AssertionError):
+        tree.are_compatible(3, 1)
+    with pytest.raises(AssertionError):
+        tree.is_in_subtree(-1, tree.mutation_id_to_node_id[3])
+
+
+def test_identical_trees_match():
+    assert describe_mutation_tree_mismatch(MutationTree(SAMPLE_MUTATION_INFO), MutationTree(SAMPLE_MUTATION_INFO)) \
+        is None
+    # File names are not part of the structure.
+    renamed: Dict = json.loads(json.dumps(SAMPLE_MUTATION_INFO))
+    renamed["infoForFiles"][0]["filename"] = "elsewhere/file0.cc"
+    assert describe_mutation_tree_mismatch(MutationTree(SAMPLE_MUTATION_INFO), MutationTree(renamed)) is None
+
+
+def test_mismatch_is_located():
+    changed: Dict = json.loads(json.dumps(SAMPLE_MUTATION_INFO))
+    changed["infoForFiles"][1]["mutationTreeRoot"]["children"][0]["mutationGroups"][0]["removeStmt"]["mutationId"] = 8
+    description = describe_mutation_tree_mismatch(MutationTree(SAMPLE_MUTATION_INFO), MutationTree(changed))
+    assert description is not None
+    assert "file 1" in description and "node 1 of the file" in description and "mutation ids" in description
+    assert "different numbers of files" in describe_mutation_tree_mismatch(
+        MutationTree(SAMPLE_MUTATION_INFO), MutationTree(mutation_info(node([0]))))
@@ -0,0 +1,76 @@
+import json
+import os
+
+from pathlib import Path
+
+from dredd_test_runners.common import mutation_tree_index
+from dredd_test_runners.common.mutation_tree import MutationTree
+from dredd_test_runners.common.mutation_tree_index import (build_mutation_tree_index,
+                                                           load_mutation_tree,
+                                                           read_mutation_tree_index)
+from tests.mutation_trees import SAMPLE_MUTATION_INFO, mutation_info, node
+from tests.test_mutation_tree import random_mutation_info
+
+ARRAY_NAMES = mutation_tree_index.ARRAY_NAMES
+
+
+def write_mutation_info(path: Path, json_data) -> Path:
+    with open(path, 'w') as outfile:
+        json.dump(json_data, outfile)
+    return path
+
+
+def assert_same_tree(tree: MutationTree, other: MutationTree) -> None:
+    for name in ARRAY_NAMES:
+        assert list(getattr(tree, name)) == list(getattr(other, name)), name
+    assert tree.file_names == other.file_names
+    assert tree.file_fingerprints == other.file_fingerprints
+    assert tree.fingerprint == other.fingerprint
+    assert tree.num_nodes == other.num_nodes
+    assert tree.num_mutations == other.num_mutations
+
+
+def test_round_trip(tmp_path: Path):
+    for seed in range(3):
+        json_data = random_mutation_info(seed)
+        mutation_info_file: Path = write_mutation_info(tmp_path / f"info{seed}.json", json_data)
+        loaded: MutationTree = load_mutation_tree(mutation_info_file)
+        assert_same_tree(MutationTree(json_data), loaded)
+        for mutation_id in range(loaded.num_mutations):
+            assert loaded.get_incompatible_mutation_ids(mutation_id) \
+                == MutationTree(json_data).get_incompatible_mutation_ids(mutation_id)
+
+
+def test_index_is_reused_without_rehashing(tmp_path: Path, monkeypatch):
+    mutation_info_file: Path = write_mutation_info(tmp_path / "info.json", SAMPLE_MUTATION_INFO)
+    index_path: Path = build_mutation_tree_index(mutation_info_file, tmp_path / "cache")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected rehash or rebuild")
+
+    monkeypatch.setattr(mutation_tree_index, "hash_mutation_info_file", fail)
+    monkeypatch.setattr(mutation_tree_index, "write_mutation_tree_index", fail)
+    assert build_mutation_tree_index(mutation_info_file, tmp_path / "cache") == index_path
+    assert_same_tree(MutationTree(SAMPLE_MUTATION_INFO), load_mutation_tree(mutation_info_file, tmp_path / "cache"))
+
+
+def test_changed_mutation_info_file_gets_new_index(tmp_path: Path):
+    mutation_info_file: Path = write_mutation_info(tmp_path / "info.json", SAMPLE_MUTATION_INFO)
+    index_path: Path = build_mutation_tree_index(mutation_info_file)
+    changed = mutation_info(node([0], [node([1])]))
+    write_mutation_info(mutation_info_file, changed)
+    # Make sure that the modification time differs even on file systems with coarse timestamps.
+    stat = mutation_info_file.stat()
+    os.utime(mutation_info_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert build_mutation_tree_index(mutation_info_file) != index_path
+    assert_same_tree(MutationTree(changed), load_mutation_tree(mutation_info_file))
+
+
+def test_unusable_index_is_rebuilt(tmp_path: Path):
+    mutation_info_file: Path = write_mutation_info(tmp_path / "info.json", SAMPLE_MUTATION_INFO)
+    index_path: Path = build_mutation_tree_index(mutation_info_file)
+    with open(index_path, 'r+b') as index_file:
+        index_file.write(b'NOTANIDX')
+    assert read_mutation_tree_index(index_path) is None
+    assert_same_tree(MutationTree(SAMPLE_MUTATION_INFO), load_mutation_tree(mutation_info_file))
+    assert read_mutation_tree_index(index_path) is not None
@@ -0,0 +1,168 @@
+import json
+import os
+import pytest
+import shutil
+import sys
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dredd_test_runners.common.run_test_with_mutants import KillStatus
+from dredd_test_runners.reduce_new_kills.reduction_scheduler import Reduction, ReductionScheduler, ReductionStats
+
+# Stands in for creduce: records the number of cores it was given, waits for as long as the reduction directory's
+# 'delay' file says, and then halves the program.
+FAKE_CREDUCE: str = f"""#!{sys.executable}
+import sys
+import time
+from pathlib import Path
+
+assert sys.argv[1] == "--n" and sys.argv[3:] == ["interesting.py", "prog.c"]
+Path("cores").write_text(sys.argv[2])
+if Path("delay").exists():
+    time.sleep(float(Path("delay").read_text()))
+program = Path("prog.c").read_text()
+Path("prog.c").write_text(program[:len(program) // 2])
+"""
+
+
+@pytest.fixture
+def fake_creduce(tmp_path: Path, monkeypatch):
+    bin_dir: Path = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "creduce").write_text(FAKE_CREDUCE)
+    os.chmod(bin_dir / "creduce", 0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+
+
+class Reductions:
+    # Creates the programs to reduce, and prepares the directories in which they are reduced.
+    def __init__(self, tmp_path: Path):
+        self.tmp_path: Path = tmp_path
+        self.prepared: List[int] = []
+        self.delays: Dict[int, float] = {}
+        self.skipped: List[int] = []
+
+    def reduction(self, mutant: int, kill_type: str = 'KillStatus.KILL_DIFFERENT_STDOUT', size: int = 100,
+                  delay: float = 0.0) -> Reduction:
+        program: Path = self.tmp_path / f"program_{mutant}.c"
+        program.write_text("x" * size)
+        self.delays[mutant] = delay
+        return Reduction(mutant=mutant, kill_info={"killing_test": f"csmith_{mutant}", "kill_type": kill_type},
+                         program=program)
+
+    def prepare(self, reduction: Reduction) -> Optional[Path]:
+        if reduction.mutant in self.skipped:
+            return None
+        self.prepared.append(reduction.mutant)
+        reduction_dir: Path = self.tmp_path / "reductions" / str(reduction.mutant)
+        reduction_dir.mkdir(parents=True)
+        shutil.copy(reduction.program, reduction_dir / "prog.c")
+        (reduction_dir / "interesting.py").write_text("")
+        (reduction_dir / "delay").write_text(str(self.delays[reduction.mutant]))
+        return reduction_dir
+
+    def cores(self, mutant: int) -> int:
+        return int((self.tmp_path / "reductions" / str(mutant) / "cores").read_text())
+
+
+def test_reductions_are_started_in_order_of_priority(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(1, 'KillStatus.KILL_RUNTIME_TIMEOUT', size=10),
+                                  reductions.reduction(2, size=300),
+                                  reductions.reduction(3, 'KillStatus.KILL_DIFFERENT_EXIT_CODES', size=10),
+                                  reductions.reduction(4, size=200)]
+    scheduler: ReductionScheduler = ReductionScheduler(cores=1, cores_per_reduction=1, timeout=60.0,
+                                                       prepare=reductions.prepare)
+    stats: List[ReductionStats] = scheduler.run(to_reduce)
+    # Kills due to differing output first, smaller programs first.
+    assert reductions.prepared == [4, 2, 3, 1]
+    assert [s.mutant for s in stats] == [4, 2, 3, 1]
+    assert stats[0].original_size == 200 and stats[0].reduced_size == 100 and stats[0].size_reduction() == 0.5
+    assert not stats[0].timed_out and stats[0].cores == 1
+    recorded: Dict = json.loads((tmp_path / "reductions" / "4" / "reduction_stats.json").read_text())
+    assert recorded["mutant"] == 4 and recorded["reduced_size"] == 100 and recorded["cross_killed_mutants"] == []
+
+
+def test_cores_are_shared_among_reductions(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(mutant, size=100 + mutant, delay=0.2) for mutant in range(3)]
+    ReductionScheduler(cores=10, cores_per_reduction=4, timeout=60.0, prepare=reductions.prepare).run(to_reduce)
+    # Two reductions fit in the budget, and share the two cores that would otherwise be idle. The third gets the cores
+    # of whichever finishes first.
+    assert [reductions.cores(mutant) for mutant in range(3)] == [5, 5, 5]
+
+
+def test_cores_are_shared_when_few_reductions_are_left(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(mutant, size=100 + mutant) for mutant in range(2)]
+    ReductionScheduler(cores=16, cores_per_reduction=4, timeout=60.0, prepare=reductions.prepare).run(to_reduce)
+    assert [reductions.cores(mutant) for mutant in range(2)] == [8, 8]
+
+
+def test_budget_smaller_than_cores_per_reduction(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(mutant, size=100 + mutant) for mutant in range(2)]
+    ReductionScheduler(cores=2, cores_per_reduction=4, timeout=60.0, prepare=reductions.prepare).run(to_reduce)
+    assert [reductions.cores(mutant) for mutant in range(2)] == [2, 2]
+
+
+def test_skipped_reductions_leave_their_cores_free(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(mutant, size=100 + mutant) for mutant in range(3)]
+    reductions.skipped = [0]
+    stats: List[ReductionStats] = ReductionScheduler(cores=8, cores_per_reduction=4, timeout=60.0,
+                                                     prepare=reductions.prepare).run(to_reduce)
+    assert sorted(s.mutant for s in stats) == [1, 2]
+    assert [reductions.cores(mutant) for mutant in [1, 2]] == [4, 4]
+
+
+def test_timed_out_reduction_keeps_its_program(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    stats: List[ReductionStats] = ReductionScheduler(cores=1, cores_per_reduction=1, timeout=0.5,
+                                                     prepare=reductions.prepare).run(
+        [reductions.reduction(1, delay=30.0)])
+    assert stats[0].timed_out and stats[0].cpu_time is None
+    assert stats[0].reduced_size == 100
+
+
+class CrossKills:
+    # Stands in for a cross-kill check: the reduced program for each mutant kills the given other mutants.
+    def __init__(self, kills: Dict[int, List[int]]):
+        self.kills: Dict[int, List[int]] = kills
+        self.checks: List[Tuple[int, List[int], int]] = []
+
+    def check(self, reduction: Reduction, reduction_dir: Path, mutants: List[int], cores: int) -> Dict[int, KillStatus]:
+        assert (reduction_dir / "prog.c").exists()
+        self.checks.append((reduction.mutant, sorted(mutants), cores))
+        return {mutant: KillStatus.KILL_DIFFERENT_STDOUT for mutant in self.kills.get(reduction.mutant, [])
+                if mutant in mutants}
+
+
+def test_cross_killed_mutants_are_not_reduced(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    to_reduce: List[Reduction] = [reductions.reduction(mutant, size=100 + mutant) for mutant in range(1, 5)]
+    cross_kills: CrossKills = CrossKills({1: [3, 7]})
+    stats: List[ReductionStats] = ReductionScheduler(cores=1, cores_per_reduction=1, timeout=60.0,
+                                                     prepare=reductions.prepare,
+                                                     check_cross_kills=cross_kills.check).run(to_reduce)
+    assert reductions.prepared == [1, 2, 4]
+    # Each check is given the mutants whose reductions have not yet been started, as pruned by earlier checks.
+    assert cross_kills.checks == [(1, [2, 3, 4], 1), (2, [4], 1), (4, [], 1)]
+    assert list(stats[0].cross_kills.keys()) == [3]
+    recorded: Dict = json.loads((tmp_path / "reductions" / "1" / "reduction_stats.json").read_text())
+    assert recorded["cross_killed_mutants"] == [3]
+
+
+def test_queue_is_pruned_before_cores_are_reused(tmp_path: Path, fake_creduce):
+    reductions: Reductions = Reductions(tmp_path)
+    # Mutant 2's reduction takes longer than mutant 1's, so it is still running when mutant 1's check prunes the queue.
+    to_reduce: List[Reduction] = [reductions.reduction(1, size=101),
+                                  reductions.reduction(2, size=102, delay=0.5)] \
+        + [reductions.reduction(mutant, size=100 + mutant) for mutant in range(3, 6)]
+    cross_kills: CrossKills = CrossKills({1: [3]})
+    ReductionScheduler(cores=2, cores_per_reduction=1, timeout=60.0, prepare=reductions.prepare,
+                       check_cross_kills=cross_kills.check).run(to_reduce)
+    assert cross_kills.checks[0] == (1, [3, 4, 5], 1)
+    assert reductions.prepared == [1, 2, 4, 5]
+    assert all(3 not in mutants for _, mutants, _ in cross_kills.checks[1:])
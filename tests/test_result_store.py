@@ -0,0 +1,128 @@
+import os
+import pytest
+
+from pathlib import Path
+from typing import Optional
+
+from dredd_test_runners.common.result_store import (DirectoryResultStore,
+                                                    ResultStore,
+                                                    SqliteResultStore,
+                                                    import_work_directory,
+                                                    open_result_store,
+                                                    skipped_test_summary)
+from tests.coordinators import RunningCoordinator
+
+
+@pytest.fixture(params=["directory", "sqlite", "coordinator"])
+def store(request, tmp_path: Path):
+    work_dir: Path = tmp_path / "work"
+    coordinator: Optional[RunningCoordinator] = None
+    if request.param == "coordinator":
+        coordinator = RunningCoordinator(tmp_path / "coordinator")
+    result_store: ResultStore = open_result_store(
+        work_dir=work_dir,
+        result_database=tmp_path / "results.sqlite" if request.param == "sqlite" else None,
+        coordinator=coordinator.url if coordinator is not None else None)
+    yield result_store
+    result_store.close()
+    if coordinator is not None:
+        coordinator.close()
+
+
+def test_result_store_is_abstract(tmp_path: Path):
+    with pytest.raises(TypeError):
+        ResultStore(tmp_path)
+
+
+def test_stores_are_concrete(tmp_path: Path):
+    assert isinstance(DirectoryResultStore(tmp_path / "work"), ResultStore)
+    database_store = SqliteResultStore(tmp_path / "work", tmp_path / "results.sqlite")
+    database_store.close()
+
+
+def test_claims_and_kills(store: ResultStore):
+    assert store.claim_test("csmith_1")
+    assert not store.claim_test("csmith_1")
+    assert store.test_directory("csmith_1").is_dir()
+    assert store.record_kill(5, {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"})
+    assert not store.record_kill(5, {"killing_test": "csmith_2", "kill_type": "KillStatus.KILL_COMPILER_CRASH"})
+    assert store.is_mutant_killed(5) and not store.is_mutant_killed(6)
+    assert store.killed_mutants() == {5}
+    assert store.kill_info(5)["killing_test"] == "csmith_1"
+    assert store.kill_info(6) is None
+
+
+def test_resumable_tests(store: ResultStore):
+    for test_name in ["complete", "terminated_early", "unfinished", "completed_with_key", "skipped"]:
+        assert store.claim_test(test_name)
+    store.record_test_summary("complete", {"killed_mutants": []})
+    # A test that turned out to be unusable is complete.
+    store.record_test_summary("skipped", skipped_test_summary(test="skipped", reason="it fails without mutation"))
+    store.record_test_summary("terminated_early", {"killed_mutants": [], "terminated_early": True})
+    # The Csmith and YARPGen runners always record whether the test was terminated early.
+    store.record_test_summary("completed_with_key", {"killed_mutants": [], "terminated_early": False})
+    # A negative staleness threshold makes every heartbeat stale.
+    assert store.resumable_tests(stale_after=-1.0) == ["terminated_early", "unfinished"]
+    assert store.resumable_tests(stale_after=3600.0) == []
+
+
+def test_reclaim_supersedes_previous_claim(store: ResultStore):
+    assert store.claim_test("csmith_1")
+    store.heartbeat_test("csmith_1", checkpoint={"evaluated": [1, 2]})
+    assert not store.reclaim_test("csmith_1", stale_after=3600.0)
+    assert store.reclaim_test("csmith_1", stale_after=-1.0)
+    assert store.test_checkpoint("csmith_1") == {"evaluated": [1, 2]}
+    store.record_test_summary("csmith_1", {"killed_mutants": [], "terminated_early": False})
+    assert not store.reclaim_test("csmith_1", stale_after=-1.0)
+
+
+def test_killed_mutants_since(store: ResultStore):
+    kill_info = {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"}
+    store.record_kill(1, kill_info)
+    killed_mutants, cursor = store.killed_mutants_since(None)
+    assert killed_mutants == {1}
+    store.record_kill(2, kill_info)
+    killed_mutants, cursor = store.killed_mutants_since(cursor)
+    # Kills already returned may be returned again.
+    assert {2} <= killed_mutants <= {1, 2}
+
+
+def test_first_shard_plan_is_kept(store: ResultStore):
+    assert store.record_shard_plan("key", {"a": 0, "b": 1}) == {"a": 0, "b": 1}
+    assert store.record_shard_plan("key", {"a": 1, "b": 0}) == {"a": 0, "b": 1}
+    assert store.record_shard_plan("other_key", {"a": 1}) == {"a": 1}
+
+
+def test_unmodified_killed_mutants_directory_is_not_listed(tmp_path: Path):
+    store: DirectoryResultStore = DirectoryResultStore(tmp_path / "work")
+    kill_info = {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"}
+    store.record_kill(1, kill_info)
+    # A recent modification time is not relied on, in case a kill recorded just after the listing left it unchanged.
+    assert store.killed_mutants_since(None) == ({1}, None)
+    os.utime(store.killed_mutants_dir, (1000.0, 1000.0))
+    killed_mutants, cursor = store.killed_mutants_since(None)
+    assert killed_mutants == {1} and cursor == 1000.0
+    assert store.killed_mutants_since(cursor) == (set(), cursor)
+    store.record_kill(2, kill_info)
+    assert store.killed_mutants_since(cursor)[0] == {1, 2}
+
+
+def test_import_work_directory(tmp_path: Path, capsys):
+    source: DirectoryResultStore = DirectoryResultStore(tmp_path / "work")
+    for test_name in ["csmith_1", "csmith_2", "unfinished"]:
+        assert source.claim_test(test_name)
+    source.record_kill(1, {"killing_test": "csmith_1", "kill_type": "KillStatus.KILL_COMPILER_CRASH"})
+    source.record_test_summary("csmith_1", {"killed_mutants": [1], "terminated_early": False})
+    source.record_test_summary("csmith_2", {"killed_mutants": [2], "terminated_early": False})
+    # Mutants 2 and 3 were killed by workers that crashed before writing the kill information; the test that killed
+    # mutant 2 is known from its summary.
+    (source.killed_mutants_dir / "2").mkdir()
+    (source.killed_mutants_dir / "3").mkdir()
+    store: SqliteResultStore = SqliteResultStore(tmp_path / "work", tmp_path / "results.sqlite")
+    assert import_work_directory(work_dir=tmp_path / "work", store=store) == (3, 3)
+    assert "2 killed mutants have no kill information" in capsys.readouterr().out
+    assert store.killed_mutants() == {1, 2, 3}
+    assert store.kill_info(2) == {"killing_test": "csmith_2", "kill_type": "unknown"}
+    assert store.kill_info(3) == {"killing_test": "unknown", "kill_type": "unknown"}
+    assert store.resumable_tests(stale_after=-1.0) == ["unfinished"]
+    store.close()
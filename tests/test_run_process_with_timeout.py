@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import threading
+
+from typing import List, Optional
+
+from dredd_test_runners.common.run_process_with_timeout import (ProcessEngine,
+                                                                ProcessResult,
+                                                                run_process_with_timeout)
+
+
+def python_cmd(code: str) -> List[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_runs_process():
+    result: Optional[ProcessResult] = run_process_with_timeout(
+        cmd=python_cmd("import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"), timeout_seconds=30)
+    assert result is not None
+    assert result.returncode == 3
+    assert result.stdout == b"out\n" and result.stderr == b"err\n"
+    assert not result.output_truncated
+
+
+def test_timeout():
+    assert run_process_with_timeout(cmd=python_cmd("import time; time.sleep(30)"), timeout_seconds=0.5) is None
+
+
+def test_concurrent_threads():
+    # Each thread has an event loop of its own, so threads can run processes at the same time.
+    results: List[Optional[ProcessResult]] = [None] * 4
+    errors: List[BaseException] = []
+
+    def run(index: int) -> None:
+        try:
+            results[index] = run_process_with_timeout(cmd=python_cmd(f"import time; time.sleep(0.5); print({index})"),
+                                                      timeout_seconds=30)
+        except BaseException as error:
+            errors.append(error)
+
+    threads: List[threading.Thread] = [threading.Thread(target=run, args=(index,)) for index in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [result.stdout for result in results] == [f"{index}\n".encode() for index in range(len(results))]
+
+
+def run_with_limit(code: str, output_limit: int) -> ProcessResult:
+    result: Optional[ProcessResult] = asyncio.run(ProcessEngine(output_limit=output_limit).run(
+        cmd=python_cmd(code), timeout_seconds=30))
+    assert result is not None
+    return result
+
+
+def test_truncated_outputs_are_compared_in_full():
+    same: ProcessResult = run_with_limit("print('a' * 1000)", output_limit=100)
+    also_same: ProcessResult = run_with_limit("print('a' * 1000)", output_limit=100)
+    # The outputs first differ after the output limit.
+    different: ProcessResult = run_with_limit("print('a' * 999 + 'b')", output_limit=100)
+    assert same.output_truncated and different.output_truncated
+    assert same.stdout == different.stdout == b'a' * 100
+    assert same.same_stdout(also_same)
+    assert not same.same_stdout(different)
+    assert same.same_stderr(different)
+
+
+def test_truncated_output_differs_from_untruncated_prefix():
+    truncated: ProcessResult = run_with_limit("print('a' * 1000)", output_limit=100)
+    prefix_only = ProcessResult(returncode=0, stdout=b'a' * 100, stderr=b'')
+    assert not truncated.same_stdout(prefix_only)
+    assert not prefix_only.same_stdout(truncated)
+
+
+def test_cpu_time_limit():
+    # A busy process is stopped once it uses its CPU time allowance, long before the wall-clock timeout.
+    assert run_process_with_timeout(cmd=python_cmd("while True: pass"), timeout_seconds=60, cpu_timeout_seconds=1) \
+        is None
+    # The limit is applied to the process (and so to the processes it starts).
+    result: Optional[ProcessResult] = run_process_with_timeout(cmd=["sh", "-c", "ulimit -t"], timeout_seconds=30,
+                                                               cpu_timeout_seconds=2.5)
+    assert result is not None and result.stdout == b"3\n"
+    # A process that is blocked rather than busy is caught by the wall-clock timeout.
+    assert run_process_with_timeout(cmd=python_cmd("import time; time.sleep(30)"), timeout_seconds=0.5,
+                                    cpu_timeout_seconds=1) is None
+
+
+def test_cpu_time_limit_with_threads():
+    # Processes with CPU time limits can be started while this process has other threads.
+    results: List[Optional[ProcessResult]] = [None] * 4
+
+    def run(index: int) -> None:
+        results[index] = run_process_with_timeout(cmd=python_cmd("print('done')"), timeout_seconds=30,
+                                                  cpu_timeout_seconds=5)
+
+    threads: List[threading.Thread] = [threading.Thread(target=run, args=(index,)) for index in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result is not None and result.stdout == b"done\n" for result in results)
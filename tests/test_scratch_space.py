@@ -0,0 +1,82 @@
+import os
+import pytest
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+
+from dredd_test_runners.common.scratch_space import BuildDirectory, ScratchSpace
+
+
+@pytest.fixture
+def dirs(tmp_path: Path, monkeypatch):
+    ram_dir: Path = tmp_path / "ram"
+    disk_dir: Path = tmp_path / "disk"
+    ram_dir.mkdir()
+    disk_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(disk_dir))
+    return ram_dir, disk_dir
+
+
+def write_megabytes(path: Path, megabytes: int) -> None:
+    with open(path, "wb") as output:
+        output.write(os.urandom(megabytes * 1024 * 1024))
+
+
+def test_directories_fall_back_to_disk_once_over_budget(dirs):
+    ram_dir, disk_dir = dirs
+    with ScratchSpace(ram_dir=ram_dir, ram_budget_mb=1) as scratch_space:
+        first: Path = scratch_space.allocate(prefix="__first_")
+        assert first.parent == scratch_space.ram_root and first.parent.parent == ram_dir
+        write_megabytes(first / "big", 2)
+        second: Path = scratch_space.allocate(prefix="__second_")
+        assert second.parent == scratch_space.disk_root and second.parent.parent == disk_dir
+    assert list(ram_dir.iterdir()) == [] and list(disk_dir.iterdir()) == []
+
+
+def test_zero_budget_only_uses_disk(dirs):
+    ram_dir, _ = dirs
+    with ScratchSpace(ram_dir=ram_dir, ram_budget_mb=0) as scratch_space:
+        assert scratch_space.ram_root is None
+        assert scratch_space.allocate(prefix="__x_").parent == scratch_space.disk_root
+
+
+def test_build_directory_checks_the_budget_before_each_build(dirs):
+    ram_dir, _ = dirs
+    with ScratchSpace(ram_dir=ram_dir, ram_budget_mb=1) as scratch_space:
+        build_directory: BuildDirectory = scratch_space.build_directory(prefix="__worker_")
+        in_ram: Path = build_directory.for_build()
+        assert in_ram.parent == scratch_space.ram_root
+        assert build_directory.for_build() == in_ram
+        # A build that outgrows the budget pushes the next build to disk, and its artifacts are removed from RAM.
+        write_megabytes(in_ram / "__mutant.exe", 2)
+        on_disk: Path = build_directory.for_build()
+        assert on_disk.parent == scratch_space.disk_root
+        assert not in_ram.exists()
+        # Space used by other builds counts against the budget too.
+        other: Path = scratch_space.allocate(prefix="__other_")
+        write_megabytes(other / "big", 2)
+        assert build_directory.for_build() == on_disk
+        # Once usage falls below the budget, builds return to RAM.
+        (other / "big").unlink()
+        back_in_ram: Path = build_directory.for_build()
+        assert back_in_ram.parent == scratch_space.ram_root
+        assert not on_disk.exists()
+
+
+def test_stale_roots_are_removed(dirs):
+    ram_dir, disk_dir = dirs
+    finished: subprocess.Popen = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    stale: Path = ram_dir / f"dredd-scratch-{finished.pid}-abc"
+    (stale / "__worker_x").mkdir(parents=True)
+    stale_on_disk: Path = disk_dir / f"dredd-scratch-{finished.pid}-def"
+    stale_on_disk.mkdir()
+    live: Path = ram_dir / f"dredd-scratch-{os.getpid()}-ghi"
+    live.mkdir()
+    unrelated: Path = ram_dir / "something-else"
+    unrelated.mkdir()
+    with ScratchSpace(ram_dir=ram_dir, ram_budget_mb=1):
+        assert not stale.exists() and not stale_on_disk.exists()
+        assert live.exists() and unrelated.exists()
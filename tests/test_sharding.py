@@ -0,0 +1,83 @@
+import pytest
+
+from pathlib import Path
+from typing import Dict, List, Set
+
+from dredd_test_runners.common.result_store import DirectoryResultStore, ResultStore, open_result_store
+from dredd_test_runners.common.sharding import plan_by_cost, select_shard, shard_by_hash, shard_plan_key
+from dredd_test_runners.common.timeout_calibration import TimingHistory
+
+TEST_NAMES: List[str] = [f"test{index}" for index in range(50)]
+
+
+@pytest.mark.parametrize("strategy", ["hash", "duration"])
+def test_shards_partition_the_tests(strategy: str, tmp_path: Path):
+    result_store: DirectoryResultStore = DirectoryResultStore(tmp_path / "work")
+    shards: List[Set[str]] = [select_shard(test_names=TEST_NAMES,
+                                           shard_index=index,
+                                           shard_count=4,
+                                           strategy=strategy,
+                                           record_plan=result_store.record_shard_plan)
+                              for index in range(4)]
+    assert set().union(*shards) == set(TEST_NAMES)
+    assert sum(len(shard) for shard in shards) == len(TEST_NAMES)
+    assert all(shards)
+
+
+def test_single_shard_has_every_test():
+    assert select_shard(test_names=TEST_NAMES, shard_index=0, shard_count=1, strategy="duration") == set(TEST_NAMES)
+
+
+def test_hash_shards_are_stable():
+    shard: Set[str] = shard_by_hash(test_names=TEST_NAMES, shard_index=1, shard_count=3)
+    # A test stays in its shard when other tests are added or removed.
+    assert shard_by_hash(test_names=TEST_NAMES + ["new_test"], shard_index=1, shard_count=3) - {"new_test"} == shard
+    assert shard_by_hash(test_names=TEST_NAMES[10:], shard_index=1, shard_count=3) == shard - set(TEST_NAMES[:10])
+
+
+def test_plan_by_cost_balances_shards():
+    costs: Dict[str, float] = {"a": 7.0, "b": 5.0, "c": 4.0, "d": 3.0, "e": 1.0}
+    plan: Dict[str, int] = plan_by_cost(test_names=list(costs.keys()), costs=costs, shard_count=2)
+    totals: List[float] = [sum(cost for name, cost in costs.items() if plan[name] == index) for index in range(2)]
+    # The longest-processing-time-first assignment: a, then b, then c with b, then d with a, then e with b.
+    assert plan == {"a": 0, "b": 1, "c": 1, "d": 0, "e": 1}
+    assert sorted(totals) == [10.0, 10.0]
+
+
+def test_plan_by_cost_is_deterministic():
+    costs: Dict[str, float] = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0}
+    plan: Dict[str, int] = plan_by_cost(test_names=["d", "c", "b", "a"], costs=costs, shard_count=2)
+    assert plan == plan_by_cost(test_names=["a", "b", "c", "d"], costs=costs, shard_count=2)
+    assert plan == {"a": 0, "b": 1, "c": 0, "d": 1}
+
+
+def test_tests_without_durations_are_given_the_median():
+    costs: Dict[str, float] = {"a": 10.0, "b": 2.0, "c": 1.0}
+    plan: Dict[str, int] = plan_by_cost(test_names=["a", "b", "c", "unknown"], costs=costs, shard_count=2)
+    # The unknown test is assumed to take 2, so it joins b and c rather than a.
+    assert plan == {"a": 0, "b": 1, "unknown": 1, "c": 1}
+
+
+@pytest.mark.parametrize("use_database", [False, True])
+def test_duration_plan_is_recorded_and_reused(use_database: bool, tmp_path: Path):
+    history: TimingHistory = TimingHistory(tmp_path / "history")
+    history.record("slow", "run", [10.0])
+    for name in ["fast1", "fast2", "fast3"]:
+        history.record(name, "run", [1.0])
+    test_names: List[str] = ["slow", "fast1", "fast2", "fast3"]
+    result_store: ResultStore = open_result_store(work_dir=tmp_path / "work",
+                                                  result_database=tmp_path / "results.sqlite" if use_database else None)
+    shard: Set[str] = select_shard(test_names=test_names, shard_index=0, shard_count=2, strategy="duration",
+                                   timing_history_dir=tmp_path / "history", record_plan=result_store.record_shard_plan)
+    assert shard == {"slow"}
+    plan_key: str = shard_plan_key(test_names=test_names, shard_count=2)
+    assert result_store.record_shard_plan(plan_key, {}) == {"slow": 0, "fast1": 1, "fast2": 1, "fast3": 1}
+    # A worker that starts later sees a different history, but uses the recorded plan.
+    history.record("fast1", "run", [100.0])
+    assert select_shard(test_names=test_names, shard_index=1, shard_count=2, strategy="duration",
+                        timing_history_dir=tmp_path / "history",
+                        record_plan=result_store.record_shard_plan) == {"fast1", "fast2", "fast3"}
+    # Without a result store, the split is computed afresh.
+    assert select_shard(test_names=test_names, shard_index=0, shard_count=2, strategy="duration",
+                        timing_history_dir=tmp_path / "history") == {"fast1"}
+    result_store.close()
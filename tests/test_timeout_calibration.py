@@ -0,0 +1,76 @@
+import pytest
+import sys
+
+from pathlib import Path
+
+from dredd_test_runners.common.timeout_calibration import (MAX_HISTORY_SAMPLES,
+                                                           TimeoutCalibration,
+                                                           TimingHistory,
+                                                           mutant_timeout,
+                                                           quantile)
+
+
+def test_quantile():
+    assert quantile([3.0], 0.95) == 3.0
+    assert quantile([4.0, 1.0, 3.0, 2.0], 0.0) == 1.0
+    assert quantile([4.0, 1.0, 3.0, 2.0], 1.0) == 4.0
+    assert quantile([4.0, 1.0, 3.0, 2.0], 0.5) == pytest.approx(2.5)
+    # Linear interpolation between the closest ranks.
+    assert quantile([0.0, 10.0], 0.95) == pytest.approx(9.5)
+    with pytest.raises(AssertionError):
+        quantile([], 0.5)
+    with pytest.raises(AssertionError):
+        quantile([1.0], 1.5)
+
+
+def test_mutant_timeout():
+    assert mutant_timeout(baseline=0.1, multiplier=5.0, minimum=1.0) == 1.0
+    assert mutant_timeout(baseline=2.0, multiplier=5.0, minimum=1.0) == 10.0
+
+
+def test_timing_history(tmp_path: Path):
+    history = TimingHistory(tmp_path / "history")
+    assert history.recorded_duration("test") is None
+    assert history.record("test", "compile", [1.0, 2.0]) == [1.0, 2.0]
+    assert history.record("test", "compile", [3.0]) == [1.0, 2.0, 3.0]
+    assert history.record("test", "run", [0.5]) == [0.5]
+    # The median of each kind of step, summed.
+    assert history.recorded_duration("test") == pytest.approx(2.5)
+    # Histories survive across instances, and are kept per test.
+    assert TimingHistory(tmp_path / "history").recorded_duration("test") == pytest.approx(2.5)
+    assert TimingHistory(tmp_path / "history").recorded_duration("other") is None
+
+
+def test_timing_history_keeps_recent_samples(tmp_path: Path):
+    history = TimingHistory(tmp_path)
+    history.record("test", "run", [float(sample) for sample in range(MAX_HISTORY_SAMPLES)])
+    samples = history.record("test", "run", [100.0, 101.0])
+    assert len(samples) == MAX_HISTORY_SAMPLES
+    assert samples[0] == 2.0 and samples[-2:] == [100.0, 101.0]
+
+
+def test_corrupt_history_is_ignored(tmp_path: Path):
+    (tmp_path / "test.json").write_text("{not json")
+    assert TimingHistory(tmp_path).recorded_duration("test") is None
+    assert TimingHistory(tmp_path).record("test", "run", [1.0]) == [1.0]
+
+
+def test_baseline_uses_history(tmp_path: Path):
+    calibration = TimeoutCalibration(runs=2, timeout_quantile=1.0, history_dir=tmp_path)
+    assert calibration.baseline_from_samples("test", "run", [5.0, 1.0]) == 5.0
+    # The earlier, slower sample is still taken into account.
+    assert calibration.baseline_from_samples("test", "run", [1.0, 1.0]) == 5.0
+    assert TimeoutCalibration(runs=2, timeout_quantile=1.0).baseline_from_samples("test", "run", [1.0, 1.0]) == 1.0
+
+
+def test_calibrate_repeats_commands(tmp_path: Path):
+    calibration = TimeoutCalibration(runs=3, timeout_quantile=0.0)
+    counter: Path = tmp_path / "counter"
+    cmd = [sys.executable, "-c", f"open({str(counter)!r}, 'a').write('x')"]
+    baseline = calibration.calibrate(test_name="test", kind="run", cmds=[cmd, cmd], first_sample=0.0,
+                                     timeout_seconds=30)
+    assert baseline == 0.0
+    assert counter.read_text() == "xxxx"
+    sleep = [sys.executable, "-c", "import time; time.sleep(30)"]
+    assert calibration.calibrate(test_name="test", kind="run", cmds=[sleep], first_sample=0.0,
+                                 timeout_seconds=0.5) is None